@@ -4,6 +4,15 @@ Sistema de gestión para restaurante con reservas, pedidos y múltiples paneles
 """
 import os
 
+if __name__ == '__main__' and os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+    # La cola de mensajes usa sockets bloqueantes: con eventlet hay que parchearlos
+    # antes de importar el resto
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+    except ImportError:
+        pass
+
 # Configuración para subir imágenes
 STATIC_FOLDER = 'static'
 UPLOADS_FOLDER = os.path.join(STATIC_FOLDER, 'uploads')
@@ -32,9 +41,25 @@ from flask import Flask, render_template
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from config import config
-from models import db, Usuario
+from models import db, ArchivoSubido, Pedido, ProductoPiscina, VentaResumen
 from werkzeug.utils import secure_filename
 from socket_events import socketio  # Importar la instancia de SocketIO
+from utils.ocupacion import indice_ocupacion
+from utils.menu_cache import menu_cache
+from utils.piscina_catalogo import iniciar_sincronizacion_periodica, sincronizar_productos_piscina
+from utils.ventas_resumen import reconstruir_ventas
+from utils.alertas import iniciar_revision_periodica, motor_alertas
+from utils.cola_cocina import cola_cocina
+from utils.disponibilidad import disponibilidad
+from utils.usuarios_cache import cache_usuarios
+from utils.contrasenas import pool_hash
+from utils.imagenes import procesador_imagenes
+from utils import almacen, compresion, json_rapido, migraciones
+from utils.assets import assets
+from utils.cola_mensajes import crear_gestor
+from utils.eventos import bus_eventos
+from utils.metricas import metricas
+from utils.presupuesto_sql import presupuesto_sql
 from sqlalchemy.exc import OperationalError, InterfaceError
 
 # Importar blueprints
@@ -50,9 +75,11 @@ from routes.cuenta import cuenta_bp
 
 from routes.admin_api import admin_api_bp
 
-def create_app(config_name='default'):
+def create_app(config_name='default', config_overrides=None):
     """Factory para crear la aplicación Flask"""
     app = Flask(__name__)
+    # JSON con orjson; Decimal y fechas de los modelos se convierten al serializar
+    app.json = json_rapido.ProveedorJSON(app)
     # Configuración para subir imágenes (mover aquí evita usar `app` antes de definirla)
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, MENU_UPLOADS)  # Por defecto usa la carpeta del menú
     app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -63,15 +90,35 @@ def create_app(config_name='default'):
 
     # Cargar configuración
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     
     # Inicializar extensiones
     db.init_app(app)
-    # Inicializar SocketIO con la app (usa init_app para instancias globales)
+    # Inicializar SocketIO con la app (usa init_app para instancias globales).
+    # Con SOCKETIO_MESSAGE_QUEUE los emits se reparten entre todos los procesos;
+    # client_manager se pasa siempre porque init_app acumula las opciones
     try:
-        socketio.init_app(app, cors_allowed_origins='*')
+        socketio.init_app(
+            app,
+            cors_allowed_origins='*',
+            async_mode=app.config.get('SOCKETIO_ASYNC_MODE'),
+            json=json_rapido,
+            client_manager=crear_gestor(app.config.get('SOCKETIO_MESSAGE_QUEUE'),
+                                        app.config.get('SOCKETIO_CHANNEL', 'boodfood')),
+        )
     except Exception:
         # Fallback: si ya estaba inicializado, ignorar
         pass
+    # Primero de los before_request y último de los after_request: mide la petición completa
+    metricas.iniciar(app, socketio)
+    presupuesto_sql.iniciar(app)
+    bus_eventos.iniciar(app)
+    cola_cocina.iniciar(app)
+    pool_hash.configurar(app.config.get('HASH_CONCURRENCIA'), socketio.async_mode)
+    procesador_imagenes.iniciar(app)
+    assets.iniciar(app)
+    compresion.iniciar(app)
     
     # Configurar Flask-Login
     login_manager = LoginManager()
@@ -82,13 +129,13 @@ def create_app(config_name='default'):
     
     @login_manager.user_loader
     def load_user(user_id):
-        """Carga el usuario para Flask-Login con manejo de desconexión de MySQL.
-        Intenta una vez, y si hay error de conexión, recicla el engine y reintenta.
+        """Carga el usuario para Flask-Login desde la caché de usuarios (sin tocar la
+        base de datos si ya está). Si al leerlo hay error de conexión, recicla el
+        engine y reintenta una vez.
         """
         uid = int(user_id)
         try:
-            # Preferir Session.get() (SQLAlchemy 2.x)
-            return db.session.get(Usuario, uid)
+            return cache_usuarios.obtener(uid)
         except (OperationalError, InterfaceError):
             # Conexión perdida, intentar recuperar
             try:
@@ -100,7 +147,7 @@ def create_app(config_name='default'):
             except Exception:
                 pass
             try:
-                return db.session.get(Usuario, uid)
+                return cache_usuarios.obtener(uid)
             except Exception:
                 return None
     
@@ -116,6 +163,47 @@ def create_app(config_name='default'):
     app.register_blueprint(cuenta_bp)
     app.register_blueprint(admin_api_bp)
     
+    @app.cli.command('migrar')
+    def migrar_command():
+        """Aplica las migraciones pendientes del esquema"""
+        aplicadas = migraciones.migrar()
+        print(f"Esquema en la versión {migraciones.version_actual()} "
+              f"(aplicadas ahora: {', '.join(map(str, aplicadas)) or 'ninguna'})")
+    
+    @app.cli.command('sincronizar-piscina')
+    def sincronizar_piscina_command():
+        """Reenlaza productos_de_consumo_rapido con el menú (para cron)"""
+        resultado = sincronizar_productos_piscina()
+        print(f"Productos sincronizados: {resultado['productos']}, "
+              f"items del menú creados: {resultado['menu_items_creados']}")
+    
+    @app.cli.command('reconstruir-ventas')
+    def reconstruir_ventas_command():
+        """Recalcula los acumulados de ventas desde la tabla de pedidos"""
+        grupos = reconstruir_ventas()
+        print(f"Acumulados de ventas reconstruidos: {grupos} grupos")
+    
+    @app.cli.command('limpiar-uploads')
+    def limpiar_uploads_command():
+        """Borra las fotos e imágenes subidas que ya nadie usa"""
+        resultado = almacen.barrer()
+        print(f"Archivos borrados: {resultado['archivos']} ({resultado['bytes'] / 1024 / 1024:.1f} MB)")
+    
+    @app.cli.command('reconstruir-uploads')
+    def reconstruir_uploads_command():
+        """Registra los archivos subidos y recuenta sus referencias"""
+        archivos = almacen.reconstruir()
+        print(f"Archivos subidos registrados: {archivos}")
+    
+    @app.teardown_appcontext
+    def sincronizar_cola_cocina(exception=None):
+        """Envía a cocina los pedidos que cambiaron en este contexto (petición, CLI...)"""
+        try:
+            cola_cocina.sincronizar()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f'No se pudo sincronizar la cola de cocina: {e}')
+    
     # Manejador de errores
     @app.errorhandler(404)
     def not_found(error):
@@ -126,9 +214,30 @@ def create_app(config_name='default'):
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
-    # Crear tablas si no existen
     with app.app_context():
-        db.create_all()
+        # Versión del esquema: una consulta; aplica las migraciones pendientes (utils.migraciones)
+        migraciones.preparar(app)
+        # Construir el índice de ocupación de mesas de este proceso
+        indice_ocupacion.reconstruir()
+        # Primer enlace de productos de la piscina con el menú
+        if ProductoPiscina.query.first() is None:
+            sincronizar_productos_piscina()
+        # Primer cálculo de los acumulados de ventas (luego son incrementales)
+        if VentaResumen.query.first() is None and Pedido.query.first() is not None:
+            reconstruir_ventas()
+        # Conjunto inicial de alertas del admin (luego se actualiza con cada commit)
+        motor_alertas.reconstruir()
+        cola_cocina.reconstruir()
+        # Registrar los archivos subidos antes de este almacén (luego es incremental)
+        if ArchivoSubido.query.first() is None:
+            almacen.reconstruir()
+    iniciar_revision_periodica(app, socketio)
+    almacen.iniciar_limpieza_periodica(app, socketio)
+    iniciar_sincronizacion_periodica(app, socketio)
+    # El snapshot del menú y los días de reservas se cargan en la primera lectura
+    menu_cache.invalidar()
+    disponibilidad.invalidar()
+    cache_usuarios.invalidar()
     
     return app
 
@@ -136,4 +245,4 @@ def create_app(config_name='default'):
 if __name__ == '__main__':
     app = create_app('development')
     # Usar socketio.run en lugar de app.run para habilitar WebSocket
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    socketio.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
@@ -0,0 +1,112 @@
+"""
+Bytes y CPU por petición de los endpoints más pesados, con y sin gzip.
+
+Crea una base SQLite temporal con ``--pedidos`` pedidos (3 items cada uno) y
+``--platos`` items del menú, y pide cada endpoint ``--repeticiones`` veces:
+
+* ``identidad``: sin ``Accept-Encoding`` (como antes);
+* ``gzip``: con ``Accept-Encoding: gzip`` y ``COMPRESION_NIVEL`` = ``--nivel``.
+
+La CPU es ``time.process_time`` del proceso (servir + serializar + comprimir).
+Al final, el coste de comprimir sólo el cuerpo a los niveles 1, 6 y 9.
+
+Uso::
+
+    python -m benchmarks.bench_compresion [--pedidos 200] [--platos 80] [--nivel 6]
+
+El menú sale de la caché precomprimida (el coste de gzip se paga una vez por
+versión del menú); los listados de pedidos se comprimen en cada petición.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db, Categoria, MenuItem, Pedido, PedidoItem, Usuario
+from utils.compresion import comprimir
+
+ENDPOINTS = ['/api/menu', '/admin/api/menu/items', '/api/cocina/pedidos', '/admin/api/pedidos?limite=200',
+             '/cuenta/api/mis-pedidos']
+
+
+def _poblar(app, pedidos, platos):
+    with app.app_context():
+        admin = Usuario(nombre='Admin', apellido='Bench', email='admin@bench.com', password_hash='x',
+                        rol='admin', activo=True)
+        categoria = Categoria(nombre='Platos', orden=1)
+        db.session.add_all([admin, categoria])
+        db.session.flush()
+        menu = [MenuItem(restaurante_id=1, categoria_id=categoria.id, nombre=f'Plato {i}',
+                         descripcion='Arroz, frijoles, chicharrón, huevo, plátano maduro y aguacate',
+                         precio=Decimal('18000'), imagen_url=f'/static/uploads/menu/plato{i}.jpg')
+                for i in range(platos)]
+        db.session.add_all(menu)
+        db.session.flush()
+        for n in range(pedidos):
+            pedido = Pedido(usuario_id=admin.id, restaurante_id=1, subtotal=Decimal('54000'),
+                            total=Decimal('54000'), metodo_pago='efectivo', estado='pendiente')
+            db.session.add(pedido)
+            db.session.flush()
+            for plato in menu[n % platos:n % platos + 3]:
+                db.session.add(PedidoItem(pedido_id=pedido.id, menu_item_id=plato.id, nombre_item=plato.nombre,
+                                          cantidad=1, precio_unitario=plato.precio, subtotal=plato.precio))
+        db.session.commit()
+        return admin.id
+
+
+def _medir(client, url, repeticiones, headers):
+    client.get(url, headers=headers)  # calentar cachés (usuario, menú)
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        respuesta = client.get(url, headers=headers)
+    cpu = (time.process_time() - inicio) / repeticiones * 1000
+    return len(respuesta.data), cpu, respuesta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pedidos', type=int, default=200)
+    parser.add_argument('--platos', type=int, default=80)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--nivel', type=int, default=6)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(carpeta, "bench.db")}',
+        'COMPRESION_NIVEL': args.nivel,
+    })
+    usuario_id = _poblar(app, args.pedidos, args.platos)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(usuario_id)
+        sess['_fresh'] = True
+
+    print(f'{args.pedidos} pedidos, {args.platos} platos; gzip nivel {args.nivel}')
+    print(f'{"endpoint":32} {"modo":9} {"bytes":>9} {"ratio":>6} {"CPU ms":>7}')
+    cuerpos = {}
+    for url in ENDPOINTS:
+        plano, cpu_plano, respuesta = _medir(client, url, args.repeticiones, {})
+        cuerpos[url] = respuesta.data
+        comprimido, cpu_gzip, _ = _medir(client, url, args.repeticiones, {'Accept-Encoding': 'gzip'})
+        print(f'{url:32} {"identidad":9} {plano:9d} {1:6.2f} {cpu_plano:7.2f}')
+        print(f'{"":32} {"gzip":9} {comprimido:9d} {comprimido / plano:6.2f} {cpu_gzip:7.2f}')
+
+    print()
+    print(f'{"sólo gzip del cuerpo":32} {"nivel":>9} {"bytes":>9} {"ratio":>6} {"CPU ms":>7}')
+    for url, cuerpo in cuerpos.items():
+        for nivel in (1, 6, 9):
+            inicio = time.process_time()
+            for _ in range(args.repeticiones):
+                resultado = comprimir(cuerpo, nivel)
+            cpu = (time.process_time() - inicio) / args.repeticiones * 1000
+            print(f'{url:32} {nivel:9d} {len(resultado):9d} {len(resultado) / len(cuerpo):6.2f} {cpu:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Latencia del bucle de eventos durante una ráfaga de logins.
+
+Con eventlet (como en producción), lanza N verificaciones de contraseña
+simultáneas mientras un greenlet "latido" se despierta cada 10 ms, igual que
+el heartbeat de un socket o el siguiente paquete de otra conexión. Se mide
+cuánto se retrasa cada latido:
+
+* ``directo``: ``check_password_hash`` en el greenlet de la petición (antes).
+* ``pool``: ``utils.contrasenas.verificar_hash`` (hilos nativos con tope).
+
+Uso::
+
+    python -m benchmarks.bench_hash_login [--logins 100] [--concurrencia 4]
+
+Con el hash en el greenlet los retrasos llegan al tiempo de un hash (o
+varios seguidos); con el pool se mantienen en el orden de milisegundos.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils.contrasenas import pool_hash, verificar_hash
+
+PERIODO = 0.01
+
+
+def _medir(verificar, password_hash, logins):
+    retrasos = []
+    activo = [True]
+
+    def latido():
+        while activo[0]:
+            esperado = time.perf_counter() + PERIODO
+            eventlet.sleep(PERIODO)
+            retrasos.append(max(time.perf_counter() - esperado, 0) * 1000)
+
+    hilo_latido = eventlet.spawn(latido)
+    eventlet.sleep(0)
+    inicio = time.perf_counter()
+    pool = eventlet.GreenPool(logins)
+    resultados = list(pool.imap(lambda _: verificar(password_hash, 'secreta'), range(logins)))
+    duracion = time.perf_counter() - inicio
+    activo[0] = False
+    hilo_latido.wait()
+    assert all(resultados)
+    return duracion, retrasos
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrencia', type=int, default=None)
+    args = parser.parse_args()
+
+    pool_hash.configurar(args.concurrencia)
+    password_hash = generate_password_hash('secreta')
+
+    print(f'{args.logins} logins simultáneos; latido cada {PERIODO * 1000:.0f} ms')
+    print(f'{"modo":8} {"total s":>8} {"latidos":>8} {"p50 ms":>8} {"p99 ms":>8} {"máx ms":>8}')
+    for modo, verificar in (('directo', check_password_hash), ('pool', verificar_hash)):
+        duracion, retrasos = _medir(verificar, password_hash, args.logins)
+        print(f'{modo:8} {duracion:8.2f} {len(retrasos):8d} {statistics.median(retrasos or [0]):8.2f} '
+              f'{_percentil(retrasos, 0.99):8.2f} {max(retrasos or [0]):8.2f}')
+
+
+if __name__ == '__main__':
+    main()
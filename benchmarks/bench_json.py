@@ -0,0 +1,106 @@
+"""
+Serialización de listas de pedidos: proveedor de Flask por defecto frente a
+``utils.json_rapido``.
+
+Construye en memoria (sin base de datos) N pedidos con 3 items cada uno,
+cada item con su plato completo, y mide para cada tamaño:
+
+* ``antes``: ``to_dict`` + ``float()`` / ``.isoformat()`` campo a campo (lo
+  que hacían los modelos) + ``json`` de la biblioteca estándar con las
+  opciones por defecto de Flask (``sort_keys``, ``ensure_ascii``);
+* ``ahora``: ``to_dict`` con los valores de las columnas tal cual +
+  ``orjson`` (``json_rapido.dumps_bytes``).
+
+Tiempo total y pico de memoria de Python (``tracemalloc``) de la
+serialización completa, incluidos los diccionarios intermedios.
+
+Uso::
+
+    python -m benchmarks.bench_json [--tamanos 1000 5000 10000] [--repeticiones 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import MenuItem, Pedido, PedidoItem
+from utils import json_rapido
+
+
+def _pedidos(n):
+    platos = [MenuItem(id=i, restaurante_id=1, categoria_id=1, nombre=f'Plato {i}',
+                       descripcion='Arroz, frijoles, chicharrón y aguacate', precio=Decimal('18000.00'),
+                       imagen_url=f'/static/uploads/menu/plato{i}.jpg', disponible=True)
+               for i in range(50)]
+    pedidos = []
+    for p in range(n):
+        items = [PedidoItem(pedido_id=p, menu_item_id=plato.id, nombre_item=plato.nombre, cantidad=2,
+                            precio_unitario=plato.precio, subtotal=plato.precio * 2, menu_item=plato)
+                 for plato in platos[p % 48:p % 48 + 3]]
+        pedidos.append(Pedido(id=p, usuario_id=1, codigo_pedido=f'PED{p:06d}', subtotal=Decimal('108000.00'),
+                              impuestos=Decimal('0.00'), total=Decimal('108000.00'), estado='pendiente',
+                              metodo_pago='efectivo', fecha_pedido=datetime(2025, 5, 1, 12, 30, p % 60),
+                              items=items))
+    return pedidos
+
+
+def _como_antes(valor):
+    """Conversión campo a campo que hacían los ``to_dict``"""
+    if isinstance(valor, dict):
+        return {clave: _como_antes(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_como_antes(v) for v in valor]
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date, hora)):
+        return valor.isoformat()
+    return valor
+
+
+def antes(pedidos):
+    datos = [_como_antes(p.to_dict()) for p in pedidos]
+    return json.dumps(datos, ensure_ascii=True, sort_keys=True).encode('utf-8')
+
+
+def ahora(pedidos):
+    return json_rapido.dumps_bytes([p.to_dict() for p in pedidos])
+
+
+def _medir(funcion, pedidos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion(pedidos)
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion(pedidos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos) * 1000, pico / 1024 / 1024, len(cuerpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    motor = 'orjson' if json_rapido.orjson is not None else 'json (sin orjson)'
+    print(f'ahora = {motor}')
+    print(f'{"pedidos":>8} {"modo":6} {"ms":>9} {"pico MB":>8} {"bytes":>10}')
+    for n in args.tamanos:
+        pedidos = _pedidos(n)
+        assert json.loads(antes(pedidos[:5])) == json.loads(ahora(pedidos[:5]))
+        for nombre, funcion in (('antes', antes), ('ahora', ahora)):
+            ms, pico, tamano = _medir(funcion, pedidos, args.repeticiones)
+            print(f'{n:8d} {nombre:6} {ms:9.1f} {pico:8.1f} {tamano:10d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,506 @@
+"""
+Simulador de la hora del almuerzo: tráfico mixto por HTTP y Socket.IO contra
+la app en marcha, para dimensionar workers y el pool de la base de datos.
+
+Por defecto arranca la app en un proceso aparte (``socketio.run``, como
+``python app.py``, configuración ``production``) sobre una copia de la base
+de ``benchmarks.restaurante``; con ``--url`` ataca una que ya esté en marcha
+y tenga los usuarios del restaurante sintético. Cada actor es un hilo con su
+propia sesión (login real) y conexión keep-alive:
+
+* ``--tabletas``: tabletas de mesa conectadas por Socket.IO a su mesa que
+  refrescan ``/api/menu`` (con ``If-None-Match``) y ``/api/mesas``;
+* ``--clientes``: clientes que miran el menú y piden (a mesa o a domicilio)
+  con ``/pedidos/crear`` y de vez en cuando revisan ``mis-pedidos``;
+* ``--piscina``: pedidos de piscina con los productos enlazados;
+* ``--cocineros``: cocina conectada por Socket.IO que lee la cola y pasa los
+  pedidos a ``preparando`` y luego a ``entregado``;
+* ``--admins``: paneles de admin (Socket.IO) que refrescan dashboard,
+  alertas y pedidos cada ``--intervalo-admin`` segundos;
+* ráfagas de ``--rafaga`` reservas simultáneas para la misma noche cada
+  ``--intervalo-rafaga`` segundos (las que chocan se cuentan como rechazos).
+
+Al final, por endpoint: peticiones, peticiones/s, p50/p95/p99, errores (5xx
+o fallos de conexión) y rechazos (4xx); y por Socket.IO: conexiones y
+eventos recibidos. ``--salida`` guarda el resultado en JSON.
+
+Uso::
+
+    python -m benchmarks.hora_pico --duracion 120 --tabletas 40 --clientes 30 [--pool 5]
+    python -m benchmarks.hora_pico --url http://127.0.0.1:5000 --duracion 300
+
+Socket.IO necesita ``websocket-client``; sin él se simula sólo el HTTP.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import restaurante
+
+try:
+    import socketio as cliente_socketio
+    import websocket  # noqa: F401  (transporte WebSocket del cliente de Socket.IO)
+except ImportError:  # pragma: no cover - depende del entorno
+    cliente_socketio = None
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class Registro:
+    """Latencias y resultados por endpoint, y contadores de Socket.IO"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}   # nombre -> {'tiempos': [...], 'errores': n, 'rechazos': n}
+        self.sockets = {'conectados': 0, 'fallidos': 0, 'eventos': 0}
+
+    def anotar(self, nombre, duracion, estado):
+        with self._lock:
+            datos = self.endpoints.setdefault(nombre, {'tiempos': [], 'errores': 0, 'rechazos': 0})
+            datos['tiempos'].append(duracion)
+            if estado is None or estado >= 500:
+                datos['errores'] += 1
+            elif estado >= 400:
+                datos['rechazos'] += 1
+
+    def socket(self, clave, cantidad=1):
+        with self._lock:
+            self.sockets[clave] += cantidad
+
+    def resumen(self, duracion):
+        with self._lock:
+            endpoints = {}
+            for nombre, datos in sorted(self.endpoints.items()):
+                tiempos = sorted(datos['tiempos'])
+                total = len(tiempos)
+                endpoints[nombre] = {
+                    'peticiones': total,
+                    'por_segundo': round(total / duracion, 2),
+                    'p50_ms': round(_percentil(tiempos, 0.50) * 1000, 2),
+                    'p95_ms': round(_percentil(tiempos, 0.95) * 1000, 2),
+                    'p99_ms': round(_percentil(tiempos, 0.99) * 1000, 2),
+                    'errores': datos['errores'],
+                    'tasa_error': round(datos['errores'] / total, 4),
+                    'rechazos': datos['rechazos'],
+                }
+            return endpoints, dict(self.sockets)
+
+
+def _percentil(ordenados, fraccion):
+    return ordenados[max(0, math.ceil(fraccion * len(ordenados)) - 1)] if ordenados else 0.0
+
+
+class Navegador:
+    """Sesión HTTP keep-alive de un actor (cookie de sesión de Flask y ETags)"""
+
+    def __init__(self, url, registro):
+        partes = urlsplit(url)
+        self.host, self.puerto = partes.hostname, partes.port or 80
+        self.registro = registro
+        self.cookies = {}
+        self.etags = {}
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            self._conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=30)
+        return self._conexion
+
+    def cabecera_cookie(self):
+        return '; '.join(f'{nombre}={valor}' for nombre, valor in self.cookies.items())
+
+    def pedir(self, metodo, ruta, nombre=None, json_=None, form=None, etag=False):
+        """Hace la petición y la anota en el registro; devuelve (estado, cuerpo) o (None, None)"""
+        cabeceras = {}
+        cuerpo = None
+        if json_ is not None:
+            cuerpo = json.dumps(json_).encode()
+            cabeceras['Content-Type'] = 'application/json'
+        elif form is not None:
+            cuerpo = urlencode(form).encode()
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            cabeceras['Cookie'] = self.cabecera_cookie()
+        if etag and ruta in self.etags:
+            cabeceras['If-None-Match'] = self.etags[ruta]
+        cabeceras['Accept-Encoding'] = 'gzip'
+        nombre = nombre or f'{metodo} {ruta}'
+        inicio = time.perf_counter()
+        try:
+            conexion = self._conectar()
+            conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            datos = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.cerrar()
+            self.registro.anotar(nombre, time.perf_counter() - inicio, None)
+            return None, None
+        self.registro.anotar(nombre, time.perf_counter() - inicio, respuesta.status)
+        for valor in respuesta.headers.get_all('Set-Cookie') or []:
+            clave, _, resto = valor.partition('=')
+            self.cookies[clave.strip()] = resto.split(';', 1)[0]
+        if etag and respuesta.getheader('ETag'):
+            self.etags[ruta] = respuesta.getheader('ETag')
+        if respuesta.getheader('Content-Encoding') == 'gzip':
+            import gzip
+            datos = gzip.decompress(datos)
+        return respuesta.status, datos
+
+    def json(self, metodo, ruta, nombre=None, **kwargs):
+        estado, datos = self.pedir(metodo, ruta, nombre, **kwargs)
+        if estado is None or estado >= 300 or not datos:
+            return estado, None
+        try:
+            return estado, json.loads(datos)
+        except ValueError:
+            return estado, None
+
+    def login(self, usuario_id):
+        estado, _ = self.pedir('POST', '/login', 'POST /login', form={
+            'email': restaurante.email(usuario_id), 'password': restaurante.CONTRASENA})
+        return estado in (302, 303)
+
+    def cerrar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+
+class Simulacion:
+    """Actores de la hora pico contra ``url`` durante ``duracion`` segundos"""
+
+    def __init__(self, url, args, ids, semilla=42):
+        self.url = url.rstrip('/')
+        self.args = args
+        self.ids = ids
+        self.semilla = semilla
+        self.registro = Registro()
+        self.fin = threading.Event()
+        self._sockets = []
+
+    # -- utilidades ----------------------------------------------------------
+
+    def _esperar(self, azar, media):
+        """Pausa exponencial de media ``media`` segundos (interrumpible al terminar)"""
+        self.fin.wait(azar.expovariate(1 / media) if media > 0 else 0)
+
+    def _navegador(self, usuario_id):
+        navegador = Navegador(self.url, self.registro)
+        if usuario_id is not None and not navegador.login(usuario_id):
+            return None
+        return navegador
+
+    def _conectar_socket(self, navegador, mesa_id=None):
+        if cliente_socketio is None:
+            return
+        cliente = cliente_socketio.Client(reconnection=False)
+
+        @cliente.on('*')
+        def _evento(evento, *datos):
+            self.registro.socket('eventos')
+
+        url = self.url + (f'?mesa_id={mesa_id}' if mesa_id else '')
+        try:
+            cliente.connect(url, headers={'Cookie': navegador.cabecera_cookie()}, transports=['websocket'],
+                            wait_timeout=10)
+        except Exception:
+            self.registro.socket('fallidos')
+            return
+        self.registro.socket('conectados')
+        self._sockets.append(cliente)
+
+    def _platos(self, azar, cantidad):
+        return azar.sample(range(1, self.ids['platos'] + 1), min(cantidad, self.ids['platos']))
+
+    def _cliente_id(self, indice):
+        clientes = self.ids['clientes']
+        return clientes[indice % len(clientes)]
+
+    # -- actores -------------------------------------------------------------
+
+    def tableta(self, indice, azar):
+        mesa_id = indice % self.ids['mesas'] + 1
+        navegador = self._navegador(self._cliente_id(indice))
+        if navegador is None:
+            return
+        self._conectar_socket(navegador, mesa_id)
+        while not self.fin.is_set():
+            navegador.pedir('GET', '/api/menu', etag=True)
+            navegador.pedir('GET', '/api/mesas')
+            self._esperar(azar, self.args.intervalo_tableta)
+
+    def cliente(self, indice, azar):
+        navegador = self._navegador(self._cliente_id(self.args.tabletas + indice))
+        if navegador is None:
+            return
+        pedidos = 0
+        while not self.fin.is_set():
+            navegador.pedir('GET', '/api/menu', etag=True)
+            self._esperar(azar, self.args.pausa_cliente / 3)
+            datos = {
+                'items': [{'id': plato, 'precio': 15000, 'cantidad': azar.randint(1, 2)}
+                          for plato in self._platos(azar, azar.randint(1, 4))],
+                'metodo_pago': azar.choice(('efectivo', 'tarjeta')),
+            }
+            if azar.random() < 0.3:
+                datos.update(tipo='mesa', mesa_id=azar.randint(1, self.ids['mesas']))
+            navegador.pedir('POST', '/pedidos/crear', json_=datos)
+            pedidos += 1
+            if pedidos % 3 == 0:
+                navegador.pedir('GET', '/cuenta/api/mis-pedidos')
+            self._esperar(azar, self.args.pausa_cliente)
+
+    def piscina(self, indice, azar):
+        navegador = self._navegador(self._cliente_id(self.args.tabletas + self.args.clientes + indice))
+        if navegador is None or not self.ids['productos_piscina']:
+            return
+        while not self.fin.is_set():
+            navegador.pedir('GET', '/api/piscina/productos', etag=True)
+            productos = azar.sample(range(1, self.ids['productos_piscina'] + 1),
+                                    min(2, self.ids['productos_piscina']))
+            navegador.pedir('POST', '/pedidos/crear', 'POST /pedidos/crear (piscina)', json_={
+                'tipo': 'piscina', 'metodo_pago': 'efectivo',
+                'items': [{'id': f'PS{p}', 'precio': 12000, 'cantidad': 1} for p in productos],
+            })
+            self._esperar(azar, self.args.pausa_cliente * 1.5)
+
+    def cocinero(self, indice, azar):
+        navegador = self._navegador(self.ids['cocinero'])
+        if navegador is None:
+            return
+        self._conectar_socket(navegador)
+        while not self.fin.is_set():
+            _, cola = navegador.json('GET', '/cocina/api/cola')
+            for pedido in (cola or {}).get('pedidos', [])[:6]:
+                if pedido['id'] % self.args.cocineros != indice or self.fin.is_set():
+                    continue
+                siguiente = {'pendiente': 'preparando', 'preparando': 'entregado'}.get(pedido['estado'])
+                if siguiente:
+                    navegador.pedir('POST', f'/cocina/api/pedido/{pedido["id"]}/estado',
+                                    'POST /cocina/api/pedido/<id>/estado', json_={'estado': siguiente})
+            self._esperar(azar, self.args.intervalo_cocina)
+
+    def admin(self, indice, azar):
+        navegador = self._navegador(self.ids['admin'])
+        if navegador is None:
+            return
+        self._conectar_socket(navegador)
+        while not self.fin.is_set():
+            navegador.pedir('GET', '/admin/api/stats/dashboard')
+            navegador.pedir('GET', '/admin/api/alertas')
+            navegador.pedir('GET', '/admin/api/pedidos?limite=50', 'GET /admin/api/pedidos')
+            self.fin.wait(self.args.intervalo_admin)
+
+    def rafagas_reservas(self, indice, azar):
+        navegadores = [self._navegador(self._cliente_id(len(self.ids['clientes']) // 2 + i))
+                       for i in range(self.args.rafaga)]
+        navegadores = [n for n in navegadores if n is not None]
+        if not navegadores:
+            return
+        noche = datetime.utcnow().date() + timedelta(days=1)
+        while not self.fin.wait(self.args.intervalo_rafaga):
+            noche += timedelta(days=1)
+            mesas = azar.sample(range(1, self.ids['mesas'] + 1), min(3, self.ids['mesas']))
+
+            def reservar(navegador, mesa_id):
+                navegador.pedir('GET', f'/api/reservas/disponibilidad?fecha={noche}&hora=20:00&personas=4',
+                                'GET /api/reservas/disponibilidad')
+                navegador.pedir('POST', '/api/reservas/crear', json_={
+                    'fecha': noche.isoformat(), 'hora': '20:00', 'numero_personas': 4, 'mesa_id': mesa_id})
+
+            hilos = [threading.Thread(target=reservar, args=(n, azar.choice(mesas)), daemon=True)
+                     for n in navegadores]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+    # -- ejecución -----------------------------------------------------------
+
+    def ejecutar(self):
+        a = self.args
+        actores = ([(self.tableta, i) for i in range(a.tabletas)]
+                   + [(self.cliente, i) for i in range(a.clientes)]
+                   + [(self.piscina, i) for i in range(a.piscina)]
+                   + [(self.cocinero, i) for i in range(a.cocineros)]
+                   + [(self.admin, i) for i in range(a.admins)]
+                   + ([(self.rafagas_reservas, 0)] if a.rafaga else []))
+        hilos = []
+        for n, (actor, indice) in enumerate(actores):
+            azar = random.Random(self.semilla * 1000 + n)
+            hilos.append(threading.Thread(target=actor, args=(indice, azar), daemon=True))
+        inicio = time.perf_counter()
+        for n, hilo in enumerate(hilos):
+            hilo.start()
+            # Rampa: los actores entran repartidos en los primeros segundos
+            if a.rampa and self.fin.wait(a.rampa / len(hilos)):
+                break
+        self.fin.wait(max(0, a.duracion - (time.perf_counter() - inicio)))
+        self.fin.set()
+        for hilo in hilos:
+            hilo.join(timeout=35)
+        duracion = time.perf_counter() - inicio
+        for cliente in self._sockets:
+            try:
+                cliente.disconnect()
+            except Exception:
+                pass
+        endpoints, sockets = self.registro.resumen(duracion)
+        return {'duracion_s': round(duracion, 1), 'endpoints': endpoints, 'socketio': sockets}
+
+
+# -- servidor local ------------------------------------------------------------
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def servir(base, puerto, pool):
+    """Proceso servidor: la app como en ``python app.py`` sobre la base SQLite dada"""
+    from app import create_app
+    from socket_events import socketio
+    app = create_app('production', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{base}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': pool, 'max_overflow': pool * 2, 'pool_timeout': 10,
+                                      'connect_args': {'timeout': 30}},
+        'SECRET_KEY': 'hora-pico',
+        'SESSION_COOKIE_SECURE': False,
+        'MIGRACIONES_AL_ARRANCAR': True,
+    })
+    socketio.run(app, host='127.0.0.1', port=puerto, log_output=False)
+
+
+def _esperar_servidor(url, proceso, limite=60):
+    navegador = Navegador(url, Registro())
+    fin = time.time() + limite
+    while time.time() < fin:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError('El servidor terminó al arrancar')
+        estado, _ = navegador.pedir('GET', '/api/check-auth')
+        if estado == 200:
+            return
+        time.sleep(0.3)
+    raise RuntimeError(f'El servidor no respondió en {limite} s')
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def simular(args, parametros):
+    """Arranca el servidor si hace falta, ejecuta la simulación y devuelve el resultado"""
+    ids = restaurante.ids(parametros)
+    proceso, carpeta = None, None
+    url = args.url
+    try:
+        if not url:
+            carpeta = tempfile.mkdtemp()
+            base = os.path.join(carpeta, 'restaurante.db')
+            shutil.copyfile(restaurante.base_en_cache(parametros), base)
+            puerto = _puerto_libre()
+            proceso = subprocess.Popen(
+                [sys.executable, '-m', 'benchmarks.hora_pico', '--servir', base, '--puerto', str(puerto),
+                 '--pool', str(args.pool)],
+                cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+            url = f'http://127.0.0.1:{puerto}'
+        _esperar_servidor(url, proceso)
+        resultado = Simulacion(url, args, ids, parametros['semilla']).ejecutar()
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+        if carpeta:
+            shutil.rmtree(carpeta, ignore_errors=True)
+    actores = {clave: getattr(args, clave) for clave in
+               ('tabletas', 'clientes', 'piscina', 'cocineros', 'admins', 'rafaga')}
+    return dict({
+        'simulacion': 'hora_pico',
+        'fecha': datetime.utcnow().replace(microsecond=0).isoformat(),
+        'commit': _commit(),
+        'url': args.url or 'local',
+        'pool': None if args.url else args.pool,
+        'actores': actores,
+        'parametros': parametros,
+    }, **resultado)
+
+
+def imprimir(resultado):
+    print(f"{resultado['duracion_s']} s · actores {resultado['actores']} · pool {resultado['pool']}")
+    print(f'{"endpoint":42} {"total":>6} {"req/s":>7} {"p50":>8} {"p95":>8} {"p99":>8} {"error %":>8} {"4xx":>5}')
+    for nombre, r in resultado['endpoints'].items():
+        print(f"{nombre:42} {r['peticiones']:6d} {r['por_segundo']:7.2f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+              f"{r['p99_ms']:8.1f} {r['tasa_error'] * 100:7.2f}% {r['rechazos']:5d}")
+    total = sum(r['peticiones'] for r in resultado['endpoints'].values())
+    print(f"Total: {total} peticiones ({total / resultado['duracion_s']:.1f}/s)")
+    s = resultado['socketio']
+    if cliente_socketio is None:
+        print('Socket.IO: sin websocket-client, no simulado')
+    else:
+        print(f"Socket.IO: {s['conectados']} conexiones ({s['fallidos']} fallidas), {s['eventos']} eventos recibidos")
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='app ya en marcha (por defecto se arranca una local)')
+    parser.add_argument('--duracion', type=float, default=60)
+    parser.add_argument('--rampa', type=float, default=10, help='segundos en los que entran los actores')
+    parser.add_argument('--tabletas', type=int, default=30)
+    parser.add_argument('--clientes', type=int, default=20)
+    parser.add_argument('--piscina', type=int, default=5)
+    parser.add_argument('--cocineros', type=int, default=3)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--rafaga', type=int, default=8, help='reservas simultáneas por ráfaga (0 = ninguna)')
+    parser.add_argument('--intervalo-tableta', type=float, default=15)
+    parser.add_argument('--pausa-cliente', type=float, default=20)
+    parser.add_argument('--intervalo-cocina', type=float, default=5)
+    parser.add_argument('--intervalo-admin', type=float, default=30)
+    parser.add_argument('--intervalo-rafaga', type=float, default=20)
+    parser.add_argument('--pool', type=int, default=5, help='pool_size de la app local')
+    parser.add_argument('--salida', help='archivo JSON de resultados')
+    parser.add_argument('--verbose', action='store_true', help='mostrar el log del servidor local')
+    parser.add_argument('--servir', metavar='BASE', help=argparse.SUPPRESS)
+    parser.add_argument('--puerto', type=int, help=argparse.SUPPRESS)
+    for clave, valor in restaurante.PARAMETROS_POR_DEFECTO.items():
+        parser.add_argument(f'--{clave.replace("_", "-")}', dest=f'restaurante_{clave}', type=int, default=valor)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = argumentos()
+    if args.servir:
+        servir(args.servir, args.puerto, args.pool)
+        return
+    parametros = {clave: getattr(args, f'restaurante_{clave}') for clave in restaurante.PARAMETROS_POR_DEFECTO}
+    resultado = simular(args, parametros)
+    imprimir(resultado)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f'Resultados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Restaurante sintético y reproducible para los benchmarks.
+
+``construir(url, parametros)`` llena una base vacía (SQLite por defecto; vale
+cualquier URL compatible, p. ej. un MySQL local de pruebas) con:
+
+* ``categorias`` y ``platos`` del menú, cada plato con 2 ingredientes en
+  ``inventario`` (stock de sobra para no agotarse durante el benchmark);
+* ``productos_piscina`` enlazados con los primeros platos (ids ``PS1``...);
+* ``mesas`` del comedor y ``usuarios`` clientes, más un admin, un cocinero y
+  un cliente ``frecuente`` con ``pedidos_frecuente`` pedidos;
+* ``pedidos`` repartidos en los últimos ``dias`` días (1-4 items cada uno),
+  casi todos entregados y los de la última hora en cocina;
+* ``reservas`` en los próximos ``dias_reservas`` días con mesa asignada.
+
+Las filas se generan con ``random.Random(semilla)`` y se insertan en lote con
+``INSERT`` de SQLAlchemy Core (sin eventos de sesión); los derivados
+(``ventas_resumen``, cola de cocina, índices en memoria) se reconstruyen al
+crear la app sobre la base ya llena. ``base_en_cache`` guarda la base SQLite
+por combinación de parámetros para no regenerarla en cada ejecución.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app import create_app
+from config import Config
+from models import (db, Categoria, Inventario, MenuItem, Mesa, Pedido, PedidoItem, ProductoPiscina, Receta,
+                    Reserva, Usuario)
+from utils.contrasenas import generar_hash
+
+PARAMETROS_POR_DEFECTO = {
+    'platos': 2000,
+    'categorias': 25,
+    'mesas': 150,
+    'productos_piscina': 40,
+    'usuarios': 5000,
+    'pedidos': 200000,
+    'pedidos_frecuente': 500,
+    'pedidos_en_cocina': 200,
+    'dias': 365,
+    'reservas': 20000,
+    'dias_reservas': 60,
+    'semilla': 42,
+}
+
+CONTRASENA = 'benchmark'
+LOTE = 5000
+METODOS_PAGO = ('efectivo', 'tarjeta', 'transferencia')
+
+
+def _insertar(modelo, filas):
+    for inicio in range(0, len(filas), LOTE):
+        db.session.execute(insert(modelo.__table__), filas[inicio:inicio + LOTE])
+
+
+def _insertar_pedidos(p, azar, ids_platos, precios, clientes, frecuente_id):
+    ahora = datetime.utcnow().replace(microsecond=0)
+    segundos = p['dias'] * 24 * 3600
+    pedidos, items = [], []
+    for pedido_id in range(1, p['pedidos'] + 1):
+        if pedido_id <= p['pedidos_en_cocina']:
+            fecha = ahora - timedelta(seconds=azar.randrange(3600))
+            estado = azar.choice(('pendiente', 'preparando'))
+        else:
+            fecha = ahora - timedelta(seconds=azar.randrange(3600, segundos))
+            estado = 'entregado' if azar.random() < 0.95 else 'cancelado'
+        usuario_id = frecuente_id if pedido_id % max(1, p['pedidos'] // p['pedidos_frecuente']) == 0 \
+            else azar.choice(clientes)
+        subtotal = Decimal(0)
+        for plato_id in azar.sample(ids_platos, azar.randint(1, min(4, len(ids_platos)))):
+            cantidad = azar.randint(1, 3)
+            linea = precios[plato_id] * cantidad
+            subtotal += linea
+            items.append({'pedido_id': pedido_id, 'menu_item_id': plato_id, 'nombre_item': f'Plato {plato_id}',
+                          'cantidad': cantidad, 'precio_unitario': precios[plato_id], 'subtotal': linea})
+        pedidos.append({'id': pedido_id, 'usuario_id': usuario_id, 'restaurante_id': 1,
+                        'codigo_pedido': f'B{pedido_id:09d}', 'subtotal': subtotal, 'total': subtotal,
+                        'estado': estado, 'metodo_pago': azar.choice(METODOS_PAGO), 'fecha_pedido': fecha,
+                        'created_at': fecha})
+        if len(pedidos) >= LOTE:
+            _insertar(Pedido, pedidos)
+            _insertar(PedidoItem, items)
+            pedidos, items = [], []
+    _insertar(Pedido, pedidos)
+    _insertar(PedidoItem, items)
+
+
+def construir(url, parametros=None):
+    """Crea las tablas en ``url`` (vacía) y las llena; devuelve los ids útiles"""
+    if url == Config.SQLALCHEMY_DATABASE_URI:
+        raise ValueError('El benchmark no puede usar la base de datos de producción')
+    p = {**PARAMETROS_POR_DEFECTO, **(parametros or {})}
+    azar = random.Random(p['semilla'])
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': url, 'PRESUPUESTO_SQL': None, 'METRICAS': False})
+    with app.app_context():
+        if Usuario.query.first() is not None:
+            raise ValueError(f'La base {url} ya tiene datos')
+        hash_ = generar_hash(CONTRASENA)
+        personal = [
+            {'id': 1, 'nombre': 'Admin', 'apellido': 'Bench', 'email': 'admin@bench.local', 'rol': 'admin'},
+            {'id': 2, 'nombre': 'Cocina', 'apellido': 'Bench', 'email': 'cocina@bench.local', 'rol': 'cocinero'},
+            {'id': 3, 'nombre': 'Frecuente', 'apellido': 'Bench', 'email': 'frecuente@bench.local', 'rol': 'cliente'},
+        ]
+        clientes = [{'id': i, 'nombre': f'Cliente {i}', 'apellido': 'Bench', 'email': f'cliente{i}@bench.local',
+                     'rol': 'cliente'} for i in range(4, p['usuarios'] + 4)]
+        _insertar(Usuario, [dict(u, password_hash=hash_, activo=True, estado='activo') for u in personal + clientes])
+
+        _insertar(Categoria, [{'id': i, 'nombre': f'Categoría {i}', 'orden': i}
+                              for i in range(1, p['categorias'] + 1)])
+        precios = {i: Decimal(azar.randrange(8000, 60000, 500)) for i in range(1, p['platos'] + 1)}
+        _insertar(MenuItem, [{'id': i, 'restaurante_id': 1, 'categoria_id': i % p['categorias'] + 1,
+                              'nombre': f'Plato {i}', 'descripcion': 'Arroz, frijoles, chicharrón y aguacate',
+                              'precio': precio, 'disponible': True, 'imagen_url': f'/static/uploads/menu/{i}.jpg'}
+                             for i, precio in precios.items()])
+        ingredientes = max(1, p['platos'] // 4)
+        _insertar(Inventario, [{'id': i, 'nombre': f'Ingrediente {i}', 'cantidad': Decimal('100000000'),
+                                'unidad': 'g', 'stock_minimo': Decimal('10')} for i in range(1, ingredientes + 1)])
+        _insertar(Receta, [{'menu_item_id': plato_id, 'inventario_id': (plato_id + k * 7) % ingredientes + 1,
+                            'cantidad_usada': Decimal('50')} for plato_id in precios for k in range(2)])
+        _insertar(ProductoPiscina, [{'producto_id': f'PS{i}', 'menu_item_id': i, 'nombre': f'Plato {i}',
+                                     'precio': precios[i], 'disponible': True}
+                                    for i in range(1, min(p['productos_piscina'], p['platos']) + 1)])
+        _insertar(Mesa, [{'id': i, 'numero': i, 'capacidad': azar.choice((2, 4, 4, 6, 8)), 'disponible': True}
+                         for i in range(1, p['mesas'] + 1)])
+
+        ids_clientes = [u['id'] for u in clientes]
+        _insertar_pedidos(p, azar, list(precios), precios, ids_clientes, frecuente_id=3)
+
+        manana = datetime.utcnow().date() + timedelta(days=1)
+        _insertar(Reserva, [{'id': i, 'usuario_id': azar.choice(ids_clientes), 'restaurante_id': 1,
+                             'fecha': manana + timedelta(days=azar.randrange(p['dias_reservas'])),
+                             'hora': time(azar.randrange(12, 22), azar.choice((0, 30))),
+                             'numero_personas': azar.randint(2, 8), 'codigo_reserva': f'R{i:08d}',
+                             'estado': azar.choice(('pendiente', 'confirmada')), 'duracion_estimada': 120,
+                             'mesa_asignada': str(azar.randint(1, p['mesas']))}
+                            for i in range(1, p['reservas'] + 1)])
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    return ids(p)
+
+
+def ids(parametros=None):
+    """Ids del personal y del cliente frecuente creados por ``construir``"""
+    p = {**PARAMETROS_POR_DEFECTO, **(parametros or {})}
+    return {'admin': 1, 'cocinero': 2, 'frecuente': 3, 'clientes': range(4, p['usuarios'] + 4),
+            'platos': p['platos'], 'mesas': p['mesas'], 'dias_reservas': p['dias_reservas'],
+            'productos_piscina': min(p['productos_piscina'], p['platos'])}
+
+
+def email(usuario_id):
+    """Email de un usuario creado por ``construir`` (todos con la contraseña ``CONTRASENA``)"""
+    return {1: 'admin@bench.local', 2: 'cocina@bench.local', 3: 'frecuente@bench.local'}.get(
+        usuario_id, f'cliente{usuario_id}@bench.local')
+
+
+def base_en_cache(parametros=None, carpeta=None):
+    """Ruta de una base SQLite construida hoy con estos parámetros (la crea si no existe)
+
+    Las fechas de los pedidos son relativas al momento de construirla: la
+    fecha forma parte de la clave para que "hoy" y "en cocina" signifiquen lo
+    mismo en todas las ejecuciones que se comparan.
+    """
+    p = {**PARAMETROS_POR_DEFECTO, **(parametros or {})}
+    clave = dict(p, construida=datetime.utcnow().date().isoformat())
+    huella = hashlib.sha256(json.dumps(clave, sort_keys=True).encode()).hexdigest()[:12]
+    carpeta = carpeta or os.path.join(tempfile.gettempdir(), 'boodfood-bench')
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f'restaurante-{huella}.db')
+    if not os.path.exists(ruta):
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        construir(f'sqlite:///{temporal}', p)
+        os.replace(temporal, ruta)
+    return ruta
@@ -0,0 +1,238 @@
+"""
+Suite de benchmarks de los caminos calientes sobre un restaurante sintético.
+
+Construye (o reutiliza de la caché) la base de ``benchmarks.restaurante``,
+trabaja sobre una copia para que cada ejecución parta de los mismos datos y
+mide con el cliente de pruebas de Flask (sin red: coste del servidor):
+
+* ``api_menu`` / ``api_menu_frio``: menú público, con el snapshot en caché y
+  reconstruyéndolo en cada petición;
+* ``crear_pedido``: pedido de 3 platos con descuento de inventario;
+* ``cocina_cola``: cola de cocina;
+* ``dashboard``: estadísticas del panel de admin;
+* ``disponibilidad``: mesas libres de un día (cada repetición pide otro día);
+* ``mis_pedidos``: historial del cliente frecuente.
+
+Para cada escenario: p50, p95, media y mínimo en ms, sentencias SQL por
+petición y bytes de la respuesta. Los resultados se escriben en JSON
+(``--salida``) con el commit y los parámetros, para comparar versiones::
+
+    python -m benchmarks.suite --salida antes.json
+    git checkout otra-rama
+    python -m benchmarks.suite --salida despues.json
+    python -m benchmarks.suite --comparar antes.json despues.json
+
+Los parámetros del restaurante (``--pedidos``, ``--platos``...) cambian el
+tamaño; ``--url`` usa otra base compatible (p. ej. un MySQL local vacío, que
+se llena la primera vez; ``crear_pedido`` le añade pedidos en cada ejecución).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks import restaurante
+from models import db, Usuario
+from utils.menu_cache import menu_cache
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _cliente(app, usuario_id):
+    client = app.test_client()
+    if usuario_id is not None:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(usuario_id)
+            sess['_fresh'] = True
+    return client
+
+
+def escenarios(ids, semilla):
+    """nombre -> (usuario, petición(client, i), preparar() o None)"""
+    azar = random.Random(semilla)
+    manana = datetime.utcnow().date() + timedelta(days=1)
+
+    def crear_pedido(client, i):
+        platos = azar.sample(range(1, ids['platos'] + 1), min(3, ids['platos']))
+        return client.post('/pedidos/crear', json={
+            'items': [{'id': plato, 'precio': 10000, 'cantidad': 1} for plato in platos],
+            'metodo_pago': 'efectivo',
+        })
+
+    def disponibilidad(client, i):
+        fecha = manana + timedelta(days=i % ids['dias_reservas'])
+        return client.get(f'/api/reservas/disponibilidad?fecha={fecha.isoformat()}&hora=20:00&personas=4')
+
+    return {
+        'api_menu': (None, lambda client, i: client.get('/api/menu'), None),
+        'api_menu_frio': (None, lambda client, i: client.get('/api/menu'), menu_cache.invalidar),
+        'crear_pedido': (ids['cliente'], crear_pedido, None),
+        'cocina_cola': (ids['cocinero'], lambda client, i: client.get('/cocina/api/cola'), None),
+        'dashboard': (ids['admin'], lambda client, i: client.get('/admin/api/stats/dashboard'), None),
+        'disponibilidad': (None, disponibilidad, None),
+        'mis_pedidos': (ids['frecuente'], lambda client, i: client.get('/cuenta/api/mis-pedidos'), None),
+    }
+
+
+def _percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(fraccion * len(ordenados)) - 1)]
+
+
+def medir(app, usuario_id, peticion, preparar, repeticiones, calentamiento):
+    client = _cliente(app, usuario_id)
+    sentencias = [0]
+
+    def contar(*args):
+        sentencias[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    tiempos, tamano, codigos = [], 0, set()
+    for i in range(calentamiento + repeticiones):
+        if preparar:
+            preparar()
+        if i == calentamiento:
+            event.listen(engine, 'before_cursor_execute', contar)
+        inicio = time.perf_counter()
+        respuesta = peticion(client, i)
+        duracion = time.perf_counter() - inicio
+        if i >= calentamiento:
+            tiempos.append(duracion * 1000)
+            tamano = len(respuesta.data)
+            codigos.add(respuesta.status_code)
+    event.remove(engine, 'before_cursor_execute', contar)
+    return {
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(_percentil(tiempos, 0.95), 3),
+        'media_ms': round(statistics.fmean(tiempos), 3),
+        'min_ms': round(min(tiempos), 3),
+        'sql_por_peticion': round(sentencias[0] / repeticiones, 2),
+        'bytes': tamano,
+        'codigos': sorted(codigos),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def ejecutar(url, parametros, repeticiones=30, calentamiento=3, solo=None):
+    """Mide los escenarios sobre la base ``url`` ya construida; devuelve el resultado en dict"""
+    ids = dict(restaurante.ids(parametros), cliente=4)
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': url, 'PRESUPUESTO_SQL': None})
+    with app.app_context():
+        dialecto = db.engine.dialect.name
+    resultados = {}
+    for nombre, (usuario_id, peticion, preparar) in escenarios(ids, parametros['semilla']).items():
+        if solo and nombre not in solo:
+            continue
+        resultados[nombre] = medir(app, usuario_id, peticion, preparar, repeticiones, calentamiento)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return {
+        'suite': 'boodfood',
+        'fecha': datetime.utcnow().replace(microsecond=0).isoformat(),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'base': dialecto,
+        'parametros': parametros,
+        'repeticiones': repeticiones,
+        'escenarios': resultados,
+    }
+
+
+def imprimir(resultado):
+    print(f"commit {resultado['commit']} · {resultado['base']} · {resultado['parametros']['pedidos']} pedidos, "
+          f"{resultado['parametros']['platos']} platos · {resultado['repeticiones']} repeticiones")
+    print(f'{"escenario":16} {"p50 ms":>9} {"p95 ms":>9} {"media":>9} {"SQL":>6} {"bytes":>9} códigos')
+    for nombre, r in resultado['escenarios'].items():
+        print(f"{nombre:16} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['media_ms']:9.2f} "
+              f"{r['sql_por_peticion']:6.1f} {r['bytes']:9d} {r['codigos']}")
+
+
+def comparar(antes, despues):
+    """Tabla de p50/p95 y sentencias SQL de dos resultados (JSON de ``--salida``)"""
+    print(f"antes {antes['commit']} ({antes['fecha']}) -> después {despues['commit']} ({despues['fecha']})")
+    if antes['parametros'] != despues['parametros']:
+        print('Aviso: los parámetros del restaurante no coinciden')
+    print(f'{"escenario":16} {"p50 antes":>10} {"p50 desp.":>10} {"cambio":>8} {"p95 cambio":>11} {"SQL":>11}')
+    for nombre, a in antes['escenarios'].items():
+        d = despues['escenarios'].get(nombre)
+        if d is None:
+            print(f'{nombre:16} (no está en el segundo resultado)')
+            continue
+        cambio = (d['p50_ms'] / a['p50_ms'] - 1) * 100 if a['p50_ms'] else 0
+        cambio_p95 = (d['p95_ms'] / a['p95_ms'] - 1) * 100 if a['p95_ms'] else 0
+        sql = f"{a['sql_por_peticion']:g}->{d['sql_por_peticion']:g}"
+        print(f"{nombre:16} {a['p50_ms']:10.2f} {d['p50_ms']:10.2f} {cambio:+7.1f}% {cambio_p95:+10.1f}% {sql:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    for clave, valor in restaurante.PARAMETROS_POR_DEFECTO.items():
+        parser.add_argument(f'--{clave.replace("_", "-")}', dest=clave, type=int, default=valor)
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--calentamiento', type=int, default=3)
+    parser.add_argument('--solo', help='escenarios separados por comas')
+    parser.add_argument('--url', help='base compatible a usar en lugar de la copia SQLite')
+    parser.add_argument('--salida', help='archivo JSON de resultados')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DESPUES'))
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as f1, open(args.comparar[1]) as f2:
+            comparar(json.load(f1), json.load(f2))
+        return
+
+    parametros = {clave: getattr(args, clave) for clave in restaurante.PARAMETROS_POR_DEFECTO}
+    solo = set(args.solo.split(',')) if args.solo else None
+    if args.url:
+        app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': args.url, 'PRESUPUESTO_SQL': None})
+        with app.app_context():
+            vacia = Usuario.query.first() is None
+            db.engine.dispose()
+        if vacia:
+            restaurante.construir(args.url, parametros)
+        resultado = ejecutar(args.url, parametros, args.repeticiones, args.calentamiento, solo)
+    else:
+        inicio = time.perf_counter()
+        original = restaurante.base_en_cache(parametros)
+        print(f'Base: {original} ({time.perf_counter() - inicio:.1f} s)')
+        carpeta = tempfile.mkdtemp()
+        try:
+            copia = os.path.join(carpeta, 'restaurante.db')
+            shutil.copyfile(original, copia)
+            resultado = ejecutar(f'sqlite:///{copia}', parametros, args.repeticiones, args.calentamiento, solo)
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    imprimir(resultado)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f'Resultados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -48,6 +48,37 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB máximo
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Procesos que generan las variantes de las imágenes del menú (None = núcleos, máx. 2)
+    IMAGENES_PROCESOS = None
+    # Archivos subidos sin usar: segundos de gracia antes de borrarlos y cada
+    # cuántos segundos se barren (None = sólo con ``flask limpiar-uploads``)
+    UPLOADS_GRACIA = 24 * 3600
+    UPLOADS_LIMPIEZA_INTERVALO = 3600
+    
+    # Compresión gzip de respuestas: tamaño mínimo en bytes (None = desactivada),
+    # nivel 1-9, tipos de contenido y respuestas con ETag guardadas ya comprimidas
+    COMPRESION_MINIMO = 1024
+    COMPRESION_NIVEL = 6
+    COMPRESION_TIPOS = None  # None = JSON, HTML, CSS, JS, texto y SVG
+    COMPRESION_CACHE_MAX = 64
+    
+    # CSS/JS empaquetados de static/dist (python -m utils.assets); sin manifiesto
+    # o con False se enlazan los archivos originales
+    ASSETS_PAQUETES = True
+    
+    # Métricas por endpoint, SQL, pool y Socket.IO en /admin/api/metrics
+    # (formato de Prometheus). False = sin instrumentar
+    METRICAS = True
+    
+    # Presupuesto de sentencias SQL por endpoint (utils.presupuesto_sql): 'error'
+    # lanza una excepción, 'log' avisa con las sentencias y su origen, None = nada.
+    # PRESUPUESTOS_SQL añade o cambia límites: {'main.api_menu': 3, ...}
+    PRESUPUESTO_SQL = None
+    PRESUPUESTOS_SQL = None
+    
+    # Migraciones del esquema pendientes al arrancar (utils.migraciones): True las
+    # aplica, False hace fallar el arranque hasta ejecutar ``python -m utils.migraciones``
+    MIGRACIONES_AL_ARRANCAR = True
     
     # Configuración de la aplicación
     DEBUG = True
@@ -55,23 +86,100 @@ class Config:
     
     # Zona horaria
     TIMEZONE = 'America/Bogota'
+    
+    # Segundos tras los que el índice de ocupación de mesas se reconstruye desde la
+    # base de datos (recoge cambios hechos por otros procesos). None = nunca
+    OCUPACION_MAX_EDAD = 300
+    
+    # Segundos de vida del snapshot del menú si nadie lo invalida (cambios hechos
+    # desde otro proceso). None = sólo se invalida desde las rutas del admin
+    MENU_CACHE_MAX_EDAD = 60
+    
+    # Tamaño de página por defecto y máximo de los listados paginados del admin
+    PAGINACION_LIMITE = 50
+    PAGINACION_LIMITE_MAX = 200
+    
+    # Alertas del admin: minutos tras los que un pedido en cocina está atrasado,
+    # cada cuántos segundos se revisan las alertas que dependen del reloj y cada
+    # cuántos se reconstruye el conjunto desde la base de datos
+    ALERTA_PEDIDO_ATRASADO = 60
+    ALERTAS_INTERVALO = 30
+    ALERTAS_MAX_EDAD = 300
+    
+    # Segundos tras los que la cola de cocina se reconstruye desde la base de datos
+    COLA_COCINA_MAX_EDAD = 60
+    # Versión de la cola compartida entre procesos (tabla cola_cocina_cambios).
+    # None = sí cuando hay SOCKETIO_MESSAGE_QUEUE. Segundos que se guarda cada cambio
+    COLA_COCINA_GLOBAL = None
+    COLA_COCINA_RETENCION = 3600
+    
+    # Caché de usuarios de Flask-Login: segundos de vida de cada entrada (None = sin
+    # caché) y número máximo de usuarios en memoria
+    USUARIOS_CACHE_TTL = 300
+    USUARIOS_CACHE_MAX = 1000
+    
+    # Hash de contraseñas simultáneos en hilos nativos (None = núcleos, máx. 4)
+    HASH_CONCURRENCIA = None
+    
+    # Reservas: minutos que ocupa una reserva sin duración estimada, segundos
+    # tras los que los días cargados en memoria se vuelven a leer y número máximo
+    # de días en memoria
+    RESERVA_DURACION_DEFECTO = 120
+    DISPONIBILIDAD_MAX_EDAD = 300
+    DISPONIBILIDAD_MAX_DIAS = 60
+    
+    # Segundos entre sincronizaciones de los productos de la piscina con el menú
+    # (utils.piscina_catalogo). None = sólo al arrancar, desde el admin o con
+    # ``flask sincronizar-piscina``
+    PISCINA_SINCRONIZAR_CADA = 300
+    
+    # Cola de mensajes de Socket.IO para varios procesos/nodos (redis://, amqp://,
+    # kafka://, local://host:puerto...). None = un solo proceso
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL') or 'boodfood'
+    # Modo asíncrono de Socket.IO (eventlet, threading...). None = automático
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE')
+    
+    # Segundos durante los que se agrupan los eventos enviados a cada sala
+    # (utils.eventos). None = enviar cada evento en el momento
+    EVENTOS_VENTANA = 0.05
 
 
 class DevelopmentConfig(Config):
     """Configuración de desarrollo"""
     DEBUG = True
     SQLALCHEMY_ECHO = True
+    PRESUPUESTO_SQL = 'log'
 
 
 class ProductionConfig(Config):
     """Configuración de producción"""
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    # Varios procesos: se migra una vez con ``python -m utils.migraciones`` antes de arrancarlos
+    MIGRACIONES_AL_ARRANCAR = False
+
+
+class TestingConfig(Config):
+    """Configuración de pruebas (base local, nunca la remota)"""
+    DEBUG = False
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    # Las opciones del pool/PyMySQL de la configuración base no aplican a SQLite
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Sin tareas en segundo plano durante las pruebas
+    ALERTAS_INTERVALO = None
+    EVENTOS_VENTANA = None
+    UPLOADS_LIMPIEZA_INTERVALO = None
+    PISCINA_SINCRONIZAR_CADA = None
+    # Un endpoint con consultas N+1 hace fallar la prueba que lo llama
+    PRESUPUESTO_SQL = 'error'
 
 
 # Configuración por defecto
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -1,11 +1,14 @@
 """
 Modelos de base de datos para BoodFood
 Actualizados para coincidir con la estructura existente de la base de datos
+
+Los to_dict devuelven Decimal y fechas tal cual: utils.json_rapido los
+convierte a número e ISO 8601 al serializar.
 """
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.contrasenas import generar_hash, verificar_hash
 
 db = SQLAlchemy()
 
@@ -40,12 +43,12 @@ class Usuario(UserMixin, db.Model):
     pedidos = db.relationship('Pedido', backref='usuario', lazy=True)
     
     def set_password(self, password):
-        """Establece el hash de la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        """Establece el hash de la contraseña (calculado en el pool de hash)"""
+        self.password_hash = generar_hash(password)
     
     def check_password(self, password):
-        """Verifica la contraseña"""
-        return check_password_hash(self.password_hash, password)
+        """Verifica la contraseña (en el pool de hash)"""
+        return verificar_hash(self.password_hash, password)
     
     def to_dict(self):
         """Convierte el usuario a diccionario"""
@@ -72,15 +75,12 @@ class Mesa(db.Model):
     tipo = db.Column(db.Enum('interior', 'terraza', 'vip'), default='interior')
     
     def to_dict(self):
-        # Determinar si la mesa está ocupada por pedidos activos
+        # Determinar si la mesa está ocupada por pedidos activos (índice en memoria,
+        # sin consultar pedidos por cada mesa)
         ocupada = False
         try:
-            from models import Pedido
-            pedido_activo = Pedido.query.filter(
-                Pedido.mesa_id == self.id,
-                Pedido.estado.in_(['pendiente', 'preparando', 'enviado'])
-            ).first()
-            ocupada = pedido_activo is not None
+            from utils.ocupacion import indice_ocupacion
+            ocupada = indice_ocupacion.ocupada(self.id)
         except Exception:
             pass
         
@@ -151,6 +151,8 @@ class MenuItem(db.Model):
     categoria_nombre = db.Column(db.String(100))
     subcategoria = db.Column(db.String(100))
     imagen_url = db.Column(db.String(500))
+    # {tamaño: {'ancho', 'alto', 'jpg', 'webp'}} generado por utils.imagenes
+    imagen_variantes = db.Column(db.JSON)
     disponible = db.Column(db.Boolean, default=True)
     tiempo_preparacion = db.Column(db.Integer)
     calorias = db.Column(db.Integer)
@@ -163,17 +165,24 @@ class MenuItem(db.Model):
     created_at = db.Column(db.DateTime)
     updated_at = db.Column(db.DateTime)
     
+    def imagen(self, tamano, formato='jpg'):
+        """URL de la variante pedida, o la imagen original si aún no hay variantes"""
+        variante = (self.imagen_variantes or {}).get(tamano)
+        return variante[formato] if variante else self.imagen_url
+    
     def to_dict(self):
         return {
             'id': self.id,
             'nombre': self.nombre,
             'descripcion': self.descripcion,
-            'precio': float(self.precio),
-            'precio_descuento': float(self.precio_descuento) if self.precio_descuento else None,
+            'precio': self.precio,
+            'precio_descuento': self.precio_descuento or None,
             'categoria_id': self.categoria_id,
             'categoria_nombre': self.categoria_nombre,
             'subcategoria': self.subcategoria,
-            'imagen': self.imagen_url,
+            'imagen': self.imagen('tarjeta'),
+            'imagen_original': self.imagen_url,
+            'imagenes': self.imagen_variantes,
             'disponible': self.disponible,
             'tiempo_preparacion': self.tiempo_preparacion,
             'vegetariano': self.vegetariano,
@@ -182,6 +191,46 @@ class MenuItem(db.Model):
             'picante': self.picante,
             'destacado': self.destacado
         }
+    
+    def to_dict_resumen(self):
+        """Sólo los campos que muestran los paneles de cocina, caja y admin"""
+        return {
+            'id': self.id,
+            'nombre': self.nombre,
+            'imagen': self.imagen('miniatura')
+        }
+
+
+class ProductoPiscina(db.Model):
+    """Copia precalculada de productos_de_consumo_rapido enlazada con el menú.
+    
+    La tabla de productos de la piscina no tiene relación con ``menu_items``;
+    esta tabla guarda el resultado de emparejarlas (por nombre normalizado) para
+    que el menú de la piscina sea una sola lectura y los pedidos de piscina no
+    tengan que crear items del menú. Se regenera con
+    ``utils.piscina_catalogo.sincronizar_productos_piscina``.
+    """
+    __tablename__ = 'productos_piscina_menu'
+    
+    producto_id = db.Column(db.String(50), primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id', ondelete='CASCADE'), nullable=False, index=True)
+    nombre = db.Column(db.String(255), nullable=False)
+    descripcion = db.Column(db.Text)
+    precio = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    imagen = db.Column(db.String(500))
+    disponible = db.Column(db.Boolean, default=True, index=True)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': int(self.producto_id) if self.producto_id.isdigit() else self.producto_id,
+            'nombre': self.nombre,
+            'descripcion': self.descripcion or '',
+            'precio': self.precio,
+            'imagen': self.imagen,
+            'disponible': self.disponible,
+            'menu_item_id': self.menu_item_id
+        }
 
 
 class Servicio(db.Model):
@@ -201,7 +250,7 @@ class Servicio(db.Model):
             'id': self.id,
             'nombre': self.nombre,
             'descripcion': self.descripcion,
-            'precio': float(self.precio),
+            'precio': self.precio,
             'tipo': self.tipo,
             'capacidad': self.capacidad,
             'disponible': self.disponible
@@ -211,6 +260,13 @@ class Servicio(db.Model):
 class Reserva(db.Model):
     """Modelo de reserva"""
     __tablename__ = 'reservas'
+    # Los crea la migración 2 (utils.migraciones): disponibilidad del día y "mis reservas";
+    # la 5, el listado paginado del admin (utils.paginacion)
+    __table_args__ = (
+        db.Index('ix_reservas_fecha_estado_mesa', 'fecha', 'estado', 'mesa_asignada'),
+        db.Index('ix_reservas_usuario_creada', 'usuario_id', 'created_at'),
+        db.Index('ix_reservas_creada_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -238,8 +294,8 @@ class Reserva(db.Model):
         return {
             'id': self.id,
             'usuario_id': self.usuario_id,
-            'fecha': self.fecha.isoformat() if self.fecha else None,
-            'hora': self.hora.isoformat() if self.hora else None,
+            'fecha': self.fecha,
+            'hora': self.hora,
             'numero_personas': self.numero_personas,
             'nombre_reserva': self.nombre_reserva,
             'email_reserva': self.email_reserva,
@@ -250,13 +306,22 @@ class Reserva(db.Model):
             'mesa_asignada': self.mesa_asignada,
             'zona_mesa': self.zona_mesa,
             'duracion_estimada': self.duracion_estimada,
-            'total_reserva': float(self.total_reserva) if self.total_reserva is not None else None
+            'total_reserva': self.total_reserva
         }
 
 
 class Pedido(db.Model):
     """Modelo de pedido"""
     __tablename__ = 'pedidos'
+    # Los crea la migración 2 (utils.migraciones): cola de cocina y listados por
+    # estado, pedidos abiertos de una mesa e historial del cliente; la 5, el
+    # listado paginado del admin sin filtros (utils.paginacion)
+    __table_args__ = (
+        db.Index('ix_pedidos_estado_fecha', 'estado', 'fecha_pedido'),
+        db.Index('ix_pedidos_mesa_estado', 'mesa_id', 'estado'),
+        db.Index('ix_pedidos_usuario_fecha', 'usuario_id', 'fecha_pedido'),
+        db.Index('ix_pedidos_fecha_id', 'fecha_pedido', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -293,23 +358,28 @@ class Pedido(db.Model):
         self.total = self.subtotal + (self.impuestos or 0) + (self.costo_envio or 0) - (self.descuento or 0)
         return self.total
     
-    def to_dict(self):
+    def to_dict(self, resumen=False):
+        """Convierte el pedido a diccionario.
+        
+        Con ``resumen=True`` cada item lleva sólo un resumen del plato (ver
+        ``MenuItem.to_dict_resumen``) en lugar del plato completo.
+        """
         return {
             'id': self.id,
             'usuario_id': self.usuario_id,
             'codigo_pedido': self.codigo_pedido,
-            'subtotal': float(self.subtotal),
-            'impuestos': float(self.impuestos) if self.impuestos else 0,
-            'costo_envio': float(self.costo_envio) if self.costo_envio else 0,
-            'descuento': float(self.descuento) if self.descuento else 0,
-            'total': float(self.total),
+            'subtotal': self.subtotal,
+            'impuestos': self.impuestos or 0,
+            'costo_envio': self.costo_envio or 0,
+            'descuento': self.descuento or 0,
+            'total': self.total,
             'estado': self.estado,
             'metodo_pago': self.metodo_pago,
             'direccion_entrega': self.direccion_entrega,
             'telefono_contacto': self.telefono_contacto,
             'nombre_receptor': self.nombre_receptor,
-            'fecha_pedido': self.fecha_pedido.isoformat() if self.fecha_pedido else None,
-            'items': [item.to_dict() for item in self.items]
+            'fecha_pedido': self.fecha_pedido,
+            'items': [item.to_dict(resumen=resumen) for item in self.items]
         }
 
 
@@ -328,19 +398,90 @@ class PedidoItem(db.Model):
     # Relación con MenuItem
     menu_item = db.relationship('MenuItem', backref='pedido_items')
     
-    def to_dict(self):
+    def to_dict(self, resumen=False):
+        if self.menu_item is None:
+            menu_item = None
+        elif resumen:
+            menu_item = self.menu_item.to_dict_resumen()
+        else:
+            menu_item = self.menu_item.to_dict()
         return {
             'pedido_id': self.pedido_id,
             'menu_item_id': self.menu_item_id,
             'nombre_item': self.nombre_item,
             'descripcion_item': self.descripcion_item,
             'cantidad': self.cantidad,
-            'precio_unitario': float(self.precio_unitario),
-            'subtotal': float(self.subtotal),
-            'menu_item': self.menu_item.to_dict() if self.menu_item else None
+            'precio_unitario': self.precio_unitario,
+            'subtotal': self.subtotal,
+            'menu_item': menu_item
         }
 
 
+class VentaResumen(db.Model):
+    """Acumulado de pedidos por día/hora local, estado y método de pago.
+    
+    Lo mantiene ``utils.ventas_resumen`` con un upsert justo después del commit
+    que crea o modifica cada ``Pedido``; los dashboards leen estas filas en lugar de
+    recorrer la tabla de pedidos. ``fecha`` y ``hora`` están en la zona
+    horaria configurada (``TIMEZONE``), no en UTC como ``fecha_pedido``.
+    """
+    __tablename__ = 'ventas_resumen'
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    hora = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    estado = db.Column(db.String(20), primary_key=True)
+    metodo_pago = db.Column(db.String(20), primary_key=True)  # '' si el pedido no tiene
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class ArchivoSubido(db.Model):
+    """Archivo de ``static/uploads`` guardado por contenido (``utils.almacen``).
+    
+    ``referencias`` cuenta los usuarios (``foto_perfil``) e items del menú
+    (``imagen_url``) que lo usan; lo mantiene la sesión de SQLAlchemy en la misma
+    transacción. ``actualizado`` es la última subida o cambio de referencias: el
+    barrido sólo borra archivos sin referencias desde hace ``UPLOADS_GRACIA``.
+    """
+    __tablename__ = 'archivos_subidos'
+    __table_args__ = (db.Index('ix_archivos_subidos_huerfanos', 'referencias', 'actualizado'),)
+    
+    url = db.Column(db.String(500), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    tamano = db.Column(db.BigInteger, nullable=False, default=0)
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class CambioColaCocina(db.Model):
+    """Pedido tocado por un commit, con varios procesos (``utils.cola_cocina``).
+    
+    El ``id`` es la versión de la cola de cocina compartida por todos los
+    procesos: cada proceso aplica las filas en orden y sólo el que hizo el
+    commit envía el cambio a la sala ``cocina``. Las filas más antiguas que
+    ``COLA_COCINA_RETENCION`` se borran al reconstruir la cola.
+    """
+    __tablename__ = 'cola_cocina_cambios'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pedido_id = db.Column(db.Integer, nullable=False)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class EsquemaMigracion(db.Model):
+    """Migración del esquema ya aplicada (``utils.migraciones``).
+    
+    Al arrancar sólo se consulta la versión máxima de esta tabla; las
+    migraciones pendientes se aplican con ``python -m utils.migraciones`` (o al arrancar,
+    con ``MIGRACIONES_AL_ARRANCAR``).
+    """
+    __tablename__ = 'esquema_migraciones'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    descripcion = db.Column(db.String(200), nullable=False)
+    aplicada = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
 # Nota: Las tablas de Factura e Inventario no existen en la base de datos actual
 # por lo que han sido removidas de este archivo. Si necesitas estas funcionalidades,
 # deberás crear las tablas correspondientes en la base de datos.
@@ -370,11 +511,11 @@ class Inventario(db.Model):
             'id': self.id,
             'nombre': self.nombre,
             'descripcion': self.descripcion,
-            'cantidad': float(self.cantidad),
+            'cantidad': self.cantidad,
             'unidad': self.unidad,
-            'precio_unitario': float(self.precio_unitario) if self.precio_unitario else None,
-            'stock_minimo': float(self.stock_minimo),
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
+            'precio_unitario': self.precio_unitario or None,
+            'stock_minimo': self.stock_minimo,
+            'fecha_actualizacion': self.fecha_actualizacion
         }
 
 
@@ -396,15 +537,16 @@ class InventarioMovimiento(db.Model):
             'id': self.id,
             'inventario_id': self.inventario_id,
             'tipo': self.tipo,
-            'cantidad': float(self.cantidad),
+            'cantidad': self.cantidad,
             'usuario_id': self.usuario_id,
             'notas': self.notas,
-            'fecha_movimiento': self.fecha_movimiento.isoformat() if self.fecha_movimiento else None
+            'fecha_movimiento': self.fecha_movimiento
         }
 
 class Receta(db.Model):
     """Define los ingredientes necesarios para cada plato del menú"""
     __tablename__ = 'recetas'
+    __table_args__ = (db.Index('ix_recetas_menu_item', 'menu_item_id'),)  # migración 2
     
     id = db.Column(db.Integer, primary_key=True)
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), nullable=False)
@@ -420,6 +562,6 @@ class Receta(db.Model):
             'id': self.id,
             'menu_item_id': self.menu_item_id,
             'inventario_id': self.inventario_id,
-            'cantidad_usada': float(self.cantidad_usada),
+            'cantidad_usada': self.cantidad_usada,
             'ingrediente': self.inventario.to_dict() if self.inventario else None
         }
\ No newline at end of file
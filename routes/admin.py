@@ -1,20 +1,25 @@
 """
 Rutas del panel de administrador - COMPLETO Y FUNCIONAL
 """
-import os
-
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 from flask import Blueprint, render_template, request, jsonify
-from werkzeug.utils import secure_filename
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, date
 from flask import current_app
 from models import db, MenuItem, Categoria, Usuario, Mesa, Mesero, Servicio, Pedido, Reserva, Inventario, InventarioMovimiento
+from utils.inventario_utils import descontar_stock, sumar_stock
+from utils.pedido_utils import cargar_pedidos, serializar_pedidos
+from utils import eventos
+from utils import almacen
+from utils.imagenes import procesador_imagenes, variantes_de
+from utils.menu_cache import menu_cache
+from utils.piscina_catalogo import desenlazar_menu_item, sincronizar_productos_piscina
+from utils.paginacion import ParametroInvalido, filtrar_rango_fechas, leer_entero, leer_lista, paginar, respuesta_pagina
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -42,8 +47,8 @@ def panel_admin():
 
     # ✅ AÑADIDO: estado_inicial con datos reales para evitar el error de Undefined
     try:
-        pedidos = Pedido.query.order_by(Pedido.fecha_pedido.desc()).limit(20).all()
-        pedidos_data = [p.to_dict() for p in pedidos]
+        pedidos = cargar_pedidos(Pedido.query.order_by(Pedido.fecha_pedido.desc()).limit(20)).all()
+        pedidos_data = serializar_pedidos(pedidos)
         
         hoy = date.today()
         reservas = Reserva.query.filter(Reserva.fecha >= hoy).order_by(Reserva.fecha, Reserva.hora).limit(10).all()
@@ -197,20 +202,34 @@ def eliminar_usuario_admin(user_id):
 @login_required
 @admin_required
 def api_pedidos():
-    """Devuelve todos los pedidos"""
+    """Devuelve los pedidos paginados, del más reciente al más antiguo.
+
+    Filtros: tipo, estado (lista separada por comas), desde/hasta (fecha del
+    pedido), mesa_id, usuario_id. Ver utils.paginacion para cursor/limite/total.
+    """
     # Obtener parámetros de filtro (opcional)
     tipo = request.args.get('tipo')
-    estado = request.args.get('estado')
+    estados = leer_lista('estado')
     
-    query = Pedido.query.order_by(Pedido.fecha_pedido.desc())
-    
-    if tipo:
-        query = query.filter(Pedido.tipo == tipo)
-    if estado:
-        query = query.filter(Pedido.estado == estado)
-        
-    pedidos = query.all()
-    return jsonify([p.to_dict() for p in pedidos])
+    try:
+        query = Pedido.query
+        
+        if tipo:
+            query = query.filter(Pedido.tipo == tipo)
+        if estados:
+            query = query.filter(Pedido.estado.in_(estados))
+        query = filtrar_rango_fechas(query, Pedido.fecha_pedido)
+        mesa_id = leer_entero('mesa_id')
+        if mesa_id is not None:
+            query = query.filter(Pedido.mesa_id == mesa_id)
+        usuario_id = leer_entero('usuario_id')
+        if usuario_id is not None:
+            query = query.filter(Pedido.usuario_id == usuario_id)
+        
+        pedidos, siguiente, total = paginar(cargar_pedidos(query), [Pedido.fecha_pedido, Pedido.id])
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return respuesta_pagina(serializar_pedidos(pedidos), siguiente, total)
 
 
 @admin_bp.route('/api/pedidos/<int:pedido_id>')
@@ -238,13 +257,9 @@ def update_pedido_estado(pedido_id):
         return jsonify({'error': f'Estado inválido: {nuevo_estado}'}), 400
         
     pedido.estado = nuevo_estado
+    evento = eventos.datos_pedido(pedido)
     db.session.commit()
-    
-    try:
-        from app import socketio
-        socketio.emit('estado_pedido_actualizado', {'pedido_id': pedido.id, 'estado': nuevo_estado}, namespace='/')
-    except ImportError:
-        pass
+    eventos.estado_pedido(evento)
     
     return jsonify({'message': f'Estado de pedido {pedido_id} actualizado a {nuevo_estado}', 'estado': nuevo_estado})
 
@@ -253,9 +268,16 @@ def update_pedido_estado(pedido_id):
 @login_required
 @admin_required
 def api_usuarios_lista():
-    """Devuelve la lista de usuarios (solo nombre, email y rol)"""
-    usuarios = Usuario.query.all()
-    return jsonify([u.to_dict() for u in usuarios])
+    """Devuelve la lista de usuarios paginada por id (filtro opcional: rol)"""
+    query = Usuario.query
+    rol = request.args.get('rol')
+    if rol:
+        query = query.filter(Usuario.rol == rol)
+    try:
+        usuarios, siguiente, total = paginar(query, [Usuario.id], descendente=False)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return respuesta_pagina([u.to_dict() for u in usuarios], siguiente, total)
 
 
 @admin_bp.route('/api/pedido/<int:pedido_id>/actualizar', methods=['PUT'])
@@ -274,7 +296,9 @@ def actualizar_pedido(pedido_id):
         if 'mesa_id' in data:
             pedido.mesa_id = data['mesa_id']
         
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         return jsonify({'success': True, 'pedido': pedido.to_dict()})
         
     except Exception as e:
@@ -321,8 +345,24 @@ def api_reservas():
             db.session.rollback()
             return jsonify({'error': f'Error al crear la reserva: {str(e)}'}), 500
     else: # GET
-        reservas = Reserva.query.order_by(Reserva.created_at.desc()).all()
-        return jsonify([r.to_dict() for r in reservas])
+        # Paginado por (created_at, id). Filtros: estado, desde/hasta (fecha de
+        # la reserva), mesa (mesa asignada), usuario_id
+        query = Reserva.query
+        estados = leer_lista('estado')
+        if estados:
+            query = query.filter(Reserva.estado.in_(estados))
+        mesa = request.args.get('mesa')
+        if mesa:
+            query = query.filter(Reserva.mesa_asignada == mesa)
+        try:
+            query = filtrar_rango_fechas(query, Reserva.fecha)
+            usuario_id = leer_entero('usuario_id')
+            if usuario_id is not None:
+                query = query.filter(Reserva.usuario_id == usuario_id)
+            reservas, siguiente, total = paginar(query, [Reserva.created_at, Reserva.id])
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        return respuesta_pagina([r.to_dict() for r in reservas], siguiente, total)
 
 @admin_bp.route('/api/reservas/<int:reserva_id>/estado', methods=['PUT'])
 @login_required
@@ -395,20 +435,19 @@ def subir_imagen_menu():
             return jsonify({'error': 'Nombre de archivo vacío'}), 400
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{filename}"
-            
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # Nombre = hash del contenido: la misma imagen subida dos veces es un solo archivo
+            url, nuevo = almacen.guardar(file, 'menu')
+            db.session.commit()
             
-            url = f"/static/uploads/menu/{filename}"
-            return jsonify({'success': True, 'url': url})
+            # Miniatura, tarjeta y completa (JPEG + WebP) en segundo plano; se
+            # asignan solas a los items que usen esta URL
+            procesando = (nuevo or variantes_de(url) is None) and procesador_imagenes.encolar(url)
+            return jsonify({'success': True, 'url': url, 'procesando': procesando})
         
         return jsonify({'error': 'Formato de archivo no permitido'}), 400
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -577,11 +616,11 @@ def registrar_movimiento(item_id):
         db.session.add(nuevo_movimiento)
         
         if tipo == 'entrada':
-            item.cantidad += cantidad_movimiento
+            sumar_stock(item.id, cantidad_movimiento)
         elif tipo == 'salida':
-            if item.cantidad < cantidad_movimiento:
+            if not descontar_stock(item.id, cantidad_movimiento):
+                db.session.rollback()
                 return jsonify({'error': 'Stock insuficiente para esta salida'}), 400
-            item.cantidad -= cantidad_movimiento
             
         db.session.commit()
         
@@ -594,9 +633,12 @@ def registrar_movimiento(item_id):
 @login_required
 @admin_required
 def api_inventario_lista():
-    """Devuelve todo el inventario"""
-    items = Inventario.query.all()
-    return jsonify([i.to_dict() for i in items])
+    """Devuelve el inventario paginado por id"""
+    try:
+        items, siguiente, total = paginar(Inventario.query, [Inventario.id], descendente=False)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return respuesta_pagina([i.to_dict() for i in items], siguiente, total)
 
 
 @admin_bp.route('/api/inventario/crear', methods=['POST'])
@@ -636,9 +678,6 @@ def registrar_movimiento_inventario(item_id):
         if tipo not in ['entrada', 'salida']:
             return jsonify({'error': 'Tipo de movimiento inválido'}), 400
         
-        if tipo == 'salida' and item.cantidad < cantidad:
-            return jsonify({'error': 'Cantidad insuficiente en inventario'}), 400
-        
         movimiento = InventarioMovimiento(
             inventario_id=item.id,
             tipo=tipo,
@@ -648,9 +687,10 @@ def registrar_movimiento_inventario(item_id):
         )
         
         if tipo == 'entrada':
-            item.cantidad += cantidad
-        else:
-            item.cantidad -= cantidad
+            sumar_stock(item.id, cantidad)
+        elif not descontar_stock(item.id, cantidad):
+            db.session.rollback()
+            return jsonify({'error': 'Cantidad insuficiente en inventario'}), 400
         
         db.session.add(movimiento)
         db.session.commit()
@@ -662,6 +702,19 @@ def registrar_movimiento_inventario(item_id):
 
 # ===== MENÚ =====
 
+@admin_bp.route('/api/piscina/sincronizar', methods=['POST'])
+@login_required
+@admin_required
+def sincronizar_piscina():
+    """Regenera el enlace entre productos de la piscina y el menú"""
+    try:
+        resultado = sincronizar_productos_piscina()
+        return jsonify({'success': True, **resultado})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/api/menu/crear', methods=['POST'])
 @login_required
 @admin_required
@@ -688,6 +741,7 @@ def crear_menu_item():
         )
         db.session.add(nuevo_item)
         db.session.commit()
+        menu_cache.invalidar()
         return jsonify({'success': True, 'item': nuevo_item.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
@@ -717,7 +771,9 @@ def actualizar_menu_item(item_id):
         if 'disponible' in data:
             item.disponible = data['disponible']
         
+        # Los productos de la piscina siguen enlazados por id aunque cambie el nombre
         db.session.commit()
+        menu_cache.invalidar()
         return jsonify({'success': True, 'item': item.to_dict()})
     except Exception as e:
         db.session.rollback()
@@ -731,8 +787,10 @@ def eliminar_menu_item(item_id):
     """Eliminar un item del menú"""
     try:
         item = MenuItem.query.get_or_404(item_id)
+        desenlazar_menu_item(item.id)
         db.session.delete(item)
         db.session.commit()
+        menu_cache.invalidar()
         return jsonify({'success': True, 'message': 'Item eliminado'})
     except Exception as e:
         db.session.rollback()
@@ -753,8 +811,7 @@ def api_categorias_lista():
 @admin_required
 def api_menu_items():
     """Devuelve todos los items del menú"""
-    items = MenuItem.query.all()
-    return jsonify([i.to_dict() for i in items])
+    return menu_cache.respuesta('items_todos', privada=True)
 
 
 # Nueva ruta para cargar contenido dinámico del menú
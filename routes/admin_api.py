@@ -2,10 +2,14 @@
 Rutas para la API del panel de administrador.
 Incluye endpoints para estadísticas, actividad y alertas.
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_login import login_required, current_user
-from models import db, Pedido, Reserva, Mesa, Servicio, Usuario, Inventario
+from models import db, Pedido, Reserva, Mesa, Servicio, Usuario
 from datetime import datetime, timedelta
+from utils.alertas import motor_alertas
+from utils.metricas import metricas
+from utils.ocupacion import indice_ocupacion
+from utils.ventas_resumen import agrupar, hoy, totales_dia
 import functools
 
 admin_api_bp = Blueprint('admin_api', __name__, url_prefix='/admin/api')
@@ -25,26 +29,17 @@ def admin_required(f):
 def get_dashboard_stats():
     """Obtiene las estadísticas principales para el dashboard"""
     try:
-        today = datetime.now().date()
+        today = hoy()
         
-        # Pedidos de hoy
-        pedidos_hoy = Pedido.query.filter(
-            db.func.date(Pedido.fecha_pedido) == today
-        ).count()
-        
-        # Ventas de hoy
-        ventas_hoy = db.session.query(db.func.sum(Pedido.total)).filter(
-            db.func.date(Pedido.fecha_pedido) == today
-        ).scalar() or 0
+        # Pedidos y ventas de hoy (acumulados, ver utils.ventas_resumen)
+        pedidos_hoy, ventas_hoy = totales_dia(today)
         
         # Reservas de hoy
-        reservas_hoy = Reserva.query.filter_by(
-            fecha=today.strftime('%Y-%m-%d')
-        ).count()
+        reservas_hoy = Reserva.query.filter_by(fecha=today).count()
         
         # Estado de mesas
         total_mesas = Mesa.query.count()
-        mesas_ocupadas = Mesa.query.filter_by(estado='ocupada').count()
+        mesas_ocupadas = len(indice_ocupacion.mesas_ocupadas())
         
         return jsonify({
             'pedidos_hoy': pedidos_hoy,
@@ -63,37 +58,23 @@ def get_ventas_stats():
     try:
         periodo = request.args.get('periodo', 'hoy')
         
+        today = hoy()
         if periodo == 'hoy':
-            fecha_inicio = datetime.now().date()
+            fecha_inicio = today
             fecha_fin = fecha_inicio + timedelta(days=1)
         elif periodo == 'semana':
-            fecha_inicio = datetime.now().date() - timedelta(days=7)
-            fecha_fin = datetime.now().date() + timedelta(days=1)
+            fecha_inicio = today - timedelta(days=7)
+            fecha_fin = today + timedelta(days=1)
         elif periodo == 'mes':
-            fecha_inicio = datetime.now().date().replace(day=1)
+            fecha_inicio = today.replace(day=1)
             fecha_fin = (fecha_inicio + timedelta(days=32)).replace(day=1)
         else:
             return jsonify({'error': 'Periodo no válido'}), 400
         
-        # Ventas por estado
-        ventas_por_estado = db.session.query(
-            Pedido.estado,
-            db.func.count(Pedido.id),
-            db.func.sum(Pedido.total)
-        ).filter(
-            db.func.date(Pedido.fecha_pedido) >= fecha_inicio,
-            db.func.date(Pedido.fecha_pedido) < fecha_fin
-        ).group_by(Pedido.estado).all()
-        
-        # Ventas por método de pago
-        ventas_por_metodo = db.session.query(
-            Pedido.metodo_pago,
-            db.func.count(Pedido.id),
-            db.func.sum(Pedido.total)
-        ).filter(
-            db.func.date(Pedido.fecha_pedido) >= fecha_inicio,
-            db.func.date(Pedido.fecha_pedido) < fecha_fin
-        ).group_by(Pedido.metodo_pago).all()
+        # Ventas por estado, método de pago y hora (acumulados por día)
+        ventas_por_estado = agrupar('estado', fecha_inicio, fecha_fin)
+        ventas_por_metodo = agrupar('metodo_pago', fecha_inicio, fecha_fin)
+        ventas_por_hora = agrupar('hora', fecha_inicio, fecha_fin)
         
         return jsonify({
             'periodo': periodo,
@@ -112,6 +93,13 @@ def get_ventas_stats():
                     'cantidad': cantidad,
                     'total': float(total or 0)
                 } for metodo, cantidad, total in ventas_por_metodo
+            ],
+            'ventas_por_hora': [
+                {
+                    'hora': hora,
+                    'cantidad': cantidad,
+                    'total': float(total or 0)
+                } for hora, cantidad, total in ventas_por_hora
             ]
         })
     except Exception as e:
@@ -171,56 +159,9 @@ def get_reservas_stats():
 @admin_api_bp.route('/alertas', methods=['GET'])
 @admin_required
 def get_alertas():
-    """Obtiene las alertas activas del sistema"""
+    """Obtiene las alertas activas del sistema (conjunto en memoria, ver utils.alertas)"""
     try:
-        alertas = []
-        
-        # Stock bajo en inventario
-        items_stock_bajo = Inventario.query.filter(
-            Inventario.cantidad <= Inventario.stock_minimo
-        ).all()
-        
-        for item in items_stock_bajo:
-            alertas.append({
-                'tipo': 'warning',
-                'categoria': 'inventario',
-                'mensaje': f'Stock bajo de {item.nombre}: {item.cantidad} {item.unidad}',
-                'datos': item.to_dict(),
-                'fecha': datetime.now().isoformat()
-            })
-        
-        # Pedidos atrasados
-        limite_tiempo = datetime.now() - timedelta(hours=1)
-        pedidos_atrasados = Pedido.query.filter(
-            Pedido.estado.in_(['pendiente', 'preparando']),
-            Pedido.fecha_pedido <= limite_tiempo
-        ).all()
-        
-        for pedido in pedidos_atrasados:
-            alertas.append({
-                'tipo': 'danger',
-                'categoria': 'pedidos',
-                'mensaje': f'Pedido #{pedido.id} atrasado ({pedido.estado})',
-                'datos': pedido.to_dict(),
-                'fecha': datetime.now().isoformat()
-            })
-        
-        # Reservas sin confirmar
-        reservas_pendientes = Reserva.query.filter(
-            Reserva.estado == 'pendiente',
-            Reserva.fecha <= datetime.now().date() + timedelta(days=1)
-        ).all()
-        
-        for reserva in reservas_pendientes:
-            alertas.append({
-                'tipo': 'info',
-                'categoria': 'reservas',
-                'mensaje': f'Reserva #{reserva.id} sin confirmar para {reserva.fecha}',
-                'datos': reserva.to_dict(),
-                'fecha': datetime.now().isoformat()
-            })
-        
-        return jsonify(alertas)
+        return jsonify(motor_alertas.activas())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -263,4 +204,12 @@ def get_actividad():
         
         return jsonify(actividad[:50])  # Retornar solo las últimas 50 actividades
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@admin_api_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Métricas del proceso en formato de texto de Prometheus (ver utils.metricas)"""
+    if not metricas.activas:
+        return jsonify({'error': 'Métricas desactivadas'}), 404
+    return Response(metricas.exponer(), mimetype='text/plain; version=0.0.4')
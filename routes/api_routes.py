@@ -1,8 +1,16 @@
 from flask import Blueprint, jsonify, request
 from sqlalchemy import text
 from datetime import datetime, timedelta
-from models import db, Categoria, Inventario, MenuItem, Mesa, Mesero, Pedido, PedidoItem, Reserva, Servicio, Usuario
+from models import db, Categoria, Inventario, MenuItem, Mesa, Mesero, Pedido, PedidoItem, ProductoPiscina, Reserva, Servicio, Usuario
 from flask_login import login_required, current_user
+from utils.pedido_utils import cargar_pedidos, serializar_pedidos
+from utils.menu_cache import menu_cache
+from utils.paginacion import ParametroInvalido, paginar, respuesta_pagina
+from utils.alertas import motor_alertas
+from utils import eventos
+from utils.cola_cocina import cola_cocina
+from utils.ocupacion import indice_ocupacion
+from utils.ventas_resumen import hoy, totales_dia
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -11,8 +19,7 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 def get_menu_items():
     """Obtener todos los items del menú disponibles"""
     try:
-        items = MenuItem.query.filter_by(disponible=True).all()
-        return jsonify([item.to_dict() for item in items])
+        return menu_cache.respuesta('items')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -20,54 +27,10 @@ def get_menu_items():
 @api_bp.route('/piscina/productos', methods=['GET'])
 def get_productos_piscina():
     """Leer productos de la tabla productos_de_consumo_rapido para pedidos en piscina"""
-    # Usamos SQL crudo y filtramos disponibilidad en Python para tolerar esquemas sin la columna
-    sql = text("SELECT * FROM productos_de_consumo_rapido")
-    result = db.session.execute(sql).mappings().all()
-
-    # Construir mapa de MenuItem por nombre normalizado (insensible a mayúsculas/acentos/espacios)
-    import unicodedata
-    def normalize(s):
-        if not s:
-            return ''
-        s = str(s).strip().lower()
-        return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
-    menu_map = {}
-    for mi in MenuItem.query.all():
-        menu_map[normalize(mi.nombre)] = mi.id
-
-    productos = []
-    for row in result:
-        # Filtrar por disponibilidad si la columna existe
-        raw_disp = row.get('disponible') if 'disponible' in row else None
-        is_disp = bool(raw_disp) if raw_disp is not None else True
-        if not is_disp:
-            continue
-
-        # Mapeo flexible de columnas comunes
-        pid = row.get('id') or row.get('producto_id') or row.get('codigo')
-        nombre = row.get('nombre') or row.get('producto') or row.get('titulo')
-        descripcion = row.get('descripcion') or row.get('detalle') or ''
-        precio_raw = row.get('precio') or row.get('valor') or row.get('precio_unitario') or 0
-        try:
-            precio = float(precio_raw)
-        except Exception:
-            precio = 0.0
-        imagen = row.get('imagen') or row.get('imagen_url') or row.get('foto') or None
-
-        # Enlazar con MenuItem por nombre normalizado
-        menu_item_id = menu_map.get(normalize(nombre)) if nombre else None
-
-        productos.append({
-            'id': pid,
-            'nombre': nombre,
-            'descripcion': descripcion,
-            'precio': precio,
-            'imagen': imagen,
-            'disponible': is_disp,
-            'menu_item_id': menu_item_id
-        })
-
-    return jsonify(productos)
+    # Lectura de la copia precalculada (ya enlazada con el menú y filtrada por
+    # disponibilidad), ver utils.piscina_catalogo
+    productos = ProductoPiscina.query.filter_by(disponible=True).all()
+    return jsonify([p.to_dict() for p in productos])
 
 # Rutas para Pedidos (detalle individual)
 @api_bp.route('/pedidos/<int:pedido_id>', methods=['GET'])
@@ -106,27 +69,17 @@ def get_reserva_detail(reserva_id):
 def get_dashboard_stats():
     """Obtener estadísticas para el dashboard"""
     try:
-        from datetime import datetime, timedelta
-        today = datetime.now().date()
+        today = hoy()
         
-        # Pedidos de hoy
-        pedidos_hoy = Pedido.query.filter(
-            db.func.date(Pedido.fecha_pedido) == today
-        ).count()
+        # Pedidos y ventas de hoy (acumulados, ver utils.ventas_resumen)
+        pedidos_hoy, ventas_hoy = totales_dia(today)
         
         # Reservas de hoy
-        reservas_hoy = Reserva.query.filter_by(
-            fecha=today.strftime('%Y-%m-%d')
-        ).count()
-        
-        # Ventas de hoy
-        ventas_hoy = db.session.query(db.func.sum(Pedido.total)).filter(
-            db.func.date(Pedido.fecha_pedido) == today
-        ).scalar() or 0
+        reservas_hoy = Reserva.query.filter_by(fecha=today).count()
         
         # Estado de mesas
         total_mesas = Mesa.query.count()
-        mesas_ocupadas = Mesa.query.filter_by(estado='ocupada').count()
+        mesas_ocupadas = len(indice_ocupacion.mesas_ocupadas())
         
         return jsonify({
             'pedidos_hoy': pedidos_hoy,
@@ -189,36 +142,15 @@ def get_dashboard_actividad():
 def get_dashboard_alertas():
     """Obtener alertas activas para el dashboard"""
     try:
-        alertas = []
-        
-        # Verificar stock bajo en inventario
-        items_stock_bajo = Inventario.query.filter(
-            Inventario.cantidad <= Inventario.stock_minimo
-        ).all()
-        
-        for item in items_stock_bajo:
-            alertas.append({
-                'tipo': 'warning',
-                'mensaje': f'Stock bajo de {item.nombre}: {item.cantidad} {item.unidad}',
-                'tiempo': datetime.now().isoformat(),
-                'datos': item.to_dict()
-            })
-        
-        # Verificar pedidos atrasados
-        pedidos_atrasados = Pedido.query.filter(
-            Pedido.estado.in_(['pendiente', 'preparando']),
-            Pedido.fecha_pedido <= datetime.now() - timedelta(hours=1)
-        ).all()
-        
-        for pedido in pedidos_atrasados:
-            alertas.append({
-                'tipo': 'urgent',
-                'mensaje': f'Pedido #{pedido.id} atrasado ({pedido.estado})',
-                'tiempo': datetime.now().isoformat(),
-                'datos': pedido.to_dict()
-            })
-        
-        return jsonify(alertas)
+        # Conjunto en memoria (ver utils.alertas); aquí sólo inventario y pedidos
+        tipos = {'danger': 'urgent'}
+        return jsonify([{
+            'id': alerta['id'],
+            'tipo': tipos.get(alerta['tipo'], alerta['tipo']),
+            'mensaje': alerta['mensaje'],
+            'tiempo': alerta['fecha'],
+            'datos': alerta['datos']
+        } for alerta in motor_alertas.activas(categorias=('inventario', 'pedidos'))])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -229,8 +161,11 @@ def get_data(model_name):
         if not model:
             return jsonify({'error': 'Modelo no encontrado'}), 404
 
-        items = model.query.all()
-        return jsonify([item.to_dict() for item in items])
+        # Paginado por clave primaria (ver utils.paginacion)
+        items, siguiente, total = paginar(model.query, list(model.__mapper__.primary_key), descendente=False)
+        return respuesta_pagina([item.to_dict() for item in items], siguiente, total)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -306,8 +241,8 @@ def delete_data(model_name, item_id):
 @api_bp.route('/cocina/pedidos', methods=['GET'])
 def get_pedidos_cocina():
     try:
-        pedidos = Pedido.query.filter(Pedido.estado.in_(['pendiente', 'preparando', 'enviado'])).all()
-        return jsonify([p.to_dict() for p in pedidos])
+        _, pedidos = cola_cocina.snapshot()
+        return jsonify(pedidos)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -324,7 +259,9 @@ def update_pedido_estado_cocina(pedido_id):
             return jsonify({'error': 'Estado inválido'}), 400
         
         pedido.estado = new_estado
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         return jsonify(pedido.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -454,8 +391,8 @@ def get_pedidos_piscina():
         # Asumiendo que los pedidos de piscina se gestionan de forma similar a cocina
         # y están relacionados con el modelo Pedido o un modelo similar.
         # Si hay un modelo específico para pedidos de piscina, se debería usar ese.
-        pedidos = Pedido.query.filter(Pedido.estado.in_(['pendiente', 'preparando', 'enviado'])).all()
-        return jsonify([p.to_dict() for p in pedidos])
+        pedidos = cargar_pedidos(Pedido.query.filter(Pedido.estado.in_(['pendiente', 'preparando', 'enviado']))).all()
+        return jsonify(serializar_pedidos(pedidos))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -472,7 +409,9 @@ def update_pedido_estado_piscina(pedido_id):
             return jsonify({'error': 'Estado inválido'}), 400
         
         pedido.estado = new_estado
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         return jsonify(pedido.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -6,6 +6,8 @@ from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime
 from models import db, Pedido, Mesa
+from utils import eventos
+from utils.pedido_utils import cargar_pedidos, serializar_pedidos
 try:
     from models import Factura
 except ImportError:
@@ -64,12 +66,12 @@ def facturas_pendientes():
 @cajero_required
 def pedidos_piscina():
     """Obtener pedidos desde la piscina"""
-    pedidos = Pedido.query.filter_by(
+    pedidos = cargar_pedidos(Pedido.query.filter_by(
         tipo='piscina',
         estado='pendiente'
-    ).order_by(Pedido.fecha_pedido.asc()).all()
+    ).order_by(Pedido.fecha_pedido.asc())).all()
     
-    return jsonify([pedido.to_dict() for pedido in pedidos])
+    return jsonify(serializar_pedidos(pedidos))
 
 
 @caja_bp.route('/api/pedido/<int:pedido_id>/despachar', methods=['POST'])
@@ -84,7 +86,9 @@ def despachar_pedido_piscina(pedido_id):
             return jsonify({'error': 'Este pedido no es de piscina'}), 400
         
         pedido.estado = 'entregado'
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         
         return jsonify({
             'success': True,
@@ -5,6 +5,8 @@ from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
 from models import db, Pedido
+from utils import eventos
+from utils.cola_cocina import cola_cocina
 
 cocina_bp = Blueprint('cocina', __name__, url_prefix='/cocina')
 
@@ -31,13 +33,18 @@ def panel_cocina():
 @login_required
 @cocina_required
 def pedidos_pendientes():
-    """Obtener pedidos pendientes para la cocina"""
-    pedidos = Pedido.query.filter(
-        Pedido.tipo.in_(['mesa', 'domicilio']),
-        Pedido.estado.in_(['pendiente', 'preparando'])
-    ).order_by(Pedido.fecha_pedido.asc()).all()
-    
-    return jsonify([pedido.to_dict() for pedido in pedidos])
+    """Obtener pedidos pendientes para la cocina (desde la cola en memoria)"""
+    _, pedidos = cola_cocina.snapshot(estados=('pendiente', 'preparando'))
+    return jsonify(pedidos)
+
+
+@cocina_bp.route('/api/cola')
+@login_required
+@cocina_required
+def cola():
+    """Foto de la cola de cocina; luego llegan los cambios por el evento 'cola_cocina'"""
+    version, pedidos = cola_cocina.snapshot()
+    return jsonify({'version': version, 'pedidos': pedidos})
 
 
 @cocina_bp.route('/api/pedido/<int:pedido_id>/estado', methods=['POST'])
@@ -55,7 +62,9 @@ def actualizar_estado_pedido(pedido_id):
         pedido = Pedido.query.get_or_404(pedido_id)
         pedido.estado = nuevo_estado
         
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         
         return jsonify({
             'success': True,
@@ -77,7 +86,9 @@ def despachar_pedido(pedido_id):
         pedido = Pedido.query.get_or_404(pedido_id)
         pedido.estado = 'listo'
         
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         
         return jsonify({
             'success': True,
@@ -3,11 +3,10 @@ Rutas para el panel de cuenta del usuario
 """
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash
 from datetime import datetime
-import os
 from models import db, Usuario, Pedido, Reserva
+from utils import almacen, eventos
+from utils.pedido_utils import cargar_pedidos, serializar_pedidos
 
 cuenta_bp = Blueprint('cuenta', __name__, url_prefix='/cuenta')
 
@@ -29,13 +28,13 @@ def mi_cuenta():
 def obtener_mis_pedidos():
     """API para obtener los pedidos del usuario"""
     try:
-        pedidos = Pedido.query.filter_by(usuario_id=current_user.id)\
-            .order_by(Pedido.fecha_pedido.desc())\
+        pedidos = cargar_pedidos(Pedido.query.filter_by(usuario_id=current_user.id)\
+            .order_by(Pedido.fecha_pedido.desc()))\
             .all()
         
         return jsonify({
             'success': True,
-            'pedidos': [p.to_dict() for p in pedidos]
+            'pedidos': serializar_pedidos(pedidos, resumen=False)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -77,7 +76,9 @@ def cancelar_pedido(pedido_id):
             }), 400
         
         pedido.estado = 'cancelado'
+        evento = eventos.datos_pedido(pedido)
         db.session.commit()
+        eventos.estado_pedido(evento)
         
         return jsonify({
             'success': True,
@@ -144,7 +145,7 @@ def actualizar_perfil():
         
         # Actualizar contraseña si se proporciona
         if data.get('password_nueva'):
-            usuario.password_hash = generate_password_hash(data['password_nueva'])
+            usuario.set_password(data['password_nueva'])
         
         usuario.updated_at = datetime.utcnow()
         db.session.commit()
@@ -173,20 +174,14 @@ def subir_foto_perfil():
             return jsonify({'success': False, 'error': 'No se seleccionó archivo'}), 400
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            # Agregar timestamp para evitar colisiones
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"user_{current_user.id}_{timestamp}_{filename}"
-            
-            # Guardar en la carpeta de uploads de usuarios
-            upload_folder = os.path.join('static', 'uploads', 'users')
-            os.makedirs(upload_folder, exist_ok=True)
-            filepath = os.path.join(upload_folder, filename)
-            file.save(filepath)
+            # Guardar en la carpeta de uploads de usuarios, con el hash del contenido
+            # como nombre; la foto anterior queda sin esta referencia y la borra el
+            # barrido de huérfanos si nadie más la usa
+            url, _ = almacen.guardar(file, 'users')
             
             # Actualizar ruta en la base de datos
             usuario = Usuario.query.get(current_user.id)
-            usuario.foto_perfil = f'/static/uploads/users/{filename}'
+            usuario.foto_perfil = url
             usuario.updated_at = datetime.utcnow()
             db.session.commit()
             
@@ -206,21 +201,13 @@ def subir_foto_perfil():
 @cuenta_bp.route('/api/eliminar-foto', methods=['POST'])
 @login_required
 def eliminar_foto_perfil():
-    """Eliminar la foto de perfil del usuario (y borrar el archivo si existe)."""
+    """Eliminar la foto de perfil del usuario.
+    
+    El archivo puede ser compartido (mismo contenido subido por otro usuario o
+    usado en el menú): lo borra el barrido de huérfanos cuando nadie lo usa.
+    """
     try:
         usuario = Usuario.query.get(current_user.id)
-        ruta_rel = usuario.foto_perfil  # Ej: /static/uploads/users/archivo.jpg
-        
-        if ruta_rel:
-            try:
-                # Construir ruta absoluta segura al archivo dentro del proyecto
-                base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-                ruta_abs = os.path.join(base_dir, ruta_rel.lstrip('/').replace('/', os.sep))
-                if os.path.exists(ruta_abs) and os.path.isfile(ruta_abs):
-                    os.remove(ruta_abs)
-            except Exception:
-                # No bloquear por errores al eliminar el archivo físico
-                pass
         
         # Limpiar en base de datos
         usuario.foto_perfil = None
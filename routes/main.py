@@ -4,6 +4,8 @@ Rutas principales de la aplicación
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import current_user
 from models import db, MenuItem, Categoria, Servicio, Mesero, Mesa
+from utils.ocupacion import indice_ocupacion
+from utils.menu_cache import menu_cache
 from datetime import datetime
 
 main_bp = Blueprint('main', __name__)
@@ -19,12 +21,11 @@ def index():
 def menu():
     """Página del menú"""
     try:
-        categorias = Categoria.query.order_by(Categoria.orden).all()
-        items = MenuItem.query.filter_by(disponible=True).all()
+        snapshot = menu_cache.snapshot()
         
         # Organizar items por categoría
         # Se pasa la lista plana de items y las categorías para permitir el filtrado por JS
-        return render_template('menu.html', categorias=categorias, items=items)
+        return render_template('menu.html', categorias=snapshot.categorias, items=snapshot.items)
     except Exception as e:
         print(f"Error en /menu: {e}")
         return render_template('menu.html', categorias=[], menu_por_categoria={})
@@ -73,10 +74,9 @@ def reservas():
 def domicilios():
     """Página de domicilios"""
     try:
-        categorias = Categoria.query.order_by(Categoria.orden).all()
-        items = MenuItem.query.filter_by(disponible=True).all()
+        snapshot = menu_cache.snapshot()
         
-        return render_template('domicilios.html', categorias=categorias, items=items)
+        return render_template('domicilios.html', categorias=snapshot.categorias, items=snapshot.items)
     except Exception as e:
         print(f"Error en /domicilios: {e}")
         return render_template('domicilios.html', categorias=[], items=[])
@@ -87,19 +87,8 @@ def domicilios():
 def api_menu():
     """API para obtener el menú completo"""
     try:
-        categorias = Categoria.query.order_by(Categoria.orden).all()
-        items = MenuItem.query.filter_by(disponible=True).all()
-        
-        menu_data = []
-        for categoria in categorias:
-            categoria_items = [item.to_dict() for item in items if item.categoria_id == categoria.id]
-            if categoria_items:
-                menu_data.append({
-                    'categoria': categoria.to_dict(),
-                    'items': categoria_items
-                })
-        
-        return jsonify(menu_data)
+        # Snapshot precalculado y agrupado por categoría, con ETag (304 si no cambió)
+        return menu_cache.respuesta('menu')
     except Exception as e:
         print(f"Error en /api/menu: {e}")
         return jsonify([])
@@ -109,27 +98,14 @@ def api_menu():
 def api_mesas():
     """API para obtener mesas disponibles (excluyendo las ocupadas por otros usuarios)"""
     try:
-        from models import Pedido
-        
         # Obtener todas las mesas disponibles
         mesas = Mesa.query.filter_by(disponible=True).all()
         
-        # Si el usuario está autenticado, obtener pedidos activos de OTROS usuarios
-        if current_user.is_authenticated:
-            pedidos_activos = Pedido.query.filter(
-                Pedido.mesa_id.isnot(None),
-                Pedido.estado.in_(['pendiente', 'preparando', 'enviado']),
-                Pedido.usuario_id != current_user.id  # Excluir pedidos del usuario actual
-            ).all()
-        else:
-            # Si no está autenticado, mostrar todas las mesas ocupadas
-            pedidos_activos = Pedido.query.filter(
-                Pedido.mesa_id.isnot(None),
-                Pedido.estado.in_(['pendiente', 'preparando', 'enviado'])
-            ).all()
-        
-        # IDs de mesas ocupadas por otros
-        mesas_ocupadas_ids = set(p.mesa_id for p in pedidos_activos if p.mesa_id)
+        # IDs de mesas ocupadas por otros (índice en memoria). Si el usuario está
+        # autenticado se excluyen sus propios pedidos; si no, cuentan todas las ocupadas
+        mesas_ocupadas_ids = indice_ocupacion.mesas_ocupadas(
+            excluir_usuario=current_user.id if current_user.is_authenticated else None
+        )
         
         # Filtrar mesas que no estén ocupadas por otros
         mesas_disponibles = [
@@ -1,14 +1,19 @@
 # routes/pedidos.py
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Pedido, PedidoItem, MenuItem, Inventario, InventarioMovimiento
+from models import db, Pedido, PedidoItem, MenuItem, Inventario, InventarioMovimiento, ProductoPiscina
 try:
     from models import Receta
 except ImportError:
     Receta = None
 from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import insert
 import uuid
-from utils.pedido_utils import add_or_update_pedido_item
+from utils import eventos
+from utils.pedido_utils import build_pedido_items
+from utils.inventario_utils import descontar_stock_lote, StockInsuficiente
+from utils.ocupacion import indice_ocupacion
 
 pedidos_bp = Blueprint('pedidos', __name__, url_prefix='/pedidos')
 
@@ -53,6 +58,10 @@ def crear_pedido():
                 Pedido.usuario_id != current_user.id  # Solo bloquear si es de otro usuario
             ).first()
             
+            # La consulta es la fuente de verdad; si el índice de ocupación no
+            # coincide se reconstruye
+            indice_ocupacion.verificar(mesa_id, pedido_existente is not None, usuario_id=current_user.id)
+            
             if pedido_existente:
                 return jsonify({
                     'error': f'La mesa seleccionada está ocupada por otro cliente. Por favor elige otra mesa.'
@@ -63,81 +72,98 @@ def crear_pedido():
         db.session.add(nuevo_pedido)
         db.session.flush()
         
-        # Verificar stock antes de crear el pedido
-        movimientos_inventario = []
+        if Receta is None:
+            db.session.rollback()
+            return jsonify({'error': 'Funcionalidad de recetas no disponible en el sistema'}), 500
+        
+        # Cargar en bloque los items del menú, recetas e inventario de todo el carrito
+        # (número constante de consultas sin importar el tamaño del carrito)
+        claves_carrito = {str(item_data['id']) for item_data in data['items']}
+        if data.get('tipo') == 'piscina':
+            # Pedidos de piscina: el carrito trae ids de productos de la piscina
+            # (no de menu_items) y se resuelven sólo con el enlace precalculado
+            # productos_de_consumo_rapido -> menu_items (no se crean items del menú aquí)
+            enlaces = db.session.query(ProductoPiscina.producto_id, MenuItem).join(
+                MenuItem, MenuItem.id == ProductoPiscina.menu_item_id
+            ).filter(ProductoPiscina.producto_id.in_(claves_carrito)).all()
+            menu_items = dict(enlaces)
+        else:
+            ids_carrito = {int(clave) for clave in claves_carrito if clave.isdigit()}
+            menu_items = {
+                str(mi.id): mi for mi in MenuItem.query.filter(MenuItem.id.in_(ids_carrito)).all()
+            } if ids_carrito else {}
+        
+        lineas = []
         for item_data in data['items']:
-            menu_item = MenuItem.query.get(item_data['id'])
+            menu_item = menu_items.get(str(item_data['id']))
             if not menu_item:
-                # Fallback para pedidos de piscina: crear MenuItem "ligero" si no existe
                 if data.get('tipo') == 'piscina':
-                    nombre_fallback = item_data.get('nombre') or f"Producto piscina {item_data['id']}"
-                    precio_fallback = item_data.get('precio') or 0
-                    menu_item = MenuItem(
-                        restaurante_id=1,
-                        nombre=nombre_fallback,
-                        descripcion='Producto de consumo rpido (piscina)',
-                        precio=precio_fallback,
-                        categoria_nombre='Piscina',
-                        disponible=True,
-                        imagen_url=item_data.get('imagen')
-                    )
-                    db.session.add(menu_item)
-                    db.session.flush()
-                else:
+                    db.session.rollback()
+                    return jsonify({
+                        'error': f'El producto "{item_data.get("nombre") or item_data["id"]}" no está disponible'
+                    }), 400
+                continue
+            lineas.append((menu_item, int(item_data['cantidad']), item_data['precio']))
+        
+        recetas_por_item = {}
+        ids_menu = {menu_item.id for menu_item, _, _ in lineas}
+        if ids_menu:
+            for receta in Receta.query.filter(Receta.menu_item_id.in_(ids_menu)).all():
+                recetas_por_item.setdefault(receta.menu_item_id, []).append(receta)
+        
+        ids_inventario = {r.inventario_id for recetas in recetas_por_item.values() for r in recetas}
+        inventario = {
+            inv.id: inv for inv in Inventario.query.filter(Inventario.id.in_(ids_inventario)).all()
+        } if ids_inventario else {}
+        
+        # Verificar stock en memoria acumulando lo que consume todo el carrito
+        # (rechazo rápido; el descuento condicional de abajo es el que garantiza el stock)
+        consumo = {}
+        movimientos_inventario = []
+        for menu_item, cantidad_pedido, _ in lineas:
+            for receta in recetas_por_item.get(menu_item.id, []):
+                inventario_item = inventario.get(receta.inventario_id)
+                if not inventario_item:
                     continue
-
-            # Verificar recetas (ingredientes necesarios)
-            if Receta is None:
-                return jsonify({'error': 'Funcionalidad de recetas no disponible en el sistema'}), 500
-            recetas = Receta.query.filter_by(menu_item_id=menu_item.id).all()
-            cantidad_pedido = item_data['cantidad']
-            
-            # Verificar stock suficiente para cada ingrediente
-            for receta in recetas:
-                inventario_item = Inventario.query.get(receta.inventario_id)
-                if inventario_item:
-                    cantidad_necesaria = float(receta.cantidad_usada) * cantidad_pedido
-                    if inventario_item.cantidad < cantidad_necesaria:
-                        return jsonify({
-                            'error': f'Stock insuficiente de "{inventario_item.nombre}" para el plato "{menu_item.nombre}"'
-                        }), 400
-            
-            # Agregar o actualizar item del pedido (centralizado en helper)
-            pedido_item = add_or_update_pedido_item(
-                nuevo_pedido.id,
-                menu_item,
-                cantidad_pedido,
-                item_data['precio']
-            )
-            
-            # Registrar movimientos de inventario (salidas)
-            for receta in recetas:
-                inventario_item = Inventario.query.get(receta.inventario_id)
-                if inventario_item:
-                    cantidad_salida = float(receta.cantidad_usada) * cantidad_pedido
-                    inventario_item.cantidad -= cantidad_salida
-                    
-                    # Registrar movimiento
-                    movimiento = InventarioMovimiento(
-                        inventario_id=inventario_item.id,
-                        tipo='salida',
-                        cantidad=cantidad_salida,
-                        usuario_id=current_user.id,
-                        notas=f'Pedido {codigo} - {menu_item.nombre} x{cantidad_pedido}'
-                    )
-                    movimientos_inventario.append(movimiento)
-        
-        # Agregar todos los movimientos de inventario
-        for movimiento in movimientos_inventario:
-            db.session.add(movimiento)
+                cantidad_salida = Decimal(receta.cantidad_usada) * cantidad_pedido
+                consumo[inventario_item.id] = consumo.get(inventario_item.id, Decimal('0')) + cantidad_salida
+                if inventario_item.cantidad < consumo[inventario_item.id]:
+                    # El mensaje antes del rollback (expira los objetos cargados)
+                    error = f'Stock insuficiente de "{inventario_item.nombre}" para el plato "{menu_item.nombre}"'
+                    db.session.rollback()
+                    return jsonify({'error': error}), 400
+                movimientos_inventario.append({
+                    'inventario_id': inventario_item.id,
+                    'tipo': 'salida',
+                    'cantidad': cantidad_salida,
+                    'usuario_id': current_user.id,
+                    'notas': f'Pedido {codigo} - {menu_item.nombre} x{cantidad_pedido}'
+                })
+        
+        # Items del pedido (las líneas repetidas del carrito se agrupan en memoria)
+        db.session.add_all(build_pedido_items(nuevo_pedido.id, lineas))
+        
+        # Descontar inventario con UPDATE condicionales (atómicos frente a pedidos
+        # concurrentes) y registrar todos los movimientos en bloque
+        try:
+            descontar_stock_lote(consumo)
+        except StockInsuficiente as e:
+            # El nombre antes del rollback (expira los objetos cargados)
+            nombre = inventario[e.inventario_id].nombre if e.inventario_id in inventario else e.inventario_id
+            db.session.rollback()
+            return jsonify({'error': f'Stock insuficiente de "{nombre}"'}), 409
+        if movimientos_inventario:
+            db.session.execute(insert(InventarioMovimiento), movimientos_inventario)
         
+        evento = eventos.datos_pedido(nuevo_pedido)
         db.session.commit()
+        eventos.pedido_creado(evento)
         
         return jsonify({
             'success': True,
             'message': 'Pedido creado exitosamente',
-            'pedido_id': nuevo_pedido.id,
-            'codigo': nuevo_pedido.codigo_pedido
+            'pedido_id': evento['id'],
+            'codigo': evento['codigo_pedido']
         })
         
     except Exception as e:
@@ -9,6 +9,9 @@ import string
 from models import db, Reserva, Mesa, Mesero, Servicio
 import json
 from decimal import Decimal
+from utils.disponibilidad import disponibilidad, intervalo
+from utils.ocupacion import indice_ocupacion
+from utils.paginacion import ParametroInvalido, leer_entero, leer_fecha
 
 reservas_bp = Blueprint('reservas', __name__, url_prefix='/api/reservas')
 
@@ -70,21 +73,26 @@ def crear_reserva():
         fecha = datetime.strptime(data['fecha'], '%Y-%m-%d').date()
         hora = datetime.strptime(data['hora'], '%H:%M').time()
         
-        # Validar disponibilidad de mesa si se especifica (para servicios de billar, etc.)
-        # Solo verificar conflictos con reservas de OTROS usuarios
+        # Duración estimada en horas (por ejemplo piscina)
+        duracion_estimada = None
+        if data.get('duracion_estimada'):
+            try:
+                duracion_estimada = int(data['duracion_estimada'])
+            except Exception:
+                pass
+        
+        # Validar disponibilidad de mesa si se especifica (para servicios de billar, etc.):
+        # la mesa del mismo servicio no debe tener otra reserva activa que se cruce
+        # en horario. Solo verificar conflictos con reservas de OTROS usuarios
         if data.get('mesa_id'):
-            mesa_id_str = str(data.get('mesa_id'))
-            # Verificar que no haya reservas activas de otros usuarios para esa mesa en la misma fecha
-            reserva_existente = Reserva.query.filter(
-                Reserva.mesa_asignada == mesa_id_str,
-                Reserva.fecha == fecha,
-                Reserva.estado.in_(['pendiente', 'confirmada']),
-                Reserva.usuario_id != current_user.id  # Permitir al mismo usuario
-            ).first()
-            
-            if reserva_existente:
+            mesa_id_str = str(data.get('mesa_id')).strip()
+            servicio_id = str(data['servicio_id']) if data.get('servicio_id') else None
+            inicio, fin = intervalo(hora, duracion_estimada)
+            if disponibilidad.conflicto(fecha, (servicio_id, mesa_id_str), inicio, fin,
+                                        excluir_usuario=current_user.id):
                 return jsonify({
-                    'error': f'La mesa {mesa_id_str} ya está reservada por otro cliente para el {fecha.strftime("%d/%m/%Y")}'
+                    'error': f'La mesa {mesa_id_str} ya está reservada por otro cliente para el '
+                             f'{fecha.strftime("%d/%m/%Y")} en ese horario'
                 }), 400
 
         # Preparar notas_especiales con metadatos del servicio
@@ -119,11 +127,8 @@ def crear_reserva():
         )
 
         # Si viene una duración estimada (por ejemplo piscina), guardarla
-        if data.get('duracion_estimada'):
-            try:
-                nueva_reserva.duracion_estimada = int(data['duracion_estimada'])
-            except Exception:
-                pass
+        if duracion_estimada:
+            nueva_reserva.duracion_estimada = duracion_estimada
 
         # Calcular total_reserva si hay servicio y reglas básicas
         try:
@@ -223,35 +228,39 @@ def cancelar_reserva(reserva_id):
 
 @reservas_bp.route('/disponibilidad', methods=['GET'])
 def verificar_disponibilidad():
-    """Verificar disponibilidad de mesas en una fecha"""
+    """Verificar disponibilidad de mesas (o de un servicio) en una fecha.
+
+    Parámetros: ``fecha`` (YYYY-MM-DD, requerida), ``hora`` (HH:MM; sin ella se
+    mira el día completo), ``duracion`` en horas, ``personas`` y ``servicio_id``
+    (sin él, mesas del comedor). Se responde desde el índice en memoria.
+    """
     try:
-        fecha_str = request.args.get('fecha')
-        
-        if not fecha_str:
+        fecha = leer_fecha('fecha')
+        if not fecha:
             return jsonify({'error': 'Fecha requerida'}), 400
         
-        fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
-        
-        # Obtener reservas para esa fecha
-        reservas_fecha = Reserva.query.filter(
-            Reserva.fecha == fecha,
-            Reserva.estado.in_(['pendiente', 'confirmada'])
-        ).all()
-        
-        mesas_reservadas = [r.mesa_asignada for r in reservas_fecha if r.mesa_asignada]
-        
-        # Obtener mesas disponibles
-        mesas_disponibles = Mesa.query.filter(
-            Mesa.disponible == True
-        ).all()
-        
-        # Filtrar las que no están reservadas
-        mesas_libres = [mesa for mesa in mesas_disponibles if str(mesa.numero) not in mesas_reservadas]
+        hora_str = request.args.get('hora')
+        duracion_str = request.args.get('duracion')
+        try:
+            duracion = float(duracion_str) if duracion_str else None
+            if hora_str:
+                inicio, fin = intervalo(datetime.strptime(hora_str, '%H:%M').time(), duracion)
+            else:
+                inicio, fin = 0, 24 * 60
+        except ValueError:
+            raise ParametroInvalido('hora (HH:MM) o duracion inválida')
+        personas = leer_entero('personas') or 1
+        servicio_id = request.args.get('servicio_id') or None
         
-        return jsonify({
-            'disponibles': [mesa.to_dict() for mesa in mesas_libres],
-            'reservadas': mesas_reservadas
-        })
+        respuesta = {'reservadas': disponibilidad.recursos_ocupados(fecha, inicio, fin, servicio_id)}
+        if servicio_id is None:
+            respuesta['disponibles'] = [
+                dict(mesa, ocupada=indice_ocupacion.ocupada(mesa['id']))
+                for mesa in disponibilidad.mesas_libres(fecha, inicio, fin, personas)
+            ]
+        return jsonify(respuesta)
         
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -50,35 +50,9 @@ def handle_disconnect():
         elif current_user.rol == 'cajero':
             leave_room(ROOM_CAJA)
 
-# Eventos de Pedidos
-@socketio.on('nuevo_pedido')
-def handle_nuevo_pedido(data):
-    """Nuevo pedido creado"""
-    # Notificar a cocina
-    emit('pedido_recibido', data, room=ROOM_COCINA)
-    # Notificar a caja si es relevante
-    if data.get('requiere_pago'):
-        emit('pedido_pendiente_pago', data, room=ROOM_CAJA)
-    # Notificar a admin
-    emit('nuevo_pedido_admin', data, room=ROOM_ADMIN)
-    # Confirmar al cliente
-    emit('pedido_confirmado', {
-        'pedido_id': data.get('pedido_id'),
-        'estado': 'recibido'
-    })
-
-@socketio.on('actualizar_estado_pedido')
-def handle_actualizar_pedido(data):
-    """Actualización del estado de un pedido"""
-    pedido_id = data.get('pedido_id')
-    nuevo_estado = data.get('estado')
-    # Notificar a todas las salas relevantes
-    emit('estado_pedido_actualizado', data, room=ROOM_COCINA)
-    emit('estado_pedido_actualizado', data, room=ROOM_CAJA)
-    emit('estado_pedido_actualizado', data, room=ROOM_ADMIN)
-    # Notificar a la mesa específica si existe
-    if data.get('mesa_id'):
-        emit('estado_pedido_actualizado', data, room=f'mesa_{data["mesa_id"]}')
+# Los eventos de pedidos (creación y cambios de estado) los publica el servidor
+# después del commit desde las rutas (ver utils.eventos); ya no se reenvían
+# desde el navegador
 
 # Eventos de Mesas
 @socketio.on('actualizar_estado_mesa')
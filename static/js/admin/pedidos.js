@@ -1,29 +1,114 @@
 // static/js/admin/pedidos.js
 
-// Cargar contenido de pedidos
+// Cursor de la siguiente página del listado (null = no hay más)
+let cursorPedidos = null;
+
+// Filtros que resuelve el servidor (estado y fecha); el tipo se filtra en la tabla
+function filtrosPedidos() {
+  const estado = document.getElementById('filter-estado-pedido')?.value || 'todos';
+  const fecha = document.getElementById('filter-fecha-pedido')?.value || '';
+  return {
+    estado: estado !== 'todos' ? estado : '',
+    desde: fecha,
+    hasta: fecha
+  };
+}
+
+// Fila de la tabla para un pedido
+function filaPedido(p) {
+  // Determinar tipo de pedido
+  const tipo = p.direccion_entrega ? 'domicilio' : 'mesa';
+  const tipoBadge = tipo === 'domicilio' ? 'badge-info' : 'badge-secondary';
+  
+  // Cliente o mesa
+  const clienteInfo = tipo === 'mesa' ? 
+    `Mesa ${p.mesa_id || 'N/A'}` : 
+    (p.nombre_receptor || 'Cliente');
+  
+  // Teléfono
+  const telefono = p.telefono_contacto || 'N/A';
+  
+  // Dirección (solo para domicilios)
+  const direccion = tipo === 'domicilio' ? 
+    (p.direccion_entrega ? p.direccion_entrega.substring(0, 30) + '...' : 'N/A') : 
+    '-';
+  
+  // Color del estado
+  const estadoColor = {
+    'pendiente': 'badge-warning',
+    'preparando': 'badge-info',
+    'enviado': 'badge-primary',
+    'entregado': 'badge-success',
+    'cancelado': 'badge-danger',
+    'rechazado': 'badge-danger'
+  }[p.estado] || 'badge-secondary';
+  
+  return `
+    <tr data-tipo="${tipo}" data-estado="${p.estado}" data-fecha="${p.fecha_pedido ? p.fecha_pedido.split('T')[0] : ''}">
+      <td>${p.id}</td>
+      <td><strong>${p.codigo_pedido || 'PED' + p.id}</strong></td>
+      <td><span class="badge ${tipoBadge}">${tipo === 'domicilio' ? '🏠 Domicilio' : '🍽️ Mesa'}</span></td>
+      <td>${clienteInfo}</td>
+      <td>${telefono}</td>
+      <td title="${p.direccion_entrega || ''}">${direccion}</td>
+      <td><strong>${currency(p.total)}</strong></td>
+      <td>${(p.metodo_pago || 'efectivo').toUpperCase()}</td>
+      <td>
+        <select onchange="window.actualizarEstadoPedido(${p.id}, this.value)" class="estado-select ${estadoColor}">
+          <option value="pendiente" ${p.estado === 'pendiente' ? 'selected' : ''}>⏳ Pendiente</option>
+          <option value="preparando" ${p.estado === 'preparando' ? 'selected' : ''}>👨‍🍳 Preparando</option>
+          <option value="enviado" ${p.estado === 'enviado' ? 'selected' : ''}>🚚 Enviado</option>
+          <option value="entregado" ${p.estado === 'entregado' ? 'selected' : ''}>✅ Entregado</option>
+          <option value="cancelado" ${p.estado === 'cancelado' ? 'selected' : ''}>❌ Cancelado</option>
+          <option value="rechazado" ${p.estado === 'rechazado' ? 'selected' : ''}>🚫 Rechazado</option>
+        </select>
+      </td>
+      <td>${formatDateTime(p.fecha_pedido)}</td>
+      <td>
+        <button class="ghost small" onclick="window.verDetallesPedido(${p.id})" title="Ver detalles">👁️</button>
+        <button class="ghost small" onclick="window.imprimirPedido(${p.id})" title="Imprimir">🖨️</button>
+      </td>
+    </tr>
+  `;
+}
+
+function actualizarBotonMasPedidos() {
+  const boton = document.getElementById('btn-mas-pedidos');
+  if (boton) boton.style.display = cursorPedidos ? '' : 'none';
+}
+
+// Cargar contenido de pedidos (primera página con los filtros actuales)
 async function cargarPedidos() {
   try {
-    const pedidos = await API.get('/api/pedidos');
+    // Conservar los filtros elegidos al reconstruir la barra
+    const tipoActual = document.getElementById('filter-tipo-pedido')?.value || 'todos';
+    const filtros = filtrosPedidos();
+    const pagina = await API.pagina('/api/pedidos', { ...filtros, total: 1 });
+    const pedidos = pagina.items;
+    cursorPedidos = pagina.siguiente;
+    const opcion = (valor, actual, texto) =>
+      `<option value="${valor}" ${valor === actual ? 'selected' : ''}>${texto}</option>`;
+    const estadoActual = filtros.estado || 'todos';
     
     let html = `
       <div class="filters-bar" style="margin-bottom: 20px; display: flex; gap: 10px; align-items: center; flex-wrap: wrap;">
         <select id="filter-tipo-pedido" onchange="window.filtrarPedidos()">
-          <option value="todos">Todos los tipos</option>
-          <option value="mesa">Mesa</option>
-          <option value="domicilio">Domicilio</option>
+          ${opcion('todos', tipoActual, 'Todos los tipos')}
+          ${opcion('mesa', tipoActual, 'Mesa')}
+          ${opcion('domicilio', tipoActual, 'Domicilio')}
         </select>
-        <select id="filter-estado-pedido" onchange="window.filtrarPedidos()">
-          <option value="todos">Todos los estados</option>
-          <option value="pendiente">Pendiente</option>
-          <option value="preparando">Preparando</option>
-          <option value="enviado">Enviado</option>
-          <option value="entregado">Entregado</option>
-          <option value="cancelado">Cancelado</option>
-          <option value="rechazado">Rechazado</option>
+        <select id="filter-estado-pedido" onchange="window.cargarPedidos()">
+          ${opcion('todos', estadoActual, 'Todos los estados')}
+          ${opcion('pendiente', estadoActual, 'Pendiente')}
+          ${opcion('preparando', estadoActual, 'Preparando')}
+          ${opcion('enviado', estadoActual, 'Enviado')}
+          ${opcion('entregado', estadoActual, 'Entregado')}
+          ${opcion('cancelado', estadoActual, 'Cancelado')}
+          ${opcion('rechazado', estadoActual, 'Rechazado')}
         </select>
-        <input type="date" id="filter-fecha-pedido" onchange="window.filtrarPedidos()">
+        <input type="date" id="filter-fecha-pedido" value="${filtros.desde}" onchange="window.cargarPedidos()">
         <button class="secondary" onclick="window.cargarPedidos()">🔄 Actualizar</button>
-        <span style="margin-left: auto; font-weight: bold;">Total: ${pedidos.length} pedidos</span>
+        <span style="margin-left: auto; font-weight: bold;">Total: ${pagina.total} pedidos</span>
       </div>
       <div style="overflow-x: auto;">
       <table>
@@ -43,67 +128,16 @@ async function cargarPedidos() {
           </tr>
         </thead>
         <tbody id="tbody-pedidos">
+          ${pedidos.map(filaPedido).join('')}
+        </tbody>
+      </table>
+      </div>
+      <button id="btn-mas-pedidos" class="secondary" onclick="window.cargarMasPedidos()">Cargar más</button>
     `;
     
-    pedidos.forEach(p => {
-      // Determinar tipo de pedido
-      const tipo = p.direccion_entrega ? 'domicilio' : 'mesa';
-      const tipoBadge = tipo === 'domicilio' ? 'badge-info' : 'badge-secondary';
-      
-      // Cliente o mesa
-      const clienteInfo = tipo === 'mesa' ? 
-        `Mesa ${p.mesa_id || 'N/A'}` : 
-        (p.nombre_receptor || 'Cliente');
-      
-      // Teléfono
-      const telefono = p.telefono_contacto || 'N/A';
-      
-      // Dirección (solo para domicilios)
-      const direccion = tipo === 'domicilio' ? 
-        (p.direccion_entrega ? p.direccion_entrega.substring(0, 30) + '...' : 'N/A') : 
-        '-';
-      
-      // Color del estado
-      const estadoColor = {
-        'pendiente': 'badge-warning',
-        'preparando': 'badge-info',
-        'enviado': 'badge-primary',
-        'entregado': 'badge-success',
-        'cancelado': 'badge-danger',
-        'rechazado': 'badge-danger'
-      }[p.estado] || 'badge-secondary';
-      
-      html += `
-        <tr data-tipo="${tipo}" data-estado="${p.estado}" data-fecha="${p.fecha_pedido ? p.fecha_pedido.split('T')[0] : ''}">
-          <td>${p.id}</td>
-          <td><strong>${p.codigo_pedido || 'PED' + p.id}</strong></td>
-          <td><span class="badge ${tipoBadge}">${tipo === 'domicilio' ? '🏠 Domicilio' : '🍽️ Mesa'}</span></td>
-          <td>${clienteInfo}</td>
-          <td>${telefono}</td>
-          <td title="${p.direccion_entrega || ''}">${direccion}</td>
-          <td><strong>${currency(p.total)}</strong></td>
-          <td>${(p.metodo_pago || 'efectivo').toUpperCase()}</td>
-          <td>
-            <select onchange="window.actualizarEstadoPedido(${p.id}, this.value)" class="estado-select ${estadoColor}">
-              <option value="pendiente" ${p.estado === 'pendiente' ? 'selected' : ''}>⏳ Pendiente</option>
-              <option value="preparando" ${p.estado === 'preparando' ? 'selected' : ''}>👨‍🍳 Preparando</option>
-              <option value="enviado" ${p.estado === 'enviado' ? 'selected' : ''}>🚚 Enviado</option>
-              <option value="entregado" ${p.estado === 'entregado' ? 'selected' : ''}>✅ Entregado</option>
-              <option value="cancelado" ${p.estado === 'cancelado' ? 'selected' : ''}>❌ Cancelado</option>
-              <option value="rechazado" ${p.estado === 'rechazado' ? 'selected' : ''}>🚫 Rechazado</option>
-            </select>
-          </td>
-          <td>${formatDateTime(p.fecha_pedido)}</td>
-          <td>
-            <button class="ghost small" onclick="window.verDetallesPedido(${p.id})" title="Ver detalles">👁️</button>
-            <button class="ghost small" onclick="window.imprimirPedido(${p.id})" title="Imprimir">🖨️</button>
-          </td>
-        </tr>
-      `;
-    });
-    
-    html += '</tbody></table></div>';
     document.getElementById('tabla-pedidos').innerHTML = html;
+    actualizarBotonMasPedidos();
+    window.filtrarPedidos();
     
   } catch (err) {
     console.error('Error:', err);
@@ -112,6 +146,23 @@ async function cargarPedidos() {
   }
 }
 
+// Añade la siguiente página al final de la tabla
+window.cargarMasPedidos = async () => {
+  if (!cursorPedidos) return;
+  try {
+    const pagina = await API.pagina('/api/pedidos', { ...filtrosPedidos(), cursor: cursorPedidos });
+    cursorPedidos = pagina.siguiente;
+    document.getElementById('tbody-pedidos')
+      .insertAdjacentHTML('beforeend', pagina.items.map(filaPedido).join(''));
+    actualizarBotonMasPedidos();
+    window.filtrarPedidos();
+  } catch (err) {
+    showToast('❌ Error al cargar más pedidos: ' + err.message, 'error');
+  }
+};
+
+window.cargarPedidos = cargarPedidos;
+
 // Funciones globales
 window.actualizarEstadoPedido = async (pedidoId, estado) => {
   try {
@@ -458,8 +509,6 @@ window.imprimirPedido = async (pedidoId) => {
 
 window.filtrarPedidos = () => {
   const tipoFilter = document.getElementById('filter-tipo-pedido').value;
-  const estadoFilter = document.getElementById('filter-estado-pedido').value;
-  const fechaFilter = document.getElementById('filter-fecha-pedido').value;
   
   const rows = document.querySelectorAll('#tbody-pedidos tr');
   
@@ -470,12 +519,7 @@ window.filtrarPedidos = () => {
       mostrar = false;
     }
     
-    if (estadoFilter !== 'todos' && row.dataset.estado !== estadoFilter) {
-      mostrar = false;
-    }
-    
-    // Filtro de fecha (simplificado)
-    // En producción, deberías comparar con la fecha real del pedido
+    // Estado y fecha los filtra el servidor (ver cargarPedidos)
     
     row.style.display = mostrar ? '' : 'none';
   });
@@ -3,6 +3,7 @@
 
 let reservasData = [];
 let reservasFiltradas = [];
+let cargaReservas = 0;
 
 // ========================================
 // CARGAR RESERVAS
@@ -10,12 +11,16 @@ let reservasFiltradas = [];
 async function cargarReservas() {
   try {
     mostrarCargando();
-    const reservas = await API.get('/api/reservas');
-    reservasData = reservas;
-    reservasFiltradas = [...reservas];
-    
-    actualizarEstadisticas(reservas);
-    renderizarTablaReservas(reservasFiltradas);
+    // Se pide página a página y se pinta a medida que llegan; si empieza otra
+    // carga (p. ej. tras crear una reserva) esta deja de pedir páginas
+    const carga = ++cargaReservas;
+    reservasData = [];
+    await API.paginas('/api/reservas', {}, (pagina) => {
+      if (carga !== cargaReservas) return false;
+      reservasData.push(...pagina.items);
+      actualizarEstadisticas(reservasData);
+      window.filtrarReservas();
+    });
     
   } catch (err) {
     console.error('Error:', err);
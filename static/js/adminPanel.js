@@ -89,6 +89,23 @@ function configurarWebSocket() {
         });
     });
 
+    // Alertas calculadas en el servidor: altas/cambios y bajas por id
+    boodFoodSocket.on('alerta_nueva', (alerta) => {
+        if (alerta.categoria === 'reservas') return;
+        alertas = alertas.filter(a => a.id !== alerta.id);
+        agregarAlerta({
+            ...alerta,
+            tipo: alerta.tipo === 'danger' ? 'urgent' : alerta.tipo,
+            tiempo: alerta.fecha
+        });
+    });
+
+    boodFoodSocket.on('alerta_resuelta', ({ id }) => {
+        alertas = alertas.filter(a => a.id !== id);
+        actualizarListaAlertas();
+        actualizarContadorNotificaciones();
+    });
+
     // Eventos de mesas
     boodFoodSocket.on('estado_mesa_actualizado', (data) => {
         if (currentView === 'mesas') renderView();
@@ -183,6 +200,57 @@ const API = {
     const res = await fetch(`/admin${url}`, { method: 'DELETE' });
     if (!res.ok) throw new Error(`Error ${res.status}: ${await res.text()}`);
     return res.json();
+  },
+  
+  // Una página de un listado paginado: { items, siguiente, limite, total? }
+  async pagina(url, params = {}) {
+    const qs = new URLSearchParams(
+      Object.entries(params).filter(([, v]) => v !== null && v !== undefined && v !== '')
+    ).toString();
+    return this.get(qs ? `${url}${url.includes('?') ? '&' : '?'}${qs}` : url);
+  },
+  
+  // Recorre un listado paginado siguiendo el cursor y entrega cada página a
+  // alRecibir según llega; si alRecibir devuelve false se deja de pedir
+  async paginas(url, params, alRecibir) {
+    let cursor = null;
+    do {
+      const pagina = await this.pagina(url, { ...params, cursor });
+      if (await alRecibir(pagina) === false) return;
+      cursor = pagina.siguiente;
+    } while (cursor);
+  },
+  
+  // Todas las filas de un listado paginado (sólo para listados cortos, p. ej. selectores)
+  async todas(url, params = {}) {
+    const items = [];
+    await this.paginas(url, params, (pagina) => { items.push(...pagina.items); });
+    return items;
+  }
+};
+
+// ===== TABLAS CON "CARGAR MÁS" =====
+// tbody -> { url, params, cursor, fila }: las vistas piden sólo la primera página
+const tablasPaginadas = {};
+
+// Registra la tabla y devuelve el botón (oculto si no hay más páginas)
+function botonCargarMas(tbodyId, url, params, pagina, fila) {
+  tablasPaginadas[tbodyId] = { url, params, cursor: pagina.siguiente, fila };
+  return `<button id="mas-${tbodyId}" class="secondary" onclick="window.cargarMasFilas('${tbodyId}')"
+    style="${pagina.siguiente ? '' : 'display:none'}">Cargar más</button>`;
+}
+
+// Añade la siguiente página al final de la tabla
+window.cargarMasFilas = async (tbodyId) => {
+  const tabla = tablasPaginadas[tbodyId];
+  if (!tabla || !tabla.cursor) return;
+  try {
+    const pagina = await API.pagina(tabla.url, { ...tabla.params, cursor: tabla.cursor });
+    tabla.cursor = pagina.siguiente;
+    document.getElementById(tbodyId).insertAdjacentHTML('beforeend', pagina.items.map(tabla.fila).join(''));
+    if (!tabla.cursor) document.getElementById(`mas-${tbodyId}`).style.display = 'none';
+  } catch (err) {
+    alert('❌ Error al cargar más: ' + err.message);
   }
 };
 
@@ -228,7 +296,8 @@ async function renderView() {
 // Cargar módulo dinámicamente
 async function loadModule(view) {
   const htmlPath = `/admin/${view}-content`;
-  const jsPath = `/static/js/admin/${view}.js`;
+  // Versión empaquetada (static/dist) si el servidor la indica
+  const jsPath = (window.modulosAdmin || {})[`js/admin/${view}.js`] || `/static/js/admin/${view}.js`;
 
   // Cargar HTML
   let htmlRes;
@@ -269,23 +338,23 @@ async function loadModule(view) {
 
 // ===== DASHBOARD =====
 async function renderDashboard() {
-  const [pedidos, reservas, usuarios] = await Promise.all([
-    API.get('/api/pedidos'),
-    API.get('/api/reservas'),
-    API.get('/api/usuarios/lista')
+  // Sólo conteos y las primeras filas: nunca los listados completos
+  const [pedidos, reservas, usuarios, pendientes, reservasHoy] = await Promise.all([
+    API.pagina('/api/pedidos', { limite: 5, total: 1 }),
+    API.pagina('/api/reservas', { limite: 5, total: 1 }),
+    API.pagina('/api/usuarios/lista', { limite: 1, total: 1 }),
+    API.pagina('/api/pedidos', { estado: 'pendiente', limite: 1, total: 1 }),
+    API.pagina('/api/reservas', { desde: today(), hasta: today(), limite: 1, total: 1 })
   ]);
   
-  const pendientes = pedidos.filter(p => p.estado === 'pendiente').length;
-  const reservasHoy = reservas.filter(r => r.fecha === today()).length;
-  
   return `
     <div class="grid-2">
       <div class="card">
         <div class="card-header"><strong>📊 Resumen General</strong></div>
         <div class="card-body">
-          <p><strong>Usuarios:</strong> ${usuarios.length}</p>
-          <p><strong>Pedidos:</strong> ${pedidos.length} (Pendientes: ${pendientes})</p>
-          <p><strong>Reservas:</strong> ${reservas.length} (Hoy: ${reservasHoy})</p>
+          <p><strong>Usuarios:</strong> ${usuarios.total}</p>
+          <p><strong>Pedidos:</strong> ${pedidos.total} (Pendientes: ${pendientes.total})</p>
+          <p><strong>Reservas:</strong> ${reservas.total} (Hoy: ${reservasHoy.total})</p>
         </div>
       </div>
     </div>
@@ -297,7 +366,7 @@ async function renderDashboard() {
           <table>
             <thead><tr><th>ID</th><th>Total</th><th>Estado</th><th>Fecha</th></tr></thead>
             <tbody>
-              ${pedidos.slice(0, 5).map(p => `
+              ${pedidos.items.map(p => `
                 <tr>
                   <td>${p.id}</td>
                   <td>${currency(p.total)}</td>
@@ -316,7 +385,7 @@ async function renderDashboard() {
           <table>
             <thead><tr><th>ID</th><th>Personas</th><th>Fecha</th><th>Estado</th></tr></thead>
             <tbody>
-              ${reservas.slice(0, 5).map(r => `
+              ${reservas.items.map(r => `
                 <tr>
                   <td>${r.id}</td>
                   <td>${r.numero_personas}</td>
@@ -334,7 +403,7 @@ async function renderDashboard() {
 
 // ===== USUARIOS =====
 async function renderUsuarios() {
-  const usuarios = await API.get('/api/usuarios/lista');
+  const pagina = await API.pagina('/api/usuarios/lista', { total: 1 });
   
   const formHTML = `
     <div class="card">
@@ -359,22 +428,7 @@ async function renderUsuarios() {
     </div>
   `;
   
-  const tableHTML = `
-    <div class="card">
-      <div class="card-header"><strong>👥 Usuarios (${usuarios.length})</strong></div>
-      <div class="card-body">
-        <table>
-          <thead>
-            <tr>
-              <th>Nombre</th>
-              <th>Email</th>
-              <th>Rol</th>
-              <th>Activo</th>
-              <th>Acciones</th>
-            </tr>
-          </thead>
-          <tbody>
-            ${usuarios.map(u => `
+  const fila = (u) => `
               <tr>
                 <td>${u.nombre} ${u.apellido || ''}</td>
                 <td>${u.email}</td>
@@ -394,9 +448,27 @@ async function renderUsuarios() {
                     '<span style="color:gray">—</span>'}
                 </td>
               </tr>
-            `).join('')}
+            `;
+  
+  const tableHTML = `
+    <div class="card">
+      <div class="card-header"><strong>👥 Usuarios (${pagina.total})</strong></div>
+      <div class="card-body">
+        <table>
+          <thead>
+            <tr>
+              <th>Nombre</th>
+              <th>Email</th>
+              <th>Rol</th>
+              <th>Activo</th>
+              <th>Acciones</th>
+            </tr>
+          </thead>
+          <tbody id="tbody-usuarios-panel">
+            ${pagina.items.map(fila).join('')}
           </tbody>
         </table>
+        ${botonCargarMas('tbody-usuarios-panel', '/api/usuarios/lista', {}, pagina, fila)}
       </div>
     </div>
   `;
@@ -406,26 +478,9 @@ async function renderUsuarios() {
 
 // ===== PEDIDOS =====
 async function renderPedidos() {
-  const pedidos = await API.get('/api/pedidos');
+  const pagina = await API.pagina('/api/pedidos', { total: 1 });
   
-  const tableHTML = `
-    <div class="card">
-      <div class="card-header"><strong>📋 Todos los Pedidos (${pedidos.length})</strong></div>
-      <div class="card-body">
-        <table>
-          <thead>
-            <tr>
-              <th>ID</th>
-              <th>Mesa</th>
-              <th>Cliente</th>
-              <th>Total</th>
-              <th>Estado</th>
-              <th>Fecha</th>
-              <th>Acciones</th>
-            </tr>
-          </thead>
-          <tbody>
-            ${pedidos.map(p => `
+  const fila = (p) => `
               <tr>
                 <td>${p.id}</td>
                 <td>${p.mesa_id || 'Delivery'}</td>
@@ -444,9 +499,29 @@ async function renderPedidos() {
                 <td>${formatDateTime(p.fecha_pedido)}</td>
                 <td><button class="ghost" onclick="window.verPedido(${p.id})">Ver</button></td>
               </tr>
-            `).join('')}
+            `;
+  
+  const tableHTML = `
+    <div class="card">
+      <div class="card-header"><strong>📋 Todos los Pedidos (${pagina.total})</strong></div>
+      <div class="card-body">
+        <table>
+          <thead>
+            <tr>
+              <th>ID</th>
+              <th>Mesa</th>
+              <th>Cliente</th>
+              <th>Total</th>
+              <th>Estado</th>
+              <th>Fecha</th>
+              <th>Acciones</th>
+            </tr>
+          </thead>
+          <tbody id="tbody-pedidos-panel">
+            ${pagina.items.map(fila).join('')}
           </tbody>
         </table>
+        ${botonCargarMas('tbody-pedidos-panel', '/api/pedidos', {}, pagina, fila)}
       </div>
     </div>
   `;
@@ -456,7 +531,7 @@ async function renderPedidos() {
 
 // ===== RESERVAS =====
 async function renderReservas() {
-  const reservas = await API.get('/api/reservas');
+  const pagina = await API.pagina('/api/reservas', { total: 1 });
   
   const formHTML = `
     <div class="card">
@@ -483,23 +558,7 @@ async function renderReservas() {
     </div>
   `;
   
-  const tableHTML = `
-    <div class="card">
-      <div class="card-header"><strong>📅 Todas las Reservas (${reservas.length})</strong></div>
-      <div class="card-body">
-        <table>
-          <thead>
-            <tr>
-              <th>ID</th>
-              <th>Personas</th>
-              <th>Fecha</th>
-              <th>Estado</th>
-              <th>Mesa</th>
-              <th>Acciones</th>
-            </tr>
-          </thead>
-          <tbody>
-            ${reservas.map(r => `
+  const fila = (r) => `
               <tr>
                 <td>${r.id}</td>
                 <td>${r.numero_personas}</td>
@@ -516,9 +575,28 @@ async function renderReservas() {
                 <td>${r.mesa_asignada || '-'}</td>
                 <td><button class="ghost" onclick="window.verReserva(${r.id})">Ver</button></td>
               </tr>
-            `).join('')}
+            `;
+  
+  const tableHTML = `
+    <div class="card">
+      <div class="card-header"><strong>📅 Todas las Reservas (${pagina.total})</strong></div>
+      <div class="card-body">
+        <table>
+          <thead>
+            <tr>
+              <th>ID</th>
+              <th>Personas</th>
+              <th>Fecha</th>
+              <th>Estado</th>
+              <th>Mesa</th>
+              <th>Acciones</th>
+            </tr>
+          </thead>
+          <tbody id="tbody-reservas-panel">
+            ${pagina.items.map(fila).join('')}
           </tbody>
         </table>
+        ${botonCargarMas('tbody-reservas-panel', '/api/reservas', {}, pagina, fila)}
       </div>
     </div>
   `;
@@ -528,7 +606,7 @@ async function renderReservas() {
 
 // ===== INVENTARIO =====
 async function renderInventario() {
-  const items = await API.get('/api/inventario/lista');
+  const pagina = await API.pagina('/api/inventario/lista', { total: 1 });
   
   const formHTML = `
     <div class="card">
@@ -545,9 +623,22 @@ async function renderInventario() {
     </div>
   `;
   
+  const fila = (i) => `
+              <tr>
+                <td>${i.nombre}</td>
+                <td>${i.cantidad}</td>
+                <td>${i.unidad}</td>
+                <td>${i.stock_minimo}</td>
+                <td>
+                  <button class="ghost" onclick="window.registrarEntrada(${i.id})">+ Entrada</button>
+                  <button class="ghost" onclick="window.registrarSalida(${i.id})">- Salida</button>
+                </td>
+              </tr>
+            `;
+  
   const tableHTML = `
     <div class="card">
-      <div class="card-header"><strong>📦 Inventario (${items.length} items)</strong></div>
+      <div class="card-header"><strong>📦 Inventario (${pagina.total} items)</strong></div>
       <div class="card-body">
         <table>
           <thead>
@@ -559,21 +650,11 @@ async function renderInventario() {
               <th>Acciones</th>
             </tr>
           </thead>
-          <tbody>
-            ${items.map(i => `
-              <tr>
-                <td>${i.nombre}</td>
-                <td>${i.cantidad}</td>
-                <td>${i.unidad}</td>
-                <td>${i.stock_minimo}</td>
-                <td>
-                  <button class="ghost" onclick="window.registrarEntrada(${i.id})">+ Entrada</button>
-                  <button class="ghost" onclick="window.registrarSalida(${i.id})">- Salida</button>
-                </td>
-              </tr>
-            `).join('')}
+          <tbody id="tbody-inventario-panel">
+            ${pagina.items.map(fila).join('')}
           </tbody>
         </table>
+        ${botonCargarMas('tbody-inventario-panel', '/api/inventario/lista', {}, pagina, fila)}
       </div>
     </div>
   `;
@@ -967,7 +1048,7 @@ function getActivityIcon(tipo) {
 }
 
 window.gestionarReceta = async (menuItemId, nombrePlato) => {
-  const inventario = await API.get('/api/inventario/lista');
+  const inventario = await API.todas('/api/inventario/lista');
   const recetasActuales = []; // Cargar recetas actuales si las tienes
   
   let html = `
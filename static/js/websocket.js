@@ -46,37 +46,45 @@ class BoodFoodSocket {
             if (data.status === 'connected') {
                 console.log('Conexión confirmada por el servidor');
             }
+            this._triggerHandlers('connection_response', data);
         });
 
-        // Eventos de pedidos
-        this.socket.on('pedido_recibido', (data) => {
-            this._triggerHandlers('pedido_recibido', data);
-            BoodFood.reproducirSonidoNotificacion();
+        // El servidor agrupa los eventos de una ventana corta en 'eventos'
+        // ([{evento, datos}, ...]); se reparten en orden como si llegaran sueltos
+        this.socket.on('eventos', (lote) => {
+            lote.forEach(({ evento, datos }) => this._despachar(evento, datos));
         });
 
-        this.socket.on('estado_pedido_actualizado', (data) => {
-            this._triggerHandlers('estado_pedido_actualizado', data);
+        this.socket.onAny((event, data) => {
+            if (event !== 'eventos' && event !== 'connection_response') {
+                this._despachar(event, data);
+            }
         });
+    }
 
-        // Eventos de mesas
-        this.socket.on('estado_mesa_actualizado', (data) => {
-            this._triggerHandlers('estado_mesa_actualizado', data);
-        });
+    _despachar(event, data) {
+        this._triggerHandlers(event, data);
+
+        // Eventos de pedidos
+        if (event === 'pedido_recibido') {
+            BoodFood.reproducirSonidoNotificacion();
+        }
 
         // Notificaciones generales
-        this.socket.on('nueva_notificacion', (data) => {
-            this._triggerHandlers('nueva_notificacion', data);
+        if (event === 'nueva_notificacion') {
             BoodFood.mostrarNotificacion(data.mensaje, data.tipo || 'info');
             if (data.sonido !== false) {
                 BoodFood.reproducirSonidoNotificacion();
             }
-        });
+        }
     }
 
     on(event, callback) {
-        if (this.handlers[event]) {
-            this.handlers[event].push(callback);
+        // Eventos sin manejo propio (p. ej. 'cola_cocina') se registran al vuelo
+        if (!this.handlers[event]) {
+            this.handlers[event] = [];
         }
+        this.handlers[event].push(callback);
     }
 
     emit(event, data) {
@@ -0,0 +1,75 @@
+import os, sys
+
+# Asegurar que el directorio de proyecto está en sys.path para importar app y models
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import create_app
+from models import db, Usuario
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App de pruebas sobre un archivo SQLite temporal (compartido entre hilos)"""
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'boodfood.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+    })
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def crear_usuario(app):
+    """Crea usuarios de prueba y devuelve su id"""
+    def _crear(rol='cliente', email=None):
+        with app.app_context():
+            usuario = Usuario(
+                nombre=rol.capitalize(),
+                apellido='Test',
+                email=email or f'{rol}{Usuario.query.count()}@test.com',
+                password_hash='x',
+                rol=rol,
+                activo=True
+            )
+            db.session.add(usuario)
+            db.session.commit()
+            return usuario.id
+    return _crear
+
+
+@pytest.fixture
+def login(app):
+    """Devuelve un test client con sesión iniciada para el usuario dado"""
+    def _login(usuario_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(usuario_id)
+            sess['_fresh'] = True
+        return client
+    return _login
+
+
+@pytest.fixture
+def contar_consultas(app):
+    """Context manager que cuenta las sentencias SQL ejecutadas en el bloque"""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def _contar():
+        sentencias = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', registrar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(engine, 'before_cursor_execute', registrar)
+    return _contar
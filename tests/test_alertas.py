@@ -0,0 +1,74 @@
+"""
+Motor de alertas: se actualiza con cada commit (incluidos los descuentos de
+stock con UPDATE directo), agenda los pedidos que se van a atrasar y envía
+los cambios a la sala admin.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from models import db, Inventario, Pedido
+from socket_events import socketio
+from utils import alertas as modulo_alertas
+from utils.inventario_utils import descontar_stock, sumar_stock
+
+
+def _ids(client):
+    return [a['id'] for a in client.get('/admin/api/alertas').get_json()]
+
+
+def test_stock_bajo_por_update_directo(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    client = login(admin_id)
+    socket = socketio.test_client(app, flask_test_client=client)
+    with app.app_context():
+        item = Inventario(nombre='Harina', cantidad=Decimal('10'), unidad='kg', stock_minimo=Decimal('5'))
+        db.session.add(item)
+        db.session.commit()
+        item_id = item.id
+    assert _ids(client) == []
+
+    with app.app_context():
+        descontar_stock(item_id, 6)
+        db.session.commit()
+    assert _ids(client) == [f'inventario:{item_id}']
+    alerta = client.get('/admin/api/alertas').get_json()[0]
+    assert alerta['datos']['cantidad'] == 4.0
+
+    with app.app_context():
+        sumar_stock(item_id, 6)
+        db.session.commit()
+    assert _ids(client) == []
+
+    eventos = [(m['name'], m['args'][0]['id']) for m in socket.get_received() if m['name'].startswith('alerta_')]
+    assert eventos == [('alerta_nueva', f'inventario:{item_id}'), ('alerta_resuelta', f'inventario:{item_id}')]
+
+
+def test_pedido_atrasado_agendado(app, crear_usuario, login, contar_consultas, monkeypatch):
+    admin_id = crear_usuario('admin')
+    client = login(admin_id)
+    with app.app_context():
+        pedido = Pedido(usuario_id=admin_id, restaurante_id=1, subtotal=Decimal('1000'), total=Decimal('1000'),
+                        metodo_pago='efectivo', estado='pendiente', fecha_pedido=datetime.utcnow())
+        viejo = Pedido(usuario_id=admin_id, restaurante_id=1, subtotal=Decimal('1000'), total=Decimal('1000'),
+                       metodo_pago='efectivo', estado='preparando',
+                       fecha_pedido=datetime.utcnow() - timedelta(hours=2))
+        db.session.add_all([pedido, viejo])
+        db.session.commit()
+        pedido_id, viejo_id = pedido.id, viejo.id
+
+    assert _ids(client) == [f'pedido:{viejo_id}']
+    # La alerta es liviana: sin items anidados
+    assert 'items' not in client.get('/admin/api/alertas').get_json()[0]['datos']
+
+    # Pasada una hora y pico, el pedido nuevo también está atrasado, sin consultar la base
+    futuro = datetime.now(timezone.utc) + timedelta(minutes=61)
+    monkeypatch.setattr(modulo_alertas, '_ahora', lambda: futuro)
+    with app.app_context(), contar_consultas() as sentencias:
+        activas = modulo_alertas.motor_alertas.activas()
+    assert [a['id'] for a in activas] == [f'pedido:{pedido_id}', f'pedido:{viejo_id}']
+    assert sentencias == []
+
+    with app.app_context():
+        db.session.get(Pedido, viejo_id).estado = 'entregado'
+        db.session.commit()
+    assert _ids(client) == [f'pedido:{pedido_id}']
@@ -0,0 +1,101 @@
+"""
+Almacén de uploads: un archivo por contenido, referencias contadas desde
+usuarios e items del menú y barrido de los que nadie usa.
+"""
+import io
+import os
+
+import pytest
+
+from models import db, ArchivoSubido, MenuItem, Mesero, ProductoPiscina
+from utils import almacen
+from utils.imagenes import procesador_imagenes
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    return app
+
+
+def _subir_foto(client, contenido):
+    respuesta = client.post('/cuenta/api/subir-foto', data={'foto': (io.BytesIO(contenido), 'foto.jpg')},
+                            content_type='multipart/form-data')
+    assert respuesta.status_code == 200
+    return respuesta.get_json()['foto_url']
+
+
+def _referencias(app):
+    with app.app_context():
+        return {a.url: a.referencias for a in ArchivoSubido.query}
+
+
+def _ruta(app, url):
+    return os.path.join(app.config['UPLOAD_FOLDER'], *url.split('/')[3:])
+
+
+def _barrer(app):
+    with app.app_context():
+        return almacen.barrer(gracia=0)
+
+
+def test_fotos_deduplicadas_y_barridas(app, crear_usuario, login):
+    ana, luis = login(crear_usuario('cliente')), login(crear_usuario('cliente'))
+    compartida = _subir_foto(ana, b'misma foto' * 1000)
+    assert _subir_foto(luis, b'misma foto' * 1000) == compartida
+    assert os.listdir(os.path.dirname(_ruta(app, compartida))) == [os.path.basename(compartida)]
+    assert _referencias(app) == {compartida: 2}
+
+    # Ana cambia de foto: la anterior sigue en uso por Luis
+    nueva = _subir_foto(ana, b'otra foto')
+    assert _referencias(app) == {compartida: 1, nueva: 1}
+    assert _barrer(app)['archivos'] == 0
+
+    assert luis.post('/cuenta/api/eliminar-foto').status_code == 200
+    assert _referencias(app) == {compartida: 0, nueva: 1}
+    assert _barrer(app) == {'archivos': 1, 'bytes': 10000}
+    assert not os.path.exists(_ruta(app, compartida))
+    assert os.path.exists(_ruta(app, nueva))
+    assert _referencias(app) == {nueva: 1}
+
+
+def test_imagen_del_menu_y_archivos_antiguos(app, crear_usuario, login):
+    admin = login(crear_usuario('admin'))
+    url = admin.post('/admin/api/menu/subir-imagen', data={'imagen': (io.BytesIO(b'\x89PNG roto'), 'plato.png')},
+                     content_type='multipart/form-data').get_json()['url']
+    item_id = admin.post('/admin/api/menu/crear', json={
+        'nombre': 'Arepa', 'precio': 4000, 'imagen_url': url}).get_json()['item']['id']
+    procesador_imagenes.esperar(timeout=60)
+
+    # Archivos de antes del almacén: en uso por el menú, por un mesero y (con URL
+    # absoluta) por un producto de la piscina, y uno abandonado
+    carpeta = os.path.join(app.config['UPLOAD_FOLDER'], 'menu')
+    antiguos = ('20240101_120000_viejo.jpg', '20240101_120000_mesero.jpg', '20240101_120000_piscina.jpg',
+                '20240101_120000_abandonado.jpg')
+    for nombre in antiguos:
+        with open(os.path.join(carpeta, nombre), 'wb') as f:
+            f.write(b'legado')
+    with app.app_context():
+        db.session.add(MenuItem(restaurante_id=1, nombre='Viejo', precio=1000,
+                                imagen_url='/static/uploads/menu/20240101_120000_viejo.jpg'))
+        db.session.add(Mesero(nombre='Pedro', foto='/static/uploads/menu/20240101_120000_mesero.jpg'))
+        db.session.add(ProductoPiscina(producto_id='1', menu_item_id=item_id, nombre='Limonada', precio=5000,
+                                       imagen='https://boodfood.example/static/uploads/menu/20240101_120000_piscina.jpg'))
+        db.session.commit()
+
+    # El barrido sólo borra archivos registrados: los antiguos siguen ahí
+    assert _barrer(app)['archivos'] == 0
+    assert sorted(os.listdir(carpeta)) == sorted([os.path.basename(url), *antiguos])
+
+    # Una vez registrados, sólo se borra el que ninguna columna de imagen usa
+    with app.app_context():
+        almacen.reconstruir()
+    assert _barrer(app)['archivos'] == 1
+    assert sorted(os.listdir(carpeta)) == sorted([os.path.basename(url), *antiguos[:3]])
+
+    with app.app_context():
+        ProductoPiscina.query.delete()
+        db.session.commit()
+    assert admin.delete(f'/admin/api/menu/{item_id}').status_code == 200
+    assert _barrer(app)['archivos'] == 2
+    assert sorted(os.listdir(carpeta)) == sorted(antiguos[:2])
@@ -0,0 +1,72 @@
+"""
+Paquetes de static/dist: un CSS y un JS por página con huella en el nombre,
+servidos como inmutables.
+"""
+import os
+import shutil
+
+import pytest
+
+from utils.assets import assets, construir
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    carpeta = tmp_path / 'static'
+    for sub in ('css', 'js'):
+        shutil.copytree(os.path.join(STATIC, sub), carpeta / sub)
+    app.static_folder = str(carpeta)
+    assets.iniciar(app)
+    return app
+
+
+def _render(app, plantilla):
+    with app.test_request_context():
+        return app.jinja_env.from_string(plantilla).render()
+
+
+def test_paquete_por_pagina_con_huella(app):
+    # Sin construir: archivos originales, uno por etiqueta
+    html = _render(app, "{{ assets('admin', 'js') }}")
+    assert html.count('<script') == 3 and '/static/js/adminPanel.js?v=' in html
+
+    manifiesto = construir(app.static_folder)
+    assets.iniciar(app)
+    html = _render(app, "{{ assets('admin', 'css') }}\n{{ assets('admin', 'js') }}")
+    assert html.count('<link') == 1 and html.count('<script') == 1
+    assert f"/static/{manifiesto['paquetes']['admin']['js']}" in html
+    assert _render(app, "{{ asset_modulos('js/admin/')['js/admin/pedidos.js'] }}") == \
+        f"/static/{manifiesto['archivos']['js/admin/pedidos.js']}"
+
+    bundle = os.path.join(app.static_folder, manifiesto['paquetes']['admin']['js'])
+    originales = sum(os.path.getsize(os.path.join(app.static_folder, 'js', f))
+                     for f in ('boodfood.js', 'websocket.js', 'adminPanel.js'))
+    assert os.path.getsize(bundle) < originales
+    with open(bundle, encoding='utf-8') as f:
+        contenido = f.read()
+    assert 'loadModule' in contenido and 'BoodFood' in contenido
+
+    # Cambiar un archivo fuente cambia el nombre del paquete
+    with open(os.path.join(app.static_folder, 'css', 'admin.css'), 'a', encoding='utf-8') as f:
+        f.write('\n.nuevo { color: red; }\n')
+    nuevo = construir(app.static_folder)
+    assert nuevo['paquetes']['admin']['css'] != manifiesto['paquetes']['admin']['css']
+    assert nuevo['paquetes']['admin']['js'] == manifiesto['paquetes']['admin']['js']
+
+
+def test_dist_inmutable(app):
+    manifiesto = construir(app.static_folder)
+    client = app.test_client()
+
+    respuesta = client.get(f"/static/{manifiesto['paquetes']['cocina']['css']}")
+    assert respuesta.status_code == 200
+    assert respuesta.cache_control.immutable
+    assert respuesta.cache_control.max_age == 365 * 24 * 3600
+    assert not respuesta.cache_control.no_cache
+
+    # Los originales siguen con revalidación normal
+    respuesta = client.get('/static/css/admin.css')
+    assert respuesta.status_code == 200
+    assert not respuesta.cache_control.immutable
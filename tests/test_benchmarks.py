@@ -0,0 +1,35 @@
+"""
+Suite de benchmarks: el restaurante sintético se construye en una base local
+y todos los escenarios responden 200 con resultados serializables a JSON.
+"""
+import json
+
+import pytest
+
+from benchmarks import restaurante, suite
+from config import Config
+
+PEQUENO = {'platos': 20, 'categorias': 3, 'mesas': 10, 'usuarios': 30, 'pedidos': 300, 'pedidos_frecuente': 20,
+           'pedidos_en_cocina': 15, 'reservas': 40, 'dias_reservas': 5}
+
+
+def test_suite_sobre_restaurante_sintetico(tmp_path):
+    url = f"sqlite:///{tmp_path / 'restaurante.db'}"
+    parametros = {**restaurante.PARAMETROS_POR_DEFECTO, **PEQUENO}
+    restaurante.construir(url, parametros)
+
+    resultado = suite.ejecutar(url, parametros, repeticiones=3, calentamiento=1)
+    assert set(resultado['escenarios']) == {'api_menu', 'api_menu_frio', 'crear_pedido', 'cocina_cola',
+                                            'dashboard', 'disponibilidad', 'mis_pedidos'}
+    for nombre, medida in resultado['escenarios'].items():
+        assert medida['codigos'] == [200], nombre
+        assert medida['p50_ms'] <= medida['p95_ms']
+    # El snapshot del menú en caché no toca la base; reconstruirlo sí
+    assert resultado['escenarios']['api_menu']['sql_por_peticion'] == 0
+    assert resultado['escenarios']['api_menu_frio']['sql_por_peticion'] > 0
+    assert json.loads(json.dumps(resultado))['parametros']['pedidos'] == 300
+
+
+def test_nunca_usa_la_base_de_produccion(tmp_path):
+    with pytest.raises(ValueError):
+        restaurante.construir(Config.SQLALCHEMY_DATABASE_URI, PEQUENO)
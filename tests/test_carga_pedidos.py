@@ -0,0 +1,54 @@
+"""
+Listados de pedidos: número fijo de consultas sin importar cuántos
+pedidos e items haya.
+"""
+from decimal import Decimal
+
+import pytest
+
+from models import db, MenuItem, Pedido, PedidoItem
+
+
+def _crear_pedidos(app, usuario_id, n, items_por_pedido=3):
+    with app.app_context():
+        platos = [MenuItem(restaurante_id=1, nombre=f'Plato {i}', precio=Decimal('5000'))
+                  for i in range(items_por_pedido)]
+        db.session.add_all(platos)
+        db.session.flush()
+        for _ in range(n):
+            pedido = Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('15000'),
+                            total=Decimal('15000'), metodo_pago='efectivo', estado='pendiente')
+            db.session.add(pedido)
+            db.session.flush()
+            for plato in platos:
+                db.session.add(PedidoItem(pedido_id=pedido.id, menu_item_id=plato.id, nombre_item=plato.nombre,
+                                          cantidad=1, precio_unitario=plato.precio, subtotal=plato.precio))
+        db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/api/cocina/pedidos', '/admin/api/pedidos', '/cuenta/api/mis-pedidos'])
+def test_consultas_fijas_por_listado(app, crear_usuario, login, contar_consultas, url):
+    admin_id = crear_usuario('admin')
+    client = login(admin_id)
+    client.get(url)  # usuario ya en la caché de Flask-Login
+
+    consultas = []
+    for n in (2, 25):
+        _crear_pedidos(app, admin_id, n)
+        with contar_consultas() as sentencias:
+            r = client.get(url)
+        assert r.status_code == 200
+        consultas.append(len(sentencias))
+
+    assert consultas[0] == consultas[1]
+
+
+def test_modo_resumen(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id, 1)
+
+    item = login(admin_id).get('/api/cocina/pedidos').get_json()[0]['items'][0]
+    assert set(item['menu_item']) == {'id', 'nombre', 'imagen'}
+
+    item = login(admin_id).get('/cuenta/api/mis-pedidos').get_json()['pedidos'][0]['items'][0]
+    assert item['menu_item']['precio'] == 5000.0
@@ -0,0 +1,104 @@
+"""
+Cola de cocina: foto inicial ordenada y cambios (insertar, actualizar,
+quitar) enviados a la sala de cocina al hacer commit.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from models import db, Pedido
+from socket_events import socketio
+
+
+def _crear_pedido(app, usuario_id, fecha_pedido):
+    with app.app_context():
+        pedido = Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('1000'), total=Decimal('1000'),
+                        metodo_pago='efectivo', estado='pendiente', fecha_pedido=fecha_pedido)
+        db.session.add(pedido)
+        db.session.commit()
+        return pedido.id
+
+
+def _cambiar_estado(app, pedido_id, estado):
+    with app.app_context():
+        db.session.get(Pedido, pedido_id).estado = estado
+        db.session.commit()
+
+
+def test_foto_y_cambios(app, crear_usuario, login):
+    cocinero_id = crear_usuario('cocinero')
+    client = login(cocinero_id)
+    socket = socketio.test_client(app, flask_test_client=client)
+    socket.get_received()
+
+    ahora = datetime.utcnow()
+    segundo = _crear_pedido(app, cocinero_id, ahora)
+    primero = _crear_pedido(app, cocinero_id, ahora - timedelta(minutes=5))
+    _cambiar_estado(app, segundo, 'preparando')
+    _cambiar_estado(app, primero, 'entregado')
+
+    cambios = [m['args'][0] for m in socket.get_received() if m['name'] == 'cola_cocina']
+    assert [(c['operacion'], c['pedido']['id'], c['posicion']) for c in cambios] == [
+        ('insertar', segundo, 0),
+        ('insertar', primero, 0),      # más antiguo: va delante
+        ('actualizar', segundo, 1),
+        ('quitar', primero, None),
+    ]
+    versiones = [c['version'] for c in cambios]
+    assert versiones == list(range(versiones[0], versiones[0] + 4))
+
+    cola = client.get('/cocina/api/cola').get_json()
+    assert cola['version'] == versiones[-1]
+    assert [(p['id'], p['estado']) for p in cola['pedidos']] == [(segundo, 'preparando')]
+    assert client.get('/cocina/api/pedidos-pendientes').get_json()[0]['id'] == segundo
+
+
+def test_lectura_sin_consultas(app, crear_usuario, login, contar_consultas):
+    cocinero_id = crear_usuario('cocinero')
+    for minutos in range(5):
+        _crear_pedido(app, cocinero_id, datetime.utcnow() - timedelta(minutes=minutos))
+    client = login(cocinero_id)
+
+    with contar_consultas() as sentencias:
+        pedidos = client.get('/api/cocina/pedidos').get_json()
+    assert len(pedidos) == 5
+    assert [p['fecha_pedido'] for p in pedidos] == sorted(p['fecha_pedido'] for p in pedidos)
+    assert not [s for s in sentencias if 'FROM pedidos' in s]
+
+
+def test_recargas_concurrentes_en_orden(app, crear_usuario, login, monkeypatch):
+    """Una recarga con datos viejos no puede aplicarse después de otra más reciente"""
+    from utils import cola_cocina as modulo
+
+    cocinero_id = crear_usuario('cocinero')
+    pedido_id = _crear_pedido(app, cocinero_id, datetime.utcnow())
+    socket = socketio.test_client(app, flask_test_client=login(cocinero_id))
+    socket.get_received()
+    original, fotos = modulo.cargar_pedidos, []
+
+    class _Lenta:
+        def __init__(self, consulta):
+            self.consulta = consulta
+
+        def all(self):
+            pedidos = self.consulta.all()
+            if not fotos:
+                # Foto tomada: otra petición cambia el pedido y sincroniza al terminar
+                fotos.append(pedidos)
+                segunda.start()
+                time.sleep(0.5)
+            return pedidos
+
+    segunda = threading.Thread(target=_cambiar_estado, args=(app, pedido_id, 'preparando'))
+    monkeypatch.setattr(modulo, 'cargar_pedidos', lambda consulta: _Lenta(original(consulta)))
+    with app.app_context():
+        modulo.cola_cocina.marcar([pedido_id])
+        modulo.cola_cocina.sincronizar()
+    segunda.join(10)
+
+    cambios = [m['args'][0] for m in socket.get_received() if m['name'] == 'cola_cocina']
+    assert cambios[-1]['pedido']['estado'] == 'preparando'
+    with app.app_context():
+        _, pedidos = modulo.cola_cocina.snapshot()
+    assert [(p['id'], p['estado']) for p in pedidos] == [(pedido_id, 'preparando')]
@@ -0,0 +1,74 @@
+"""
+Compresión gzip: sólo respuestas grandes de tipos de texto, y las que tienen
+ETag fuerte (menú, static) se comprimen una sola vez.
+"""
+import gzip
+import json
+from decimal import Decimal
+
+from models import db, Categoria, MenuItem
+from utils import compresion
+from utils.menu_cache import menu_cache
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+
+def _crear_menu(app, n=60):
+    with app.app_context():
+        categoria = Categoria(nombre='Platos', orden=1)
+        db.session.add(categoria)
+        db.session.flush()
+        db.session.add_all([
+            MenuItem(restaurante_id=1, nombre=f'Plato {i}', descripcion='Arroz, frijoles y aguacate',
+                     precio=Decimal('15000'), categoria_id=categoria.id)
+            for i in range(n)
+        ])
+        db.session.commit()
+
+
+def test_menu_comprimido_una_vez_y_304(app, monkeypatch):
+    _crear_menu(app)
+    client = app.test_client()
+    plano = client.get('/api/menu')
+    assert 'Content-Encoding' not in plano.headers
+    assert plano.headers['Vary'] == 'Accept-Encoding'
+
+    llamadas = []
+    original = compresion.comprimir
+    monkeypatch.setattr(compresion, 'comprimir', lambda *a: llamadas.append(1) or original(*a))
+    respuestas = [client.get('/api/menu', headers=GZIP) for _ in range(3)]
+    assert len(llamadas) == 1
+    r = respuestas[0]
+    assert r.headers['Content-Encoding'] == 'gzip'
+    assert int(r.headers['Content-Length']) < len(plano.data) / 5
+    assert json.loads(gzip.decompress(r.data)) == plano.get_json()
+
+    # ETag débil del cuerpo comprimido: sigue dando 304
+    assert r.headers['ETag'] == f'W/{plano.headers["ETag"]}'
+    assert client.get('/api/menu', headers={**GZIP, 'If-None-Match': r.headers['ETag']}).status_code == 304
+
+    # Un cambio en el menú es otro ETag: se comprime de nuevo
+    with app.app_context():
+        db.session.add(MenuItem(restaurante_id=1, categoria_id=1, nombre='Nuevo', precio=Decimal('1000')))
+        db.session.commit()
+    menu_cache.invalidar()
+    assert b'Nuevo' in gzip.decompress(client.get('/api/menu', headers=GZIP).data)
+    assert len(llamadas) == 2
+
+
+def test_umbral_y_tipos(app, crear_usuario, login):
+    client = login(crear_usuario('admin'))
+    # Respuesta pequeña: sin comprimir
+    r = client.get('/api/check-auth', headers=GZIP)
+    assert r.status_code == 200 and 'Content-Encoding' not in r.headers
+
+    # Archivos de static: texto sí, imágenes no
+    r = client.get('/static/js/adminPanel.js', headers=GZIP)
+    assert r.headers['Content-Encoding'] == 'gzip'
+    with open(f'{app.static_folder}/js/adminPanel.js', 'rb') as f:
+        assert gzip.decompress(r.data) == f.read()
+    r.close()
+
+    with app.test_request_context(headers=GZIP):
+        respuesta = app.response_class(b'\x89PNG' + b'\0' * 5000, mimetype='image/png')
+        assert 'Content-Encoding' not in app.process_response(respuesta).headers
@@ -0,0 +1,86 @@
+"""
+Hash de contraseñas en el pool: mismo resultado y tope de concurrencia.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from utils.contrasenas import generar_hash, pool_hash, verificar_hash
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_hash_y_verificacion(app):
+    with app.app_context():
+        password_hash = generar_hash('secreta')
+        assert verificar_hash(password_hash, 'secreta')
+        assert not verificar_hash(password_hash, 'otra')
+
+
+def test_tope_de_concurrencia(app):
+    pool_hash.configurar(2)
+    activos, maximo, lock = [0], [0], threading.Lock()
+
+    def tarea():
+        with lock:
+            activos[0] += 1
+            maximo[0] = max(maximo[0], activos[0])
+        time.sleep(0.05)
+        with lock:
+            activos[0] -= 1
+        return threading.current_thread().name
+
+    nombres = []
+    hilos = [threading.Thread(target=lambda: nombres.append(pool_hash.ejecutar(tarea))) for _ in range(6)]
+    try:
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        pool_hash.configurar(None)
+    assert maximo[0] == 2
+    assert all(nombre.startswith('hash') for nombre in nombres)
+
+
+_EVENTLET_SIN_PARCHEAR = textwrap.dedent('''
+    import time
+    import eventlet
+    from utils.contrasenas import _eventlet_parcheado, generar_hash, pool_hash
+
+    assert not _eventlet_parcheado()
+    pool_hash.configurar(2, 'eventlet')
+    huecos, fin = [], [False]
+
+    def latido():
+        anterior = time.perf_counter()
+        while not fin[0]:
+            eventlet.sleep(0.01)
+            ahora = time.perf_counter()
+            huecos.append(ahora - anterior)
+            anterior = ahora
+
+    corazon = eventlet.spawn(latido)
+    eventlet.sleep(0.05)
+    hashes = [eventlet.spawn(generar_hash, 'secreta') for _ in range(10)]
+    for hash_ in hashes:
+        hash_.wait()
+    fin[0] = True
+    corazon.wait()
+    print(max(huecos))
+''')
+
+
+def test_eventlet_sin_parchear_no_bloquea_el_hub():
+    """``python app.py`` sin cola de mensajes: Socket.IO en modo eventlet sin monkey_patch"""
+    pytest.importorskip('eventlet')
+    resultado = subprocess.run([sys.executable, '-c', _EVENTLET_SIN_PARCHEAR], cwd=RAIZ,
+                               capture_output=True, text=True, timeout=120)
+    assert resultado.returncode == 0, resultado.stderr
+    # Con Future.result() el latido de 10 ms se quedaba parado casi un segundo
+    assert float(resultado.stdout.split()[-1]) < 0.25
@@ -0,0 +1,129 @@
+"""
+Disponibilidad por intervalos: reservas indexadas por mesa/servicio y hora,
+actualizadas al crear, cancelar y asignar mesa.
+"""
+from datetime import date, timedelta
+
+from models import db, Mesa, Reserva
+
+FECHA = (date.today() + timedelta(days=3)).isoformat()
+
+
+def _crear_mesas(app):
+    with app.app_context():
+        for numero, capacidad in ((1, 4), (2, 6), (3, 8)):
+            db.session.add(Mesa(numero=numero, capacidad=capacidad, disponible=True))
+        db.session.commit()
+
+
+def _libres(client, hora, duracion=2, personas=6):
+    respuesta = client.get(f'/api/reservas/disponibilidad?fecha={FECHA}&hora={hora}'
+                           f'&duracion={duracion}&personas={personas}')
+    assert respuesta.status_code == 200
+    return [m['numero'] for m in respuesta.get_json()['disponibles']]
+
+
+def test_mesas_libres_por_intervalo(app, crear_usuario, login, contar_consultas):
+    _crear_mesas(app)
+    cliente = login(crear_usuario('cliente'))
+    respuesta = cliente.post('/api/reservas/crear', json={
+        'fecha': FECHA, 'hora': '19:00', 'numero_personas': 6, 'mesa_id': '2', 'duracion_estimada': 2})
+    assert respuesta.status_code == 201
+    reserva_id = respuesta.get_json()['reserva']['id']
+
+    anonimo = app.test_client()
+    assert _libres(anonimo, '19:30') == [3]            # la 2 está ocupada, la 1 es pequeña
+    assert _libres(anonimo, '21:00') == [2, 3]         # la reserva termina a las 21:00
+    assert _libres(anonimo, '17:00', duracion=2.5) == [3]
+    with contar_consultas() as sentencias:
+        assert _libres(anonimo, '18:00') == [3]
+    assert sentencias == []                            # día y mesas ya en memoria
+
+    # Asignar otra mesa y cancelar actualizan el índice sin recargar el día
+    admin = login(crear_usuario('admin'))
+    assert admin.put(f'/admin/api/reservas/{reserva_id}/asignar-mesa', json={'mesa_asignada': '3'}).status_code == 200
+    assert _libres(anonimo, '19:30') == [2]
+    assert cliente.post(f'/api/reservas/{reserva_id}/cancelar').status_code == 200
+    assert _libres(anonimo, '19:30') == [2, 3]
+
+
+def test_conflicto_al_crear_por_servicio_y_hora(app, crear_usuario, login):
+    uno, otro = login(crear_usuario('cliente')), login(crear_usuario('cliente'))
+    billar = {'fecha': FECHA, 'numero_personas': 2, 'mesa_id': '1', 'servicio_id': 7, 'tipo': 'billar'}
+
+    assert uno.post('/api/reservas/crear', json=dict(billar, hora='15:00')).status_code == 201
+    assert otro.post('/api/reservas/crear', json=dict(billar, hora='16:00')).status_code == 400
+    assert otro.post('/api/reservas/crear', json=dict(billar, hora='17:00')).status_code == 201
+    # La mesa 1 de otro servicio (o del comedor) es otro recurso
+    assert otro.post('/api/reservas/crear', json=dict(billar, hora='15:00', servicio_id=8)).status_code == 201
+
+    ocupadas = app.test_client().get(
+        f'/api/reservas/disponibilidad?fecha={FECHA}&hora=15:30&servicio_id=7').get_json()
+    assert ocupadas['reservadas'] == ['1']
+    with app.app_context():
+        assert Reserva.query.count() == 3
+
+
+def test_conflicto_lee_la_base_y_cambios_durante_la_carga(app, crear_usuario, login):
+    from datetime import time as hora
+    from sqlalchemy import event
+    from utils.disponibilidad import disponibilidad
+
+    _crear_mesas(app)
+    uno_id, otro_id = crear_usuario('cliente'), crear_usuario('cliente')
+    anonimo = app.test_client()
+    assert _libres(anonimo, '20:00') == [2, 3]           # día cargado en memoria
+
+    # Reserva creada por otro proceso: este índice no la ve, la validación sí
+    with app.app_context():
+        db.session.add(Reserva(usuario_id=uno_id, restaurante_id=1, fecha=date.fromisoformat(FECHA),
+                               hora=hora(20, 0), numero_personas=6, estado='confirmada', mesa_asignada='2'))
+        db.session.commit()
+        disponibilidad.invalidar()
+    assert _libres(anonimo, '20:00') == [3]
+    with app.app_context():
+        db.session.execute(Reserva.__table__.update().values(mesa_asignada='3'))
+        db.session.commit()
+    respuesta = login(otro_id).post('/api/reservas/crear', json={
+        'fecha': FECHA, 'hora': '21:00', 'numero_personas': 6, 'mesa_id': '3'})
+    assert respuesta.status_code == 400
+
+    # Un commit que se aplica mientras se lee el día no se pierde
+    disponibilidad.invalidar()
+    fecha = date.fromisoformat(FECHA)
+
+    def commit_concurrente(conn, cursor, statement, *args):
+        if 'FROM reservas' in statement:
+            disponibilidad.aplicar(999, (fecha, (None, '1'), 12 * 60, 14 * 60, uno_id))
+
+    with app.app_context():
+        event.listen(db.engine, 'after_cursor_execute', commit_concurrente)
+        try:
+            _libres(anonimo, '13:00', personas=1)
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', commit_concurrente)
+    assert 1 not in _libres(anonimo, '13:00', personas=1)
+
+
+def test_dias_en_memoria_acotados(app, crear_usuario, login):
+    from utils.disponibilidad import disponibilidad
+
+    _crear_mesas(app)
+    app.config['DISPONIBILIDAD_MAX_DIAS'] = 2
+    respuesta = login(crear_usuario('cliente')).post('/api/reservas/crear', json={
+        'fecha': FECHA, 'hora': '19:00', 'numero_personas': 6, 'mesa_id': '2', 'duracion_estimada': 2})
+    assert respuesta.status_code == 201
+    anonimo = app.test_client()
+    assert _libres(anonimo, '19:30') == [3]
+
+    # Recorrer fechas no hace crecer el índice: se descarta la menos reciente
+    # con sus reservas
+    fechas = [date.fromisoformat(FECHA) + timedelta(days=n) for n in range(1, 6)]
+    for fecha in fechas:
+        assert anonimo.get(f'/api/reservas/disponibilidad?fecha={fecha.isoformat()}').status_code == 200
+    assert list(disponibilidad._dias) == fechas[-2:]
+    assert disponibilidad._reservas == {}
+
+    # El día descartado se vuelve a leer completo
+    assert _libres(anonimo, '19:30') == [3]
+    assert list(disponibilidad._dias) == [fechas[-1], date.fromisoformat(FECHA)]
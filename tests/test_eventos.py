@@ -0,0 +1,85 @@
+"""
+Bus de eventos: las rutas publican los cambios de pedidos después del commit
+y, con ventana, los cambios repetidos del mismo pedido se fusionan.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from models import db, Pedido
+from socket_events import socketio
+from utils.eventos import bus_eventos
+
+
+def _crear_pedido(app, usuario_id, mesa_id=None):
+    with app.app_context():
+        pedido = Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('1000'), total=Decimal('1000'),
+                        metodo_pago='efectivo', estado='pendiente', mesa_id=mesa_id,
+                        fecha_pedido=datetime.utcnow())
+        db.session.add(pedido)
+        db.session.commit()
+        return pedido.id
+
+
+def test_ruta_publica_cambio_de_estado(app, crear_usuario, login):
+    cocinero_id = crear_usuario('cocinero')
+    cajero_id = crear_usuario('cajero')
+    pedido_id = _crear_pedido(app, cocinero_id)
+    cocina = socketio.test_client(app, flask_test_client=login(cocinero_id))
+    caja = socketio.test_client(app, flask_test_client=login(cajero_id))
+    cocina.get_received(), caja.get_received()
+
+    respuesta = login(cocinero_id).post(f'/cocina/api/pedido/{pedido_id}/estado', json={'estado': 'preparando'})
+    assert respuesta.status_code == 200
+
+    esperado = {'pedido_id': pedido_id, 'estado': 'preparando', 'mesa_id': None}
+    for socket in (cocina, caja):
+        recibidos = [m['args'][0] for m in socket.get_received() if m['name'] == 'estado_pedido_actualizado']
+        assert recibidos == [esperado]
+
+    # El navegador ya no puede reenviar eventos de pedidos por el socket
+    cocina.emit('actualizar_estado_pedido', {'pedido_id': pedido_id, 'estado': 'falso'})
+    assert not [m for m in caja.get_received() if m['name'] == 'estado_pedido_actualizado']
+
+
+def test_ventana_fusiona_por_pedido(app, crear_usuario, login):
+    cocinero_id = crear_usuario('cocinero')
+    pedido_id = _crear_pedido(app, cocinero_id)
+    client = login(cocinero_id)
+    socket = socketio.test_client(app, flask_test_client=client)
+    socket.get_received()
+
+    # Ventana larga: el envío se fuerza con vaciar()
+    app.config['EVENTOS_VENTANA'] = 10
+    bus_eventos.iniciar(app)
+    try:
+        for estado in ('preparando', 'pendiente', 'preparando'):
+            assert client.post(f'/cocina/api/pedido/{pedido_id}/estado', json={'estado': estado}).status_code == 200
+        assert socket.get_received() == []
+        bus_eventos.vaciar()
+    finally:
+        app.config['EVENTOS_VENTANA'] = None
+        bus_eventos.iniciar(app)
+
+    recibidos = socket.get_received()
+    # Tres cambios del mismo pedido: un solo evento con el estado final
+    estados = [m['args'][0] for m in recibidos if m['name'] == 'estado_pedido_actualizado']
+    assert estados == [{'pedido_id': pedido_id, 'estado': 'preparando', 'mesa_id': None}]
+    # Los cambios de la cola (con versión) llegan todos, en orden, en un solo lote
+    lotes = [m['args'][0] for m in recibidos if m['name'] == 'eventos']
+    assert len(lotes) == 1
+    versiones = [e['datos']['version'] for e in lotes[0] if e['evento'] == 'cola_cocina']
+    assert len(versiones) == 3 and versiones == sorted(versiones)
+
+
+def test_evento_sin_recargar_el_pedido(app, crear_usuario, login, contar_consultas):
+    cliente_id = crear_usuario('cliente')
+    pedido_id = _crear_pedido(app, cliente_id)
+    client = login(cliente_id)
+
+    with contar_consultas() as sentencias:
+        assert client.post(f'/cuenta/api/cancelar-pedido/{pedido_id}').status_code == 200
+
+    # La carga de la ruta y la recarga de la cola de cocina; el evento usa los
+    # datos tomados antes del commit y no vuelve a leer el pedido expirado
+    lecturas = [s for s in sentencias if s.lstrip().startswith('SELECT') and 'FROM pedidos' in s]
+    assert len(lecturas) == 2
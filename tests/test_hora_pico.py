@@ -0,0 +1,49 @@
+"""
+Simulador de la hora pico: agregación de latencias por endpoint y una
+ejecución corta contra la app arrancada en local sobre un restaurante pequeño.
+"""
+import pytest
+
+from benchmarks import hora_pico, restaurante
+
+PEQUENO = {'platos': 20, 'categorias': 3, 'mesas': 8, 'productos_piscina': 5, 'usuarios': 30, 'pedidos': 200,
+           'pedidos_frecuente': 10, 'pedidos_en_cocina': 10, 'reservas': 20, 'dias_reservas': 5}
+
+
+def test_resumen_por_endpoint():
+    registro = hora_pico.Registro()
+    for i in range(1, 101):
+        registro.anotar('GET /api/menu', i / 1000, 200)
+    registro.anotar('POST /pedidos/crear', 0.02, 500)
+    registro.anotar('POST /pedidos/crear', 0.01, None)
+    registro.anotar('POST /pedidos/crear', 0.01, 400)
+    registro.anotar('POST /pedidos/crear', 0.01, 201)
+
+    endpoints, sockets = registro.resumen(duracion=10)
+    menu = endpoints['GET /api/menu']
+    assert (menu['peticiones'], menu['por_segundo']) == (100, 10.0)
+    assert (menu['p50_ms'], menu['p95_ms'], menu['p99_ms']) == (50.0, 95.0, 99.0)
+    assert menu['tasa_error'] == 0
+    pedidos = endpoints['POST /pedidos/crear']
+    # 5xx y fallos de conexión son errores; los 4xx, rechazos
+    assert (pedidos['errores'], pedidos['rechazos'], pedidos['tasa_error']) == (2, 1, 0.5)
+    assert sockets == {'conectados': 0, 'fallidos': 0, 'eventos': 0}
+
+
+def test_simulacion_corta_contra_app_local():
+    pytest.importorskip('websocket')
+    args = hora_pico.argumentos([
+        '--duracion', '6', '--rampa', '1', '--tabletas', '2', '--clientes', '2', '--piscina', '1',
+        '--cocineros', '1', '--admins', '1', '--rafaga', '2', '--intervalo-tableta', '1', '--pausa-cliente', '1',
+        '--intervalo-cocina', '1', '--intervalo-admin', '2', '--intervalo-rafaga', '2'])
+    parametros = {**restaurante.PARAMETROS_POR_DEFECTO, **PEQUENO}
+
+    resultado = hora_pico.simular(args, parametros)
+    endpoints = resultado['endpoints']
+    for nombre in ('POST /login', 'GET /api/menu', 'GET /api/mesas', 'POST /pedidos/crear',
+                   'POST /pedidos/crear (piscina)', 'GET /cocina/api/cola', 'GET /admin/api/stats/dashboard',
+                   'POST /api/reservas/crear'):
+        assert endpoints[nombre]['peticiones'] > 0, nombre
+    assert all(r['errores'] == 0 for r in endpoints.values()), endpoints
+    assert resultado['socketio']['conectados'] == 4
+    assert resultado['socketio']['fallidos'] == 0
@@ -0,0 +1,76 @@
+"""
+Variantes de las imágenes del menú: se generan en el pool de procesos y se
+asignan a los items que usan la imagen, llegue antes el item o la imagen.
+"""
+import io
+import os
+
+import pytest
+
+from utils.imagenes import procesador_imagenes
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    return app
+
+
+def _png(ancho=2000, alto=1500):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (ancho, alto), (200, 80, 20, 255)).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def _subir(client, contenido, nombre='plato.png'):
+    respuesta = client.post('/admin/api/menu/subir-imagen', data={'imagen': (contenido, nombre)},
+                            content_type='multipart/form-data')
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def _item_del_menu(client, item_id):
+    items = client.get('/admin/api/menu/items').get_json()
+    return next(i for i in items if i['id'] == item_id)
+
+
+def test_variantes_asignadas_al_item(app, crear_usuario, login):
+    admin = login(crear_usuario('admin'))
+    subida = _subir(admin, _png())
+    assert subida['procesando'] is True
+
+    # El item se crea antes de que termine el procesado
+    item_id = admin.post('/admin/api/menu/crear', json={
+        'nombre': 'Bandeja', 'precio': 20000, 'imagen_url': subida['url']}).get_json()['item']['id']
+    assert procesador_imagenes.esperar(timeout=60)
+
+    item = _item_del_menu(admin, item_id)
+    assert item['imagen_original'] == subida['url']
+    assert item['imagen'] == item['imagenes']['tarjeta']['jpg']
+    carpeta = os.path.join(app.config['UPLOAD_FOLDER'], 'menu')
+    for tamano, lado in (('miniatura', 160), ('tarjeta', 480), ('completa', 1200)):
+        variante = item['imagenes'][tamano]
+        assert (variante['ancho'], variante['alto']) == (lado, lado * 3 // 4)
+        for formato in ('jpg', 'webp'):
+            with Image.open(os.path.join(carpeta, os.path.basename(variante[formato]))) as imagen:
+                assert imagen.size == (lado, lado * 3 // 4)
+
+    # Otro item con la misma imagen ya procesada la recibe al guardarse
+    otro = admin.post('/admin/api/menu/crear', json={
+        'nombre': 'Picada', 'precio': 30000, 'imagen_url': subida['url']}).get_json()['item']
+    assert otro['imagenes'] == item['imagenes']
+
+
+def test_imagen_invalida_conserva_original(app, crear_usuario, login):
+    admin = login(crear_usuario('admin'))
+    subida = _subir(admin, io.BytesIO(b'no es una imagen'), 'roto.jpg')
+    item = admin.post('/admin/api/menu/crear', json={
+        'nombre': 'Jugo', 'precio': 6000, 'imagen_url': subida['url']}).get_json()['item']
+    assert procesador_imagenes.esperar(timeout=60)
+
+    item = _item_del_menu(admin, item['id'])
+    assert item['imagenes'] is None
+    assert item['imagen'] == subida['url']
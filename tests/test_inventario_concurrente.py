@@ -0,0 +1,128 @@
+"""
+Prueba de estrés: descuentos de inventario concurrentes no pierden
+actualizaciones ni dejan stock negativo.
+"""
+import threading
+from decimal import Decimal
+
+from models import db, Inventario, InventarioMovimiento, MenuItem, Pedido, Receta
+from utils.inventario_utils import descontar_stock, sumar_stock
+
+
+HILOS = 16
+
+
+def _correr_en_hilos(objetivo, n):
+    barrera = threading.Barrier(n)
+    resultados = []
+    lock = threading.Lock()
+
+    def worker(i):
+        barrera.wait()
+        r = objetivo(i)
+        with lock:
+            resultados.append(r)
+
+    hilos = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return resultados
+
+
+def _crear_inventario(app, cantidad):
+    with app.app_context():
+        item = Inventario(nombre='Queso', cantidad=cantidad, unidad='kg', stock_minimo=0)
+        db.session.add(item)
+        db.session.commit()
+        return item.id
+
+
+def test_descontar_stock_concurrente_sin_perdidas(app):
+    inv_id = _crear_inventario(app, Decimal('50'))
+
+    def descontar(_):
+        exitos = 0
+        for _ in range(5):
+            with app.app_context():
+                if descontar_stock(inv_id, Decimal('1.5')):
+                    exitos += 1
+                db.session.commit()
+        return exitos
+
+    exitos = sum(_correr_en_hilos(descontar, HILOS))
+
+    with app.app_context():
+        final = db.session.get(Inventario, inv_id).cantidad
+    # 50 / 1.5 = 33 descuentos posibles; los demás deben fallar sin tocar el stock
+    assert exitos == 33
+    assert final == Decimal('50') - Decimal('1.5') * exitos
+    assert final >= 0
+
+
+def test_entradas_y_salidas_concurrentes(app):
+    inv_id = _crear_inventario(app, Decimal('0'))
+
+    def mover(i):
+        with app.app_context():
+            if i % 2 == 0:
+                sumar_stock(inv_id, 2)
+                ok = True
+            else:
+                ok = descontar_stock(inv_id, 1)
+            db.session.commit()
+            return ('entrada' if i % 2 == 0 else 'salida', ok)
+
+    resultados = _correr_en_hilos(mover, HILOS)
+    salidas = sum(1 for tipo, ok in resultados if tipo == 'salida' and ok)
+
+    with app.app_context():
+        final = db.session.get(Inventario, inv_id).cantidad
+    assert final == Decimal(2 * (HILOS // 2) - salidas)
+    assert final >= 0
+
+
+def test_crear_pedido_concurrente(app, crear_usuario, login):
+    with app.app_context():
+        plato = MenuItem(restaurante_id=1, nombre='Arepa', precio=Decimal('8000'))
+        queso = Inventario(nombre='Queso', cantidad=Decimal('10'), unidad='kg', stock_minimo=0)
+        db.session.add_all([plato, queso])
+        db.session.flush()
+        db.session.add(Receta(menu_item_id=plato.id, inventario_id=queso.id, cantidad_usada=Decimal('1')))
+        db.session.commit()
+        plato_id, queso_id = plato.id, queso.id
+
+    clientes = [login(crear_usuario()) for _ in range(HILOS)]
+
+    def pedir(i):
+        r = clientes[i].post('/pedidos/crear', json={
+            'items': [{'id': plato_id, 'precio': 8000, 'cantidad': 1}]
+        })
+        return r.status_code
+
+    codigos = _correr_en_hilos(pedir, HILOS)
+
+    with app.app_context():
+        final = db.session.get(Inventario, queso_id).cantidad
+        pedidos = Pedido.query.count()
+        movimientos = InventarioMovimiento.query.filter_by(inventario_id=queso_id).count()
+    assert codigos.count(200) == 10
+    assert all(c in (200, 400, 409) for c in codigos)
+    assert final == 0
+    assert pedidos == movimientos == 10
+
+
+def test_registrar_movimiento_salida_sin_stock(app, crear_usuario, login):
+    inv_id = _crear_inventario(app, Decimal('3'))
+    admin = login(crear_usuario('admin'))
+
+    r = admin.post(f'/admin/api/inventario/{inv_id}/movimiento', json={'tipo': 'salida', 'cantidad': 5})
+    assert r.status_code == 400
+
+    r = admin.post(f'/admin/api/inventario/{inv_id}/movimiento', json={'tipo': 'salida', 'cantidad': 2})
+    assert r.status_code == 200
+    assert r.get_json()['nueva_cantidad'] == 1.0
+
+    with app.app_context():
+        assert InventarioMovimiento.query.count() == 1
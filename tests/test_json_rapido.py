@@ -0,0 +1,49 @@
+"""
+JSON de la app con utils.json_rapido: los to_dict devuelven Decimal y fechas
+tal cual y salen como números e ISO 8601, igual que antes.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from models import db, Pedido, PedidoItem, MenuItem, Categoria
+from socket_events import socketio
+
+
+def test_jsonify_decimal_y_fechas(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    with app.app_context():
+        categoria = Categoria(nombre='Platos', orden=1)
+        db.session.add(categoria)
+        db.session.flush()
+        plato = MenuItem(restaurante_id=1, categoria_id=categoria.id, nombre='Bandeja paisa',
+                         precio=Decimal('18500.50'))
+        db.session.add(plato)
+        db.session.flush()
+        pedido = Pedido(usuario_id=admin_id, restaurante_id=1, subtotal=Decimal('37001.00'),
+                        total=Decimal('37001.00'), metodo_pago='efectivo', estado='pendiente',
+                        fecha_pedido=datetime(2025, 5, 1, 12, 30, 15))
+        db.session.add(pedido)
+        db.session.flush()
+        db.session.add(PedidoItem(pedido_id=pedido.id, menu_item_id=plato.id, nombre_item=plato.nombre,
+                                  cantidad=2, precio_unitario=plato.precio, subtotal=Decimal('37001.00')))
+        db.session.commit()
+        pedido_id = pedido.id
+
+        cuerpo = app.json.response({'total': Decimal('10.25'), 'dia': date(2025, 5, 1), 'hora': time(13, 45),
+                                    'nombre': 'Ñame'})
+        assert cuerpo.get_json() == {'total': 10.25, 'dia': '2025-05-01', 'hora': '13:45:00', 'nombre': 'Ñame'}
+        assert 'Ñame'.encode('utf-8') in cuerpo.data
+
+    datos = login(admin_id).get(f'/api/pedidos/{pedido_id}').get_json()
+    assert datos['total'] == 37001.0
+    assert datos['fecha_pedido'] == '2025-05-01T12:30:15'
+    assert datos['items'][0]['precio_unitario'] == 18500.5
+
+
+def test_socketio_serializa_to_dict(app, crear_usuario, login):
+    socket = socketio.test_client(app, flask_test_client=login(crear_usuario('cocinero')))
+    socket.get_received()
+    with app.app_context():
+        socketio.emit('prueba', {'total': Decimal('1500.50'), 'fecha': datetime(2025, 5, 1, 8, 0)})
+    recibidos = [m['args'][0] for m in socket.get_received() if m['name'] == 'prueba']
+    assert recibidos == [{'total': 1500.5, 'fecha': '2025-05-01T08:00:00'}]
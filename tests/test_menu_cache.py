@@ -0,0 +1,65 @@
+"""
+Snapshot del menú: una sola construcción para todos los lectores, ETag/304
+e invalidación desde las rutas del admin.
+"""
+from decimal import Decimal
+
+from models import db, Categoria, MenuItem
+
+
+def _crear_menu(app):
+    with app.app_context():
+        bebidas = Categoria(nombre='Bebidas', orden=2)
+        platos = Categoria(nombre='Platos', orden=1)
+        db.session.add_all([bebidas, platos])
+        db.session.flush()
+        db.session.add_all([
+            MenuItem(restaurante_id=1, nombre='Limonada', precio=Decimal('5000'), categoria_id=bebidas.id),
+            MenuItem(restaurante_id=1, nombre='Bandeja', precio=Decimal('25000'), categoria_id=platos.id),
+            MenuItem(restaurante_id=1, nombre='Agotado', precio=Decimal('1000'), categoria_id=platos.id,
+                     disponible=False),
+        ])
+        db.session.commit()
+
+
+def test_api_menu_agrupado_y_304(app, contar_consultas):
+    _crear_menu(app)
+    client = app.test_client()
+
+    r = client.get('/api/menu')
+    assert r.status_code == 200
+    menu = r.get_json()
+    assert [g['categoria']['nombre'] for g in menu] == ['Platos', 'Bebidas']
+    assert [i['nombre'] for i in menu[0]['items']] == ['Bandeja']
+    etag = r.headers['ETag']
+
+    with contar_consultas() as sentencias:
+        r = client.get('/api/menu', headers={'If-None-Match': etag})
+        r2 = client.get('/api/menu/items')
+    assert r.status_code == 304
+    assert r.data == b''
+    assert len(r2.get_json()) == 2
+    assert sentencias == []
+
+
+def test_admin_invalida_snapshot(app, crear_usuario, login):
+    _crear_menu(app)
+    admin = login(crear_usuario('admin'))
+    client = app.test_client()
+
+    etag = client.get('/api/menu').headers['ETag']
+    assert len(admin.get('/admin/api/menu/items').get_json()) == 3
+
+    with app.app_context():
+        item_id = MenuItem.query.filter_by(nombre='Agotado').first().id
+    r = admin.put(f'/admin/api/menu/{item_id}/actualizar', json={'disponible': True})
+    assert r.status_code == 200
+
+    r = client.get('/api/menu', headers={'If-None-Match': etag})
+    assert r.status_code == 200
+    assert r.headers['ETag'] != etag
+    assert len(r.get_json()[0]['items']) == 2
+
+    r = admin.delete(f'/admin/api/menu/{item_id}')
+    assert r.status_code == 200
+    assert len(admin.get('/admin/api/menu/items').get_json()) == 2
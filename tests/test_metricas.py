@@ -0,0 +1,72 @@
+"""
+Métricas en /admin/api/metrics: latencia y sentencias SQL por endpoint,
+espera del pool y emits de Socket.IO por sala, en formato de Prometheus.
+"""
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db
+from socket_events import socketio
+
+
+def _valor(texto, linea):
+    coincidencia = re.search(rf'^{re.escape(linea)} (\S+)$', texto, re.M)
+    assert coincidencia, f'{linea} no está en las métricas'
+    return float(coincidencia.group(1))
+
+
+def test_peticiones_sql_y_pool(app, crear_usuario, login):
+    admin = login(crear_usuario('admin'))
+    for _ in range(3):
+        assert admin.get('/admin/api/alertas').status_code == 200
+    admin.get('/admin/api/stats/dashboard')
+
+    r = admin.get('/admin/api/metrics')
+    assert r.status_code == 200
+    assert r.mimetype == 'text/plain'
+    texto = r.get_data(as_text=True)
+    assert '# TYPE boodfood_peticion_segundos histogram' in texto
+
+    etiquetas = 'blueprint="admin_api",endpoint="admin_api.get_alertas"'
+    assert _valor(texto, f'boodfood_peticiones_total{{{etiquetas},metodo="GET",codigo="200"}}') == 3
+    assert _valor(texto, f'boodfood_peticion_segundos_count{{{etiquetas}}}') == 3
+    assert _valor(texto, f'boodfood_peticion_segundos_bucket{{{etiquetas},le="+Inf"}}') == 3
+
+    # El dashboard consulta la base de datos: sentencias y tiempo atribuidos a su endpoint
+    dashboard = 'blueprint="admin_api",endpoint="admin_api.get_dashboard_stats"'
+    sentencias = _valor(texto, f'boodfood_sql_sentencias_total{{{dashboard}}}')
+    assert sentencias >= 1
+    assert _valor(texto, f'boodfood_peticion_sql_sentencias_sum{{{dashboard}}}') == sentencias
+    assert _valor(texto, f'boodfood_sql_segundos_total{{{dashboard}}}') > 0
+    assert _valor(texto, 'boodfood_pool_espera_segundos_count') >= 1
+    assert 'boodfood_pool_conexiones{estado="en_uso"}' in texto
+
+
+def test_sentencia_fallida_no_deja_inicio_en_la_conexion(app):
+    with app.app_context():
+        conexion = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conexion.execute(text('SELECT * FROM tabla_inexistente'))
+        conexion.execute(text('SELECT 1'))
+        # Las conexiones del pool viven todo el proceso: nada se acumula en ellas
+        assert not [clave for clave in conexion.info if 'metricas' in clave]
+        db.session.rollback()
+
+
+def test_emits_por_sala_y_solo_admin(app, crear_usuario, login):
+    cocinero = login(crear_usuario('cocinero'))
+    assert cocinero.get('/admin/api/metrics').status_code == 403
+
+    with app.app_context():
+        socketio.emit('nuevo_pedido', {'id': 1}, to=['cocina', 'caja'])
+        socketio.emit('estado_mesa_actualizado', {'id': 7}, to='mesa_7')
+        socketio.emit('estado_mesa_actualizado', {'id': 8}, to='mesa_8')
+
+    texto = login(crear_usuario('admin')).get('/admin/api/metrics').get_data(as_text=True)
+    assert _valor(texto, 'boodfood_socketio_emits_total{sala="cocina",evento="nuevo_pedido"}') == 1
+    assert _valor(texto, 'boodfood_socketio_emits_total{sala="caja",evento="nuevo_pedido"}') == 1
+    assert _valor(texto, 'boodfood_socketio_emits_total{sala="mesa",evento="estado_mesa_actualizado"}') == 2
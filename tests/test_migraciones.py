@@ -0,0 +1,76 @@
+"""
+Migraciones del esquema: una base anterior al registro de versiones recibe los
+índices compuestos, y el arranque sobre una base al día sólo consulta la versión.
+"""
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from app import create_app
+from models import db, EsquemaMigracion, MenuItem
+from utils import migraciones
+
+INDICES = {
+    'pedidos': {'ix_pedidos_estado_fecha', 'ix_pedidos_mesa_estado', 'ix_pedidos_usuario_fecha',
+                'ix_pedidos_fecha_id'},
+    'reservas': {'ix_reservas_fecha_estado_mesa', 'ix_reservas_usuario_creada', 'ix_reservas_creada_id'},
+    'recetas': {'ix_recetas_menu_item'},
+}
+
+
+def _indices(engine, tabla):
+    return {indice['name'] for indice in inspect(engine).get_indexes(tabla)}
+
+
+# Tablas que la serie de cambios añadió a la base original
+_TABLAS_NUEVAS = {'esquema_migraciones', 'productos_piscina_menu', 'ventas_resumen', 'archivos_subidos',
+                  'cola_cocina_cambios'}
+
+
+def _base_original(url):
+    """Esquema anterior a las migraciones: sin tablas ni columnas nuevas, sin índices"""
+    engine = create_engine(url)
+    tablas = [tabla for tabla in db.metadata.sorted_tables if tabla.name not in _TABLAS_NUEVAS]
+    db.metadata.create_all(engine, tables=tablas)
+    with engine.begin() as conn:
+        for tabla, nombres in INDICES.items():
+            for nombre in nombres:
+                conn.exec_driver_sql(f'DROP INDEX {nombre}')
+        conn.exec_driver_sql('ALTER TABLE menu_items DROP COLUMN imagen_variantes')
+        conn.exec_driver_sql("INSERT INTO menu_items (id, restaurante_id, nombre, precio, disponible) "
+                             "VALUES (1, 1, 'Bandeja', 20000, 1)")
+    return engine
+
+
+def test_base_existente_recibe_indices_columnas_y_version(tmp_path):
+    url = f"sqlite:///{tmp_path / 'anterior.db'}"
+    engine = _base_original(url)
+    assert migraciones.version_actual(engine) == 0
+
+    with pytest.raises(RuntimeError, match='utils.migraciones'):
+        create_app('testing', {'SQLALCHEMY_DATABASE_URI': url, 'MIGRACIONES_AL_ARRANCAR': False})
+
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': url})
+    with app.app_context():
+        assert [m.version for m in EsquemaMigracion.query.order_by(EsquemaMigracion.version)] == [1, 2, 3, 4, 5]
+        for tabla, nombres in INDICES.items():
+            assert nombres <= _indices(db.engine, tabla), tabla
+        assert _TABLAS_NUEVAS <= set(inspect(db.engine).get_table_names())
+        # El menú (y con él pedidos y panel del admin) lee la columna nueva
+        assert [item.nombre for item in MenuItem.query.all()] == ['Bandeja']
+        assert app.test_client().get('/api/menu').status_code == 200
+        # Volver a migrar no aplica nada
+        assert migraciones.migrar() == []
+        db.session.remove()
+        db.engine.dispose()
+    engine.dispose()
+
+
+def test_arranque_al_dia_solo_consulta_la_version(app, contar_consultas):
+    with app.app_context():
+        assert migraciones.version_actual() == migraciones.ULTIMA_VERSION
+        for tabla, nombres in INDICES.items():
+            assert nombres <= _indices(db.engine, tabla), tabla
+        with contar_consultas() as sentencias:
+            migraciones.preparar(app)
+    assert len(sentencias) == 1
+    assert 'esquema_migraciones' in sentencias[0]
@@ -0,0 +1,88 @@
+"""
+Índice de ocupación de mesas: listados sin consultas por mesa y
+actualización con cada cambio de estado de los pedidos.
+"""
+from decimal import Decimal
+
+from models import db, Mesa, Pedido
+from utils.ocupacion import indice_ocupacion
+
+
+def _crear_mesas(app, n):
+    with app.app_context():
+        inicio = Mesa.query.count()
+        mesas = [Mesa(numero=inicio + i + 1, capacidad=4) for i in range(n)]
+        db.session.add_all(mesas)
+        db.session.commit()
+        return [m.id for m in mesas]
+
+
+def _crear_pedido(app, usuario_id, mesa_id, estado='pendiente'):
+    with app.app_context():
+        pedido = Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('10'),
+                        total=Decimal('10'), metodo_pago='efectivo', estado=estado, mesa_id=mesa_id)
+        db.session.add(pedido)
+        db.session.commit()
+        return pedido.id
+
+
+def test_listado_mesas_sin_consultas_por_mesa(app, crear_usuario, login, contar_consultas):
+    admin_id = crear_usuario('admin')
+    admin = login(admin_id)
+    admin.get('/admin/api/mesas')  # usuario ya en la caché de Flask-Login
+
+    consultas = []
+    for n in (3, 30):
+        mesas = _crear_mesas(app, n)
+        _crear_pedido(app, admin_id, mesas[0])
+        with contar_consultas() as sentencias:
+            r = admin.get('/admin/api/mesas')
+        assert r.status_code == 200
+        assert not [s for s in sentencias if 'FROM pedidos' in s]
+        consultas.append(len(sentencias))
+
+    assert consultas[0] == consultas[1]
+    assert sum(1 for m in r.get_json() if m['ocupada']) == 2
+
+
+def test_indice_sigue_transiciones(app, crear_usuario):
+    usuario_id = crear_usuario()
+    mesa_id = _crear_mesas(app, 1)[0]
+    pedido_id = _crear_pedido(app, usuario_id, mesa_id)
+
+    with app.app_context():
+        assert indice_ocupacion.ocupada(mesa_id)
+        assert indice_ocupacion.mesas_ocupadas(excluir_usuario=usuario_id) == set()
+
+        pedido = db.session.get(Pedido, pedido_id)
+        pedido.estado = 'entregado'
+        db.session.commit()
+        assert not indice_ocupacion.ocupada(mesa_id)
+
+        # Un cambio que termina en rollback no toca el índice
+        pedido.estado = 'pendiente'
+        db.session.flush()
+        db.session.rollback()
+        assert not indice_ocupacion.ocupada(mesa_id)
+
+
+def test_reconstruir_tras_desincronizacion(app, crear_usuario, login):
+    usuario_id = crear_usuario()
+    otro = login(crear_usuario())
+    mesa_id = _crear_mesas(app, 1)[0]
+
+    # Pedido insertado "por otro proceso": el índice de este proceso no lo ve
+    with app.app_context():
+        db.session.execute(Pedido.__table__.insert().values(
+            usuario_id=usuario_id, restaurante_id=1, subtotal=10, total=10,
+            metodo_pago='efectivo', estado='pendiente', mesa_id=mesa_id))
+        db.session.commit()
+        assert not indice_ocupacion.ocupada(mesa_id)
+
+    r = otro.post('/pedidos/crear', json={
+        'tipo': 'mesa', 'mesa_id': mesa_id, 'items': [{'id': 999, 'precio': 1, 'cantidad': 1}]
+    })
+    assert r.status_code == 400
+
+    with app.app_context():
+        assert indice_ocupacion.ocupada(mesa_id)
@@ -0,0 +1,122 @@
+"""
+Listados del admin paginados por cursor: recorren todas las filas sin
+repetir ni saltarse ninguna, respetan filtros y límites.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from models import db, Pedido, Reserva
+
+
+def _crear_pedidos(app, usuario_id, n, fecha=None):
+    fecha = fecha or datetime(2025, 1, 1, 12, 0)
+    with app.app_context():
+        for i in range(n):
+            # Varios pedidos comparten fecha para probar el desempate por id
+            db.session.add(Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('1000'),
+                                  total=Decimal('1000'), metodo_pago='efectivo',
+                                  estado='pendiente' if i % 2 else 'entregado',
+                                  mesa_id=(i % 3) + 1, fecha_pedido=fecha + timedelta(minutes=i // 3)))
+        db.session.commit()
+
+
+def _recorrer(client, url):
+    ids, cursor = [], None
+    while True:
+        r = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert r.status_code == 200
+        data = r.get_json()
+        ids.extend(item['id'] for item in data['items'])
+        cursor = data['siguiente']
+        if not cursor:
+            return ids
+
+
+def test_pedidos_recorrido_completo(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id, 23)
+    client = login(admin_id)
+
+    ids = _recorrer(client, '/admin/api/pedidos?limite=5')
+    assert len(ids) == 23 == len(set(ids))
+    with app.app_context():
+        esperado = [p.id for p in Pedido.query.order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc())]
+    assert ids == esperado
+
+
+def test_claves_nulas_no_se_pierden_entre_paginas(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id, 7)
+    with app.app_context():
+        for i in range(5):
+            db.session.add(Reserva(usuario_id=admin_id, restaurante_id=1, fecha=date(2025, 3, 10),
+                                   hora=time(19, 0), numero_personas=2, estado='confirmada',
+                                   created_at=datetime(2025, 3, 1, 10, i)))
+        db.session.commit()
+        # Filas anteriores a los valores por defecto de las columnas
+        pedidos_nulos = [p.id for p in Pedido.query.order_by(Pedido.id).limit(4)]
+        reservas_nulas = [r.id for r in Reserva.query.order_by(Reserva.id).limit(3)]
+        Pedido.query.filter(Pedido.id.in_(pedidos_nulos)).update({'fecha_pedido': None})
+        Reserva.query.filter(Reserva.id.in_(reservas_nulas)).update({'created_at': None})
+        db.session.commit()
+    client = login(admin_id)
+
+    # Las claves nulas van al final y el cursor cruza de las filas con fecha a
+    # las que no la tienen
+    ids = _recorrer(client, '/admin/api/pedidos?limite=2')
+    assert len(ids) == 7 == len(set(ids))
+    assert ids[-4:] == sorted(pedidos_nulos, reverse=True)
+
+    ids = _recorrer(client, '/admin/api/reservas?limite=2')
+    assert len(ids) == 5 == len(set(ids))
+    assert ids[-3:] == sorted(reservas_nulas, reverse=True)
+
+
+def test_pedidos_filtros_y_total(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id, 12)
+    _crear_pedidos(app, admin_id, 4, fecha=datetime(2025, 2, 1, 9, 0))
+    client = login(admin_id)
+
+    data = client.get('/admin/api/pedidos?estado=pendiente&limite=2&total=1').get_json()
+    assert data['total'] == 8
+    assert len(data['items']) == 2
+    assert all(p['estado'] == 'pendiente' for p in data['items'])
+
+    data = client.get('/admin/api/pedidos?desde=2025-02-01&hasta=2025-02-01&total=1').get_json()
+    assert data['total'] == 4
+
+    ids = _recorrer(client, '/admin/api/pedidos?mesa_id=1&limite=3')
+    assert len(ids) == 6
+
+    assert 'total' not in client.get('/admin/api/pedidos').get_json()
+
+
+def test_limite_maximo_y_parametros_invalidos(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    app.config['PAGINACION_LIMITE_MAX'] = 4
+    _crear_pedidos(app, admin_id, 6)
+    client = login(admin_id)
+
+    assert len(client.get('/admin/api/pedidos?limite=1000').get_json()['items']) == 4
+    assert client.get('/admin/api/pedidos?cursor=basura').status_code == 400
+    assert client.get('/admin/api/pedidos?desde=ayer').status_code == 400
+    assert client.get('/admin/api/usuarios/lista?limite=0').status_code == 400
+
+
+def test_reservas_y_usuarios(app, crear_usuario, login):
+    admin_id = crear_usuario('admin')
+    for _ in range(4):
+        crear_usuario()
+    with app.app_context():
+        creado = datetime(2025, 3, 1, 10, 0)
+        for i in range(7):
+            db.session.add(Reserva(usuario_id=admin_id, restaurante_id=1, fecha=date(2025, 3, 10 + i % 2),
+                                   hora=time(19, 0), numero_personas=2, estado='confirmada',
+                                   created_at=creado))
+        db.session.commit()
+    client = login(admin_id)
+
+    assert len(_recorrer(client, '/admin/api/reservas?limite=3')) == 7
+    assert len(_recorrer(client, '/admin/api/reservas?limite=3&desde=2025-03-11')) == 3
+    assert len(_recorrer(client, '/admin/api/usuarios/lista?limite=2')) == 5
@@ -0,0 +1,134 @@
+"""
+Enlace precalculado entre productos de la piscina y el menú.
+"""
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from models import db, MenuItem, Pedido, PedidoItem, ProductoPiscina
+from utils.piscina_catalogo import sincronizar_productos_piscina
+
+
+def _crear_productos(app):
+    with app.app_context():
+        db.session.execute(text(
+            "CREATE TABLE productos_de_consumo_rapido "
+            "(id INTEGER PRIMARY KEY, nombre VARCHAR(100), precio NUMERIC(10, 2), disponible BOOLEAN)"
+        ))
+        db.session.execute(text(
+            "INSERT INTO productos_de_consumo_rapido (id, nombre, precio, disponible) VALUES "
+            "(101, 'Limonada Natural', 5000, 1), (102, 'Salchipapas', 9000, 1), (103, 'Nachos', 12000, 0)"
+        ))
+        db.session.add(MenuItem(restaurante_id=1, nombre='limonada natural ', precio=Decimal('5000')))
+        db.session.commit()
+
+
+def test_sincronizar_enlaza_y_crea_faltantes(app):
+    _crear_productos(app)
+    with app.app_context():
+        resultado = sincronizar_productos_piscina()
+        assert resultado == {'productos': 3, 'menu_items_creados': 2}
+        assert MenuItem.query.count() == 3
+
+        # Idempotente: una segunda pasada no crea nada
+        assert sincronizar_productos_piscina()['menu_items_creados'] == 0
+        assert ProductoPiscina.query.count() == 3
+
+
+def test_sincronizar_sin_cambios_no_escribe_y_recoge_productos_nuevos(app, crear_usuario, login,
+                                                                     contar_consultas):
+    _crear_productos(app)
+    with app.app_context():
+        sincronizar_productos_piscina()
+        with contar_consultas() as sentencias:
+            sincronizar_productos_piscina()
+        assert not [s for s in sentencias if s.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+        # Un producto nuevo se puede pedir tras la siguiente pasada (periódica)
+        db.session.execute(text(
+            "INSERT INTO productos_de_consumo_rapido (id, nombre, precio, disponible) VALUES (104, 'Mojito', 15000, 1)"
+        ))
+        db.session.commit()
+        assert sincronizar_productos_piscina() == {'productos': 4, 'menu_items_creados': 1}
+
+    r = login(crear_usuario()).post('/pedidos/crear', json={
+        'tipo': 'piscina', 'items': [{'id': 104, 'nombre': 'Mojito', 'precio': 15000, 'cantidad': 1}]
+    })
+    assert r.status_code == 200
+
+
+def test_menu_piscina_una_lectura(app, contar_consultas):
+    _crear_productos(app)
+    with app.app_context():
+        sincronizar_productos_piscina()
+
+    with contar_consultas() as sentencias:
+        r = app.test_client().get('/api/piscina/productos')
+    productos = r.get_json()
+    assert len(sentencias) == 1
+    assert {p['id'] for p in productos} == {101, 102}
+    assert all(p['menu_item_id'] for p in productos)
+
+
+def test_pedido_piscina_no_crea_items_del_menu(app, crear_usuario, login):
+    _crear_productos(app)
+    with app.app_context():
+        sincronizar_productos_piscina()
+        items_antes = MenuItem.query.count()
+    client = login(crear_usuario())
+
+    r = client.post('/pedidos/crear', json={
+        'tipo': 'piscina', 'items': [{'id': 102, 'nombre': 'Salchipapas', 'precio': 9000, 'cantidad': 2}]
+    })
+    assert r.status_code == 200
+
+    r = client.post('/pedidos/crear', json={
+        'tipo': 'piscina', 'items': [{'id': 999, 'nombre': 'Desconocido', 'precio': 1, 'cantidad': 1}]
+    })
+    assert r.status_code == 400
+
+    with app.app_context():
+        assert MenuItem.query.count() == items_antes
+        assert Pedido.query.count() == 1
+
+
+def test_pedido_piscina_no_confunde_ids_del_menu(app, crear_usuario, login):
+    _crear_productos(app)
+    with app.app_context():
+        sincronizar_productos_piscina()
+        # Un plato del menú cuyo id coincide con el de un producto de la piscina
+        db.session.add(MenuItem(id=102, restaurante_id=1, nombre='Bandeja Paisa', precio=Decimal('30000')))
+        db.session.commit()
+        salchipapas = db.session.get(ProductoPiscina, '102').menu_item_id
+        assert salchipapas != 102
+    client = login(crear_usuario())
+
+    r = client.post('/pedidos/crear', json={
+        'tipo': 'piscina', 'items': [{'id': 102, 'nombre': 'Salchipapas', 'precio': 9000, 'cantidad': 1}]
+    })
+    assert r.status_code == 200
+    with app.app_context():
+        assert [i.menu_item_id for i in PedidoItem.query.all()] == [salchipapas]
+
+
+def test_editar_o_eliminar_item_enlazado(app, crear_usuario, login):
+    _crear_productos(app)
+    with app.app_context():
+        sincronizar_productos_piscina()
+        limonada = db.session.get(ProductoPiscina, '101').menu_item_id
+        salchipapas = db.session.get(ProductoPiscina, '102').menu_item_id
+        items_antes = MenuItem.query.count()
+    client = login(crear_usuario('admin'))
+
+    # Renombrar no crea otro item ni ahora ni en la siguiente sincronización
+    assert client.put(f'/admin/api/menu/{limonada}/actualizar', json={'nombre': 'Limonada de la casa'}).status_code == 200
+    with app.app_context():
+        assert MenuItem.query.count() == items_antes
+        assert sincronizar_productos_piscina()['menu_items_creados'] == 0
+        assert db.session.get(ProductoPiscina, '101').menu_item_id == limonada
+
+    # Eliminar quita el enlace sin volver a crear el item
+    assert client.delete(f'/admin/api/menu/{salchipapas}').status_code == 200
+    with app.app_context():
+        assert MenuItem.query.count() == items_antes - 1
+        assert db.session.get(ProductoPiscina, '102') is None
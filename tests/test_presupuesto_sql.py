@@ -0,0 +1,71 @@
+"""
+Presupuesto de sentencias SQL: los endpoints calientes cuestan lo mismo con
+muchas filas y una regresión N+1 hace fallar la petición con el SQL culpable.
+"""
+import logging
+from decimal import Decimal
+
+import pytest
+
+import routes.admin
+from models import db, Categoria, MenuItem, Mesa, Pedido, PedidoItem
+from utils.presupuesto_sql import PresupuestoExcedido, presupuesto_sql
+
+
+def _crear_pedidos(app, usuario_id, n=30):
+    with app.app_context():
+        categoria = Categoria(nombre='Platos', orden=1)
+        db.session.add(categoria)
+        db.session.flush()
+        platos = [MenuItem(restaurante_id=1, categoria_id=categoria.id, nombre=f'Plato {i}',
+                           precio=Decimal('1000')) for i in range(5)]
+        db.session.add_all(platos + [Mesa(numero=i, capacidad=4, disponible=True) for i in range(1, 21)])
+        db.session.flush()
+        for _ in range(n):
+            pedido = Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal('3000'),
+                            total=Decimal('3000'), metodo_pago='efectivo', estado='pendiente')
+            db.session.add(pedido)
+            db.session.flush()
+            db.session.add_all([PedidoItem(pedido_id=pedido.id, menu_item_id=plato.id, nombre_item=plato.nombre,
+                                           cantidad=1, precio_unitario=plato.precio, subtotal=plato.precio)
+                                for plato in platos[:3]])
+        db.session.commit()
+
+
+def test_regresion_n_mas_1_falla(app, crear_usuario, login, monkeypatch):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id)
+    client = login(admin_id)
+    for url in ('/admin/api/pedidos', '/api/mesas', '/admin/api/mesas', '/api/menu', '/cocina/api/cola'):
+        assert client.get(url).status_code == 200
+
+    # Sin el plan de carga, cada pedido lee sus items (y cada item su plato) por separado
+    monkeypatch.setattr(routes.admin, 'cargar_pedidos', lambda query: query)
+    with pytest.raises(PresupuestoExcedido) as error:
+        client.get('/admin/api/pedidos')
+    mensaje = str(error.value)
+    assert '(admin.api_pedidos)' in mensaje and '(presupuesto 4)' in mensaje
+    assert 'FROM pedido_items' in mensaje
+    assert 'models' in mensaje and 'to_dict' in mensaje  # origen de la carga perezosa
+
+
+def test_modo_log_y_limite(app, crear_usuario, login, monkeypatch, caplog):
+    admin_id = crear_usuario('admin')
+    _crear_pedidos(app, admin_id, n=5)
+    monkeypatch.setattr(presupuesto_sql, 'modo', 'log')
+    monkeypatch.setitem(presupuesto_sql.presupuestos, 'admin.api_pedidos', 1)
+    with caplog.at_level(logging.WARNING, logger='boodfood.presupuesto_sql'):
+        assert login(admin_id).get('/admin/api/pedidos').status_code == 200
+    assert 'GET /admin/api/pedidos (admin.api_pedidos)' in caplog.text
+
+    with app.app_context():
+        with presupuesto_sql.limite(2) as sentencias:
+            db.session.query(Pedido).first()
+        assert len(sentencias) == 1
+        assert sentencias[0][1] is None  # dentro del presupuesto no se recorre la pila
+        with pytest.raises(PresupuestoExcedido):
+            with presupuesto_sql.limite(2, 'Items uno a uno') as sentencias:
+                for pedido in Pedido.query.all():
+                    len(pedido.items)
+        origenes = [origen for _, origen in sentencias]
+        assert origenes[:2] == [None, None] and all(origenes[2:])
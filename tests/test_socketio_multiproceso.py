@@ -0,0 +1,260 @@
+"""
+Socket.IO con varios procesos: un emit hecho en un worker llega a los clientes
+conectados a otro worker a través de la cola de mensajes (broker local).
+
+El test client de Flask-SocketIO no admite colas de mensajes, así que el
+worker que escucha es un servidor real y la prueba se conecta por WebSocket.
+"""
+import json
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+from contextlib import contextmanager
+
+import threading
+
+import simple_websocket
+
+from utils.cola_mensajes import BrokerLocal, GestorBrokerLocal, _enviar_trama
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_PREAMBULO = textwrap.dedent('''
+    import os, threading
+    from app import create_app
+    from models import db, Usuario, Pedido
+    from socket_events import socketio
+
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.environ['BD'],
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+        'SOCKETIO_MESSAGE_QUEUE': os.environ['COLA'],
+        'SOCKETIO_ASYNC_MODE': 'threading',
+    })
+''')
+
+# Worker B: servidor con un admin; imprime la cookie de sesión y "listo" cuando
+# su gestor ya está suscrito a la cola
+_SERVIDOR = _PREAMBULO + textwrap.dedent('''
+    with app.app_context():
+        admin = Usuario(nombre='Admin', apellido='Test', email='admin@test.com',
+                        password_hash='x', rol='admin', activo=True)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_id)
+    print(client.get_cookie('session').value, flush=True)
+
+    def avisar():
+        socketio.server.manager.suscrito.wait()
+        print('listo', flush=True)
+
+    threading.Thread(target=avisar, daemon=True).start()
+    socketio.run(app, host='127.0.0.1', port=int(os.environ['PUERTO']), allow_unsafe_werkzeug=True)
+''')
+
+# Worker A: cambia un pedido por HTTP y emite una notificación a caja
+_EMISOR = _PREAMBULO + textwrap.dedent('''
+    with app.app_context():
+        admin_id = Usuario.query.filter_by(email='admin@test.com').one().id
+        pedido = Pedido(usuario_id=admin_id, restaurante_id=1, subtotal=1000, total=1000,
+                        metodo_pago='efectivo', estado='pendiente')
+        db.session.add(pedido)
+        db.session.commit()
+        pedido_id = pedido.id
+    respuesta = app.test_client().put(f'/api/cocina/pedido/{pedido_id}/estado', json={'estado': 'preparando'})
+    assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
+    socketio.emit('nueva_notificacion', {'mensaje': 'desde otro worker'}, room='caja', namespace='/')
+''')
+
+# Worker A de la prueba de la cola: crea dos pedidos, espera a que el worker B
+# cambie el primero y luego entrega el segundo
+_COCINA = _PREAMBULO + textwrap.dedent('''
+    with app.app_context():
+        admin_id = Usuario.query.filter_by(email='admin@test.com').one().id
+        ids = []
+        for _ in range(2):
+            pedido = Pedido(usuario_id=admin_id, restaurante_id=1, subtotal=1000, total=1000,
+                            metodo_pago='efectivo', estado='pendiente')
+            db.session.add(pedido)
+            db.session.commit()
+            ids.append(pedido.id)
+    print(*ids, flush=True)
+    input()
+    respuesta = app.test_client().put(f'/api/cocina/pedido/{ids[1]}/estado', json={'estado': 'entregado'})
+    assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
+''')
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _conectar(puerto, cookie, timeout=30):
+    """Cliente Engine.IO/Socket.IO mínimo sobre WebSocket"""
+    limite = time.monotonic() + timeout
+    while True:
+        try:
+            ws = simple_websocket.Client.connect(
+                f'ws://127.0.0.1:{puerto}/socket.io/?EIO=4&transport=websocket',
+                headers={'Cookie': f'session={cookie}'})
+            break
+        except (ConnectionError, OSError):
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.2)
+    assert ws.receive(timeout=10).startswith('0')    # open de Engine.IO
+    ws.send('40')                                     # conectar al namespace /
+    while not ws.receive(timeout=10).startswith('40'):
+        pass                                          # connection_response puede llegar antes
+    return ws
+
+
+def _recibir_eventos(ws, esperados, timeout=20):
+    recibidos = []
+    limite = time.monotonic() + timeout
+    while not esperados <= set(recibidos) and time.monotonic() < limite:
+        paquete = ws.receive(timeout=max(limite - time.monotonic(), 0.1))
+        if paquete == '2':
+            ws.send('3')                              # ping -> pong
+        elif paquete and paquete.startswith('42'):
+            recibidos.append(json.loads(paquete[2:])[0])
+    return recibidos
+
+
+def _recibir_cola(ws, cantidad, timeout=20):
+    """Los primeros ``cantidad`` cambios de la cola de cocina recibidos"""
+    cambios = []
+    limite = time.monotonic() + timeout
+    while len(cambios) < cantidad and time.monotonic() < limite:
+        paquete = ws.receive(timeout=max(limite - time.monotonic(), 0.1))
+        if paquete == '2':
+            ws.send('3')
+        elif paquete and paquete.startswith('42'):
+            evento, *argumentos = json.loads(paquete[2:])
+            if evento == 'cola_cocina':
+                cambios.append(argumentos[0])
+    return cambios
+
+
+def _peticion(puerto, cookie, metodo, ruta, datos=None):
+    peticion = urllib.request.Request(
+        f'http://127.0.0.1:{puerto}{ruta}', method=metodo,
+        data=json.dumps(datos).encode() if datos is not None else None,
+        headers={'Cookie': f'session={cookie}', 'Content-Type': 'application/json'})
+    with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+        return json.loads(respuesta.read())
+
+
+@contextmanager
+def _worker_b(tmp_path):
+    """Broker local y worker B escuchando; devuelve (entorno, puerto, cookie, ws)"""
+    broker = BrokerLocal('127.0.0.1', 0, clave='secreta')
+    broker.iniciar_en_hilo()
+    puerto = _puerto_libre()
+    entorno = dict(os.environ, BD=str(tmp_path / 'boodfood.db'), COLA=broker.url, PUERTO=str(puerto))
+    registro = open(tmp_path / 'servidor.log', 'w')
+    servidor = subprocess.Popen([sys.executable, '-c', _SERVIDOR], cwd=RAIZ, env=entorno,
+                                stdout=subprocess.PIPE, stderr=registro, text=True)
+    ws = None
+    try:
+        cookie = servidor.stdout.readline().strip()
+        assert cookie, (tmp_path / 'servidor.log').read_text()
+        ws = _conectar(puerto, cookie)
+        for linea in servidor.stdout:                 # werkzeug también escribe aquí
+            if linea.strip() == 'listo':
+                break
+        yield entorno, puerto, cookie, ws
+    finally:
+        if ws is not None:
+            ws.close()
+        servidor.terminate()
+        servidor.wait(timeout=10)
+        registro.close()
+        broker.shutdown()
+        broker.server_close()
+
+
+def test_emit_entre_workers(tmp_path):
+    with _worker_b(tmp_path) as (entorno, _, _, ws):
+        emisor = subprocess.run([sys.executable, '-c', _EMISOR], cwd=RAIZ, env=entorno,
+                                capture_output=True, text=True, timeout=60)
+        assert emisor.returncode == 0, emisor.stderr
+
+        recibidos = _recibir_eventos(ws, {'cola_cocina', 'nueva_notificacion'})
+        assert 'cola_cocina' in recibidos
+        assert 'nueva_notificacion' in recibidos
+
+
+def test_cola_cocina_consistente_entre_workers(tmp_path):
+    """Versiones globales: cada cambio llega una vez y sin huecos, lo haga el worker que lo haga"""
+    with _worker_b(tmp_path) as (entorno, puerto, cookie, ws):
+        worker_a = subprocess.Popen([sys.executable, '-c', _COCINA], cwd=RAIZ, env=entorno, text=True,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            primero, segundo = map(int, worker_a.stdout.readline().split())
+            assert _peticion(puerto, cookie, 'PUT', f'/api/cocina/pedido/{primero}/estado',
+                             {'estado': 'preparando'})['estado'] == 'preparando'
+            worker_a.stdin.write('\n')
+            worker_a.stdin.flush()
+            assert worker_a.wait(timeout=60) == 0, worker_a.stderr.read()
+        finally:
+            worker_a.kill()
+            worker_a.wait()
+
+        cambios = _recibir_cola(ws, 5, timeout=3)
+        assert [(c['version'], c['operacion'], c['pedido']['id']) for c in cambios] == [
+            (1, 'insertar', primero),      # worker A
+            (2, 'insertar', segundo),      # worker A
+            (3, 'actualizar', primero),    # worker B, ya con los dos pedidos de A
+            (4, 'quitar', segundo),        # worker A, ya con el cambio de B
+        ]
+        assert cambios[2]['posicion'] == 0
+        cola = _peticion(puerto, cookie, 'GET', '/cocina/api/cola')
+        assert cola['version'] == 4
+        assert [(p['id'], p['estado']) for p in cola['pedidos']] == [(primero, 'preparando')]
+
+
+class _Explota:
+    def __reduce__(self):
+        return (os.system, ('exit 1',))
+
+
+def test_broker_exige_clave_y_no_usa_pickle():
+    broker = BrokerLocal('127.0.0.1', 0, clave='secreta')
+    broker.iniciar_en_hilo()
+    try:
+        host, puerto = broker.server_address[:2]
+        gestor = GestorBrokerLocal(broker.url, channel='boodfood')
+        recibidos = []
+        escucha = gestor._listen()
+        hilo = threading.Thread(target=lambda: recibidos.append(next(escucha)), daemon=True)
+        hilo.start()
+        assert gestor.suscrito.wait(10)
+
+        # Sin clave: el broker cierra la conexión y no reenvía nada
+        intruso = socket.create_connection((host, puerto))
+        _enviar_trama(intruso, json.dumps({'canal': 'boodfood', 'modo': 'publicar'}).encode())
+        _enviar_trama(intruso, json.dumps({'method': 'emit', 'event': 'falso'}).encode())
+        # Con clave, un pickle se descarta sin deserializar
+        gestor._publish({'method': 'emit', 'event': 'previo'})
+        publicador = gestor._publicador
+        _enviar_trama(publicador, pickle.dumps(_Explota()))
+        gestor._publish({'method': 'emit', 'event': 'legitimo', 'data': {'n': 1}})
+
+        hilo.join(10)
+        assert recibidos == [{'method': 'emit', 'event': 'previo'}]
+        assert next(escucha) == {'method': 'emit', 'event': 'legitimo', 'data': {'n': 1}}
+        intruso.close()
+    finally:
+        broker.shutdown()
+        broker.server_close()
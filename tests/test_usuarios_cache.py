@@ -0,0 +1,33 @@
+"""
+Caché de usuarios de Flask-Login: sin consultas a ``usuarios`` en peticiones y
+conexiones repetidas, e invalidación al cambiar el usuario.
+"""
+from socket_events import socketio
+
+
+def _consultas_usuarios(sentencias):
+    return [s for s in sentencias if 'FROM usuarios' in s]
+
+
+def test_sin_consultas_en_estado_estable(app, crear_usuario, login, contar_consultas):
+    cocinero = login(crear_usuario('cocinero'))
+    assert cocinero.get('/cocina/api/cola').status_code == 200
+
+    with contar_consultas() as sentencias:
+        assert cocinero.get('/cocina/api/cola').status_code == 200
+        socket = socketio.test_client(app, flask_test_client=cocinero)
+        assert socket.is_connected()
+    assert _consultas_usuarios(sentencias) == []
+
+
+def test_cambio_de_rol_invalida(app, crear_usuario, login):
+    cocinero_id = crear_usuario('cocinero')
+    cocinero = login(cocinero_id)
+    admin = login(crear_usuario('admin'))
+    assert cocinero.get('/cocina/api/cola').status_code == 200
+
+    assert admin.put(f'/admin/api/usuarios/{cocinero_id}/rol', json={'rol': 'cajero'}).status_code == 200
+    assert cocinero.get('/cocina/api/cola').status_code == 403
+
+    # Los atributos que no están en la caché se leen del usuario completo
+    assert cocinero.get('/api/check-auth').get_json()['user']['email'].endswith('@test.com')
@@ -0,0 +1,103 @@
+"""
+Acumulados de ventas: se mantienen al crear, cambiar y eliminar pedidos,
+agrupan por día local (America/Bogota) y coinciden con una reconstrucción
+completa.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from models import db, Pedido, VentaResumen
+from utils.ventas_resumen import agrupar, reconstruir_ventas, totales_dia
+
+
+def _pedido(usuario_id, fecha_pedido=None, total='10000', estado='pendiente', metodo_pago='efectivo'):
+    return Pedido(usuario_id=usuario_id, restaurante_id=1, subtotal=Decimal(total), total=Decimal(total),
+                  estado=estado, metodo_pago=metodo_pago, fecha_pedido=fecha_pedido)
+
+
+def _filas():
+    return sorted(
+        (r.fecha, r.hora, r.estado, r.metodo_pago, r.cantidad, Decimal(r.total))
+        for r in VentaResumen.query if r.cantidad or r.total
+    )
+
+
+def test_dia_local_y_transiciones(app, crear_usuario):
+    usuario_id = crear_usuario()
+    with app.app_context():
+        # 03:00 UTC del 2 de enero son las 22:00 del 1 de enero en Bogotá
+        tarde = _pedido(usuario_id, datetime(2025, 1, 2, 3, 0), total='20000')
+        db.session.add_all([tarde, _pedido(usuario_id, datetime(2025, 1, 2, 15, 0), metodo_pago='tarjeta')])
+        db.session.commit()
+
+        assert totales_dia(date(2025, 1, 1)) == (1, Decimal('20000'))
+        assert totales_dia(date(2025, 1, 2)) == (1, Decimal('10000'))
+        assert agrupar('hora', date(2025, 1, 1), date(2025, 1, 2)) == [(22, 1, Decimal('20000'))]
+
+        # Cambio de estado (con el atributo expirado tras el commit)
+        tarde.estado = 'entregado'
+        db.session.commit()
+        assert agrupar('estado', date(2025, 1, 1), date(2025, 1, 3)) == [
+            ('entregado', 1, Decimal('20000')), ('pendiente', 1, Decimal('10000'))]
+
+        # Un rollback no deja rastro en los acumulados
+        tarde.total = Decimal('99999')
+        db.session.flush()
+        db.session.rollback()
+        assert totales_dia(date(2025, 1, 1)) == (1, Decimal('20000'))
+
+        db.session.delete(tarde)
+        db.session.commit()
+        assert totales_dia(date(2025, 1, 1)) == (0, Decimal('0'))
+        assert agrupar('estado', date(2025, 1, 1), date(2025, 1, 2)) == []
+
+
+def test_reconstruccion_coincide(app, crear_usuario):
+    usuario_id = crear_usuario()
+    with app.app_context():
+        pedidos = [_pedido(usuario_id, datetime(2025, 5, d, h, 30), total=str(1000 * h),
+                           estado=('pendiente', 'entregado', 'cancelado')[h % 3])
+                   for d in (1, 2, 3) for h in range(0, 24, 5)]
+        db.session.add_all(pedidos)
+        db.session.commit()
+        for pedido in pedidos[::4]:
+            pedido.metodo_pago = 'transferencia'
+        db.session.commit()
+
+        incremental = _filas()
+        reconstruir_ventas()
+        assert _filas() == incremental
+
+
+def test_dashboard_lee_acumulados(app, crear_usuario, login, contar_consultas):
+    admin_id = crear_usuario('admin')
+    with app.app_context():
+        db.session.add_all([_pedido(admin_id), _pedido(admin_id, total='5000')])
+        db.session.commit()
+    client = login(admin_id)
+
+    with contar_consultas() as sentencias:
+        stats = client.get('/admin/api/stats/dashboard').get_json()
+    assert stats['pedidos_hoy'] == 2
+    assert stats['ventas_hoy'] == 15000.0
+    assert not any('FROM pedidos' in s for s in sentencias)
+    assert client.get('/api/dashboard/stats').get_json()['ventas_hoy'] == 15000.0
+
+    ventas = client.get('/admin/api/stats/ventas?periodo=hoy').get_json()
+    assert ventas['ventas_por_metodo'] == [{'metodo': 'efectivo', 'cantidad': 2, 'total': 15000.0}]
+    assert sum(h['cantidad'] for h in ventas['ventas_por_hora']) == 2
+
+
+def test_upsert_fuera_de_la_transaccion_del_pedido(app, crear_usuario, contar_consultas):
+    usuario_id = crear_usuario()
+    with app.app_context():
+        with contar_consultas() as sentencias:
+            for total in (0.1, 0.1, 0.1):   # importes que llegan como float
+                db.session.add(_pedido(usuario_id, datetime(2025, 3, 1, 17, 0), total=total))
+            db.session.flush()
+            # El pedido ya está insertado pero la fila del acumulado no se ha tocado:
+            # los pedidos concurrentes de la misma hora no esperan por su bloqueo
+            assert not any('ventas_resumen' in s for s in sentencias)
+            db.session.commit()
+        assert sum('ventas_resumen' in s for s in sentencias) == 1
+        assert totales_dia(date(2025, 3, 1)) == (3, Decimal('0.3'))
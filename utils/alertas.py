@@ -0,0 +1,282 @@
+"""
+Motor de alertas del panel de administración.
+
+Mantiene en memoria, por proceso, el conjunto de alertas activas:
+
+* ``inventario:<id>``: stock en o por debajo del mínimo.
+* ``pedido:<id>``: pedido pendiente o en preparación hace más de
+  ``ALERTA_PEDIDO_ATRASADO`` minutos.
+* ``reserva:<id>``: reserva pendiente de confirmar para hoy o mañana (o ya
+  pasada).
+
+Las condiciones se evalúan cuando cambian las filas: un listener de la sesión
+recoge los pedidos, reservas e items de inventario creados, modificados o
+eliminados, y al hacer commit se recalcula sólo su alerta. Los descuentos de
+stock con ``UPDATE`` directo (``utils.inventario_utils``) marcan los ids en la
+sesión para releerlos antes del commit. Las condiciones que dependen del reloj
+(un pedido que se atrasa, una reserva cuya fecha se acerca) quedan agendadas
+por hora de vencimiento y ``revisar()`` sólo mira las que ya vencieron.
+
+Cada alta o baja se envía por Socket.IO a la sala ``admin`` (``alerta_nueva``
+con la alerta, ``alerta_resuelta`` con su id) y los endpoints REST devuelven
+el conjunto en memoria. Como red de seguridad (cambios hechos desde otro
+proceso) el conjunto se reconstruye cada ``ALERTAS_MAX_EDAD`` segundos.
+"""
+import heapq
+import threading
+import time as reloj
+from datetime import datetime, time, timedelta, timezone
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, Inventario, Pedido, Reserva
+from utils.eventos import cambio_alerta
+from utils.inventario_utils import CLAVE_INVENTARIO_MODIFICADO
+from utils.ventas_resumen import zona_horaria
+
+ESTADOS_EN_COCINA = ('pendiente', 'preparando')
+
+# Orden en que se listan las alertas (el mismo de los endpoints originales)
+CATEGORIAS = ('inventario', 'pedidos', 'reservas')
+
+_CLAVE_PENDIENTES = 'alertas_pendientes'
+
+
+def _ahora():
+    return datetime.now(timezone.utc)
+
+
+def _iso(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+# ----- evaluación de cada condición -----
+# Devuelven (alerta, vence): alerta None si la condición no aplica; si aplica,
+# la alerta se activa cuando llega ``vence`` (None = ya)
+
+def evaluar_inventario(item_id, nombre, cantidad, unidad, stock_minimo):
+    if cantidad is None or cantidad > (stock_minimo or 0):
+        return None, None
+    return {
+        'id': f'inventario:{item_id}',
+        'tipo': 'warning',
+        'categoria': 'inventario',
+        'mensaje': f'Stock bajo de {nombre}: {cantidad} {unidad}',
+        'datos': {'id': item_id, 'nombre': nombre, 'cantidad': float(cantidad),
+                  'unidad': unidad, 'stock_minimo': float(stock_minimo or 0)},
+    }, None
+
+
+def evaluar_pedido(pedido_id, estado, mesa_id, total, fecha_pedido):
+    if estado not in ESTADOS_EN_COCINA or fecha_pedido is None:
+        return None, None
+    minutos = current_app.config.get('ALERTA_PEDIDO_ATRASADO', 60) if has_app_context() else 60
+    # fecha_pedido se guarda en UTC sin zona
+    vence = fecha_pedido.replace(tzinfo=timezone.utc) + timedelta(minutes=minutos)
+    return {
+        'id': f'pedido:{pedido_id}',
+        'tipo': 'danger',
+        'categoria': 'pedidos',
+        'mensaje': f'Pedido #{pedido_id} atrasado ({estado})',
+        'datos': {'id': pedido_id, 'estado': estado, 'mesa_id': mesa_id,
+                  'total': float(total or 0), 'fecha_pedido': _iso(fecha_pedido)},
+    }, vence
+
+
+def evaluar_reserva(reserva_id, estado, fecha, hora, nombre_reserva, numero_personas):
+    if estado != 'pendiente' or fecha is None:
+        return None, None
+    # Se alerta desde el día anterior a la reserva (hora local)
+    vence = datetime.combine(fecha - timedelta(days=1), time.min, tzinfo=zona_horaria())
+    return {
+        'id': f'reserva:{reserva_id}',
+        'tipo': 'info',
+        'categoria': 'reservas',
+        'mensaje': f'Reserva #{reserva_id} sin confirmar para {fecha}',
+        'datos': {'id': reserva_id, 'fecha': _iso(fecha), 'hora': _iso(hora),
+                  'nombre_reserva': nombre_reserva, 'numero_personas': numero_personas},
+    }, vence
+
+
+_COLUMNAS = {
+    Inventario: (Inventario.id, Inventario.nombre, Inventario.cantidad, Inventario.unidad, Inventario.stock_minimo),
+    Pedido: (Pedido.id, Pedido.estado, Pedido.mesa_id, Pedido.total, Pedido.fecha_pedido),
+    Reserva: (Reserva.id, Reserva.estado, Reserva.fecha, Reserva.hora, Reserva.nombre_reserva,
+              Reserva.numero_personas),
+}
+_EVALUADORES = {Inventario: evaluar_inventario, Pedido: evaluar_pedido, Reserva: evaluar_reserva}
+_PREFIJOS = {Inventario: 'inventario', Pedido: 'pedido', Reserva: 'reserva'}
+
+
+def _evaluar_objeto(obj):
+    modelo = type(obj)
+    return _EVALUADORES[modelo](*(getattr(obj, c.key) for c in _COLUMNAS[modelo]))
+
+
+class MotorAlertas:
+    """Alertas activas y condiciones agendadas de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._activas = {}     # clave -> alerta (con 'fecha' de activación)
+        self._agendadas = {}   # clave -> (vence, alerta)
+        self._agenda = []      # heap de (vence, clave); puede tener entradas obsoletas
+        self._construido = None
+
+    # ----- construcción -----
+
+    def reconstruir(self):
+        """Recalcula todas las alertas desde la base de datos y emite las diferencias"""
+        evaluaciones = {}
+        consultas = (
+            (Inventario, Inventario.cantidad <= Inventario.stock_minimo),
+            (Pedido, Pedido.estado.in_(ESTADOS_EN_COCINA)),
+            (Reserva, Reserva.estado == 'pendiente'),
+        )
+        for modelo, condicion in consultas:
+            for fila in db.session.execute(select(*_COLUMNAS[modelo]).where(condicion)):
+                evaluaciones[f'{_PREFIJOS[modelo]}:{fila[0]}'] = _EVALUADORES[modelo](*fila)
+
+        ahora = _ahora()
+        with self._lock:
+            anteriores = self._activas
+            self._activas, self._agendadas, self._agenda = {}, {}, []
+            cambios = [self._aplicar(clave, alerta, vence, ahora, anteriores.get(clave))
+                       for clave, (alerta, vence) in evaluaciones.items()]
+            cambios += [('alerta_resuelta', {'id': clave}) for clave in anteriores if clave not in self._activas]
+            self._construido = reloj.monotonic()
+        self._emitir(cambios)
+
+    def asegurar(self):
+        """Construye el conjunto si aún no existe o si está vencido"""
+        max_edad = current_app.config.get('ALERTAS_MAX_EDAD')
+        construido = self._construido
+        if construido is None or (max_edad and reloj.monotonic() - construido > max_edad):
+            self.reconstruir()
+
+    def invalidar(self):
+        with self._lock:
+            self._construido = None
+
+    # ----- actualización -----
+
+    def _aplicar(self, clave, alerta, vence, ahora, anterior=None):
+        """Refleja una evaluación; devuelve el evento a emitir o None. Requiere el lock."""
+        anterior = self._activas.pop(clave, anterior)
+        self._agendadas.pop(clave, None)
+        if alerta is not None and (vence is None or vence <= ahora):
+            # Conservar la fecha de activación si la alerta ya estaba activa
+            alerta['fecha'] = anterior['fecha'] if anterior else ahora.isoformat()
+            self._activas[clave] = alerta
+            if anterior == alerta:
+                return None
+            return 'alerta_nueva', alerta
+        if alerta is not None:
+            self._agendadas[clave] = (vence, alerta)
+            heapq.heappush(self._agenda, (vence, clave))
+        if anterior is not None:
+            return 'alerta_resuelta', {'id': clave}
+        return None
+
+    def actualizar(self, evaluaciones):
+        """Aplica evaluaciones nuevas ({clave: (alerta, vence)}) y emite los cambios"""
+        if self._construido is None:
+            return
+        ahora = _ahora()
+        with self._lock:
+            cambios = [self._aplicar(clave, alerta, vence, ahora) for clave, (alerta, vence) in evaluaciones.items()]
+        self._emitir(cambios)
+
+    def revisar(self):
+        """Activa las condiciones agendadas cuyo vencimiento ya pasó"""
+        ahora = _ahora()
+        cambios = []
+        with self._lock:
+            while self._agenda and self._agenda[0][0] <= ahora:
+                vence, clave = heapq.heappop(self._agenda)
+                agendada = self._agendadas.get(clave)
+                if agendada is None or agendada[0] != vence:
+                    continue  # entrada obsoleta (la condición cambió después)
+                cambios.append(self._aplicar(clave, agendada[1], None, ahora))
+        self._emitir(cambios)
+
+    # ----- consultas -----
+
+    def activas(self, categorias=CATEGORIAS):
+        """Alertas activas de las categorías pedidas, en el orden de ``CATEGORIAS``"""
+        self.asegurar()
+        self.revisar()
+        with self._lock:
+            alertas = [a for a in self._activas.values() if a['categoria'] in categorias]
+        return sorted(alertas, key=lambda a: (CATEGORIAS.index(a['categoria']), a['datos']['id']))
+
+    # ----- envío -----
+
+    def _emitir(self, cambios):
+        cambios = [c for c in cambios if c]
+        if not cambios:
+            return
+        for evento, datos in cambios:
+            cambio_alerta(evento, datos)
+
+
+motor_alertas = MotorAlertas()
+
+
+def iniciar_revision_periodica(app, socketio):
+    """Revisa las alertas agendadas cada ``ALERTAS_INTERVALO`` segundos en segundo plano"""
+    intervalo = app.config.get('ALERTAS_INTERVALO')
+    if not intervalo:
+        return
+
+    def _bucle():
+        while True:
+            socketio.sleep(intervalo)
+            try:
+                with app.app_context():
+                    motor_alertas.asegurar()
+                    motor_alertas.revisar()
+            except Exception as e:
+                app.logger.warning(f'Error revisando alertas: {e}')
+
+    socketio.start_background_task(_bucle)
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'before_commit')
+def _releer_inventario_modificado(session):
+    # Stock cambiado con UPDATE directo: leer los valores finales antes del commit
+    ids = session.info.pop(CLAVE_INVENTARIO_MODIFICADO, None)
+    if not ids:
+        return
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, {})
+    for fila in session.execute(select(*_COLUMNAS[Inventario]).where(Inventario.id.in_(ids))):
+        pendientes[f'inventario:{fila[0]}'] = evaluar_inventario(*fila)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_alertas(session, flush_context):
+    pendientes = None
+    for obj in session.new.union(session.dirty):
+        if type(obj) in _EVALUADORES and obj.id is not None:
+            pendientes = pendientes if pendientes is not None else session.info.setdefault(_CLAVE_PENDIENTES, {})
+            pendientes[f'{_PREFIJOS[type(obj)]}:{obj.id}'] = _evaluar_objeto(obj)
+    for obj in session.deleted:
+        if type(obj) in _EVALUADORES and obj.id is not None:
+            pendientes = pendientes if pendientes is not None else session.info.setdefault(_CLAVE_PENDIENTES, {})
+            pendientes[f'{_PREFIJOS[type(obj)]}:{obj.id}'] = (None, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_alertas(session):
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if pendientes:
+        motor_alertas.actualizar(pendientes)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_cambios_alertas(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_PENDIENTES, None)
+        session.info.pop(CLAVE_INVENTARIO_MODIFICADO, None)
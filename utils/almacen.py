@@ -0,0 +1,314 @@
+"""
+Almacén de archivos subidos, direccionado por contenido.
+
+Las fotos de perfil (``static/uploads/users``) y las imágenes del menú
+(``static/uploads/menu``) se guardan con el SHA-256 de su contenido como
+nombre: el hash se calcula mientras el archivo se copia a disco por bloques,
+así que subir dos veces la misma imagen deja un solo archivo.
+
+Cada archivo tiene una fila en ``archivos_subidos`` con cuántos usuarios
+(``foto_perfil``) e items del menú (``imagen_url``) lo usan. Como en
+``utils.ventas_resumen``, un listener de la sesión ajusta el contador en cada
+flush (al asignar, cambiar o quitar la URL, o al borrar la fila) dentro de la
+misma transacción.
+
+``barrer`` borra los archivos registrados sin referencias desde hace más de
+``UPLOADS_GRACIA`` segundos (y sus variantes de ``utils.imagenes``). Antes de
+borrar uno comprueba que ninguna columna de imagen lo use (también las que no
+se cuentan, como ``Mesero.foto`` o ``ProductoPiscina.imagen``, y las URL
+absolutas). Los archivos sin fila (subidas anteriores a este almacén) nunca se
+borran en el barrido: sólo ``reconstruir`` (al arrancar con la tabla vacía o
+con ``flask reconstruir-uploads``) los registra, y a partir de ahí se tratan
+como los demás. Se ejecuta cada ``UPLOADS_LIMPIEZA_INTERVALO`` segundos y con
+``flask limpiar-uploads``.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+from models import db, ArchivoSubido, MenuItem, Mesero, ProductoPiscina, Usuario
+from utils.imagenes import derivados, es_derivado
+
+URL_UPLOADS = '/static/uploads/'
+CARPETAS = ('menu', 'users')
+BLOQUE = 64 * 1024
+
+# Columnas que referencian archivos subidos (con contador de referencias)
+_REFERENCIAS = ((Usuario, 'foto_perfil'), (MenuItem, 'imagen_url'))
+# Todas las columnas de imagen: un archivo que aparece en cualquiera no se borra
+_COLUMNAS_IMAGEN = _REFERENCIAS + ((Mesero, 'foto'), (ProductoPiscina, 'imagen'))
+
+_PREFIJO_TEMPORAL = '.subida-'
+_SUFIJO_BORRANDO = '.borrando'
+
+
+def _carpeta(carpeta):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], carpeta)
+
+
+def _ruta(url):
+    """Ruta en disco de una URL del almacén (None si no es una subida propia)"""
+    if not url or not url.startswith(URL_UPLOADS):
+        return None
+    carpeta, _, nombre = url[len(URL_UPLOADS):].partition('/')
+    if carpeta not in CARPETAS or not nombre or '/' in nombre or nombre.startswith('.'):
+        return None
+    return os.path.join(_carpeta(carpeta), nombre)
+
+
+def _extension(nombre_archivo):
+    extension = nombre_archivo.rsplit('.', 1)[-1].lower() if '.' in nombre_archivo else 'bin'
+    return 'jpg' if extension == 'jpeg' else extension
+
+
+def _hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _registrar(url, sha256, tamano):
+    """Crea la fila del archivo (sin referencias) o renueva su ``actualizado``"""
+    tabla = ArchivoSubido.__table__
+    ahora = datetime.utcnow()
+    conexion = db.session.connection()
+    resultado = conexion.execute(update(tabla).where(tabla.c.url == url).values(actualizado=ahora))
+    if resultado.rowcount:
+        return
+    valores = {'url': url, 'sha256': sha256, 'tamano': tamano, 'referencias': 0, 'actualizado': ahora}
+    dialecto = conexion.dialect.name
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(tabla).values(**valores).on_duplicate_key_update(actualizado=ahora)
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+        stmt = insert_sqlite(tabla).values(**valores).on_conflict_do_update(
+            index_elements=[tabla.c.url], set_={'actualizado': ahora})
+    else:
+        stmt = insert(tabla).values(**valores)
+    conexion.execute(stmt)
+
+
+def guardar(archivo, carpeta):
+    """Guarda un archivo subido (``FileStorage``) en ``static/uploads/<carpeta>``.
+
+    Devuelve ``(url, nuevo)``; ``nuevo`` es False si ya existía un archivo con el
+    mismo contenido. La fila queda registrada en la transacción actual.
+    """
+    destino = _carpeta(carpeta)
+    os.makedirs(destino, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=destino, prefix=_PREFIJO_TEMPORAL)
+    try:
+        sha, tamano = hashlib.sha256(), 0
+        with os.fdopen(descriptor, 'wb') as salida:
+            for bloque in iter(lambda: archivo.stream.read(BLOQUE), b''):
+                sha.update(bloque)
+                salida.write(bloque)
+                tamano += len(bloque)
+        nombre = f'{sha.hexdigest()}.{_extension(archivo.filename)}'
+        url = f'{URL_UPLOADS}{carpeta}/{nombre}'
+        # Primero la fila (renueva ``actualizado``) y luego el archivo: si el
+        # barrido lo estaba borrando, o lo devuelve a su sitio o lo repone aquí
+        _registrar(url, sha.hexdigest(), tamano)
+        final = os.path.join(destino, nombre)
+        nuevo = not os.path.exists(final)
+        if nuevo:
+            os.replace(temporal, final)
+        return url, nuevo
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# ----- contadores de referencias -----
+
+def _valor_anterior(obj, atributo):
+    historial = db.inspect(obj).attrs[atributo].history
+    if historial.deleted:
+        return historial.deleted[0]
+    if historial.unchanged:
+        return historial.unchanged[0]
+    return getattr(obj, atributo)
+
+
+@event.listens_for(Session, 'after_flush')
+def _contar_referencias(session, flush_context):
+    deltas = defaultdict(int)
+    for modelo, atributo in _REFERENCIAS:
+        for obj in session.new:
+            if isinstance(obj, modelo):
+                deltas[getattr(obj, atributo)] += 1
+        for obj in session.dirty:
+            if isinstance(obj, modelo) and db.inspect(obj).attrs[atributo].history.has_changes():
+                deltas[_valor_anterior(obj, atributo)] -= 1
+                deltas[getattr(obj, atributo)] += 1
+        for obj in session.deleted:
+            if isinstance(obj, modelo):
+                deltas[_valor_anterior(obj, atributo)] -= 1
+    cambios = sorted((url, delta) for url, delta in deltas.items()
+                     if delta and url and url.startswith(URL_UPLOADS))
+    if not cambios:
+        return
+    tabla = ArchivoSubido.__table__
+    conexion = session.connection()
+    ahora = datetime.utcnow()
+    # Orden fijo de URLs para que dos transacciones no se bloqueen en cruz
+    for url, delta in cambios:
+        conexion.execute(update(tabla).where(tabla.c.url == url)
+                         .values(referencias=tabla.c.referencias + delta, actualizado=ahora))
+
+
+def _activar_historial(target, value, oldvalue, initiator):
+    pass
+
+
+for _modelo, _atributo in _REFERENCIAS:
+    event.listen(getattr(_modelo, _atributo), 'set', _activar_historial, active_history=True)
+
+
+def _urls_referenciadas():
+    """URLs del almacén usadas en cualquier columna de imagen (las absolutas, por su ruta)"""
+    urls = set()
+    for modelo, atributo in _COLUMNAS_IMAGEN:
+        columna = getattr(modelo, atributo)
+        for valor in db.session.scalars(select(columna).where(columna.like(f'%{URL_UPLOADS}%')).distinct()):
+            urls.add(valor[valor.index(URL_UPLOADS):].split('?', 1)[0].split('#', 1)[0])
+    return urls
+
+
+# ----- barrido de huérfanos -----
+
+def _borrar_archivo(ruta, eliminar_fila=None):
+    """Aparta el archivo, borra su fila (si ``eliminar_fila`` lo confirma) y lo elimina.
+
+    Si la fila ya no se puede borrar (alguien volvió a subirlo o a usarlo),
+    el archivo vuelve a su sitio y devuelve None; si no, los bytes liberados.
+    """
+    apartado = f'{ruta}{_SUFIJO_BORRANDO}'
+    try:
+        os.replace(ruta, apartado)
+    except FileNotFoundError:
+        apartado = None
+    if eliminar_fila is not None and not eliminar_fila():
+        if apartado is not None:
+            os.replace(apartado, ruta)
+        return None
+    liberado = 0
+    for archivo in [apartado, *derivados(ruta)]:
+        if archivo is None:
+            continue
+        try:
+            liberado += os.path.getsize(archivo)
+            os.remove(archivo)
+        except FileNotFoundError:
+            pass
+    return liberado
+
+
+def barrer(gracia=None):
+    """Borra los archivos que nadie usa desde hace más de ``gracia`` segundos.
+
+    Devuelve ``{'archivos': n, 'bytes': n}``.
+    """
+    if gracia is None:
+        gracia = current_app.config.get('UPLOADS_GRACIA', 86400)
+    limite = datetime.utcnow() - timedelta(seconds=gracia)
+    referenciadas = _urls_referenciadas()
+    tabla = ArchivoSubido.__table__
+    borrados, liberado = 0, 0
+
+    candidatos = db.session.scalars(
+        select(ArchivoSubido.url).where(ArchivoSubido.referencias <= 0, ArchivoSubido.actualizado < limite)
+    ).all()
+    for url in candidatos:
+        if url in referenciadas:
+            continue  # contador desfasado: lo corrige ``reconstruir``
+        ruta = _ruta(url)
+
+        def eliminar_fila(url=url):
+            resultado = db.session.execute(delete(tabla).where(
+                tabla.c.url == url, tabla.c.referencias <= 0, tabla.c.actualizado < limite))
+            db.session.commit()
+            return resultado.rowcount == 1
+
+        if ruta is None:
+            eliminar_fila()
+            continue
+        bytes_archivo = _borrar_archivo(ruta, eliminar_fila)
+        if bytes_archivo is not None:
+            borrados += 1
+            liberado += bytes_archivo
+
+    # Restos de subidas o borrados interrumpidos de este almacén; los archivos
+    # sin fila se dejan (``reconstruir`` los registra)
+    limite_mtime = time.time() - gracia
+    for carpeta in CARPETAS:
+        directorio = _carpeta(carpeta)
+        if not os.path.isdir(directorio):
+            continue
+        for nombre in os.listdir(directorio):
+            if not (nombre.startswith(_PREFIJO_TEMPORAL) or nombre.endswith(_SUFIJO_BORRANDO)):
+                continue
+            ruta = os.path.join(directorio, nombre)
+            if os.path.isfile(ruta) and os.path.getmtime(ruta) < limite_mtime:
+                liberado += os.path.getsize(ruta)
+                os.remove(ruta)
+    return {'archivos': borrados, 'bytes': liberado}
+
+
+def reconstruir():
+    """Recalcula ``archivos_subidos``: registra los archivos del disco y recuenta referencias"""
+    conteo = defaultdict(int)
+    for modelo, atributo in _REFERENCIAS:
+        columna = getattr(modelo, atributo)
+        for url in db.session.scalars(select(columna).where(columna.like(f'{URL_UPLOADS}%'))):
+            conteo[url] += 1
+
+    existentes = set(db.session.scalars(select(ArchivoSubido.url)))
+    ahora = datetime.utcnow()
+    nuevas = []
+    for carpeta in CARPETAS:
+        directorio = _carpeta(carpeta)
+        if not os.path.isdir(directorio):
+            continue
+        for nombre in sorted(os.listdir(directorio)):
+            ruta = os.path.join(directorio, nombre)
+            url = f'{URL_UPLOADS}{carpeta}/{nombre}'
+            if (url in existentes or not os.path.isfile(ruta) or es_derivado(nombre)
+                    or nombre.startswith('.') or nombre.endswith(_SUFIJO_BORRANDO)):
+                continue
+            nuevas.append({'url': url, 'sha256': _hash_archivo(ruta), 'tamano': os.path.getsize(ruta),
+                           'referencias': 0, 'actualizado': ahora})
+    if nuevas:
+        db.session.execute(insert(ArchivoSubido), nuevas)
+    tabla = ArchivoSubido.__table__
+    db.session.execute(update(tabla).values(referencias=0))
+    for url, referencias in sorted(conteo.items()):
+        db.session.execute(update(tabla).where(tabla.c.url == url).values(referencias=referencias))
+    db.session.commit()
+    return len(existentes) + len(nuevas)
+
+
+def iniciar_limpieza_periodica(app, socketio):
+    """Barre los archivos huérfanos cada ``UPLOADS_LIMPIEZA_INTERVALO`` segundos"""
+    intervalo = app.config.get('UPLOADS_LIMPIEZA_INTERVALO')
+    if not intervalo:
+        return
+
+    def _bucle():
+        while True:
+            socketio.sleep(intervalo)
+            try:
+                with app.app_context():
+                    barrer()
+            except Exception as e:
+                app.logger.warning(f'Error limpiando uploads: {e}')
+
+    socketio.start_background_task(_bucle)
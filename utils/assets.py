@@ -0,0 +1,223 @@
+"""
+Paquetes de CSS y JavaScript con huella en el nombre.
+
+Cada página (``publico``, ``admin``, ``cocina``, ``caja``) carga un solo CSS y
+un solo JS: los archivos de ``PAQUETES`` se concatenan, se minifican (con
+``rcssmin``/``rjsmin`` si están instalados) y se escriben en ``static/dist``
+con un hash del contenido en el nombre. Los módulos que el panel de admin
+carga bajo demanda (``js/admin/*.js``) se minifican y versionan uno a uno.
+
+El paso de construcción genera además ``static/dist/manifest.json``::
+
+    python -m utils.assets
+
+En ejecución, las plantillas piden los paquetes con ``{{ assets('admin',
+'css') }}`` / ``{{ assets('admin', 'js') }}``, las URLs sueltas con
+``{{ asset_url('js/admin/pedidos.js') }}`` y el mapa de módulos con
+``{{ asset_modulos('js/admin/') }}``. Como un cambio de contenido cambia
+el nombre, ``static/dist`` se sirve con ``Cache-Control: immutable`` de un
+año y el navegador no vuelve a preguntar por ellos.
+
+Sin manifiesto (desarrollo) o con ``ASSETS_PAQUETES = False`` se enlazan los
+archivos originales, uno por etiqueta y con ``?v=`` según su fecha de
+modificación.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+from flask import request, url_for
+from markupsafe import Markup, escape
+
+CARPETA_DIST = 'dist'
+MANIFIESTO = 'manifest.json'
+MAX_EDAD_INMUTABLE = 365 * 24 * 3600
+
+# Archivos de cada paquete, en orden de carga (rutas relativas a ``static``)
+PAQUETES = {
+    'publico': {
+        'css': ['css/style.css'],
+        'js': ['js/boodfood.js', 'js/main.js'],
+    },
+    'admin': {
+        'css': ['css/styles.css', 'css/admin.css'],
+        'js': ['js/boodfood.js', 'js/websocket.js', 'js/adminPanel.js'],
+    },
+    'cocina': {
+        'css': ['css/style.css', 'css/styles.css'],
+        'js': ['js/boodfood.js', 'js/websocket.js'],
+    },
+    'caja': {
+        'css': ['css/style.css', 'css/styles.css'],
+        'js': ['js/boodfood.js', 'js/websocket.js'],
+    },
+}
+
+# Módulos sueltos (se cargan bajo demanda), versionados uno a uno
+MODULOS = ['js/admin/*.js']
+
+
+def _minificar(tipo, contenido):
+    try:
+        if tipo == 'css':
+            from rcssmin import cssmin
+            return cssmin(contenido)
+        from rjsmin import jsmin
+        return jsmin(contenido)
+    except ImportError:
+        # Sin minificador: sólo sangrías y líneas vacías (nunca cambia el significado)
+        return '\n'.join(linea.strip() for linea in contenido.splitlines() if linea.strip())
+
+
+def _leer(carpeta_static, ruta):
+    with open(os.path.join(carpeta_static, ruta), encoding='utf-8-sig') as f:
+        return f.read()
+
+
+def _escribir(carpeta_dist, nombre, tipo, contenido):
+    huella = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:12]
+    archivo = f'{nombre}.{huella}.{tipo}'
+    ruta = os.path.join(carpeta_dist, archivo)
+    if not os.path.exists(ruta):
+        with open(f'{ruta}.tmp', 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(f'{ruta}.tmp', ruta)
+    return f'{CARPETA_DIST}/{archivo}'
+
+
+def construir(carpeta_static, minificar=True):
+    """Escribe los paquetes y módulos en ``static/dist`` y devuelve el manifiesto.
+
+    El manifiesto tiene ``paquetes`` (``{paquete: {tipo: ruta}}``) y ``archivos``
+    (``{ruta original: ruta versionada}`` de los módulos sueltos).
+    """
+    carpeta_dist = os.path.join(carpeta_static, CARPETA_DIST)
+    os.makedirs(carpeta_dist, exist_ok=True)
+    manifiesto = {'paquetes': {}, 'archivos': {}}
+
+    for paquete, tipos in PAQUETES.items():
+        for tipo, rutas in tipos.items():
+            partes = []
+            for ruta in rutas:
+                contenido = _leer(carpeta_static, ruta)
+                partes.append(_minificar(tipo, contenido) if minificar else contenido)
+            # ';' separa los scripts por si alguno no termina en punto y coma
+            contenido = ('\n;\n' if tipo == 'js' else '\n').join(partes) + '\n'
+            manifiesto['paquetes'].setdefault(paquete, {})[tipo] = \
+                _escribir(carpeta_dist, paquete, tipo, contenido)
+
+    for patron in MODULOS:
+        for ruta_abs in sorted(glob.glob(os.path.join(carpeta_static, patron))):
+            ruta = os.path.relpath(ruta_abs, carpeta_static).replace(os.sep, '/')
+            nombre, tipo = os.path.splitext(ruta)
+            contenido = _leer(carpeta_static, ruta)
+            contenido = _minificar(tipo[1:], contenido) if minificar else contenido
+            manifiesto['archivos'][ruta] = _escribir(
+                carpeta_dist, nombre.split('/', 1)[-1].replace('/', '-'), tipo[1:], contenido)
+
+    destino = os.path.join(carpeta_dist, MANIFIESTO)
+    with open(f'{destino}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, sort_keys=True)
+    os.replace(f'{destino}.tmp', destino)
+    return manifiesto
+
+
+class Assets:
+    """Manifiesto de ``static/dist`` cargado una vez por proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carpeta_static = None
+        self._activo = True
+        self._manifiesto = None
+        self._cargado = False
+
+    def iniciar(self, app):
+        with self._lock:
+            self._carpeta_static = app.static_folder
+            self._activo = app.config.get('ASSETS_PAQUETES', True)
+            self._manifiesto, self._cargado = None, False
+        app.jinja_env.globals.update(assets=self.etiquetas, asset_url=self.url, asset_modulos=self.modulos)
+
+        @app.after_request
+        def _cache_inmutable(response):
+            """Los archivos de ``static/dist`` nunca cambian de contenido"""
+            if (request.endpoint == 'static' and response.status_code in (200, 304)
+                    and (request.view_args or {}).get('filename', '').startswith(f'{CARPETA_DIST}/')):
+                response.cache_control.public = True
+                response.cache_control.max_age = MAX_EDAD_INMUTABLE
+                response.cache_control.immutable = True
+                response.cache_control.no_cache = None
+            return response
+
+    def manifiesto(self):
+        """Manifiesto construido, o None si no hay (o los paquetes están desactivados)"""
+        if not self._activo:
+            return None
+        with self._lock:
+            if not self._cargado:
+                try:
+                    with open(os.path.join(self._carpeta_static, CARPETA_DIST, MANIFIESTO), encoding='utf-8') as f:
+                        self._manifiesto = json.load(f)
+                except (OSError, ValueError):
+                    self._manifiesto = None
+                self._cargado = True
+            return self._manifiesto
+
+    def _original(self, ruta):
+        try:
+            version = int(os.path.getmtime(os.path.join(self._carpeta_static, ruta)))
+        except OSError:
+            version = None
+        return url_for('static', filename=ruta, v=version)
+
+    def url(self, ruta):
+        """URL de un archivo de ``static`` (versionada si está en el manifiesto)"""
+        manifiesto = self.manifiesto()
+        if manifiesto and ruta in manifiesto['archivos']:
+            return url_for('static', filename=manifiesto['archivos'][ruta])
+        return self._original(ruta)
+
+    def urls(self, paquete, tipo):
+        manifiesto = self.manifiesto()
+        if manifiesto and tipo in manifiesto['paquetes'].get(paquete, {}):
+            return [url_for('static', filename=manifiesto['paquetes'][paquete][tipo])]
+        return [self._original(ruta) for ruta in PAQUETES[paquete][tipo]]
+
+    def modulos(self, prefijo):
+        """``{ruta original: url}`` de los módulos sueltos bajo ``prefijo``"""
+        rutas = []
+        for patron in MODULOS:
+            rutas += [os.path.relpath(r, self._carpeta_static).replace(os.sep, '/')
+                      for r in sorted(glob.glob(os.path.join(self._carpeta_static, patron)))]
+        return {ruta: self.url(ruta) for ruta in rutas if ruta.startswith(prefijo)}
+
+    def etiquetas(self, paquete, tipo):
+        """``<link>``/``<script>`` del paquete para las plantillas"""
+        if tipo == 'css':
+            plantilla = '<link rel="stylesheet" href="{}" />'
+        else:
+            plantilla = '<script src="{}"></script>'
+        return Markup('\n'.join(plantilla.format(escape(url)) for url in self.urls(paquete, tipo)))
+
+
+assets = Assets()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construye los paquetes de static/dist')
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'static'))
+    parser.add_argument('--sin-minificar', action='store_true')
+    args = parser.parse_args()
+    manifiesto = construir(args.static, minificar=not args.sin_minificar)
+    for paquete, tipos in sorted(manifiesto['paquetes'].items()):
+        for tipo, ruta in sorted(tipos.items()):
+            print(f'{paquete:8} {tipo:4} {ruta}')
+    print(f'{len(manifiesto["archivos"])} módulos sueltos')
+
+
+if __name__ == '__main__':
+    main()
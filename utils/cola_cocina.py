@@ -0,0 +1,309 @@
+"""
+Cola de cocina mantenida en el servidor.
+
+Guarda, por proceso, los pedidos activos (``pendiente``, ``preparando``,
+``enviado``) ya serializados y ordenados por ``(fecha_pedido, id)``. Las
+pantallas de cocina piden una vez la foto completa (``/cocina/api/cola``) y
+después reciben por Socket.IO, en la sala ``cocina``, sólo los cambios::
+
+    {'version': 42, 'operacion': 'insertar' | 'actualizar' | 'quitar' | 'sin_cambios',
+     'posicion': 3, 'pedido': {...}}           # 'quitar' y 'sin_cambios' sólo traen {'id': ...}
+
+Cada cambio incrementa ``version``; si un cliente ve un salto, vuelve a pedir
+la foto.
+
+Los pedidos tocados en cada commit (el pedido o cualquiera de sus items) se
+anotan con los eventos de la sesión de SQLAlchemy, así que cubre todas las
+rutas que crean pedidos o cambian su estado. Como después del commit la
+sesión no puede consultar, la recarga de esos pedidos (una sola consulta) y
+el envío de los cambios se hacen en ``sincronizar()``, que se llama al cerrar
+el contexto de la aplicación (fin de la petición) y antes de leer la cola. Cada ``COLA_COCINA_MAX_EDAD``
+segundos se reconstruye desde la base de datos.
+
+Las recargas (``sincronizar`` y ``reconstruir``) van de una en una: tomar los
+ids, consultar, aplicar y emitir ocurre bajo ``_lock_recarga``. Si dos
+peticiones terminan a la vez, la que consulta después aplica después, y una
+foto antigua nunca pisa a una más reciente. Las consultas usan
+``populate_existing``: si la sesión ya tenía esos pedidos cargados (otra
+consulta de la misma petición), se sobrescriben con lo que hay en la base.
+
+Con varios procesos (``COLA_COCINA_GLOBAL``, por defecto cuando hay
+``SOCKETIO_MESSAGE_QUEUE``) la versión es global: cada commit registra sus
+pedidos en ``cola_cocina_cambios`` y el id de cada fila es la versión de ese
+cambio. Todos los procesos aplican las filas en orden, pero sólo el que hizo
+el commit envía el cambio a la sala ``cocina`` (una fila que no cambia nada
+visible se envía como ``sin_cambios`` para no dejar huecos); los demás las
+leen al servir la foto o al sincronizar sus propios commits. Las
+reconstrucciones no envían nada: cada cambio ya lo envió su proceso.
+"""
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from models import db, CambioColaCocina, Pedido, PedidoItem
+from utils.eventos import cambio_cola_cocina
+from utils.pedido_utils import cargar_pedidos
+
+logger = logging.getLogger('boodfood.cola_cocina')
+
+ESTADOS_COLA = ('pendiente', 'preparando', 'enviado')
+
+_CLAVE_PENDIENTES = 'cola_cocina_pendientes'
+
+# Un id que falta en el registro puede ser un commit de otro proceso que aún no
+# terminó: se relee unas veces antes de darlo por perdido
+_REINTENTOS_HUECO = 3
+_ESPERA_HUECO = 0.05
+
+
+def _orden(pedido):
+    return (pedido.fecha_pedido.isoformat() if pedido.fecha_pedido else '', pedido.id)
+
+
+def _entradas(pedidos):
+    return {p.id: (_orden(p), p.to_dict(resumen=True)) for p in pedidos if p.estado in ESTADOS_COLA}
+
+
+class ColaCocina:
+    """Pedidos activos serializados, en orden de llegada"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializa consulta + aplicación + envío; _lock sólo protege las estructuras
+        self._lock_recarga = threading.Lock()
+        self._pedidos = {}     # pedido_id -> (orden, datos)
+        self._orden = []       # claves de orden, ordenadas
+        self._sucios = set()   # ids tocados en commits aún no sincronizados
+        self._propios = set()  # versiones registradas por commits de este proceso (modo global)
+        self._version = 0
+        self._construido = None
+        self._global = False
+
+    def iniciar(self, app):
+        """Elige la versión por proceso o la global (``COLA_COCINA_GLOBAL``)"""
+        modo_global = app.config.get('COLA_COCINA_GLOBAL')
+        if modo_global is None:
+            modo_global = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+        with self._lock:
+            self._global = modo_global
+            self._propios.clear()
+            self._construido = None
+
+    @property
+    def es_global(self):
+        return self._global
+
+    # ----- construcción -----
+
+    def reconstruir(self):
+        """Recarga la cola completa y emite las diferencias con la anterior"""
+        with self._lock_recarga:
+            with self._lock:
+                self._sucios.clear()
+            version = None
+            if self._global:
+                # Antes que los pedidos: lo registrado hasta aquí ya está en la foto
+                version = db.session.execute(select(func.max(CambioColaCocina.id))).scalar() or 0
+                self._purgar_registro()
+            pedidos = cargar_pedidos(Pedido.query.populate_existing().filter(Pedido.estado.in_(ESTADOS_COLA))).all()
+            with self._lock:
+                actuales = {p.id: (_orden(p), p.to_dict(resumen=True)) for p in pedidos}
+                ids = set(actuales) | set(self._pedidos)
+                cambios = [self._aplicar(pid, actuales.get(pid)) for pid in sorted(ids)]
+                if version is not None:
+                    # Cada cambio ya lo envió el proceso que lo registró
+                    cambios = []
+                    self._version = version
+                    self._propios = {v for v in self._propios if v > version}
+                self._construido = time.monotonic()
+            self._emitir(cambios)
+
+    def asegurar(self):
+        """Construye la cola si aún no existe o si está vencida"""
+        max_edad = current_app.config.get('COLA_COCINA_MAX_EDAD')
+        construido = self._construido
+        if construido is None or (max_edad and time.monotonic() - construido > max_edad):
+            self.reconstruir()
+
+    def invalidar(self):
+        with self._lock:
+            self._construido = None
+
+    # ----- actualización -----
+
+    def marcar(self, pedido_ids):
+        """Anota pedidos cambiados en un commit; se recargan en ``sincronizar()``"""
+        with self._lock:
+            self._sucios.update(pedido_ids)
+
+    def marcar_propios(self, versiones):
+        """Anota versiones del registro global creadas por este proceso; se envían en ``sincronizar()``"""
+        with self._lock:
+            self._propios.update(versiones)
+
+    def sincronizar(self, forzar=False):
+        """Recarga los pedidos anotados y emite los cambios a la sala de cocina.
+
+        En modo global lee además los cambios registrados por otros procesos
+        (siempre con ``forzar``; si no, sólo cuando este proceso tiene cambios
+        propios pendientes de enviar).
+        """
+        if self._construido is None:
+            return
+        if self._global:
+            if forzar or self._propios:
+                with self._lock_recarga:
+                    completo = self._sincronizar_registro()
+                if not completo:
+                    self.reconstruir()
+            return
+        if not self._sucios:
+            return
+        with self._lock_recarga:
+            with self._lock:
+                ids, self._sucios = self._sucios, set()
+            if not ids:
+                return
+            pedidos = cargar_pedidos(Pedido.query.populate_existing().filter(Pedido.id.in_(ids))).all()
+            actuales = _entradas(pedidos)
+            with self._lock:
+                cambios = [self._aplicar(pid, actuales.get(pid)) for pid in sorted(ids)]
+            self._emitir(cambios)
+
+    def _sincronizar_registro(self):
+        """Aplica en orden las filas nuevas de ``cola_cocina_cambios``. Requiere ``_lock_recarga``.
+
+        Devuelve False si falta una versión (inserción revertida o filas ya
+        purgadas): hay que reconstruir la cola.
+        """
+        for intento in range(_REINTENTOS_HUECO):
+            filas = db.session.execute(
+                select(CambioColaCocina.id, CambioColaCocina.pedido_id)
+                .where(CambioColaCocina.id > self._version)
+                .order_by(CambioColaCocina.id)
+            ).all()
+            if all(fila.id == self._version + i + 1 for i, fila in enumerate(filas)):
+                break
+            time.sleep(_ESPERA_HUECO)
+        else:
+            logger.warning(f'Hueco en cola_cocina_cambios tras la versión {self._version}; se reconstruye la cola')
+            return False
+        if not filas:
+            return True
+        pedidos = cargar_pedidos(Pedido.query.populate_existing().filter(
+            Pedido.id.in_({fila.pedido_id for fila in filas}))).all()
+        actuales = _entradas(pedidos)
+        cambios = []
+        with self._lock:
+            for version, pedido_id in filas:
+                propio = version in self._propios
+                # Las filas de otros procesos se aplican con los datos de ahora, que
+                # pueden ser más nuevos que los que envió su proceso: las propias
+                # reenvían el pedido aunque aquí ya esté igual
+                cambio = self._aplicar(pedido_id, actuales.get(pedido_id), version, reenviar=propio)
+                self._version = version
+                if propio:
+                    self._propios.discard(version)
+                    cambios.append(cambio or self._cambio('sin_cambios', None, {'id': pedido_id}, version))
+        self._emitir(cambios)
+        return True
+
+    def _purgar_registro(self):
+        retencion = current_app.config.get('COLA_COCINA_RETENCION')
+        if not retencion:
+            return
+        limite = datetime.utcnow() - timedelta(seconds=retencion)
+        with db.session.get_bind(mapper=CambioColaCocina.__mapper__).begin() as conexion:
+            conexion.execute(delete(CambioColaCocina).where(CambioColaCocina.creado < limite))
+
+    def _aplicar(self, pedido_id, entrada, version=None, reenviar=False):
+        """Reemplaza (o quita, si ``entrada`` es None) un pedido. Requiere el lock."""
+        anterior = self._pedidos.pop(pedido_id, None)
+        if anterior is not None:
+            del self._orden[bisect.bisect_left(self._orden, anterior[0])]
+        if entrada is None:
+            if anterior is None:
+                return None
+            return self._cambio('quitar', None, {'id': pedido_id}, version)
+        orden, datos = entrada
+        self._pedidos[pedido_id] = entrada
+        posicion = bisect.bisect_left(self._orden, orden)
+        self._orden.insert(posicion, orden)
+        if anterior is None:
+            return self._cambio('insertar', posicion, datos, version)
+        if anterior == entrada and not reenviar:
+            return None
+        return self._cambio('actualizar', posicion, datos, version)
+
+    def _cambio(self, operacion, posicion, pedido, version=None):
+        self._version = self._version + 1 if version is None else version
+        return {'version': self._version, 'operacion': operacion, 'posicion': posicion, 'pedido': pedido}
+
+    # ----- consultas -----
+
+    def snapshot(self, estados=ESTADOS_COLA):
+        """Foto de la cola: (version, [pedidos en orden]) filtrada por estado"""
+        self.asegurar()
+        self.sincronizar(forzar=True)
+        with self._lock:
+            pedidos = [self._pedidos[clave[1]][1] for clave in self._orden]
+            return self._version, [p for p in pedidos if p['estado'] in estados]
+
+    # ----- envío -----
+
+    def _emitir(self, cambios):
+        cambios = [c for c in cambios if c]
+        if not cambios:
+            return
+        for cambio in cambios:
+            cambio_cola_cocina(cambio)
+
+
+cola_cocina = ColaCocina()
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_pedidos_cocina(session, flush_context):
+    tocados = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Pedido) and obj.id is not None:
+            tocados.add(obj.id)
+        elif isinstance(obj, PedidoItem) and obj.pedido_id is not None:
+            tocados.add(obj.pedido_id)
+    if tocados:
+        session.info.setdefault(_CLAVE_PENDIENTES, set()).update(tocados)
+
+
+@event.listens_for(Session, 'after_commit')
+def _marcar_pedidos_cocina(session):
+    tocados = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not tocados:
+        return
+    if not cola_cocina.es_global:
+        cola_cocina.marcar(tocados)
+        return
+    # Una transacción corta aparte: el id de cada fila es la versión global del cambio
+    try:
+        with session.get_bind(mapper=CambioColaCocina.__mapper__).begin() as conexion:
+            versiones = [
+                conexion.execute(insert(CambioColaCocina).values(
+                    pedido_id=pedido_id, creado=datetime.utcnow())).inserted_primary_key[0]
+                for pedido_id in sorted(tocados)
+            ]
+    except Exception as e:
+        logger.error(f'No se pudieron registrar los cambios de la cola de cocina ({e})')
+        cola_cocina.invalidar()
+        return
+    cola_cocina.marcar_propios(versiones)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_pedidos_cocina(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_PENDIENTES, None)
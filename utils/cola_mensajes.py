@@ -0,0 +1,255 @@
+"""
+Cola de mensajes para Socket.IO con varios procesos.
+
+Con un solo proceso, ``socketio.emit(..., room='cocina')`` sólo llega a los
+clientes conectados a ese proceso. Con ``SOCKETIO_MESSAGE_QUEUE`` configurada,
+cada emit se publica además en una cola compartida y todos los procesos
+(workers o nodos) lo reenvían a sus propios clientes de las salas ``cocina``,
+``caja``, ``admin`` y ``mesa_*``.
+
+El backend se elige por la URL:
+
+* ``redis://`` / ``rediss://``: Redis (paquete ``redis``).
+* ``kafka://``: Kafka (paquete ``kafka-python``).
+* ``zmq+tcp://``: ZeroMQ (paquete ``pyzmq``).
+* ``local://host:puerto`` o ``local://clave@host:puerto``: broker local de
+  este módulo, sin dependencias, para desarrollo, pruebas o una sola máquina
+  (``python -m utils.cola_mensajes``).
+* cualquier otra (``amqp://``...): Kombu.
+
+El broker local es un pub/sub mínimo sobre TCP: cada conexión se presenta
+con el canal, si publica o escucha y la clave compartida (si el broker tiene
+una; sin ella se cierra la conexión), y cada mensaje publicado (tramas con
+longitud de 4 bytes + datos) se reenvía a todos los que escuchan ese canal.
+Los mensajes van en JSON, no con ``pickle`` como en los gestores de
+python-socketio: lo que llega por el socket nunca se ejecuta. Por defecto
+escucha sólo en ``127.0.0.1``; para varias máquinas, en una red privada y con
+``--clave``.
+
+Como los gestores de Redis y Kombu, necesita sockets bloqueantes compatibles
+con el modo asíncrono (``eventlet.monkey_patch()`` si se usa eventlet).
+"""
+import hmac
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+from utils import json_rapido
+
+logger = logging.getLogger('boodfood.cola_mensajes')
+
+_CABECERA = struct.Struct('!I')
+
+
+def _enviar_trama(conexion, datos):
+    conexion.sendall(_CABECERA.pack(len(datos)) + datos)
+
+
+def _recibir_exacto(conexion, n):
+    partes = []
+    while n:
+        parte = conexion.recv(n)
+        if not parte:
+            raise ConnectionError('conexión cerrada')
+        partes.append(parte)
+        n -= len(parte)
+    return b''.join(partes)
+
+
+def _recibir_trama(conexion):
+    (largo,) = _CABECERA.unpack(_recibir_exacto(conexion, _CABECERA.size))
+    return _recibir_exacto(conexion, largo)
+
+
+def _direccion(url):
+    partes = urlparse(url)
+    return partes.hostname or '127.0.0.1', partes.port or 6390
+
+
+def _clave(url):
+    return urlparse(url).username or None
+
+
+# ----- broker local -----
+
+class _ManejadorBroker(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker = self.server
+        try:
+            saludo = json.loads(_recibir_trama(self.request))
+        except (ConnectionError, ValueError, struct.error):
+            return
+        if not isinstance(saludo, dict) or not broker.autorizado(saludo.get('clave')):
+            logger.warning(f'Conexión rechazada de {self.client_address[0]}: clave incorrecta')
+            return
+        canal = saludo.get('canal', 'socketio')
+        if saludo.get('modo') == 'escuchar':
+            broker.suscribir(canal, self.request)
+            # Confirmar la suscripción para que el cliente sepa que ya recibe
+            _enviar_trama(self.request, b'')
+            try:
+                # Esperar a que el cliente cierre; no envía nada más
+                while self.request.recv(1024):
+                    pass
+            except OSError:
+                pass
+            finally:
+                broker.desuscribir(canal, self.request)
+            return
+        try:
+            while True:
+                broker.publicar(canal, _recibir_trama(self.request))
+        except (ConnectionError, OSError, struct.error):
+            pass
+
+
+class BrokerLocal(socketserver.ThreadingTCPServer):
+    """Broker pub/sub en memoria, un hilo por conexión"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', puerto=6390, clave=None):
+        super().__init__((host, puerto), _ManejadorBroker)
+        self.clave = clave
+        self._lock = threading.Lock()
+        self._suscriptores = {}   # canal -> {conexión: lock de envío}
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f'local://{self.clave + "@" if self.clave else ""}{host}:{puerto}'
+
+    def autorizado(self, clave):
+        if not self.clave:
+            return True
+        return isinstance(clave, str) and hmac.compare_digest(clave.encode('utf-8'), self.clave.encode('utf-8'))
+
+    def suscribir(self, canal, conexion):
+        with self._lock:
+            self._suscriptores.setdefault(canal, {})[conexion] = threading.Lock()
+
+    def desuscribir(self, canal, conexion):
+        with self._lock:
+            self._suscriptores.get(canal, {}).pop(conexion, None)
+
+    def publicar(self, canal, datos):
+        with self._lock:
+            destinos = list(self._suscriptores.get(canal, {}).items())
+        for conexion, lock in destinos:
+            try:
+                with lock:
+                    _enviar_trama(conexion, datos)
+            except OSError:
+                self.desuscribir(canal, conexion)
+
+    def iniciar_en_hilo(self):
+        """Atiende conexiones en un hilo de fondo (pruebas, desarrollo)"""
+        hilo = threading.Thread(target=self.serve_forever, name='broker-local', daemon=True)
+        hilo.start()
+        return hilo
+
+
+# ----- gestor de clientes de Socket.IO sobre el broker local -----
+
+class GestorBrokerLocal(socketio.PubSubManager):
+    """``PubSubManager`` de python-socketio que usa el broker local"""
+
+    name = 'broker-local'
+
+    def __init__(self, url='local://127.0.0.1:6390', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.direccion = _direccion(url)
+        self.clave = _clave(url)
+        self._lock = threading.Lock()
+        self._publicador = None
+        # Se activa cuando la escucha está suscrita (los emits ya llegan a este proceso)
+        self.suscrito = threading.Event()
+
+    def _conectar(self, modo):
+        conexion = socket.create_connection(self.direccion, timeout=10)
+        conexion.settimeout(None)
+        _enviar_trama(conexion, json.dumps({'canal': self.channel, 'modo': modo,
+                                            'clave': self.clave}).encode('utf-8'))
+        return conexion
+
+    def _publish(self, data):
+        # JSON (Decimal y fechas como en los emits a los clientes), nunca pickle
+        datos = json_rapido.dumps_bytes(data)
+        with self._lock:
+            for intento in (1, 2):
+                try:
+                    if self._publicador is None:
+                        self._publicador = self._conectar('publicar')
+                    _enviar_trama(self._publicador, datos)
+                    return
+                except OSError:
+                    self._publicador = None
+                    if intento == 2:
+                        logger.error('No se pudo publicar en el broker local')
+
+    def _listen(self):
+        espera = 1
+        while True:
+            try:
+                conexion = self._conectar('escuchar')
+                _recibir_trama(conexion)  # confirmación de la suscripción
+                self.suscrito.set()
+                espera = 1
+                while True:
+                    trama = _recibir_trama(conexion)
+                    try:
+                        mensaje = json_rapido.loads(trama)
+                    except ValueError:
+                        mensaje = None
+                    if isinstance(mensaje, dict):
+                        # PubSubManager sólo recurre a pickle si no recibe un dict
+                        yield mensaje
+                    else:
+                        logger.warning('Mensaje descartado: no es JSON')
+            except (OSError, ConnectionError, struct.error):
+                self.suscrito.clear()
+                logger.error(f'Sin conexión con el broker local; reintentando en {espera} s')
+                time.sleep(espera)
+                espera = min(espera * 2, 60)
+
+
+def crear_gestor(url, canal='socketio', write_only=False):
+    """Gestor de clientes de Socket.IO para la URL de la cola (None si no hay cola)"""
+    if not url:
+        return None
+    if url.startswith('local://'):
+        return GestorBrokerLocal(url, channel=canal, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=canal, write_only=write_only)
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager(url, channel=canal, write_only=write_only)
+    if url.startswith('zmq'):
+        return socketio.ZmqManager(url, channel=canal, write_only=write_only)
+    return socketio.KombuManager(url, channel=canal, write_only=write_only)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Broker local para la cola de Socket.IO')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=6390)
+    parser.add_argument('--clave', default=os.environ.get('BROKER_CLAVE'),
+                        help='clave compartida que deben presentar los workers (o BROKER_CLAVE)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = BrokerLocal(args.host, args.puerto, args.clave)
+    if args.host not in ('127.0.0.1', 'localhost', '::1') and not args.clave:
+        logger.warning('Broker accesible desde la red sin clave: cualquiera puede publicar eventos')
+    logger.info(f'Broker escuchando en {args.host}:{broker.server_address[1]}')
+    broker.serve_forever()
@@ -0,0 +1,120 @@
+"""
+Compresión gzip de las respuestas grandes.
+
+Los listados de pedidos (cada línea repite su ``menu_item``), el
+``estado_inicial`` del panel de admin y el JSON del menú son grandes y muy
+repetitivos; comprimidos ocupan una fracción. ``iniciar(app)`` registra un
+``after_request`` que comprime cuando:
+
+* el cliente acepta ``gzip``;
+* el tipo de contenido está en ``COMPRESION_TIPOS``;
+* el cuerpo tiene al menos ``COMPRESION_MINIMO`` bytes;
+* la respuesta no es un stream, ni un 206/304, ni lleva ya ``Content-Encoding``
+  o ``Cache-Control: no-transform``.
+
+El nivel es ``COMPRESION_NIVEL`` (1-9). Las respuestas con ETag fuerte (el
+snapshot del menú, los archivos de ``static``) tienen siempre el mismo
+cuerpo para el mismo ETag: su versión comprimida se guarda en una caché LRU
+(``COMPRESION_CACHE_MAX`` entradas) y no se vuelve a comprimir. El ETag pasa a
+débil (``W/``), que sigue sirviendo para los 304.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+TIPOS_POR_DEFECTO = frozenset({
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'image/svg+xml',
+})
+
+
+class CachePrecomprimida:
+    """(etag, nivel) -> cuerpo gzip, en orden de uso (LRU)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self.maximo = 64
+
+    def obtener(self, clave):
+        with self._lock:
+            cuerpo = self._entradas.get(clave)
+            if cuerpo is not None:
+                self._entradas.move_to_end(clave)
+            return cuerpo
+
+    def guardar(self, clave, cuerpo):
+        if not self.maximo:
+            return
+        with self._lock:
+            self._entradas[clave] = cuerpo
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_precomprimida = CachePrecomprimida()
+
+
+def comprimir(cuerpo, nivel):
+    # mtime=0: mismo cuerpo, mismos bytes (reproducible entre procesos)
+    return gzip.compress(cuerpo, compresslevel=nivel, mtime=0)
+
+
+def _acepta_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+
+def iniciar(app):
+    """Registra la compresión de respuestas según la configuración de la app"""
+    minimo = app.config.get('COMPRESION_MINIMO', 1024)
+    if minimo is None:
+        return
+    nivel = app.config.get('COMPRESION_NIVEL', 6)
+    tipos = frozenset(app.config.get('COMPRESION_TIPOS') or TIPOS_POR_DEFECTO)
+    cache_precomprimida.maximo = app.config.get('COMPRESION_CACHE_MAX', 64)
+    cache_precomprimida.invalidar()
+
+    @app.after_request
+    def _comprimir_respuesta(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.mimetype not in tipos
+                or 'Content-Encoding' in response.headers
+                or response.cache_control.no_transform
+                or response.is_streamed and not response.direct_passthrough):
+            return response
+        response.vary.add('Accept-Encoding')
+        if not _acepta_gzip():
+            return response
+        longitud = response.content_length
+        if longitud is not None and longitud < minimo:
+            return response
+
+        etag, debil = response.get_etag()
+        clave = (etag, nivel) if etag and not debil else None
+        comprimido = cache_precomprimida.obtener(clave) if clave else None
+        if comprimido is None:
+            # Archivos de static (send_file): leer el archivo para comprimirlo
+            response.direct_passthrough = False
+            cuerpo = response.get_data()
+            if len(cuerpo) < minimo:
+                return response
+            comprimido = comprimir(cuerpo, nivel)
+            if clave:
+                cache_precomprimida.guardar(clave, comprimido)
+        elif response.direct_passthrough:
+            # Ya comprimido: el archivo abierto por send_file no se lee
+            response.direct_passthrough = False
+            cerrar = getattr(response.response, 'close', None)
+            if cerrar is not None:
+                cerrar()
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = 'gzip'
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,93 @@
+"""
+Hash de contraseñas fuera del bucle de eventos.
+
+``generate_password_hash`` / ``check_password_hash`` de Werkzeug (scrypt o
+PBKDF2) tardan del orden de 100 ms de CPU. Con eventlet, hacerlo en el
+greenlet de la petición congela todos los sockets y peticiones del worker
+durante ese tiempo; en un cambio de turno o una promoción con muchos
+registros se acumulan.
+
+Aquí se ejecutan en hilos nativos, como mucho ``HASH_CONCURRENCIA`` a la vez:
+
+* con eventlet (Socket.IO en modo ``eventlet``, esté o no parcheada la
+  librería estándar), en el pool de hilos de eventlet (``tpool``) y con un
+  semáforo verde como tope; el greenlet que espera cede el bucle. Sin parchear,
+  un ``Future.result()`` bloquearía el hub con un lock real;
+* sin eventlet (modo ``threading``), en un ``ThreadPoolExecutor`` propio.
+
+``hashlib`` libera el GIL mientras calcula, así que los hilos aprovechan
+varios núcleos sin necesidad de procesos.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def _eventlet_parcheado():
+    if 'eventlet' not in sys.modules:
+        return False
+    from eventlet import patcher
+    return patcher.is_monkey_patched('thread')
+
+
+class PoolHash:
+    """Ejecuta funciones de hash en hilos nativos con un tope de concurrencia"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._concurrencia = None
+        self._ejecutor = None
+        self._semaforo = None
+        self._eventlet = False
+
+    def configurar(self, concurrencia=None, async_mode=None):
+        """Fija el tope (None = ``HASH_CONCURRENCIA`` o el número de núcleos) y el
+        modo asíncrono de Socket.IO (``'eventlet'`` usa ``tpool`` aunque no esté parcheado)"""
+        with self._lock:
+            if self._ejecutor is not None:
+                self._ejecutor.shutdown(wait=False)
+            self._concurrencia, self._ejecutor, self._semaforo = concurrencia, None, None
+            self._eventlet = async_mode == 'eventlet'
+
+    def _en_hub_eventlet(self):
+        if _eventlet_parcheado():
+            return True
+        # Sin parchear, los greenlets de las peticiones corren en el hilo principal;
+        # los hilos nativos (pool de imágenes...) pueden bloquear sin problema
+        return self._eventlet and threading.current_thread() is threading.main_thread()
+
+    def _tope(self):
+        if self._concurrencia is None:
+            configurado = current_app.config.get('HASH_CONCURRENCIA') if has_app_context() else None
+            self._concurrencia = configurado or min(4, os.cpu_count() or 1)
+        return self._concurrencia
+
+    def ejecutar(self, funcion, *args):
+        if self._en_hub_eventlet():
+            from eventlet import tpool
+            from eventlet.semaphore import Semaphore
+            with self._lock:
+                if self._semaforo is None:
+                    self._semaforo = Semaphore(self._tope())
+                semaforo = self._semaforo
+            with semaforo:
+                return tpool.execute(funcion, *args)
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(max_workers=self._tope(), thread_name_prefix='hash')
+            ejecutor = self._ejecutor
+        return ejecutor.submit(funcion, *args).result()
+
+
+pool_hash = PoolHash()
+
+
+def generar_hash(password):
+    return pool_hash.ejecutar(generate_password_hash, password)
+
+
+def verificar_hash(password_hash, password):
+    return pool_hash.ejecutar(check_password_hash, password_hash, password)
@@ -0,0 +1,313 @@
+"""
+Disponibilidad de mesas y servicios por intervalos de tiempo.
+
+Cada reserva activa (``pendiente`` o ``confirmada``) con ``mesa_asignada``
+ocupa su recurso, ``(servicio_id, mesa_asignada)``, desde ``hora`` durante
+``duracion_estimada`` horas (``RESERVA_DURACION_DEFECTO`` minutos si no la
+tiene). ``servicio_id`` sale de ``notas_especiales`` y es None para las mesas
+del restaurante, así que la mesa 3 del billar no choca con la mesa 3 del
+comedor.
+
+Por proceso se guarda, para cada día consultado, la lista de intervalos de
+cada recurso ordenada por inicio (minutos desde las 00:00). El día se carga
+con una consulta la primera vez que se pregunta por él y luego se actualiza
+con cada commit que crea, cancela o reasigna reservas (eventos de la sesión
+de SQLAlchemy). Saber si un recurso está libre es una búsqueda binaria sobre
+esa lista; ``mesas_libres`` además usa el catálogo de mesas en memoria. Los
+commits que llegan mientras se lee un día se vuelven a aplicar al guardarlo
+(la consulta pudo no verlos).
+
+Ese índice sólo responde a las consultas de disponibilidad, que toleran unos
+segundos de retraso. ``conflicto``, que decide si se acepta una reserva, lee
+siempre la base de datos (índice ``ix_reservas_fecha_estado_mesa``): con
+varios procesos, el índice de otro proceso no ve las reservas recién creadas
+aquí.
+
+Un intervalo que pasa de medianoche sólo ocupa el día en que empieza. Cada
+``DISPONIBILIDAD_MAX_EDAD`` segundos los días cargados se vuelven a leer
+(cambios hechos desde otro proceso). Como la consulta es anónima y admite
+cualquier fecha, se guardan como mucho ``DISPONIBILIDAD_MAX_DIAS`` días: al
+cargar uno más se descarta el consultado hace más tiempo (LRU) junto con sus
+reservas.
+"""
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Mesa, Reserva
+
+ESTADOS_ACTIVOS = ('pendiente', 'confirmada')
+
+_CLAVE_PENDIENTES = 'disponibilidad_pendientes'
+_CLAVE_MESAS = 'disponibilidad_mesas'
+
+
+def servicio_de(notas_especiales):
+    """``servicio_id`` (texto) guardado en las notas JSON de la reserva, o None"""
+    if not notas_especiales:
+        return None
+    try:
+        servicio_id = json.loads(notas_especiales).get('servicio_id')
+    except (ValueError, AttributeError):
+        return None
+    return str(servicio_id) if servicio_id not in (None, '') else None
+
+
+def minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def duracion_defecto():
+    return current_app.config.get('RESERVA_DURACION_DEFECTO', 120) if has_app_context() else 120
+
+
+def intervalo(hora, duracion_estimada=None):
+    """(inicio, fin) en minutos para una hora y una duración en horas"""
+    inicio = minutos(hora)
+    duracion = int(duracion_estimada * 60) if duracion_estimada else duracion_defecto()
+    return inicio, inicio + max(duracion, 1)
+
+
+def _entrada(reserva_id, usuario_id, fecha, hora, duracion_estimada, mesa_asignada, notas_especiales, estado):
+    """(fecha, recurso, inicio, fin, usuario_id) de una reserva, o None si no ocupa nada"""
+    if estado not in ESTADOS_ACTIVOS or not mesa_asignada or fecha is None or hora is None:
+        return None
+    recurso = (servicio_de(notas_especiales), str(mesa_asignada).strip())
+    return (fecha, recurso) + intervalo(hora, duracion_estimada) + (usuario_id,)
+
+
+_COLUMNAS = (Reserva.id, Reserva.usuario_id, Reserva.fecha, Reserva.hora, Reserva.duracion_estimada,
+             Reserva.mesa_asignada, Reserva.notas_especiales, Reserva.estado)
+
+
+class _Dia:
+    """Intervalos de un día: recurso -> [(inicio, fin, reserva_id, usuario_id)] ordenada"""
+
+    def __init__(self):
+        self.recursos = {}
+        self.max_duracion = 0
+        self.cargado = time.monotonic()
+
+    def agregar(self, recurso, inicio, fin, reserva_id, usuario_id):
+        bisect.insort(self.recursos.setdefault(recurso, []), (inicio, fin, reserva_id, usuario_id))
+        self.max_duracion = max(self.max_duracion, fin - inicio)
+
+    def quitar(self, recurso, inicio, fin, reserva_id, usuario_id):
+        intervalos = self.recursos.get(recurso)
+        if not intervalos:
+            return
+        i = bisect.bisect_left(intervalos, (inicio, fin, reserva_id, usuario_id))
+        if i < len(intervalos) and intervalos[i][2] == reserva_id:
+            del intervalos[i]
+        if not intervalos:
+            del self.recursos[recurso]
+
+    def conflictos(self, recurso, inicio, fin):
+        """Intervalos del recurso que se cruzan con [inicio, fin)"""
+        intervalos = self.recursos.get(recurso)
+        if not intervalos:
+            return []
+        # Sólo pueden cruzarse los que empiezan antes de ``fin`` y no antes de
+        # ``inicio - max_duracion``
+        i = bisect.bisect_left(intervalos, (fin,))
+        cruces = []
+        while i > 0:
+            i -= 1
+            actual = intervalos[i]
+            if actual[0] + self.max_duracion <= inicio:
+                break
+            if actual[1] > inicio:
+                cruces.append(actual)
+        return cruces
+
+
+class DisponibilidadReservas:
+    """Días con reservas indexadas por recurso e intervalo, y catálogo de mesas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dias = OrderedDict()  # fecha -> _Dia, del consultado hace más tiempo al último
+        self._reservas = {}         # reserva_id -> entrada indexada
+        self._mesas = None          # mesas disponibles como dicts, por (capacidad, numero)
+        self._cargas = []           # cambios recibidos durante cada lectura de un día en curso
+
+    # ----- construcción -----
+
+    def _dia(self, fecha):
+        """Día cargado (y vigente); lo lee de la base de datos si hace falta"""
+        max_edad = current_app.config.get('DISPONIBILIDAD_MAX_EDAD')
+        max_dias = current_app.config.get('DISPONIBILIDAD_MAX_DIAS', 60)
+        with self._lock:
+            dia = self._dias.get(fecha)
+            if dia is not None and not (max_edad and time.monotonic() - dia.cargado > max_edad):
+                self._dias.move_to_end(fecha)
+                return dia
+        cambios = []
+        with self._lock:
+            self._cargas.append(cambios)
+        try:
+            filas = db.session.query(*_COLUMNAS).filter(
+                Reserva.fecha == fecha,
+                Reserva.estado.in_(ESTADOS_ACTIVOS),
+                Reserva.mesa_asignada.isnot(None)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._cargas.remove(cambios)
+            raise
+        dia = _Dia()
+        with self._lock:
+            self._cargas.remove(cambios)
+            for reserva_id, *valores in filas:
+                self._quitar(reserva_id)
+                entrada = _entrada(reserva_id, *valores)
+                if entrada:
+                    self._reservas[reserva_id] = entrada
+                    dia.agregar(entrada[1], entrada[2], entrada[3], reserva_id, entrada[4])
+            self._dias[fecha] = dia
+            self._dias.move_to_end(fecha)
+            # Commits aplicados mientras se leía el día: la consulta pudo no verlos
+            for reserva_id, entrada in cambios:
+                self._aplicar(reserva_id, entrada)
+            while len(self._dias) > max(max_dias, 1):
+                self._descartar_dia()
+        return dia
+
+    def _descartar_dia(self):
+        """Olvida el día consultado hace más tiempo y sus reservas. Requiere el lock."""
+        _, dia = self._dias.popitem(last=False)
+        for intervalos in dia.recursos.values():
+            for _, _, reserva_id, _ in intervalos:
+                self._reservas.pop(reserva_id, None)
+
+    def _catalogo_mesas(self):
+        mesas = self._mesas
+        if mesas is None:
+            mesas = [
+                {'id': m.id, 'numero': m.numero, 'capacidad': m.capacidad, 'ubicacion': m.ubicacion,
+                 'disponible': m.disponible, 'tipo': m.tipo}
+                for m in Mesa.query.filter_by(disponible=True).order_by(Mesa.capacidad, Mesa.numero)
+            ]
+            self._mesas = mesas
+        return mesas
+
+    def invalidar(self):
+        with self._lock:
+            self._dias, self._reservas, self._mesas = OrderedDict(), {}, None
+
+    def invalidar_mesas(self):
+        self._mesas = None
+
+    # ----- actualización -----
+
+    def _quitar(self, reserva_id):
+        """Saca una reserva de su día. Requiere el lock."""
+        anterior = self._reservas.pop(reserva_id, None)
+        if anterior is not None:
+            fecha, recurso, inicio, fin, usuario_id = anterior
+            dia = self._dias.get(fecha)
+            if dia is not None:
+                dia.quitar(recurso, inicio, fin, reserva_id, usuario_id)
+
+    def _aplicar(self, reserva_id, entrada):
+        """Requiere el lock."""
+        self._quitar(reserva_id)
+        if entrada is None:
+            return
+        dia = self._dias.get(entrada[0])
+        if dia is None:
+            return  # día no cargado: se leerá completo cuando se consulte
+        self._reservas[reserva_id] = entrada
+        dia.agregar(entrada[1], entrada[2], entrada[3], reserva_id, entrada[4])
+
+    def aplicar(self, reserva_id, entrada):
+        """Refleja el estado actual de una reserva (``entrada`` None = ya no ocupa nada)"""
+        with self._lock:
+            for cambios in self._cargas:
+                cambios.append((reserva_id, entrada))
+            self._aplicar(reserva_id, entrada)
+
+    # ----- consultas -----
+
+    def conflicto(self, fecha, recurso, inicio, fin, excluir_usuario=None):
+        """Id de una reserva que ocupa ``recurso`` en [inicio, fin) (minutos), o None.
+
+        Consulta la base de datos (no el índice en memoria): se usa para aceptar
+        o rechazar reservas y tiene que ver las de todos los procesos.
+        """
+        servicio_id, mesa = recurso
+        consulta = db.session.query(*_COLUMNAS).filter(
+            Reserva.fecha == fecha,
+            Reserva.estado.in_(ESTADOS_ACTIVOS),
+            Reserva.mesa_asignada == mesa,
+        )
+        if excluir_usuario is not None:
+            consulta = consulta.filter(Reserva.usuario_id != excluir_usuario)
+        for reserva_id, *valores in consulta:
+            entrada = _entrada(reserva_id, *valores)
+            if entrada and entrada[1] == recurso and entrada[2] < fin and entrada[3] > inicio:
+                return reserva_id
+        return None
+
+    def recursos_ocupados(self, fecha, inicio, fin, servicio_id=None):
+        """Nombres (``mesa_asignada``) de los recursos del servicio ocupados en el intervalo"""
+        dia = self._dia(fecha)
+        with self._lock:
+            return sorted(
+                recurso[1] for recurso in dia.recursos
+                if recurso[0] == servicio_id and dia.conflictos(recurso, inicio, fin)
+            )
+
+    def mesas_libres(self, fecha, inicio, fin, personas=1):
+        """Mesas disponibles con capacidad para ``personas`` y sin reserva en el intervalo.
+
+        Las reservas del comedor guardan en ``mesa_asignada`` el número de la mesa.
+        """
+        mesas = self._catalogo_mesas()
+        dia = self._dia(fecha)
+        with self._lock:
+            return [
+                mesa for mesa in mesas
+                if mesa['capacidad'] >= personas
+                and not dia.conflictos((None, str(mesa['numero'])), inicio, fin)
+            ]
+
+
+disponibilidad = DisponibilidadReservas()
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_reservas(session, flush_context):
+    pendientes = None
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Mesa):
+            session.info[_CLAVE_MESAS] = True
+        elif isinstance(obj, Reserva) and obj.id is not None:
+            pendientes = pendientes if pendientes is not None else session.info.setdefault(_CLAVE_PENDIENTES, {})
+            if obj in session.deleted:
+                pendientes[obj.id] = None
+            else:
+                pendientes[obj.id] = _entrada(obj.id, *(getattr(obj, c.key) for c in _COLUMNAS[1:]))
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_reservas(session):
+    if session.info.pop(_CLAVE_MESAS, None):
+        disponibilidad.invalidar_mesas()
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if pendientes:
+        for reserva_id, entrada in pendientes.items():
+            disponibilidad.aplicar(reserva_id, entrada)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_cambios_reservas(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_PENDIENTES, None)
+        session.info.pop(_CLAVE_MESAS, None)
@@ -0,0 +1,126 @@
+"""
+Bus de eventos del servidor hacia los paneles (Socket.IO).
+
+Las rutas publican eventos de dominio después del commit (pedido creado,
+cambio de estado...) y el bus decide a qué salas van; los navegadores ya no
+reenvían por el socket lo que acaban de escribir por REST.
+
+Los eventos se acumulan por destino (conjunto de salas) durante
+``EVENTOS_VENTANA`` segundos y se envían juntos. Dentro de una ventana, los
+eventos con la misma ``clave`` se fusionan y sólo queda el último (tres
+cambios de estado seguidos del mismo pedido llegan como uno). Si en la ventana
+hay un solo evento se envía tal cual; si hay varios, en un único mensaje::
+
+    'eventos': [{'evento': 'estado_pedido_actualizado', 'datos': {...}}, ...]
+
+que ``static/js/websocket.js`` reparte en orden a los manejadores de cada
+evento. Con ``EVENTOS_VENTANA = None`` (pruebas) cada evento se envía en el
+momento.
+"""
+import itertools
+import logging
+import threading
+from socket_events import socketio, ROOM_ADMIN, ROOM_CAJA, ROOM_COCINA
+
+logger = logging.getLogger('boodfood.eventos')
+
+
+class BusEventos:
+    """Acumula eventos por destino y los envía en ventanas cortas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = {}   # salas -> {clave: (evento, datos)} en orden de llegada
+        self._programado = False
+        self._ventana = None
+        self._secuencia = itertools.count()
+
+    def iniciar(self, app):
+        self._ventana = app.config.get('EVENTOS_VENTANA')
+
+    def publicar(self, evento, datos, salas, clave=None):
+        """Encola ``evento`` para las salas dadas; ``clave`` fusiona repetidos en la ventana"""
+        salas = tuple(sorted(set(salas)))
+        if not self._ventana:
+            self._enviar(salas, [(evento, datos)])
+            return
+        # Sin clave cada evento es único; con clave, el último reemplaza al anterior
+        clave = clave if clave is not None else next(self._secuencia)
+        with self._lock:
+            cola = self._pendientes.setdefault(salas, {})
+            cola.pop(clave, None)
+            cola[clave] = (evento, datos)
+            programar, self._programado = not self._programado, True
+        if programar:
+            socketio.start_background_task(self._vaciar_tras_ventana, self._ventana)
+
+    def vaciar(self):
+        """Envía ya todo lo acumulado"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            self._programado = False
+        for salas, cola in pendientes.items():
+            self._enviar(salas, list(cola.values()))
+
+    def _vaciar_tras_ventana(self, ventana):
+        # La ventana con la que se programó (iniciar() puede cambiarla mientras tanto)
+        socketio.sleep(ventana)
+        self.vaciar()
+
+    def _enviar(self, salas, eventos):
+        try:
+            if len(eventos) == 1:
+                evento, datos = eventos[0]
+                socketio.emit(evento, datos, to=list(salas), namespace='/')
+            else:
+                lote = [{'evento': evento, 'datos': datos} for evento, datos in eventos]
+                socketio.emit('eventos', lote, to=list(salas), namespace='/')
+        except Exception as e:
+            logger.warning(f'No se pudieron enviar eventos a {salas}: {e}')
+
+
+bus_eventos = BusEventos()
+
+
+# ----- eventos de dominio -----
+
+def _salas_pedido(mesa_id, *salas):
+    return salas + ((f'mesa_{mesa_id}',) if mesa_id else ())
+
+
+def datos_pedido(pedido):
+    """Campos del pedido que llevan sus eventos. Se toman antes del commit: después
+    el pedido está expirado y leerlo costaría otra consulta por cada cambio"""
+    return {
+        'id': pedido.id,
+        'codigo_pedido': pedido.codigo_pedido,
+        'estado': pedido.estado,
+        'mesa_id': pedido.mesa_id,
+        'total': float(pedido.total or 0),
+        'fecha_pedido': pedido.fecha_pedido.isoformat() if pedido.fecha_pedido else None,
+    }
+
+
+def pedido_creado(datos):
+    """Pedido nuevo (``datos_pedido``): a cocina, admin y la mesa del pedido"""
+    bus_eventos.publicar('pedido_recibido', {'pedido': datos},
+                         _salas_pedido(datos['mesa_id'], ROOM_COCINA, ROOM_ADMIN))
+
+
+def estado_pedido(datos):
+    """Cambio de estado de un pedido (``datos_pedido``): a cocina, caja, admin y la mesa del pedido"""
+    bus_eventos.publicar('estado_pedido_actualizado',
+                         {'pedido_id': datos['id'], 'estado': datos['estado'], 'mesa_id': datos['mesa_id']},
+                         _salas_pedido(datos['mesa_id'], ROOM_COCINA, ROOM_CAJA, ROOM_ADMIN),
+                         clave=('pedido', datos['id']))
+
+
+def cambio_cola_cocina(cambio):
+    """Cambio de la cola de cocina (nunca se fusionan: cada uno lleva su versión)"""
+    bus_eventos.publicar('cola_cocina', cambio, (ROOM_COCINA,))
+
+
+def cambio_alerta(evento, datos):
+    """Alta (``alerta_nueva``) o baja (``alerta_resuelta``) de una alerta del admin; en
+    una ventana sólo cuenta la última de cada alerta"""
+    bus_eventos.publicar(evento, datos, (ROOM_ADMIN,), clave=('alerta', datos['id']))
@@ -0,0 +1,248 @@
+"""
+Variantes redimensionadas de las imágenes del menú.
+
+``/admin/api/menu/subir-imagen`` guarda el archivo original (hasta 16 MB) y
+encola su procesado en un pool de procesos (``IMAGENES_PROCESOS``): cada
+imagen se reduce a tres tamaños (``miniatura``, ``tarjeta`` y ``completa``) y
+se recomprime en JPEG y WebP. Las variantes se escriben junto al original
+(``<nombre>_<tamaño>.jpg`` / ``.webp``) y, al final, un manifiesto
+``<nombre>_variantes.json`` con sus URLs.
+
+El manifiesto es lo que enlaza las variantes con el menú:
+
+* al guardar un ``MenuItem`` con una ``imagen_url`` nueva, la sesión de
+  SQLAlchemy copia el manifiesto (si ya existe) en ``imagen_variantes``;
+* al terminar un procesado, se actualizan los items que ya usaban esa URL.
+
+Así da igual qué llegue antes (la imagen procesada o el item) o qué proceso
+atienda cada petición. Sin Pillow, o si la imagen no se puede abrir, el item
+se queda con el original.
+"""
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+from models import db, MenuItem
+from utils.menu_cache import menu_cache
+
+URL_MENU = '/static/uploads/menu/'
+
+# (nombre, lado mayor en píxeles); nunca se amplía una imagen más pequeña
+TAMANOS = (('miniatura', 160), ('tarjeta', 480), ('completa', 1200))
+FORMATOS = (
+    ('jpg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 78, 'method': 4}),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _nombre_base(nombre_archivo):
+    return os.path.splitext(nombre_archivo)[0]
+
+
+def _manifiesto(ruta_original):
+    return f'{os.path.splitext(ruta_original)[0]}_variantes.json'
+
+
+def generar_variantes(ruta_original):
+    """Escribe las variantes de una imagen y su manifiesto (en el proceso del pool).
+
+    Devuelve ``{tamaño: {'ancho', 'alto', 'jpg', 'webp'}}`` con nombres de archivo.
+    """
+    from PIL import Image, ImageOps
+
+    carpeta, nombre = os.path.split(ruta_original)
+    base = _nombre_base(nombre)
+    variantes = {}
+    with Image.open(ruta_original) as imagen:
+        imagen.seek(0)  # GIF animados: primer fotograma
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or 'A' in imagen.mode else 'RGB')
+        # JPEG no admite transparencia: fondo blanco
+        if imagen.mode == 'RGBA':
+            opaca = Image.new('RGB', imagen.size, (255, 255, 255))
+            opaca.paste(imagen, mask=imagen.getchannel('A'))
+        else:
+            opaca = imagen
+
+        for tamano, lado in TAMANOS:
+            variante = {}
+            for extension, formato, opciones in FORMATOS:
+                copia = (opaca if formato == 'JPEG' else imagen).copy()
+                copia.thumbnail((lado, lado), Image.LANCZOS)
+                archivo = f'{base}_{tamano}.{extension}'
+                copia.save(os.path.join(carpeta, archivo), formato, **opciones)
+                variante.update(ancho=copia.width, alto=copia.height)
+                variante[extension] = archivo
+            variantes[tamano] = variante
+
+    # El manifiesto va al final y de forma atómica: si existe, las variantes también
+    manifiesto = _manifiesto(ruta_original)
+    with open(f'{manifiesto}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(variantes, f)
+    os.replace(f'{manifiesto}.tmp', manifiesto)
+    return variantes
+
+
+def derivados(ruta_original):
+    """Archivos que ``generar_variantes`` escribe para una imagen (existan o no)"""
+    base = os.path.splitext(ruta_original)[0]
+    return [f'{base}_{tamano}.{extension}' for tamano, _ in TAMANOS for extension, _, _ in FORMATOS] + \
+        [_manifiesto(ruta_original)]
+
+
+def es_derivado(nombre_archivo):
+    """True para variantes y manifiestos (no son subidas propias)"""
+    if nombre_archivo.endswith(('_variantes.json', '_variantes.json.tmp')):
+        return True
+    base, extension = os.path.splitext(nombre_archivo)
+    return extension[1:] in {e for e, _, _ in FORMATOS} and base.endswith(tuple(f'_{t}' for t, _ in TAMANOS))
+
+
+def carpeta_menu():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'menu')
+
+
+def _ruta_local(url):
+    """Ruta en disco de una imagen subida al menú (None para URLs externas)"""
+    if not url or not url.startswith(URL_MENU):
+        return None
+    nombre = url[len(URL_MENU):]
+    if not nombre or '/' in nombre or nombre.startswith('.'):
+        return None
+    return os.path.join(carpeta_menu(), nombre)
+
+
+def _con_urls(variantes):
+    """Manifiesto con nombres de archivo -> mismo manifiesto con URLs públicas"""
+    return {
+        tamano: {clave: (f'{URL_MENU}{valor}' if clave in ('jpg', 'webp') else valor)
+                 for clave, valor in variante.items()}
+        for tamano, variante in variantes.items()
+    }
+
+
+def variantes_de(url):
+    """Variantes ya generadas para una URL del menú, o None"""
+    ruta = _ruta_local(url)
+    if ruta is None:
+        return None
+    try:
+        with open(_manifiesto(ruta), encoding='utf-8') as f:
+            return _con_urls(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+class ProcesadorImagenes:
+    """Pool de procesos que genera las variantes de las imágenes subidas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terminado = threading.Condition(self._lock)
+        self._app = None
+        self._procesos = None
+        self._ejecutor = None
+        self._pendientes = 0
+
+    def iniciar(self, app):
+        """Asocia la app (para registrar resultados) y aplica ``IMAGENES_PROCESOS``"""
+        with self._lock:
+            self._app = app
+            self._procesos = app.config.get('IMAGENES_PROCESOS') or min(2, os.cpu_count() or 1)
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False)
+
+    def cerrar(self):
+        """Termina el pool al salir (con eventlet, la salida normal se queda esperando)"""
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=True, cancel_futures=True)
+
+    def _obtener_ejecutor(self):
+        if self._ejecutor is None:
+            # spawn: los procesos no heredan el bucle de eventlet ni las conexiones
+            self._ejecutor = ProcessPoolExecutor(
+                max_workers=self._procesos or 1,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._ejecutor
+
+    def encolar(self, url):
+        """Encola una imagen recién subida al menú; devuelve False si no se procesa"""
+        ruta = _ruta_local(url)
+        if ruta is None:
+            return False
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            logger.warning('Pillow no está instalado: el menú usará la imagen original')
+            return False
+        with self._lock:
+            try:
+                futuro = self._obtener_ejecutor().submit(generar_variantes, ruta)
+            except Exception as e:
+                # Pool roto (proceso muerto...): se crea otro en la siguiente subida
+                self._ejecutor = None
+                logger.warning(f'No se pudo encolar {url}: {e}')
+                return False
+            self._pendientes += 1
+        futuro.add_done_callback(lambda f: self._registrar(url, f))
+        return True
+
+    def _registrar(self, url, futuro):
+        try:
+            try:
+                variantes = futuro.result()
+            except Exception as e:
+                logger.warning(f'No se pudieron generar las variantes de {url}: {e}')
+                return
+            app = self._app
+            if app is None:
+                return
+            with app.app_context():
+                try:
+                    resultado = db.session.execute(
+                        update(MenuItem).where(MenuItem.imagen_url == url)
+                        .values(imagen_variantes=_con_urls(variantes))
+                    )
+                    db.session.commit()
+                    if resultado.rowcount:
+                        menu_cache.invalidar()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f'No se pudieron registrar las variantes de {url}: {e}')
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+                self._terminado.notify_all()
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que no queden imágenes en proceso (pruebas, scripts)"""
+        with self._lock:
+            return self._terminado.wait_for(lambda: self._pendientes == 0, timeout)
+
+
+procesador_imagenes = ProcesadorImagenes()
+atexit.register(procesador_imagenes.cerrar)
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'before_flush')
+def _copiar_variantes(session, flush_context, instances):
+    if not has_app_context():
+        return
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, MenuItem) and inspect(obj).attrs.imagen_url.history.has_changes():
+            obj.imagen_variantes = variantes_de(obj.imagen_url)
@@ -0,0 +1,98 @@
+"""
+Operaciones atómicas sobre el stock de inventario.
+
+En lugar de leer ``Inventario.cantidad`` a Python, compararla y escribirla de
+vuelta (lo que pierde actualizaciones cuando hay pedidos concurrentes), el
+descuento se hace con un ``UPDATE`` condicional que la base de datos evalúa
+de forma atómica::
+
+    UPDATE inventario SET cantidad = cantidad - :x WHERE id = :id AND cantidad >= :x
+
+Si no se afecta ninguna fila es porque no había stock suficiente, y sólo falla
+la operación que pedía ese ingrediente.
+
+Como estos ``UPDATE`` no pasan por los objetos de la sesión, los ids tocados
+se anotan en ``session.info[CLAVE_INVENTARIO_MODIFICADO]`` para quien necesite
+enterarse al hacer commit (p. ej. las alertas de stock bajo).
+"""
+from decimal import Decimal
+from sqlalchemy import update
+from models import db, Inventario
+from utils.presupuesto_sql import presupuesto_sql
+
+CLAVE_INVENTARIO_MODIFICADO = 'inventario_modificado'
+
+
+class StockInsuficiente(Exception):
+    """No hay stock suficiente de un item de inventario"""
+
+    def __init__(self, inventario_id, cantidad):
+        super().__init__(f'Stock insuficiente en inventario {inventario_id}')
+        self.inventario_id = inventario_id
+        self.cantidad = cantidad
+
+
+def _decimal(cantidad):
+    return cantidad if isinstance(cantidad, Decimal) else Decimal(str(cantidad))
+
+
+def _marcar_modificado(inventario_id):
+    db.session.info.setdefault(CLAVE_INVENTARIO_MODIFICADO, set()).add(inventario_id)
+
+
+def descontar_stock(inventario_id, cantidad):
+    """Descuenta ``cantidad`` del item sólo si hay stock suficiente.
+
+    Returns:
+        bool: True si se descontó, False si no había stock (o no existe el item)
+    """
+    cantidad = _decimal(cantidad)
+    result = db.session.execute(
+        update(Inventario)
+        .where(Inventario.id == inventario_id, Inventario.cantidad >= cantidad)
+        .values(cantidad=Inventario.cantidad - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    _marcar_modificado(inventario_id)
+    return True
+
+
+def sumar_stock(inventario_id, cantidad):
+    """Suma ``cantidad`` al item sin leerlo antes.
+
+    Returns:
+        bool: True si el item existe
+    """
+    cantidad = _decimal(cantidad)
+    result = db.session.execute(
+        update(Inventario)
+        .where(Inventario.id == inventario_id)
+        .values(cantidad=Inventario.cantidad + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    _marcar_modificado(inventario_id)
+    return True
+
+
+def descontar_stock_lote(consumo):
+    """Descuenta varios items dentro de la transacción actual.
+
+    Los items se actualizan en orden de id para que dos pedidos que comparten
+    ingredientes tomen los bloqueos de fila siempre en el mismo orden.
+
+    Args:
+        consumo (dict): inventario_id -> cantidad a descontar
+
+    Raises:
+        StockInsuficiente: con el primer item que no tenía stock. El llamador
+            debe hacer rollback para deshacer los descuentos ya aplicados.
+    """
+    # Un UPDATE condicional por ingrediente (atómico y en orden de id): no es un N+1
+    presupuesto_sql.ampliar(len(consumo))
+    for inventario_id in sorted(consumo):
+        if not descontar_stock(inventario_id, consumo[inventario_id]):
+            raise StockInsuficiente(inventario_id, consumo[inventario_id])
@@ -0,0 +1,79 @@
+"""
+Serialización JSON de la app (Flask y Socket.IO) con ``orjson``.
+
+Los ``to_dict`` de los modelos devuelven los valores de las columnas tal cual
+(``Decimal``, ``date``, ``time``, ``datetime``) y este módulo los convierte
+al serializar, en una sola pasada en C:
+
+* ``Decimal`` -> número (como el ``float()`` que hacían los modelos);
+* ``date`` / ``time`` / ``datetime`` -> ISO 8601 (como ``.isoformat()``).
+
+``ProveedorJSON`` sustituye al proveedor por defecto de Flask (``jsonify``,
+``tojson`` en plantillas, ``app.json.dumps``) y el módulo mismo sirve como
+``json`` de Socket.IO, así que los eventos con diccionarios de los modelos
+se serializan igual. Sin ``orjson`` instalado se usa ``json`` de la
+biblioteca estándar con las mismas conversiones.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+_OPCIONES = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _por_defecto(obj):
+    """Tipos que ni orjson ni json saben serializar por sí mismos"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Objeto de tipo {type(obj).__name__} no serializable a JSON')
+
+
+def dumps_bytes(obj, indent=None, sort_keys=False, **kwargs):
+    """JSON en UTF-8 (bytes)"""
+    if orjson is not None:
+        opciones = _OPCIONES
+        if indent:
+            opciones |= orjson.OPT_INDENT_2
+        if sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_por_defecto, option=opciones)
+    return json.dumps(obj, default=_por_defecto, ensure_ascii=False, indent=indent, sort_keys=sort_keys,
+                      separators=(',', ': ') if indent else (',', ':')).encode('utf-8')
+
+
+def dumps(obj, **kwargs):
+    """JSON como ``str`` (acepta y descarta opciones de ``json.dumps`` como ``separators``)"""
+    return dumps_bytes(obj, indent=kwargs.get('indent'), sort_keys=kwargs.get('sort_keys', False)).decode('utf-8')
+
+
+def loads(s, **kwargs):
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+class ProveedorJSON(JSONProvider):
+    """Proveedor JSON de Flask basado en ``dumps_bytes``"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self._app.debug else None
+        return self._app.response_class(dumps_bytes(obj, indent=indent) + b'\n', mimetype='application/json')
@@ -0,0 +1,108 @@
+"""
+Snapshot versionado del menú.
+
+Todas las lecturas del menú (``/api/menu``, ``/menu``, ``/domicilios``,
+``/api/menu/items`` y ``/admin/api/menu/items``) salen de un único snapshot
+precalculado: categorías e items se consultan una sola vez, los items se
+agrupan por categoría en una pasada y las respuestas JSON se serializan al
+construir el snapshot, cada una con su ETag fuerte (hash del contenido, igual
+en todos los procesos) para que las tablets reciban 304 mientras el menú no
+cambie.
+
+El snapshot se invalida cuando el admin crea, actualiza o elimina un item del
+menú, y como red de seguridad (cambios hechos desde otro proceso) cada
+``MENU_CACHE_MAX_EDAD`` segundos.
+"""
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+from flask import current_app, request
+from models import Categoria, MenuItem
+
+
+def _como_objeto(instancia):
+    """Copia de las columnas de una fila, utilizable en plantillas sin sesión"""
+    return SimpleNamespace(**{
+        col.key: getattr(instancia, col.key) for col in instancia.__table__.columns
+    })
+
+
+class MenuSnapshot:
+    """Menú precalculado en un momento dado"""
+
+    def __init__(self, version, categorias, items):
+        self.version = version
+        self.creado = time.monotonic()
+
+        disponibles = [item for item in items if item.disponible]
+        self.categorias = [_como_objeto(c) for c in categorias]
+        self.items = [_como_objeto(i) for i in disponibles]
+
+        # Agrupar por categoría en una sola pasada (antes: categorías x items)
+        por_categoria = {}
+        for item in disponibles:
+            por_categoria.setdefault(item.categoria_id, []).append(item.to_dict())
+        menu_data = [
+            {'categoria': categoria.to_dict(), 'items': por_categoria[categoria.id]}
+            for categoria in categorias if categoria.id in por_categoria
+        ]
+
+        self.vistas = {
+            'menu': self._serializar(menu_data),
+            'items': self._serializar([item.to_dict() for item in disponibles]),
+            'items_todos': self._serializar([item.to_dict() for item in items]),
+        }
+
+    @staticmethod
+    def _serializar(data):
+        cuerpo = f'{current_app.json.dumps(data)}\n'.encode('utf-8')
+        return cuerpo, hashlib.sha256(cuerpo).hexdigest()[:32]
+
+
+class MenuCache:
+    """Mantiene el snapshot vigente del menú de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+
+    def _vencido(self, snapshot):
+        if snapshot is None:
+            return True
+        max_edad = current_app.config.get('MENU_CACHE_MAX_EDAD')
+        return bool(max_edad) and time.monotonic() - snapshot.creado > max_edad
+
+    def snapshot(self):
+        """Devuelve el snapshot vigente, construyéndolo si hace falta"""
+        snapshot = self._snapshot
+        if not self._vencido(snapshot):
+            return snapshot
+        with self._lock:
+            # Otro hilo pudo haberlo construido mientras esperábamos el lock
+            snapshot = self._snapshot
+            if self._vencido(snapshot):
+                categorias = Categoria.query.order_by(Categoria.orden).all()
+                items = MenuItem.query.all()
+                snapshot = MenuSnapshot(self._version, categorias, items)
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidar(self):
+        """Descarta el snapshot; el siguiente lector construye uno nuevo"""
+        with self._lock:
+            self._snapshot = None
+            self._version += 1
+
+    def respuesta(self, vista, privada=False):
+        """Respuesta JSON de una vista del snapshot, con ETag y soporte de 304"""
+        cuerpo, etag = self.snapshot().vistas[vista]
+        resp = current_app.response_class(cuerpo, mimetype='application/json')
+        resp.set_etag(etag)
+        # Siempre revalidar: el ETag hace que la revalidación sea un 304 sin cuerpo
+        resp.headers['Cache-Control'] = 'private, no-cache' if privada else 'no-cache'
+        return resp.make_conditional(request)
+
+
+menu_cache = MenuCache()
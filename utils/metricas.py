@@ -0,0 +1,268 @@
+"""
+Métricas del proceso en formato de texto de Prometheus.
+
+``iniciar(app)`` instrumenta la app:
+
+* cada petición HTTP (``before_request`` / ``after_request``): latencia por
+  blueprint y endpoint, y peticiones por método y código de respuesta;
+* cada sentencia SQL (eventos del engine de SQLAlchemy): número de sentencias
+  y tiempo en la base de datos (totales y por petición), atribuidos al endpoint de la petición en
+  curso (o a ``fondo`` si se ejecutan fuera de una petición: alertas,
+  barrido de uploads...), y un histograma de sentencias por petición;
+* la espera para obtener una conexión del pool (incluye abrir una nueva
+  contra MySQL cuando el pool no tiene libres) y las conexiones en uso;
+* cada ``emit`` de Socket.IO, por sala y evento.
+
+``exponer()`` devuelve el texto para ``GET /admin/api/metrics``. Los valores
+son de este proceso: con varios workers, Prometheus debe consultar cada uno.
+``METRICAS = False`` desactiva la instrumentación.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from models import db
+from socket_events import ROOM_ADMIN, ROOM_CAJA, ROOM_COCINA, ROOM_MESAS
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SENTENCIAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+SALAS = {ROOM_ADMIN, ROOM_CAJA, ROOM_COCINA, ROOM_MESAS}
+_SALA_CON_ID = re.compile(r'^([a-z]+)_\d+$')
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ''
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador (o gauge) con etiquetas"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+
+    def sumar(self, valores=(), cantidad=1):
+        self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self):
+        for valores, total in sorted(self._valores.items()):
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(total)}'
+
+
+class Histograma:
+    """Histograma acumulativo (``_bucket``, ``_sum``, ``_count``) con etiquetas"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._valores = {}   # etiquetas -> ([observaciones por bucket, +Inf], suma)
+
+    def observar(self, valores, valor):
+        serie = self._valores.get(valores)
+        if serie is None:
+            serie = self._valores[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+        conteos = serie[0]
+        conteos[bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+
+    def lineas(self):
+        nombres = self.etiquetas + ('le',)
+        limites = self.buckets + (float('inf'),)
+        for valores, (conteos, suma) in sorted(self._valores.items()):
+            acumulado = 0
+            for limite, conteo in zip(limites, conteos):
+                acumulado += conteo
+                yield f'{self.nombre}_bucket{_etiquetas(nombres, valores + (_numero(limite),))} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(float(suma))}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}'
+
+
+class Metricas:
+    """Registro de métricas del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.activas = False
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.peticiones = Contador(
+                'boodfood_peticiones_total', 'Peticiones HTTP atendidas',
+                ('blueprint', 'endpoint', 'metodo', 'codigo'))
+            self.latencia = Histograma(
+                'boodfood_peticion_segundos', 'Latencia de las peticiones HTTP',
+                ('blueprint', 'endpoint'))
+            self.sentencias_peticion = Histograma(
+                'boodfood_peticion_sql_sentencias', 'Sentencias SQL por petición HTTP',
+                ('blueprint', 'endpoint'), BUCKETS_SENTENCIAS)
+            self.sql_peticion = Histograma(
+                'boodfood_peticion_sql_segundos', 'Tiempo en la base de datos por petición HTTP',
+                ('blueprint', 'endpoint'))
+            self.sql_sentencias = Contador(
+                'boodfood_sql_sentencias_total', 'Sentencias SQL ejecutadas',
+                ('blueprint', 'endpoint'))
+            self.sql_segundos = Contador(
+                'boodfood_sql_segundos_total', 'Tiempo en la base de datos',
+                ('blueprint', 'endpoint'))
+            self.pool_espera = Histograma(
+                'boodfood_pool_espera_segundos', 'Espera para obtener una conexión del pool')
+            self.emits = Contador(
+                'boodfood_socketio_emits_total', 'Mensajes de Socket.IO enviados',
+                ('sala', 'evento'))
+
+    # -- Peticiones HTTP -------------------------------------------------
+
+    def _inicio_peticion(self):
+        g._metricas = [time.perf_counter(), 0, 0.0]
+
+    def _fin_peticion(self, response):
+        datos = g.pop('_metricas', None)
+        if datos is None:
+            return response
+        inicio, sentencias, segundos_db = datos
+        etiquetas = _endpoint()
+        with self._lock:
+            self.latencia.observar(etiquetas, time.perf_counter() - inicio)
+            self.sentencias_peticion.observar(etiquetas, sentencias)
+            self.sql_peticion.observar(etiquetas, segundos_db)
+            self.peticiones.sumar(etiquetas + (request.method, str(response.status_code)))
+        return response
+
+    # -- SQL ---------------------------------------------------------------
+
+    def _antes_de_sentencia(self, conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de la ejecución y no en la conexión: si la sentencia
+        # falla no hay after_cursor_execute y el inicio se va con el contexto
+        if context is not None:
+            context._metricas_inicio = time.perf_counter()
+
+    def _despues_de_sentencia(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, '_metricas_inicio', None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        datos = g.get('_metricas') if has_request_context() else None
+        if datos is not None:
+            datos[1] += 1
+            datos[2] += duracion
+            etiquetas = _endpoint()
+        else:
+            etiquetas = ('', 'fondo')
+        with self._lock:
+            self.sql_sentencias.sumar(etiquetas)
+            self.sql_segundos.sumar(etiquetas, duracion)
+
+    def _medir_pool(self, engine):
+        # Connection pide la conexión con engine.raw_connection(); envolverlo en la
+        # instancia sobrevive a engine.dispose() (que sustituye el pool)
+        if getattr(engine, '_metricas_pool', False):
+            return
+        original = engine.raw_connection
+
+        def raw_connection():
+            inicio = time.perf_counter()
+            try:
+                return original()
+            finally:
+                with self._lock:
+                    self.pool_espera.observar((), time.perf_counter() - inicio)
+
+        engine.raw_connection = raw_connection
+        engine._metricas_pool = True
+
+    # -- Socket.IO ---------------------------------------------------------
+
+    def _medir_emits(self, servidor):
+        if getattr(servidor, '_metricas_emits', False):
+            return
+        original = servidor.emit
+
+        def emit(evento, *args, **kwargs):
+            destino = kwargs.get('to') or kwargs.get('room')
+            salas = destino if isinstance(destino, (list, tuple, set)) else [destino]
+            with self._lock:
+                for sala in salas:
+                    self.emits.sumar((_nombre_sala(sala), evento))
+            return original(evento, *args, **kwargs)
+
+        servidor.emit = emit
+        servidor._metricas_emits = True
+
+    # -- Exposición ----------------------------------------------------------
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus (``text/plain; version=0.0.4``)"""
+        lineas = []
+        with self._lock:
+            for metrica in (self.peticiones, self.latencia, self.sentencias_peticion, self.sql_peticion,
+                            self.sql_sentencias, self.sql_segundos, self.pool_espera, self.emits):
+                lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+                lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+                lineas.extend(metrica.lineas())
+        pool = db.engine.pool if has_app_context() else None
+        if pool is not None and hasattr(pool, 'checkedout'):
+            lineas.append('# HELP boodfood_pool_conexiones Conexiones del pool de la base de datos')
+            lineas.append('# TYPE boodfood_pool_conexiones gauge')
+            lineas.append(f'boodfood_pool_conexiones{{estado="en_uso"}} {pool.checkedout()}')
+            lineas.append(f'boodfood_pool_conexiones{{estado="libres"}} {pool.checkedin()}')
+        return '\n'.join(lineas) + '\n'
+
+    def iniciar(self, app, socketio):
+        """Registra la instrumentación en ``app``, su engine y el servidor de Socket.IO"""
+        self.reiniciar()
+        self.activas = app.config.get('METRICAS', True)
+        if not self.activas:
+            return
+        app.before_request(self._inicio_peticion)
+        app.after_request(self._fin_peticion)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._antes_de_sentencia)
+        event.listen(engine, 'after_cursor_execute', self._despues_de_sentencia)
+        self._medir_pool(engine)
+        if getattr(socketio, 'server', None) is not None:
+            self._medir_emits(socketio.server)
+
+
+def _endpoint():
+    endpoint = request.endpoint or 'sin_ruta'
+    return (request.blueprint or '', endpoint)
+
+
+def _nombre_sala(sala):
+    """Agrupa las salas para no crear una serie por cliente o por mesa"""
+    if sala is None:
+        return 'todos'
+    if sala in SALAS:
+        return sala
+    coincidencia = _SALA_CON_ID.match(str(sala))
+    if coincidencia:
+        return coincidencia.group(1)
+    return 'cliente'
+
+
+metricas = Metricas()
@@ -0,0 +1,156 @@
+"""
+Migraciones versionadas del esquema.
+
+``MIGRACIONES`` es la lista ordenada de cambios ``(versión, descripción,
+función(conexión))``; cada una se aplica en su propia transacción junto con
+su fila en ``esquema_migraciones``. Al arrancar, ``preparar`` sólo consulta la
+versión máxima de esa tabla (una sentencia, sin reflejar las tablas como
+``db.create_all()``) y:
+
+* si está al día, no hace nada más;
+* si faltan migraciones, las aplica (``MIGRACIONES_AL_ARRANCAR = True``) o
+  falla (``False``: despliegues con varios procesos, donde se migra una vez
+  antes de arrancarlos con ``python -m utils.migraciones``, que no necesita
+  crear la app completa; ``flask migrar`` hace lo mismo con la app ya al día).
+
+La versión 1 crea las tablas que declaran los modelos y no existen (bases
+nuevas o anteriores a este registro), pero ``create_all`` no añade columnas a
+las tablas que ya existen: cada columna nueva necesita su migración. Una base
+nueva ya tiene lo que añaden las siguientes, así que cada migración debe poder
+aplicarse sobre un esquema que ya tenga su cambio (``checkfirst``, o comprobar
+las columnas antes del ``ALTER TABLE``). Si dos procesos migran a la vez, el que
+llega segundo falla al crear o al registrar la versión y continúa si el otro ya
+la dejó registrada.
+"""
+import argparse
+import logging
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from models import db, CambioColaCocina, EsquemaMigracion, MenuItem, Pedido, Receta, Reserva
+
+logger = logging.getLogger('boodfood.migraciones')
+
+
+def _esquema_base(conn):
+    db.metadata.create_all(conn)
+
+
+def _indices_caminos_calientes(conn):
+    # Cola de cocina y listados por estado/fecha, pedidos abiertos de cada mesa,
+    # historial del cliente, disponibilidad de reservas del día, "mis reservas"
+    # y recetas de los platos de un pedido (descuento de stock)
+    for modelo, nombres in (
+        (Pedido, ('ix_pedidos_estado_fecha', 'ix_pedidos_mesa_estado', 'ix_pedidos_usuario_fecha')),
+        (Reserva, ('ix_reservas_fecha_estado_mesa', 'ix_reservas_usuario_creada')),
+        (Receta, ('ix_recetas_menu_item',)),
+    ):
+        indices = {indice.name: indice for indice in modelo.__table__.indexes}
+        for nombre in nombres:
+            indices[nombre].create(conn, checkfirst=True)
+
+
+def _agregar_columna(conn, modelo, nombre):
+    tabla = modelo.__table__
+    if nombre in {columna['name'] for columna in inspect(conn).get_columns(tabla.name)}:
+        return
+    columna = tabla.c[nombre]
+    tipo = columna.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f'ALTER TABLE {tabla.name} ADD COLUMN {nombre} {tipo} NULL')
+
+
+def _variantes_imagenes_menu(conn):
+    # Variantes redimensionadas de las imágenes del menú (utils.imagenes)
+    _agregar_columna(conn, MenuItem, 'imagen_variantes')
+
+
+def _cambios_cola_cocina(conn):
+    # Versión de la cola de cocina compartida entre procesos (utils.cola_cocina)
+    CambioColaCocina.__table__.create(conn, checkfirst=True)
+
+
+def _indices_listados_admin(conn):
+    # Listados paginados del admin sin filtros: orden (fecha, id) del cursor
+    # (utils.paginacion)
+    for modelo, nombre in ((Pedido, 'ix_pedidos_fecha_id'), (Reserva, 'ix_reservas_creada_id')):
+        indice = next(indice for indice in modelo.__table__.indexes if indice.name == nombre)
+        indice.create(conn, checkfirst=True)
+
+
+MIGRACIONES = [
+    (1, 'Esquema base (tablas de los modelos)', _esquema_base),
+    (2, 'Índices compuestos de pedidos, reservas y recetas', _indices_caminos_calientes),
+    (3, 'Columna menu_items.imagen_variantes', _variantes_imagenes_menu),
+    (4, 'Tabla cola_cocina_cambios', _cambios_cola_cocina),
+    (5, 'Índices (fecha, id) de los listados de pedidos y reservas', _indices_listados_admin),
+]
+
+ULTIMA_VERSION = MIGRACIONES[-1][0]
+
+
+def version_actual(engine=None):
+    """Versión aplicada del esquema (0 si la base no tiene registro de migraciones)"""
+    engine = engine or db.engine
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(EsquemaMigracion.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def migrar(engine=None):
+    """Aplica las migraciones pendientes en orden; devuelve las versiones aplicadas"""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        EsquemaMigracion.__table__.create(conn, checkfirst=True)
+    actual = version_actual(engine)
+    aplicadas = []
+    for version, descripcion, funcion in MIGRACIONES:
+        if version <= actual:
+            continue
+        try:
+            with engine.begin() as conn:
+                funcion(conn)
+                conn.execute(insert(EsquemaMigracion).values(
+                    version=version, descripcion=descripcion, aplicada=datetime.utcnow()))
+        except (IntegrityError, OperationalError, ProgrammingError):
+            # Otro proceso aplicó la misma migración a la vez
+            if version_actual(engine) >= version:
+                continue
+            raise
+        logger.info('Migración %s aplicada: %s', version, descripcion)
+        aplicadas.append(version)
+    return aplicadas
+
+
+def preparar(app):
+    """Comprobación de arranque: aplica las migraciones pendientes o falla según la configuración"""
+    actual = version_actual()
+    if actual >= ULTIMA_VERSION:
+        return
+    if not app.config.get('MIGRACIONES_AL_ARRANCAR', True):
+        raise RuntimeError(f'El esquema está en la versión {actual} y la app necesita la {ULTIMA_VERSION}: '
+                           f'ejecuta "python -m utils.migraciones"')
+    aplicadas = migrar()
+    app.logger.info(f'Esquema migrado de la versión {actual} a la {ULTIMA_VERSION} (aplicadas: {aplicadas})')
+
+
+def main():
+    from config import config
+    parser = argparse.ArgumentParser(description='Aplica las migraciones pendientes del esquema')
+    parser.add_argument('--config', default='production', choices=sorted(config))
+    parser.add_argument('--estado', action='store_true', help='sólo mostrar la versión aplicada')
+    args = parser.parse_args()
+    # Sin create_app: arrancarla exige el esquema al día
+    app = Flask(__name__)
+    app.config.from_object(config[args.config])
+    db.init_app(app)
+    with app.app_context():
+        aplicadas = [] if args.estado else migrar()
+        print(f"Esquema en la versión {version_actual()} de {ULTIMA_VERSION} "
+              f"(aplicadas ahora: {', '.join(map(str, aplicadas)) or 'ninguna'})")
+
+
+if __name__ == '__main__':
+    main()
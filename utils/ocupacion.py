@@ -0,0 +1,162 @@
+"""
+Índice en memoria de ocupación de mesas.
+
+Mantiene, por proceso, qué pedidos activos tiene cada mesa
+(mesa_id -> ids de pedidos en 'pendiente', 'preparando' o 'enviado') para que
+los listados de mesas no consulten la tabla de pedidos una vez por mesa.
+
+El índice se construye una vez desde la base de datos y luego se actualiza
+con cada commit que crea, cambia de estado/mesa o elimina un ``Pedido``
+(se engancha a los eventos de la sesión de SQLAlchemy, así que cubre todas
+las rutas que tocan pedidos). Si se detecta una desincronización, o pasa
+``OCUPACION_MAX_EDAD`` segundos sin reconstruirse (por cambios hechos desde
+otro proceso), se vuelve a construir desde la base de datos.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Pedido
+
+ESTADOS_ACTIVOS = ('pendiente', 'preparando', 'enviado')
+
+_CLAVE_PENDIENTES = 'ocupacion_pendientes'
+
+
+class IndiceOcupacion:
+    """mesa_id -> pedidos activos, con el usuario de cada pedido"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mesas = {}      # mesa_id -> set(pedido_id)
+        self._pedidos = {}    # pedido_id -> (mesa_id, usuario_id)
+        self._construido = None
+
+    # ----- construcción -----
+
+    def reconstruir(self):
+        """Reconstruye el índice completo desde la base de datos"""
+        filas = db.session.query(Pedido.id, Pedido.mesa_id, Pedido.usuario_id).filter(
+            Pedido.mesa_id.isnot(None),
+            Pedido.estado.in_(ESTADOS_ACTIVOS)
+        ).all()
+        mesas, pedidos = {}, {}
+        for pedido_id, mesa_id, usuario_id in filas:
+            mesas.setdefault(mesa_id, set()).add(pedido_id)
+            pedidos[pedido_id] = (mesa_id, usuario_id)
+        with self._lock:
+            self._mesas, self._pedidos = mesas, pedidos
+            self._construido = time.monotonic()
+
+    def asegurar(self):
+        """Construye el índice si aún no existe o si está vencido"""
+        max_edad = current_app.config.get('OCUPACION_MAX_EDAD')
+        construido = self._construido
+        if construido is None or (max_edad and time.monotonic() - construido > max_edad):
+            self.reconstruir()
+
+    def invalidar(self):
+        """Marca el índice para reconstruirlo en el próximo uso"""
+        with self._lock:
+            self._construido = None
+
+    # ----- actualización -----
+
+    def aplicar(self, pedido_id, mesa_id, usuario_id, estado):
+        """Refleja el estado actual de un pedido en el índice"""
+        with self._lock:
+            anterior = self._pedidos.pop(pedido_id, None)
+            if anterior:
+                pedidos_mesa = self._mesas.get(anterior[0])
+                if pedidos_mesa:
+                    pedidos_mesa.discard(pedido_id)
+                    if not pedidos_mesa:
+                        del self._mesas[anterior[0]]
+            if mesa_id is not None and estado in ESTADOS_ACTIVOS:
+                self._mesas.setdefault(mesa_id, set()).add(pedido_id)
+                self._pedidos[pedido_id] = (mesa_id, usuario_id)
+
+    def quitar(self, pedido_id):
+        """Saca un pedido eliminado del índice"""
+        self.aplicar(pedido_id, None, None, None)
+
+    # ----- consultas -----
+
+    def ocupada(self, mesa_id):
+        self.asegurar()
+        return bool(self._mesas.get(mesa_id))
+
+    def pedidos_activos(self, mesa_id):
+        self.asegurar()
+        with self._lock:
+            return set(self._mesas.get(mesa_id, ()))
+
+    def mesas_ocupadas(self, excluir_usuario=None):
+        """Ids de mesas con pedidos activos, ignorando los de ``excluir_usuario``"""
+        self.asegurar()
+        with self._lock:
+            if excluir_usuario is None:
+                return set(self._mesas)
+            return {
+                mesa_id for mesa_id, usuario_id in self._pedidos.values()
+                if usuario_id != excluir_usuario
+            }
+
+    def ocupada_por_otro(self, mesa_id, usuario_id):
+        self.asegurar()
+        with self._lock:
+            return any(
+                self._pedidos[pid][1] != usuario_id
+                for pid in self._mesas.get(mesa_id, ())
+            )
+
+    def verificar(self, mesa_id, ocupada_en_db, usuario_id=None):
+        """Compara el índice con un resultado de la base de datos.
+
+        Si no coinciden se reconstruye el índice. Devuelve True si estaba sincronizado.
+        """
+        if usuario_id is None:
+            en_indice = self.ocupada(mesa_id)
+        else:
+            en_indice = self.ocupada_por_otro(mesa_id, usuario_id)
+        if en_indice == bool(ocupada_en_db):
+            return True
+        current_app.logger.warning(f'Índice de ocupación desincronizado en mesa {mesa_id}; reconstruyendo')
+        self.reconstruir()
+        return False
+
+
+indice_ocupacion = IndiceOcupacion()
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_pedidos(session, flush_context):
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, {})
+    for obj in session.new.union(session.dirty):
+        if isinstance(obj, Pedido) and obj.id is not None:
+            pendientes[obj.id] = (obj.mesa_id, obj.usuario_id, obj.estado)
+    for obj in session.deleted:
+        if isinstance(obj, Pedido) and obj.id is not None:
+            pendientes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_pedidos(session):
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes:
+        return
+    for pedido_id, valores in pendientes.items():
+        if valores is None:
+            indice_ocupacion.quitar(pedido_id)
+        else:
+            indice_ocupacion.aplicar(pedido_id, *valores)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_cambios_pedidos(session, transaction):
+    # Tras un commit ya se aplicaron; si la transacción terminó en rollback se descartan
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_PENDIENTES, None)
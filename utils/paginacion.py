@@ -0,0 +1,211 @@
+"""
+Paginación por cursor (keyset) para los listados del panel de administración.
+
+En lugar de ``.all()`` sobre la tabla completa, cada listado devuelve una
+página ordenada por una clave única (por ejemplo ``(fecha_pedido, id)``) y un
+cursor opaco con la clave de la última fila. La página siguiente se pide con
+``?cursor=...`` y se resuelve con un ``WHERE`` sobre el índice, sin ``OFFSET``,
+así que cuesta lo mismo la primera página que la número mil.
+
+Parámetros comunes de la query string:
+
+* ``limite``: tamaño de página (``PAGINACION_LIMITE`` por defecto, como
+  máximo ``PAGINACION_LIMITE_MAX``).
+* ``cursor``: valor de ``siguiente`` de la página anterior.
+* ``total=1``: incluye el conteo total de filas que cumplen los filtros (es
+  un ``COUNT`` adicional, por eso solo se calcula si se pide).
+* ``desde`` / ``hasta``: rango de fechas ``YYYY-MM-DD`` (ambos inclusive) en
+  los listados que lo admiten.
+
+Respuesta: ``{'items': [...], 'siguiente': cursor | None, 'limite': n}`` más
+``'total'`` cuando se pidió.
+"""
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, or_
+
+
+class ParametroInvalido(ValueError):
+    """Parámetro de paginación o de filtro mal formado (se responde con 400)"""
+
+
+# ----- parámetros -----
+
+def leer_limite():
+    """Tamaño de página pedido, acotado a ``PAGINACION_LIMITE_MAX``"""
+    por_defecto = current_app.config.get('PAGINACION_LIMITE', 50)
+    maximo = current_app.config.get('PAGINACION_LIMITE_MAX', 200)
+    valor = request.args.get('limite')
+    if valor in (None, ''):
+        return por_defecto
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise ParametroInvalido(f'limite inválido: {valor}')
+    if limite < 1:
+        raise ParametroInvalido('limite debe ser mayor que 0')
+    return min(limite, maximo)
+
+
+def leer_entero(nombre):
+    """Entero opcional de la query string"""
+    valor = request.args.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ParametroInvalido(f'{nombre} inválido: {valor}')
+
+
+def leer_fecha(nombre):
+    """Fecha ``YYYY-MM-DD`` opcional de la query string"""
+    valor = request.args.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ParametroInvalido(f'{nombre} inválido (formato YYYY-MM-DD): {valor}')
+
+
+def leer_lista(nombre):
+    """Lista separada por comas (``?estado=pendiente,preparando``)"""
+    valor = request.args.get(nombre)
+    if not valor:
+        return []
+    return [v.strip() for v in valor.split(',') if v.strip()]
+
+
+def filtrar_rango_fechas(query, columna):
+    """Aplica ``desde``/``hasta`` (inclusive) sobre una columna Date o DateTime"""
+    desde, hasta = leer_fecha('desde'), leer_fecha('hasta')
+    es_datetime = columna.type.python_type is datetime
+    if desde:
+        query = query.filter(columna >= (datetime.combine(desde, time.min) if es_datetime else desde))
+    if hasta:
+        if es_datetime:
+            query = query.filter(columna < datetime.combine(hasta + timedelta(days=1), time.min))
+        else:
+            query = query.filter(columna <= hasta)
+    return query
+
+
+# ----- cursor -----
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _desde_json(valor, columna):
+    if valor is None:
+        return None
+    tipo = columna.type.python_type
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    if tipo is time:
+        return time.fromisoformat(valor)
+    if tipo is Decimal:
+        return Decimal(valor)
+    return tipo(valor)
+
+
+def codificar_cursor(valores):
+    crudo = json.dumps([_a_json(v) for v in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, columnas):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise ValueError
+        return [_desde_json(v, c) for v, c in zip(valores, columnas)]
+    except (ValueError, TypeError):
+        raise ParametroInvalido('cursor inválido')
+
+
+def _igual(columna, valor):
+    return columna.is_(None) if valor is None else columna == valor
+
+
+def _paso(columna, valor, descendente):
+    """Filas estrictamente posteriores a ``valor`` en una columna, o None si no hay.
+
+    MySQL y SQLite ordenan NULL como el menor valor: en orden descendente las
+    claves NULL van al final (después de cualquier valor) y en ascendente al
+    principio.
+    """
+    admite_nulos = columna.expression.nullable
+    if valor is None:
+        return None if descendente else columna.isnot(None)
+    if descendente:
+        return or_(columna < valor, columna.is_(None)) if admite_nulos else columna < valor
+    return columna > valor
+
+
+def _despues_de(columnas, valores, descendente):
+    """Condición keyset: filas estrictamente posteriores a ``valores`` en el orden dado.
+
+    Se expande a ``a < x OR (a = x AND b < y)`` en vez de comparar tuplas para
+    que MySQL pueda usar el índice de la primera columna. Las columnas que
+    admiten NULL se comparan con ``IS NULL`` (``a IS NULL AND b < y``), así que
+    las filas sin clave se recorren por el resto de columnas sin expresiones
+    que impidan usar el índice.
+    """
+    condiciones = []
+    for i, (columna, valor) in enumerate(zip(columnas, valores)):
+        paso = _paso(columna, valor, descendente)
+        if paso is None:
+            continue
+        iguales = [_igual(c, v) for c, v in zip(columnas[:i], valores[:i])]
+        condiciones.append(and_(*iguales, paso))
+    return or_(*condiciones)
+
+
+# ----- página -----
+
+def paginar(query, columnas, descendente=True):
+    """Ejecuta una página de ``query`` ordenada por ``columnas`` (la última debe ser única).
+
+    Las filas cuya clave es NULL (pedidos o reservas antiguos sin fecha) no se
+    pierden: van al final en orden descendente y el cursor las recorre por id.
+    Devuelve ``(filas, siguiente, total)``; ``total`` es None si no se pidió.
+    Lanza ``ParametroInvalido`` si el límite o el cursor no son válidos.
+    """
+    limite = leer_limite()
+    total = None
+    if request.args.get('total') in ('1', 'true'):
+        total = query.order_by(None).count()
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        query = query.filter(_despues_de(columnas, decodificar_cursor(cursor, columnas), descendente))
+
+    orden = [c.desc() if descendente else c.asc() for c in columnas]
+    filas = query.order_by(None).order_by(*orden).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor([getattr(ultima, c.key) for c in columnas])
+    return filas, siguiente, total
+
+
+def respuesta_pagina(items, siguiente, total=None):
+    """Sobre JSON común de los listados paginados"""
+    cuerpo = {'items': items, 'siguiente': siguiente, 'limite': leer_limite()}
+    if total is not None:
+        cuerpo['total'] = total
+    return jsonify(cuerpo)
@@ -1,5 +1,6 @@
 from decimal import Decimal
-from models import db, PedidoItem
+from sqlalchemy.orm import selectinload, joinedload
+from models import db, Pedido, PedidoItem
 
 
 def add_or_update_pedido_item(pedido_id, menu_item, cantidad, precio_unitario):
@@ -35,3 +36,64 @@ def add_or_update_pedido_item(pedido_id, menu_item, cantidad, precio_unitario):
         db.session.add(pedido_item)
 
     return pedido_item
+
+
+def build_pedido_items(pedido_id, lineas):
+    """Construye los PedidoItem de un pedido nuevo agrupando en memoria.
+
+    Equivalente a llamar ``add_or_update_pedido_item`` por cada línea, pero sin
+    consultar la base de datos: como el pedido es nuevo no puede tener items
+    previos, así que las líneas repetidas del carrito se suman aquí.
+
+    Args:
+        pedido_id (int): id del pedido
+        lineas (list): tuplas ``(menu_item, cantidad, precio_unitario)``
+
+    Returns:
+        list[PedidoItem]: instancias nuevas (sin agregar a la sesión)
+    """
+    items = {}
+    for menu_item, cantidad, precio_unitario in lineas:
+        cantidad = int(cantidad)
+        existente = items.get(menu_item.id)
+        if existente:
+            existente.cantidad += cantidad
+            existente.subtotal = existente.precio_unitario * existente.cantidad
+            continue
+        precio = Decimal(precio_unitario)
+        items[menu_item.id] = PedidoItem(
+            pedido_id=pedido_id,
+            menu_item_id=menu_item.id,
+            nombre_item=menu_item.nombre,
+            descripcion_item=menu_item.descripcion or '',
+            cantidad=cantidad,
+            precio_unitario=precio,
+            subtotal=precio * cantidad
+        )
+    return list(items.values())
+
+
+def cargar_pedidos(query=None):
+    """Aplica el plan de carga de los listados de pedidos.
+
+    Los items se traen con un único SELECT ... IN para todos los pedidos de la
+    lista y el plato de cada item con un JOIN en esa misma consulta, así que
+    serializar la lista cuesta dos consultas sin importar cuántos pedidos o
+    items tenga (en lugar de 1 + N + N*M cargas perezosas).
+
+    Args:
+        query: consulta de ``Pedido`` ya filtrada/ordenada (por defecto todos)
+
+    Returns:
+        la consulta con las opciones de carga aplicadas
+    """
+    if query is None:
+        query = Pedido.query
+    return query.options(
+        selectinload(Pedido.items).joinedload(PedidoItem.menu_item)
+    )
+
+
+def serializar_pedidos(pedidos, resumen=True):
+    """Serializa una lista de pedidos cargada con ``cargar_pedidos``"""
+    return [pedido.to_dict(resumen=resumen) for pedido in pedidos]
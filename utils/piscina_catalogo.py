@@ -0,0 +1,163 @@
+"""
+Sincronización entre productos_de_consumo_rapido (piscina) y el menú.
+
+Lee la tabla de productos de la piscina (sin modelo, con nombres de columna
+variables), empareja cada producto con un ``MenuItem`` por nombre normalizado
+(insensible a mayúsculas/acentos/espacios), crea el ``MenuItem`` si no existe y
+guarda el resultado en ``ProductoPiscina``. Todo esto ocurre aquí, fuera del
+camino de los pedidos: ``/api/piscina/productos`` sólo lee la tabla
+precalculada y ``crear_pedido`` sólo la consulta para resolver ids.
+
+Se ejecuta al arrancar si la tabla está vacía, cada
+``PISCINA_SINCRONIZAR_CADA`` segundos en segundo plano (un producto nuevo en la
+tabla de la piscina aparece en el menú y se puede pedir sin intervención), desde
+``POST /admin/api/piscina/sincronizar`` y con ``flask sincronizar-piscina``; no
+al editar el menú. Una pasada sin cambios sólo lee: las filas cuyo producto no
+cambió no se reescriben. Un producto ya enlazado
+conserva su ``MenuItem`` aunque el admin lo renombre; si el admin lo elimina,
+se quita su enlace (``desenlazar_menu_item``) y la siguiente sincronización lo
+vuelve a emparejar por nombre o a crear mientras siga en la tabla de la piscina.
+"""
+import unicodedata
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, MenuItem, ProductoPiscina
+from utils.menu_cache import menu_cache
+
+
+def normalizar_nombre(s):
+    if not s:
+        return ''
+    s = str(s).strip().lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
+
+
+def _leer_productos():
+    """Productos de la piscina con el mapeo flexible de columnas comunes"""
+    # SQL crudo: el esquema de esta tabla varía (p. ej. sin columna disponible)
+    filas = db.session.execute(text("SELECT * FROM productos_de_consumo_rapido")).mappings().all()
+    productos = []
+    for row in filas:
+        raw_disp = row.get('disponible') if 'disponible' in row else None
+        pid = row.get('id') or row.get('producto_id') or row.get('codigo')
+        nombre = row.get('nombre') or row.get('producto') or row.get('titulo')
+        if pid is None or not nombre:
+            continue
+        precio_raw = row.get('precio') or row.get('valor') or row.get('precio_unitario') or 0
+        try:
+            precio = Decimal(str(precio_raw))
+        except (InvalidOperation, ValueError):
+            precio = Decimal('0')
+        productos.append({
+            'producto_id': str(pid),
+            'nombre': nombre,
+            'descripcion': row.get('descripcion') or row.get('detalle') or '',
+            'precio': precio,
+            'imagen': row.get('imagen') or row.get('imagen_url') or row.get('foto') or None,
+            'disponible': bool(raw_disp) if raw_disp is not None else True,
+        })
+    return productos
+
+
+def sincronizar_productos_piscina():
+    """Regenera ``ProductoPiscina`` desde la tabla de productos y el menú.
+
+    Returns:
+        dict: cantidad de productos sincronizados y de items del menú creados
+    """
+    try:
+        productos = _leer_productos()
+    except SQLAlchemyError:
+        # La tabla de productos de la piscina no existe en esta base
+        db.session.rollback()
+        return {'productos': 0, 'menu_items_creados': 0}
+
+    menu_map, menu_ids = {}, set()
+    for menu_item_id, nombre in db.session.query(MenuItem.id, MenuItem.nombre):
+        menu_map.setdefault(normalizar_nombre(nombre), menu_item_id)
+        menu_ids.add(menu_item_id)
+
+    existentes = {p.producto_id: p for p in ProductoPiscina.query.all()}
+    # Los enlaces existentes se respetan (el item pudo cambiar de nombre en el menú)
+    enlazados = {pid: fila.menu_item_id for pid, fila in existentes.items() if fila.menu_item_id in menu_ids}
+
+    # Crear en bloque los items del menú que falten (antes se creaban en crear_pedido)
+    nuevos = {}
+    for producto in productos:
+        if producto['producto_id'] in enlazados:
+            continue
+        clave = normalizar_nombre(producto['nombre'])
+        if clave not in menu_map and clave not in nuevos:
+            nuevos[clave] = MenuItem(
+                restaurante_id=1,
+                nombre=producto['nombre'],
+                descripcion='Producto de consumo rápido (piscina)',
+                precio=producto['precio'],
+                categoria_nombre='Piscina',
+                disponible=True,
+                imagen_url=producto['imagen']
+            )
+    if nuevos:
+        db.session.add_all(nuevos.values())
+        db.session.flush()
+        for clave, menu_item in nuevos.items():
+            menu_map[clave] = menu_item.id
+
+    ahora = datetime.utcnow()
+    vistos = set()
+    for producto in productos:
+        if producto['producto_id'] in vistos:
+            continue
+        vistos.add(producto['producto_id'])
+        valores = {
+            'menu_item_id': enlazados.get(producto['producto_id']) or menu_map[normalizar_nombre(producto['nombre'])],
+            'nombre': producto['nombre'],
+            'descripcion': producto['descripcion'],
+            'precio': producto['precio'],
+            'imagen': producto['imagen'],
+            'disponible': producto['disponible'],
+        }
+        fila = existentes.get(producto['producto_id'])
+        if fila is None:
+            fila = ProductoPiscina(producto_id=producto['producto_id'])
+            db.session.add(fila)
+        elif all(getattr(fila, campo) == valor for campo, valor in valores.items()):
+            continue
+        for campo, valor in valores.items():
+            setattr(fila, campo, valor)
+        fila.actualizado = ahora
+    for producto_id, fila in existentes.items():
+        if producto_id not in vistos:
+            db.session.delete(fila)
+
+    db.session.commit()
+
+    if nuevos:
+        menu_cache.invalidar()
+
+    return {'productos': len(vistos), 'menu_items_creados': len(nuevos)}
+
+
+def iniciar_sincronizacion_periodica(app, socketio):
+    """Sincroniza los productos de la piscina cada ``PISCINA_SINCRONIZAR_CADA`` segundos en segundo plano"""
+    intervalo = app.config.get('PISCINA_SINCRONIZAR_CADA')
+    if not intervalo:
+        return
+
+    def _bucle():
+        while True:
+            socketio.sleep(intervalo)
+            try:
+                with app.app_context():
+                    sincronizar_productos_piscina()
+            except Exception as e:
+                app.logger.warning(f'Error sincronizando productos de la piscina: {e}')
+
+    socketio.start_background_task(_bucle)
+
+
+def desenlazar_menu_item(menu_item_id):
+    """Quita los enlaces de la piscina a un item del menú que se va a eliminar (sin commit)"""
+    ProductoPiscina.query.filter_by(menu_item_id=menu_item_id).delete(synchronize_session=False)
@@ -0,0 +1,146 @@
+"""
+Presupuesto de sentencias SQL por endpoint, para detectar consultas N+1.
+
+Muchos ``to_dict`` cargan relaciones de forma perezosa (``Pedido`` -> items
+-> ``menu_item``, ``Receta`` -> ``inventario``...): un listado que olvida
+``cargar_pedidos`` o un ``selectinload`` pasa de 2 sentencias a una por fila
+sin que nada falle. ``PRESUPUESTOS`` fija el máximo de sentencias por
+petición de los endpoints más usados (``PRESUPUESTOS_SQL`` en la
+configuración añade o cambia límites) y ``PRESUPUESTO_SQL`` decide qué pasa
+al superarlo:
+
+* ``'error'`` (pruebas): la petición lanza ``PresupuestoExcedido`` con cada
+  sentencia y el código de la app que la ejecutó, y la prueba falla;
+* ``'log'`` (desarrollo): lo mismo se escribe como aviso en el log;
+* ``None`` (producción): sin instrumentar.
+
+Los límites no dependen del número de filas: un endpoint que los supera con
+más datos tiene una consulta por fila. El código que ejecuta a propósito una
+sentencia por fila (el descuento atómico de stock) lo declara con
+``ampliar(n)``. Con el modo activo, ``limite(n)``
+aplica un presupuesto a cualquier bloque de código (pruebas).
+
+Dentro del presupuesto sólo se guarda el texto de cada sentencia: la pila
+(el código que la ejecutó) se recorre únicamente para las que lo superan, que
+son las que aparecen con su origen en el informe.
+"""
+import logging
+import os
+import traceback
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+logger = logging.getLogger('boodfood.presupuesto_sql')
+
+# endpoint -> sentencias por petición (con la caché correspondiente fría)
+PRESUPUESTOS = {
+    'main.api_menu': 3,              # snapshot del menú (utils.menu_cache)
+    'main.api_mesas': 3,             # mesas + índice de ocupación en memoria
+    'admin.api_mesas': 3,
+    'cocina.pedidos_pendientes': 3,  # cola de cocina en memoria
+    'cocina.cola': 3,
+    'api.get_pedidos_cocina': 3,
+    'pedidos.crear_pedido': 12,      # platos, recetas y stock en lote (+ un UPDATE por ingrediente, ver ampliar)
+    'admin.panel_admin': 8,          # estado_inicial: mesas, pedidos con items, reservas, inventario
+    'admin.api_pedidos': 4,
+}
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PresupuestoExcedido(AssertionError):
+    """Un endpoint o bloque ejecutó más sentencias SQL de las permitidas"""
+
+
+def _origen():
+    """Marcos de la pila que son código de la app (sin este módulo ni dependencias)"""
+    marcos = [
+        marco for marco in traceback.extract_stack()[:-2]
+        if marco.filename.startswith(_RAIZ) and marco.filename != __file__
+        and os.sep + 'site-packages' + os.sep not in marco.filename
+    ]
+    return ''.join(traceback.format_list(marcos[-6:]))
+
+
+def _informe(titulo, sentencias, limite):
+    lineas = [f'{titulo}: {len(sentencias)} sentencias SQL (presupuesto {limite})']
+    for i, (sentencia, origen) in enumerate(sentencias, 1):
+        lineas.append(f'--- {i}: {" ".join(sentencia.split())}')
+        if origen:
+            lineas.append(origen.rstrip())
+    return '\n'.join(lineas)
+
+
+class PresupuestoSQL:
+    """Cuenta las sentencias de cada petición presupuestada y actúa al superar el límite"""
+
+    def __init__(self):
+        self.modo = None
+        self.presupuestos = dict(PRESUPUESTOS)
+        self._bloques = []   # (maximo, sentencias) abiertos por limite()
+
+    def iniciar(self, app):
+        self.modo = app.config.get('PRESUPUESTO_SQL')
+        self.presupuestos = {**PRESUPUESTOS, **(app.config.get('PRESUPUESTOS_SQL') or {})}
+        self._bloques = []
+        if not self.modo:
+            return
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._registrar)
+        app.before_request(self._inicio_peticion)
+        app.after_request(self._fin_peticion)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        sentencias = g.get('_presupuesto_sql') if has_request_context() else None
+        if sentencias is None and not self._bloques:
+            return
+        excedido = (sentencias is not None and len(sentencias) >= self._limite_peticion()) or any(
+            len(bloque) >= maximo for maximo, bloque in self._bloques)
+        registro = (statement, _origen() if excedido else None)
+        if sentencias is not None:
+            sentencias.append(registro)
+        for _, bloque in self._bloques:
+            bloque.append(registro)
+
+    def _limite_peticion(self):
+        return self.presupuestos[request.endpoint] + g.get('_presupuesto_sql_extra', 0)
+
+    def _inicio_peticion(self):
+        if request.endpoint in self.presupuestos:
+            g._presupuesto_sql = []
+
+    def _fin_peticion(self, response):
+        sentencias = g.pop('_presupuesto_sql', None)
+        if sentencias is None:
+            return response
+        limite = self._limite_peticion()
+        g.pop('_presupuesto_sql_extra', None)
+        if len(sentencias) > limite:
+            mensaje = _informe(f'{request.method} {request.path} ({request.endpoint})', sentencias, limite)
+            if self.modo == 'error':
+                raise PresupuestoExcedido(mensaje)
+            logger.warning(mensaje)
+        return response
+
+    def ampliar(self, sentencias):
+        """Permite ``sentencias`` más en la petición en curso (sentencias por fila intencionadas)"""
+        if has_request_context() and g.get('_presupuesto_sql') is not None:
+            g._presupuesto_sql_extra = g.get('_presupuesto_sql_extra', 0) + sentencias
+
+    @contextmanager
+    def limite(self, maximo, titulo='Bloque'):
+        """Falla con ``PresupuestoExcedido`` si el bloque ejecuta más de ``maximo`` sentencias"""
+        sentencias = []
+        self._bloques.append((maximo, sentencias))
+        try:
+            yield sentencias
+        finally:
+            self._bloques = [b for b in self._bloques if b[1] is not sentencias]
+        if len(sentencias) > maximo:
+            raise PresupuestoExcedido(_informe(titulo, sentencias, maximo))
+
+
+presupuesto_sql = PresupuestoSQL()
@@ -0,0 +1,141 @@
+"""
+Caché de usuarios para Flask-Login.
+
+``load_user`` se ejecuta en cada petición autenticada y en cada conexión de
+Socket.IO. En lugar de leer el usuario completo cada vez, devuelve un
+``Principal``: una copia inmutable de lo que usan los permisos (id, rol,
+nombre, activo) guardada por proceso en una caché LRU con caducidad
+(``USUARIOS_CACHE_TTL`` segundos, ``USUARIOS_CACHE_MAX`` entradas).
+
+Los demás atributos (``email``, ``telefono``, ``to_dict()``...) se leen del
+``Usuario`` de la base de datos la primera vez que se piden en la petición,
+así que las rutas que los necesitan siguen funcionando igual.
+
+Cualquier commit que modifica o elimina un usuario (cambio de rol, perfil,
+contraseña, borrado) invalida su entrada mediante los eventos de la sesión de
+SQLAlchemy; los cambios hechos desde otro proceso se ven al caducar.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, Usuario
+
+_CLAVE_PENDIENTES = 'usuarios_modificados'
+
+
+class Principal(UserMixin):
+    """Usuario autenticado en memoria: id, rol, nombre y activo (sólo lectura)"""
+
+    def __init__(self, id, rol, nombre, activo):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'rol', rol)
+        object.__setattr__(self, 'nombre', nombre)
+        object.__setattr__(self, 'activo', activo)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('Principal es de sólo lectura; modifique el Usuario')
+
+    @property
+    def is_active(self):
+        return self.activo is not False
+
+    def usuario(self):
+        """``Usuario`` completo (del mapa de identidad de la sesión si ya se cargó)"""
+        usuario = db.session.get(Usuario, self.id)
+        if has_app_context():
+            # El mapa de identidad guarda referencias débiles: sin retenerlo durante el
+            # contexto, cada atributo leído (telefono, nombre...) volvería a consultarlo
+            g.setdefault('_usuarios_cargados', {})[self.id] = usuario
+        return usuario
+
+    def __getattr__(self, nombre):
+        # Sólo se llama para atributos que el principal no tiene
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+        usuario = self.usuario()
+        if usuario is None:
+            raise AttributeError(nombre)
+        return getattr(usuario, nombre)
+
+    def __eq__(self, otro):
+        return isinstance(otro, (Principal, Usuario)) and otro.get_id() == self.get_id()
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<Principal {self.id} {self.rol}>'
+
+
+class CacheUsuarios:
+    """id -> (Principal, vence), en orden de uso (LRU)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+
+    def _limites(self):
+        if not has_app_context():
+            return 300, 1000
+        config = current_app.config
+        return config.get('USUARIOS_CACHE_TTL', 300), config.get('USUARIOS_CACHE_MAX', 1000)
+
+    def obtener(self, usuario_id):
+        """Principal del usuario; lo lee de la base de datos si no está o caducó"""
+        ttl, maximo = self._limites()
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is not None and entrada[1] > ahora:
+                self._entradas.move_to_end(usuario_id)
+                return entrada[0]
+        fila = db.session.execute(
+            select(Usuario.id, Usuario.rol, Usuario.nombre, Usuario.activo).where(Usuario.id == usuario_id)
+        ).first()
+        if fila is None:
+            self.invalidar(usuario_id)
+            return None
+        principal = Principal(*fila)
+        if ttl:
+            with self._lock:
+                self._entradas[usuario_id] = (principal, ahora + ttl)
+                self._entradas.move_to_end(usuario_id)
+                while len(self._entradas) > maximo:
+                    self._entradas.popitem(last=False)
+        return principal
+
+    def invalidar(self, usuario_id=None):
+        """Olvida un usuario (o todos)"""
+        with self._lock:
+            if usuario_id is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(usuario_id, None)
+
+
+cache_usuarios = CacheUsuarios()
+
+
+# ----- enganche con la sesión de SQLAlchemy -----
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_usuarios_modificados(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, Usuario) and obj.id is not None:
+            session.info.setdefault(_CLAVE_PENDIENTES, set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_usuarios_modificados(session):
+    for usuario_id in session.info.pop(_CLAVE_PENDIENTES, ()):
+        cache_usuarios.invalidar(usuario_id)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_usuarios_modificados(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_PENDIENTES, None)
@@ -0,0 +1,225 @@
+"""
+Acumulados de ventas por día para los dashboards.
+
+La tabla ``ventas_resumen`` guarda, por fecha y hora locales (``TIMEZONE``),
+estado y método de pago, cuántos pedidos hay y cuánto suman. Se mantiene de
+forma incremental: un listener de la sesión de SQLAlchemy calcula, en cada
+flush, cuánto cambia cada grupo por los pedidos creados, modificados (cambio
+de estado, método de pago, total o fecha) o eliminados, y tras el commit lo
+aplica con un upsert en una transacción corta aparte. Todos los pedidos de la
+misma hora actualizan la misma fila: hacerlo dentro de la transacción del
+pedido haría esperar a cada pedido concurrente por ese bloqueo hasta el commit
+del anterior. Si la transacción se deshace, los cambios se descartan; si el
+upsert falla después del commit, se registra en el log y el acumulado queda
+desajustado hasta ``reconstruir_ventas``.
+
+Los endpoints de estadísticas leen unas pocas filas de esta tabla en lugar de
+filtrar ``pedidos`` por ``DATE(fecha_pedido)``, que no puede usar índices.
+``reconstruir_ventas`` recalcula todo desde ``pedidos`` (primer arranque o
+reparación, ``flask reconstruir-ventas``).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, insert, update
+from sqlalchemy.orm import Session
+from models import db, Pedido, VentaResumen
+
+logger = logging.getLogger('boodfood.ventas_resumen')
+
+ZONA_POR_DEFECTO = 'America/Bogota'
+
+_CLAVE_DELTAS = 'ventas_resumen_deltas'
+
+# Atributos del pedido que deciden a qué grupo pertenece y cuánto aporta
+_ATRIBUTOS = ('fecha_pedido', 'estado', 'metodo_pago', 'total')
+
+
+def zona_horaria():
+    nombre = current_app.config.get('TIMEZONE') if has_app_context() else None
+    return ZoneInfo(nombre or ZONA_POR_DEFECTO)
+
+
+def hoy():
+    """Fecha actual en la zona horaria del restaurante"""
+    return datetime.now(zona_horaria()).date()
+
+
+def _clave(fecha_pedido, estado, metodo_pago, zona):
+    """Grupo de un pedido; ``fecha_pedido`` se guarda en UTC sin zona"""
+    if fecha_pedido is None:
+        return None
+    local = fecha_pedido.replace(tzinfo=timezone.utc).astimezone(zona)
+    return local.date(), local.hour, estado or '', metodo_pago or ''
+
+
+# ----- mantenimiento incremental -----
+
+def _valores_anteriores(pedido):
+    """Valores de los atributos antes de este flush"""
+    estado = db.inspect(pedido)
+    valores = []
+    for atributo in _ATRIBUTOS:
+        historial = estado.attrs[atributo].history
+        if historial.deleted:
+            valores.append(historial.deleted[0])
+        elif historial.unchanged:
+            valores.append(historial.unchanged[0])
+        else:
+            valores.append(getattr(pedido, atributo))
+    return valores
+
+
+def _decimal(valor):
+    """Importe como Decimal exacto (un float pasa por su texto, no por su binario)"""
+    if isinstance(valor, Decimal):
+        return valor
+    return Decimal(str(valor or 0))
+
+
+def _sumar(deltas, clave, cantidad, total):
+    if clave is not None:
+        acumulado = deltas[clave]
+        acumulado[0] += cantidad
+        acumulado[1] += _decimal(total)
+
+
+def _upsert(conexion, clave, cantidad, total):
+    tabla = VentaResumen.__table__
+    fecha, hora, estado, metodo_pago = clave
+    valores = {'fecha': fecha, 'hora': hora, 'estado': estado, 'metodo_pago': metodo_pago,
+               'cantidad': cantidad, 'total': total}
+    dialecto = conexion.dialect.name
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(tabla).values(**valores)
+        stmt = stmt.on_duplicate_key_update(cantidad=tabla.c.cantidad + stmt.inserted.cantidad,
+                                            total=tabla.c.total + stmt.inserted.total)
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+        stmt = insert_sqlite(tabla).values(**valores)
+        stmt = stmt.on_conflict_do_update(index_elements=list(tabla.primary_key.columns),
+                                          set_={'cantidad': tabla.c.cantidad + stmt.excluded.cantidad,
+                                                'total': tabla.c.total + stmt.excluded.total})
+    else:
+        resultado = conexion.execute(
+            update(tabla)
+            .where(tabla.c.fecha == fecha, tabla.c.hora == hora,
+                   tabla.c.estado == estado, tabla.c.metodo_pago == metodo_pago)
+            .values(cantidad=tabla.c.cantidad + cantidad, total=tabla.c.total + total)
+        )
+        if resultado.rowcount:
+            return
+        stmt = insert(tabla).values(**valores)
+    conexion.execute(stmt)
+
+
+def _nuevos_deltas():
+    return defaultdict(lambda: [0, Decimal('0')])
+
+
+@event.listens_for(Session, 'after_flush')
+def _acumular_ventas(session, flush_context):
+    zona = None
+    deltas = session.info.get(_CLAVE_DELTAS)
+    if deltas is None:
+        deltas = _nuevos_deltas()
+    for obj in session.new:
+        if isinstance(obj, Pedido):
+            zona = zona or zona_horaria()
+            _sumar(deltas, _clave(obj.fecha_pedido, obj.estado, obj.metodo_pago, zona), 1, obj.total)
+    for obj in session.dirty:
+        if isinstance(obj, Pedido) and session.is_modified(obj):
+            zona = zona or zona_horaria()
+            fecha, estado, metodo_pago, total = _valores_anteriores(obj)
+            _sumar(deltas, _clave(fecha, estado, metodo_pago, zona), -1, -_decimal(total))
+            _sumar(deltas, _clave(obj.fecha_pedido, obj.estado, obj.metodo_pago, zona), 1, obj.total)
+    for obj in session.deleted:
+        if isinstance(obj, Pedido):
+            zona = zona or zona_horaria()
+            fecha, estado, metodo_pago, total = _valores_anteriores(obj)
+            _sumar(deltas, _clave(fecha, estado, metodo_pago, zona), -1, -_decimal(total))
+    if deltas:
+        session.info[_CLAVE_DELTAS] = deltas
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_ventas(session):
+    deltas = session.info.pop(_CLAVE_DELTAS, None)
+    if not deltas:
+        return
+    try:
+        with session.get_bind(mapper=VentaResumen.__mapper__).begin() as conexion:
+            # Orden fijo de claves para que dos transacciones no se bloqueen en cruz
+            for clave in sorted(deltas):
+                cantidad, total = deltas[clave]
+                if cantidad or total:
+                    _upsert(conexion, clave, cantidad, total)
+    except Exception as e:
+        logger.error(f'No se pudieron aplicar los acumulados de ventas ({e}); '
+                     f'ejecuta "flask reconstruir-ventas"')
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_ventas(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CLAVE_DELTAS, None)
+
+
+def _activar_historial(target, value, oldvalue, initiator):
+    pass
+
+
+# Cargar el valor anterior al asignar (aunque el atributo estuviera expirado)
+# para poder restarlo del grupo viejo
+for _atributo in _ATRIBUTOS:
+    event.listen(getattr(Pedido, _atributo), 'set', _activar_historial, active_history=True)
+
+
+# ----- reconstrucción -----
+
+def reconstruir_ventas():
+    """Recalcula ``ventas_resumen`` completa desde la tabla de pedidos"""
+    zona = zona_horaria()
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    filas = db.session.query(
+        Pedido.fecha_pedido, Pedido.estado, Pedido.metodo_pago, Pedido.total
+    ).execution_options(yield_per=1000)
+    for fecha, estado, metodo_pago, total in filas:
+        _sumar(deltas, _clave(fecha, estado, metodo_pago, zona), 1, total)
+
+    db.session.query(VentaResumen).delete(synchronize_session=False)
+    if deltas:
+        db.session.execute(insert(VentaResumen), [
+            {'fecha': fecha, 'hora': hora, 'estado': estado, 'metodo_pago': metodo_pago,
+             'cantidad': cantidad, 'total': total}
+            for (fecha, hora, estado, metodo_pago), (cantidad, total) in sorted(deltas.items())
+        ])
+    db.session.commit()
+    return len(deltas)
+
+
+# ----- lecturas -----
+
+def totales_dia(fecha):
+    """(pedidos, ventas) de un día local"""
+    cantidad, total = db.session.query(
+        func.sum(VentaResumen.cantidad), func.sum(VentaResumen.total)
+    ).filter(VentaResumen.fecha == fecha).one()
+    return int(cantidad or 0), Decimal(total or 0)
+
+
+def agrupar(campo, fecha_inicio, fecha_fin):
+    """[(valor, cantidad, total)] por ``campo`` entre fecha_inicio (incl.) y fecha_fin (excl.)"""
+    columna = getattr(VentaResumen, campo)
+    filas = db.session.query(
+        columna, func.sum(VentaResumen.cantidad), func.sum(VentaResumen.total)
+    ).filter(
+        VentaResumen.fecha >= fecha_inicio,
+        VentaResumen.fecha < fecha_fin
+    ).group_by(columna).having(func.sum(VentaResumen.cantidad) > 0).order_by(columna).all()
+    return [(valor if valor != '' else None, int(cantidad), Decimal(total or 0))
+            for valor, cantidad, total in filas]